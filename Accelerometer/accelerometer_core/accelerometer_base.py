@@ -1,6 +1,8 @@
+from Accelerometer.accelerometer_core.accelerometer_binary_log import AsyncBinaryLogWriter, ACCEL_LOG_FIELDS
 from Accelerometer.accelerometer_core.accelerometer_constants import GRAVITY_CONSTANT
 from Utilities.Geometry import Vector3, Quaternion, Matrix3
 from typing import Tuple, List, Dict
+from Utilities.Common import WindowOrderStatistics
 from Utilities import RealTimeFilter
 import time
 
@@ -16,6 +18,7 @@ USE_FILTERING_BIT = 8
 WAIT_FOR_READ_RESPONSE_BIT = 9
 RAD_TO_DEG = 57.297469361769856
 DEG_TO_RAD = 1.0 / RAD_TO_DEG
+CALIBRATION_WINDOW_SIZE = 1023
 
 TIME = "\"time\""
 DTIME = "\"dtime\""
@@ -63,6 +66,16 @@ def smooth_step(value, edge0, edge1) -> float:
     return x * x * (3.0 - 2.0 * x)
 
 
+def _reuse_vector(curr: Vector3, prev: Vector3, x: float, y: float, z: float) -> Tuple[Vector3, Vector3]:
+    """
+    Записывает новое значение в объект предыдущего значения вместо создания нового Vector3.
+    :return: (текущее, предыдущее)
+    """
+    if prev is curr:
+        return Vector3(x, y, z), curr
+    return prev.assign(x, y, z), curr
+
+
 class AccelerometerBase:
     RAED_SETTINGS_BITS = {
         ACCELERATION_BIT,
@@ -82,6 +95,17 @@ class AccelerometerBase:
     def _device_read_request(self) -> Tuple[bool, Tuple[float, ...]]:
         return False, (0.0,)
 
+    def _device_read_into(self) -> bool:
+        """
+        Читает одно измерение и обновляет текущие и предыдущие значения на месте.
+        По умолчанию через _device_read_request и _parce_response, устройства с прямым доступом к регистрам
+        переопределяют его разбором блока регистров.
+        """
+        flag, response = self._device_read_request()
+        if flag:
+            self._parce_response(response)
+        return flag
+
     def __init__(self):
         self._device_connection = None
         if not self._request_for_device_connection():
@@ -124,12 +148,17 @@ class AccelerometerBase:
 
         self._basis_curr: Matrix3 = Matrix3.identity()
         self._basis_prev: Matrix3 = Matrix3.identity()
+        # матрицы и оси, в которые _build_basis пишет на месте, вместо создания новых на каждом измерении
+        self._basis_buffers: Tuple[Matrix3, Matrix3] = (Matrix3.identity(), Matrix3.identity())
+        self._basis_axes: Tuple[Vector3, Vector3, Vector3, Vector3] = \
+            (Vector3(0.0, 0.0, 0.0), Vector3(0.0, 0.0, 0.0), Vector3(0.0, 0.0, 0.0), Vector3(0.0, 0.0, 0.0))
 
         self._curr_t: float = -1.0
         self._prev_t: float = -1.0
         self._status: int = 0
         self._read_config: int = 0
         self._calib_cntr: int = 0
+        self._calib_windows: List[WindowOrderStatistics] = []
 
         self._filters: Dict[int, List[RealTimeFilter()]] = {}
 
@@ -189,10 +218,10 @@ class AccelerometerBase:
     @use_filtering.setter
     def use_filtering(self, val: bool):
         if val:
-            _set_bit(self.read_config, USE_FILTERING_BIT)
+            self._read_config = _set_bit(self.read_config, USE_FILTERING_BIT)
             self._set_up_filters()
         else:
-            _clear_bit(self.read_config, USE_FILTERING_BIT)
+            self._read_config = _clear_bit(self.read_config, USE_FILTERING_BIT)
 
     @property
     def device(self):
@@ -624,28 +653,33 @@ class AccelerometerBase:
     #########################################################
     """
     def _set_accel(self, x: float, y: float, z: float):
-        self._accel_prev = self._accel_curr
-        self._accel_curr = Vector3(x, y, z)
+        self._accel_curr, self._accel_prev = _reuse_vector(self._accel_curr, self._accel_prev, x, y, z)
 
     def _set_lin_accel(self, x: float, y: float, z: float):
-        self._accel_lin_prev = self._accel_lin_curr
-        self._accel_lin_curr = Vector3(x, y, z) - self._accel_calib_lin
+        calib = self._accel_calib_lin
+        self._accel_lin_curr, self._accel_lin_prev = \
+            _reuse_vector(self._accel_lin_curr, self._accel_lin_prev, x - calib.x, y - calib.y, z - calib.z)
 
     def _set_omega(self, x: float, y: float, z: float):
-        self._omega_prev = self._omega_curr
-        self._omega_curr = Vector3(x, y, z) - self._omega_calib
+        calib = self._omega_calib
+        self._omega_curr, self._omega_prev = \
+            _reuse_vector(self._omega_curr, self._omega_prev, x - calib.x, y - calib.y, z - calib.z)
 
     def _set_angles(self, x: float, y: float, z: float):
-        self._angle_prev = self._angle_curr
-        self._angle_curr = Vector3(x, y, z)
+        self._angle_curr, self._angle_prev = _reuse_vector(self._angle_curr, self._angle_prev, x, y, z)
 
     def _set_magnetometer(self, x: float, y: float, z: float):
-        self._mag_prev = self._mag_curr
-        self._mag_curr = Vector3(x, y, z)
+        self._mag_curr, self._mag_prev = _reuse_vector(self._mag_curr, self._mag_prev, x, y, z)
 
     def _set_quaternion(self, w: float, x: float, y: float, z: float):
-        self._quat_prev = self._quat_curr
-        self._quat_curr = Quaternion(w, x, y, z)
+        if self._quat_prev is self._quat_curr:
+            self._quat_curr = Quaternion(w, x, y, z)
+            return
+        self._quat_curr, self._quat_prev = self._quat_prev, self._quat_curr
+        self._quat_curr.ew = w
+        self._quat_curr.ex = x
+        self._quat_curr.ey = y
+        self._quat_curr.ez = z
 
     def _set_basis(self, basis: Matrix3):
         self._basis_prev = self._basis_curr
@@ -719,16 +753,22 @@ class AccelerometerBase:
         # self._set_angles(angles.x * RAD_TO_DEG,
         #                angles.y * RAD_TO_DEG,
         #                 angles.z * RAD_TO_DEG)
-        try:
-            y_axis = (self.basis.up    + Vector3.cross(self.omega, self.basis.up   ) * self.delta_t).normalized()
-            z_axis = (self.basis.front + Vector3.cross(self.omega, self.basis.front) * self.delta_t).normalized()
-            z_axis = (z_axis * (1.0 - k_filter_arg) + k_filter_arg * self.acceleration.normalized()).normalized()
-            x_axis = Vector3.cross(z_axis, y_axis).normalized()
-            y_axis = Vector3.cross(x_axis, z_axis).normalized()
-            self._set_basis(
-                Matrix3(x_axis.x, y_axis.x, z_axis.x, x_axis.y, y_axis.y, z_axis.y, x_axis.z, y_axis.z, z_axis.z))
-        except ZeroDivisionError as _:
-            self._set_basis(self._basis_curr)
+        basis, omega, delta_t = self._basis_curr, self.omega, self.delta_t
+        x_axis, y_axis, z_axis, tmp = self._basis_axes
+        # y = (up + (omega x up) * dt).normalized
+        basis.up_into(y_axis)
+        y_axis.iadd_scaled(Vector3.cross_into(omega, y_axis, tmp), delta_t).normalize()
+        # z = (front + (omega x front) * dt).normalized
+        basis.front_into(z_axis)
+        z_axis.iadd_scaled(Vector3.cross_into(omega, z_axis, tmp), delta_t).normalize()
+        # z = (z * (1 - k) + k * acceleration.normalized).normalized
+        z_axis *= 1.0 - k_filter_arg
+        z_axis.iadd_scaled(tmp.copy_from(self.acceleration).normalize(), k_filter_arg).normalize()
+        Vector3.cross_into(z_axis, y_axis, x_axis).normalize()
+        Vector3.cross_into(x_axis, z_axis, y_axis).normalize()
+        # пишем в свободный из двух буферов: текущий базис остаётся предыдущим
+        basis_next = self._basis_buffers[1] if basis is self._basis_buffers[0] else self._basis_buffers[0]
+        self._set_basis(basis_next.assign_columns(x_axis, y_axis, z_axis))
 
     def _default_settings(self):
         self.is_accel_read = True
@@ -761,28 +801,28 @@ class AccelerometerBase:
     def _filter_values(self):
         if self.is_accel_read:
             fx, fy, fz = self._filters[ACCELERATION_BIT]
-            x, y, z = self._accel_curr
-            self._accel_curr = Vector3(fx.filter(x), fy.filter(y), fz.filter(z))
+            value = self._accel_curr
+            value.assign(fx.filter(value.x), fy.filter(value.y), fz.filter(value.z))
 
         if self.is_omega_read:
             fx, fy, fz = self._filters[OMEGA_BIT]
-            x, y, z = self._omega_curr
-            self._omega_curr = Vector3(fx.filter(x), fy.filter(y), fz.filter(z))
+            value = self._omega_curr
+            value.assign(fx.filter(value.x), fy.filter(value.y), fz.filter(value.z))
 
         if self.is_angles_read:
             fx, fy, fz = self._filters[ANGLES_BIT]
-            x, y, z = self._angle_curr
-            self._angle_curr = Vector3(fx.filter(x), fy.filter(y), fz.filter(z))
+            value = self._angle_curr
+            value.assign(fx.filter(value.x), fy.filter(value.y), fz.filter(value.z))
 
         if self.is_magnetometer_read:
             fx, fy, fz = self._filters[MAGNETOMETER_BIT]
-            x, y, z = self._mag_curr
-            self._mag_curr = Vector3(fx.filter(x), fy.filter(y), fz.filter(z))
+            value = self._mag_curr
+            value.assign(fx.filter(value.x), fy.filter(value.y), fz.filter(value.z))
 
         if self.is_lin_accel_read:
             fx, fy, fz = self._filters[ACCELERATION_LINEAR_BIT]
-            x, y, z = self._accel_lin_curr
-            self._accel_lin_curr = Vector3(fx.filter(x), fy.filter(y), fz.filter(z))
+            value = self._accel_lin_curr
+            value.assign(fx.filter(value.x), fy.filter(value.y), fz.filter(value.z))
     """
     ##########################################
     #####  Main accelerometer functions  #####
@@ -841,7 +881,7 @@ class AccelerometerBase:
         cntr_fail = 0
         max_read_fails = max(10, max_read_fails)
         max_read_success = max(10, max_read_success)
-        acceleration = Vector3()
+        acceleration = Vector3(0.0, 0.0, 0.0)
         while True:
             cntr_fail += 1
             if self.read_request():
@@ -853,8 +893,8 @@ class AccelerometerBase:
                 break
         try:
             acceleration /= cntr
-            x_axis = Vector3.cross(acceleration, Vector3(0, 1, 0) if azimuth is None else azimuth).normalized()
-            y_axis = Vector3.cross(x_axis, acceleration).normalized()
+            x_axis = Vector3.cross(acceleration, Vector3(0, 1, 0) if azimuth is None else azimuth).normalized
+            y_axis = Vector3.cross(x_axis, acceleration).normalized
             z_axis = Vector3.cross(y_axis, x_axis)
             self._set_basis(
                 Matrix3(x_axis.x, y_axis.x, z_axis.x, x_axis.y, y_axis.y, z_axis.y,  x_axis.z, y_axis.z, z_axis.z))
@@ -865,42 +905,51 @@ class AccelerometerBase:
             self._set_angles(0.0, 0.0, 0.0)
 
     def read_request(self, k_filter_arg: float = 0.01) -> bool:
-        flag, response = self._device_read_request()
-        if not flag:
+        if not self._device_read_into():
             self._read_errors += 1
             if self._read_errors == self.errors_before_restart:
                 self._read_errors = 0
                 self.restart()
             return False
         self._read_errors = 0
-        self._parce_response(response)
         if self.use_filtering:
             self._filter_values()
         self._build_basis(k_filter_arg)
         self._update_time()
         return True
 
-    def calibrate(self, stop: bool = False, forward: Vector3 = None, acceleration_noize_level: float = 0.05) -> bool:
+    def calibrate(self, stop: bool = False, forward: Vector3 = None, acceleration_noize_level: float = 0.05,
+                  robust: bool = False) -> bool:
         """
         Читает и аккумулирует калибровочные значения для углов и ускорений.
         :param stop: переход в режим завершения калибровки.
         :param forward: направление вперёд. М.б. использованы показания магнетометра.
         :param acceleration_noize_level: forward: ...
+        :param robust: смещения считаются медианой последних CALIBRATION_WINDOW_SIZE измерений, а не средним,
+        что устойчиво к выбросам (удары, одиночные ошибки чтения). Должен быть одинаковым на всех итерациях.
         :return: успешно ли завершилась итерация калибровки
         """
-        stop = True if self.d_acceleration.magnitude() > acceleration_noize_level else stop
+        stop = True if self.d_acceleration.magnitude > acceleration_noize_level else stop
 
         if stop:
             if self._calib_cntr == 0:
                 return False
-            self._accel_calib     /= self._calib_cntr
-            self._omega_calib     /= self._calib_cntr
-            self._mag_calib       /= self._calib_cntr
-            self._accel_calib_lin /= self._calib_cntr
+            if robust and self._calib_windows:
+                ax, ay, az, wx, wy, wz, mx, my, mz, lx, ly, lz = (w.median for w in self._calib_windows)
+                self._accel_calib     = Vector3(ax, ay, az)
+                self._omega_calib     = Vector3(wx, wy, wz)
+                self._mag_calib       = Vector3(mx, my, mz)
+                self._accel_calib_lin = Vector3(lx, ly, lz)
+            else:
+                self._accel_calib     /= self._calib_cntr
+                self._omega_calib     /= self._calib_cntr
+                self._mag_calib       /= self._calib_cntr
+                self._accel_calib_lin /= self._calib_cntr
+            self._calib_windows    = []
             self._calib_cntr       = 0
             self._basis_curr       = Matrix3.build_basis(self._accel_calib, forward)
             self._basis_prev       = self._basis_curr
-            self._accel_calib      = self._accel_calib * self.basis
+            self._accel_calib      = self.basis.transposed * self._accel_calib
                                             # Vector3(self.basis.m00 * self._accel_calib.x +
                                             # self.basis.m10 * self._accel_calib.y +
                                             # self.basis.m20 * self._accel_calib.z,
@@ -916,6 +965,13 @@ class AccelerometerBase:
             return False
 
         if self.read_request():
+            if robust:
+                if self._calib_cntr == 0:
+                    self._calib_windows = [WindowOrderStatistics(CALIBRATION_WINDOW_SIZE) for _ in range(12)]
+                for window, value in zip(self._calib_windows, (*self.acceleration, *self.omega, *self.magnetometer,
+                                                               *self.acceleration_linear)):
+                    if value == value:
+                        window.append(value)
             self._calib_cntr      += 1
             self._accel_calib     += self.acceleration
             self._omega_calib     += self.omega
@@ -929,22 +985,18 @@ class AccelerometerBase:
 
     def record(self, file_path: str, time_out: float = 0.016, record_time: float = 180.0):
         """
-        Пишет измерения акселерометра в файл с интервалом time_out на протяжении времени record_time.
+        Пишет измерения акселерометра в бинарный лог с интервалом time_out на протяжении времени record_time.
         :param file_path: куда пишем
         :param time_out: время между записями
         :param record_time: общее время записи
         """
-        import datetime as dt
-        with open(file_path, 'wt') as record:
+        with AsyncBinaryLogWriter(file_path, ACCEL_LOG_FIELDS, type(self).__name__) as record:
             t_elapsed = 0.0
-            print(f"{{\n\"record_date\": \"{dt.datetime.now().strftime('%H; %M; %S')}\",\n", file=record)
-            print("\"way_points\" :[", file=record)
             while t_elapsed <= record_time:
                 d_t = time.perf_counter()
-                self.update()
-                print(self, file=record)
+                if self.read_request():
+                    record.append_accel(self)
                 d_t = time.perf_counter() - d_t
-                print(' ,', file=record)
                 if d_t > time_out:
                     t_elapsed += d_t
                     print(_device_progres_bar(t_elapsed / record_time, label='RECORDING...'), end='')
@@ -952,5 +1004,4 @@ class AccelerometerBase:
                 t_elapsed += time_out
                 print(_device_progres_bar(t_elapsed / record_time, label='RECORDING...'), end='')
                 time.sleep(time_out - d_t)
-            record.seek(record.tell() - 3, 0)
-            print("]\n}", file=record)
+        print(f"\nRecorded: {record.written_count}, dropped: {record.dropped_count}")
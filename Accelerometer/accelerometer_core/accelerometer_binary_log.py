@@ -0,0 +1,503 @@
+"""
+Бинарный колоночный формат логов акселерометра/инерциалки.
+
+Файл состоит из заголовка фиксированного размера LOG_HEADER_SIZE байт:
+    |++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++|
+    |  смещение  |  размер  |                   Описание                   |
+    |++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++|
+    |     0      |    4     | Сигнатура b'IMUL'.                           |
+    |     4      |    2     | Версия формата.                              |
+    |     6      |    2     | Маска записанных полей (см. *_FIELD_BIT).    |
+    |     8      |    4     | Размер одной записи в байтах.                |
+    |    12      |    8     | Время начала записи (unix time, float64).    |
+    |    20      |   32     | Имя устройства (utf-8, дополнено нулями).    |
+    |    52      |   12     | Зарезервировано.                             |
+    |++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++|
+и следующих за ним записей. Каждая запись - упакованные (little endian) значения
+включённых в маску полей в порядке возрастания номера бита. Время - float64,
+векторные величины - три float32.
+"""
+from typing import Tuple, Dict, List, Iterable
+from collections import namedtuple
+import numpy as np
+import threading
+import struct
+import os
+import time
+
+LOG_MAGIC = b'IMUL'
+LOG_VERSION = 1
+LOG_EXTENSION = '.imulog'
+_LOG_HEADER = struct.Struct('<4sHHId32s12x')
+LOG_HEADER_SIZE = _LOG_HEADER.size
+
+TIME_FIELD_BIT = 0
+DTIME_FIELD_BIT = 1
+ACCELERATION_FIELD_BIT = 2
+VELOCITY_FIELD_BIT = 3
+POSITION_FIELD_BIT = 4
+ANGLES_VELOCITY_FIELD_BIT = 5
+ANGLES_FIELD_BIT = 6
+
+TIME = "time"
+DTIME = "dtime"
+ACCELERATION = "acceleration"
+VELOCITY = "velocity"
+POSITION = "position"
+ANGLES_VELOCITY = "angles_velocity"
+ANGLES = "angles"
+
+# (имя поля, тип numpy, количество компонент, формат struct)
+_LOG_FIELDS = {TIME_FIELD_BIT:            (TIME,            '<f8', 1, 'd'),
+               DTIME_FIELD_BIT:           (DTIME,           '<f8', 1, 'd'),
+               ACCELERATION_FIELD_BIT:    (ACCELERATION,    '<f4', 3, '3f'),
+               VELOCITY_FIELD_BIT:        (VELOCITY,        '<f4', 3, '3f'),
+               POSITION_FIELD_BIT:        (POSITION,        '<f4', 3, '3f'),
+               ANGLES_VELOCITY_FIELD_BIT: (ANGLES_VELOCITY, '<f4', 3, '3f'),
+               ANGLES_FIELD_BIT:          (ANGLES,          '<f4', 3, '3f')}
+
+ACCEL_LOG_FIELDS = (1 << TIME_FIELD_BIT) | (1 << DTIME_FIELD_BIT) | (1 << ACCELERATION_FIELD_BIT) | \
+                   (1 << ANGLES_VELOCITY_FIELD_BIT)
+
+IMU_LOG_FIELDS = ACCEL_LOG_FIELDS | (1 << VELOCITY_FIELD_BIT) | (1 << POSITION_FIELD_BIT) | (1 << ANGLES_FIELD_BIT)
+
+
+class LogHeader(namedtuple('LogHeader', 'device_name, log_time_start, fields, record_size')):
+    def __new__(cls,
+                device_name: str,
+                log_time_start: float,
+                fields: int,
+                record_size: int):
+        """
+        Заголовок бинарного лог файла
+        """
+        return super().__new__(cls, device_name, log_time_start, fields, record_size)
+
+    @property
+    def log_time_start_str(self) -> str:
+        return time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(self.log_time_start))
+
+
+def _fields_bits(fields: int) -> List[int]:
+    return [bit for bit in sorted(_LOG_FIELDS.keys()) if (fields & (1 << bit)) != 0]
+
+
+def log_fields_names(fields: int) -> Tuple[str, ...]:
+    """
+    Имена полей, записанных в лог с указанной маской, в порядке их следования в записи.
+    """
+    return tuple(_LOG_FIELDS[bit][0] for bit in _fields_bits(fields))
+
+
+def log_record_dtype(fields: int) -> np.dtype:
+    """
+    Структурный тип numpy, соответствующий одной записи лога с указанной маской полей.
+    """
+    dtype = []
+    for bit in _fields_bits(fields):
+        name, np_type, size, _ = _LOG_FIELDS[bit]
+        dtype.append((name, np_type) if size == 1 else (name, np_type, (size,)))
+    return np.dtype(dtype)
+
+
+def log_record_struct(fields: int) -> struct.Struct:
+    """
+    Скомпилированный struct для упаковки одной записи лога с указанной маской полей.
+    """
+    return struct.Struct('<' + ''.join(_LOG_FIELDS[bit][3] for bit in _fields_bits(fields)))
+
+
+def is_binary_log(file_path: str) -> bool:
+    """
+    Проверяет сигнатуру файла.
+    """
+    try:
+        with open(file_path, 'rb') as input_file:
+            return input_file.read(len(LOG_MAGIC)) == LOG_MAGIC
+    except IOError as _:
+        return False
+
+
+def read_log_header(file_path: str) -> LogHeader:
+    with open(file_path, 'rb') as input_file:
+        return _unpack_header(input_file.read(LOG_HEADER_SIZE), file_path)
+
+
+def _unpack_header(raw_header: bytes, file_path: str) -> LogHeader:
+    if len(raw_header) < LOG_HEADER_SIZE:
+        raise RuntimeError(f"BinaryLog :: file \"{file_path}\" is too short to be a log")
+    magic, version, fields, record_size, log_time_start, device_name = _LOG_HEADER.unpack(raw_header)
+    if magic != LOG_MAGIC:
+        raise RuntimeError(f"BinaryLog :: file \"{file_path}\" is not a binary log")
+    if version != LOG_VERSION:
+        raise RuntimeError(f"BinaryLog :: unsupported log version {version} in file \"{file_path}\"")
+    if record_size != log_record_dtype(fields).itemsize:
+        raise RuntimeError(f"BinaryLog :: corrupted header in file \"{file_path}\"")
+    return LogHeader(device_name.rstrip(b'\x00').decode('utf-8', errors='replace'), log_time_start,
+                     fields, record_size)
+
+
+def read_binary_log(file_path: str) -> Tuple[LogHeader, np.ndarray]:
+    """
+    Читает бинарный лог целиком.
+    :param file_path: путь к файлу.
+    :return: заголовок и структурный массив записей. Недописанный хвост файла отбрасывается.
+    """
+    with open(file_path, 'rb') as input_file:
+        header = _unpack_header(input_file.read(LOG_HEADER_SIZE), file_path)
+        raw_data = input_file.read()
+    n_records = len(raw_data) // header.record_size
+    records = np.frombuffer(raw_data, dtype=log_record_dtype(header.fields), count=n_records)
+    return header, records
+
+
+def map_binary_log(file_path: str) -> Tuple[LogHeader, np.ndarray]:
+    """
+    Отображает бинарный лог в память без чтения данных с диска.
+    :param file_path: путь к файлу.
+    :return: заголовок и структурный массив записей (np.memmap, только для чтения).
+    """
+    header = read_log_header(file_path)
+    n_records = (os.path.getsize(file_path) - LOG_HEADER_SIZE) // header.record_size
+    dtype = log_record_dtype(header.fields)
+    if n_records == 0:
+        return header, np.zeros(0, dtype=dtype)
+    return header, np.memmap(file_path, dtype=dtype, mode='r', offset=LOG_HEADER_SIZE, shape=(n_records,))
+
+
+def log_columns(records: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Разбивает структурный массив записей на колонки. Колонки не копируются.
+    Скалярные поля имеют форму (N,), векторные - (N, 3).
+    """
+    return {name: records[name] for name in records.dtype.names}
+
+
+def read_log_columns(file_path: str) -> Tuple[LogHeader, Dict[str, np.ndarray]]:
+    """
+    Читает бинарный лог и возвращает его заголовок и колонки.
+    """
+    header, records = read_binary_log(file_path)
+    return header, log_columns(records)
+
+
+class BinaryLogWriter:
+    """
+    Пишет записи в бинарный лог. Записи упаковываются в заранее выделенный буфер
+    и сбрасываются на диск блоками по buffer_records штук, поэтому запись одного
+    измерения не требует обращения к файлу.
+    """
+    def __init__(self, file_path: str, fields: int = IMU_LOG_FIELDS, device_name: str = "",
+                 buffer_records: int = 256, log_time_start: float = None):
+        if (fields & ((1 << TIME_FIELD_BIT) | (1 << DTIME_FIELD_BIT))) == 0:
+            raise ValueError("BinaryLogWriter :: log must contain time or dtime field")
+        self._fields: int = fields
+        self._record: struct.Struct = log_record_struct(fields)
+        self._buffer_records: int = max(1, buffer_records)
+        self._buffer: bytearray = bytearray(self._record.size * self._buffer_records)
+        self._buffer_view: memoryview = memoryview(self._buffer)
+        self._n_buffered: int = 0
+        self._n_records: int = 0
+        self._file = open(file_path, 'wb')
+        self._file.write(_LOG_HEADER.pack(LOG_MAGIC, LOG_VERSION, fields, self._record.size,
+                                          time.time() if log_time_start is None else log_time_start,
+                                          device_name.encode('utf-8')[:32]))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    @property
+    def fields(self) -> int:
+        return self._fields
+
+    @property
+    def record_size(self) -> int:
+        return self._record.size
+
+    @property
+    def records_count(self) -> int:
+        """
+        Общее количество записей, включая ещё не сброшенные на диск.
+        """
+        return self._n_records
+
+    @property
+    def is_closed(self) -> bool:
+        return self._file is None
+
+    def append(self, *values: float) -> None:
+        """
+        Добавляет запись. Значения перечисляются плоско в порядке полей лога,
+        например для ACCEL_LOG_FIELDS: t, dt, ax, ay, az, wx, wy, wz.
+        """
+        self._record.pack_into(self._buffer, self._n_buffered * self._record.size, *values)
+        self._n_buffered += 1
+        self._n_records += 1
+        if self._n_buffered == self._buffer_records:
+            self.flush()
+
+    def append_records(self, records: np.ndarray) -> None:
+        """
+        Добавляет сразу массив записей с типом log_record_dtype(fields).
+        """
+        if records.dtype != log_record_dtype(self._fields):
+            raise ValueError("BinaryLogWriter :: records dtype does not match log fields")
+        self.flush()
+        self._file.write(np.ascontiguousarray(records).tobytes())
+        self._n_records += records.size
+
+    def append_accel(self, accelerometer) -> None:
+        """
+        Добавляет текущее измерение акселерометра (поля ACCEL_LOG_FIELDS).
+        """
+        self.append(*_collect_values(self._fields, accelerometer.curr_t, accelerometer.delta_t,
+                                     accelerometer.acceleration, None, None, accelerometer.omega, None))
+
+    def append_imu(self, imu) -> None:
+        """
+        Добавляет текущее состояние инерциалки (поля IMU_LOG_FIELDS).
+        """
+        self.append(*_collect_values(self._fields, imu.curr_t, imu.delta_t, imu.acceleration, imu.velocity,
+                                     imu.position, imu.omega, imu.angles))
+
+    def flush(self) -> None:
+        if self._n_buffered == 0 or self._file is None:
+            return
+        self._file.write(self._buffer_view[:self._n_buffered * self._record.size])
+        self._n_buffered = 0
+
+    def close(self) -> None:
+        if self._file is None:
+            return
+        self.flush()
+        self._file.close()
+        self._file = None
+
+
+class AsyncBinaryLogWriter(BinaryLogWriter):
+    """
+    Асинхронная версия BinaryLogWriter. Записи упаковываются в кольцо из ring_records заранее
+    выделенных слотов, а на диск их пишет фоновый поток блоками: как только в очереди набирается
+    flush_records записей или раз в flush_time секунд. Если диск не успевает и кольцо заполнено,
+    запись отбрасывается (см. dropped_count), поэтому append никогда не ждёт файловую систему.
+    Добавлять записи должен один поток, файл пишет только фоновый поток.
+    Ошибка фонового потока передаётся вызывающему из flush и close.
+    """
+    def __init__(self, file_path: str, fields: int = IMU_LOG_FIELDS, device_name: str = "",
+                 ring_records: int = 4096, flush_records: int = 256, flush_time: float = 0.5,
+                 log_time_start: float = None):
+        super().__init__(file_path, fields, device_name, ring_records, log_time_start)
+        self._flush_records: int = min(max(1, flush_records), self._buffer_records)
+        self._flush_time: float = max(0.001, flush_time)
+        self._ring_bytes: np.ndarray = np.frombuffer(self._buffer, dtype=np.uint8)
+        self._head: int = 0  # слот для следующей записи
+        self._tail: int = 0  # первый ещё не записанный на диск слот
+        self._n_queued: int = 0
+        self._n_written: int = 0
+        self._n_dropped: int = 0
+        self._max_queue_depth: int = 0
+        self._writer_error = None
+        self._unreported_error = None  # ошибка потока записи, ещё не переданная в flush/close
+        self._writer_done: bool = False
+        self._stop: bool = False
+        self._lock = threading.Lock()
+        self._drained = threading.Condition(self._lock)
+        self._wake_up = threading.Event()
+        self._writer = threading.Thread(target=self._write_loop, name='binary-log-writer', daemon=True)
+        self._writer.start()
+
+    @property
+    def queue_depth(self) -> int:
+        """
+        Количество записей, ожидающих записи на диск.
+        """
+        return self._n_queued
+
+    @property
+    def max_queue_depth(self) -> int:
+        """
+        Максимальная глубина очереди за время записи.
+        """
+        return self._max_queue_depth
+
+    @property
+    def ring_capacity(self) -> int:
+        return self._buffer_records
+
+    @property
+    def dropped_count(self) -> int:
+        """
+        Количество записей, отброшенных из-за переполнения кольца или ошибки записи.
+        """
+        return self._n_dropped
+
+    @property
+    def written_count(self) -> int:
+        """
+        Количество записей, записанных на диск.
+        """
+        return self._n_written
+
+    @property
+    def writer_error(self):
+        """
+        Последняя ошибка записи фонового потока или None.
+        """
+        return self._writer_error
+
+    def append(self, *values: float) -> bool:
+        """
+        Ставит запись в очередь. Возвращает False, если кольцо заполнено и запись отброшена.
+        """
+        if self._n_queued == self._buffer_records or self._stop or self._writer_done:
+            with self._lock:
+                self._n_dropped += 1
+            return False
+        self._record.pack_into(self._buffer, self._head * self._record.size, *values)
+        self._head = (self._head + 1) % self._buffer_records
+        with self._lock:
+            self._n_queued += 1
+            self._n_records += 1
+            depth = self._n_queued
+            self._max_queue_depth = max(self._max_queue_depth, depth)
+        if depth >= self._flush_records:
+            self._wake_up.set()
+        return True
+
+    def append_records(self, records: np.ndarray) -> None:
+        """
+        Ставит в очередь массив записей с типом log_record_dtype(fields). В отличие от append
+        записи не отбрасываются: если кольцо заполнено, вызов ждёт, пока фоновый поток освободит место.
+        """
+        if records.dtype != log_record_dtype(self._fields):
+            raise ValueError("AsyncBinaryLogWriter :: records dtype does not match log fields")
+        if self._file is None or self._stop:
+            raise RuntimeError("AsyncBinaryLogWriter :: writer is closed")
+        size = self._record.size
+        raw = np.ascontiguousarray(records).reshape(-1).view(np.uint8)
+        n_total, n_done = records.size, 0
+        while n_done != n_total:
+            with self._drained:
+                self._drained.wait_for(lambda: self._n_queued != self._buffer_records or self._writer_done,
+                                       self._flush_time)
+                n_free = self._buffer_records - self._n_queued
+            self._raise_writer_error()
+            if self._writer_done:
+                raise RuntimeError("AsyncBinaryLogWriter :: writer thread is stopped")
+            # запись до конца кольца, остаток - следующей итерацией с начала кольца
+            n_slots = min(n_free, n_total - n_done, self._buffer_records - self._head)
+            if n_slots == 0:
+                self._wake_up.set()
+                continue
+            self._ring_bytes[self._head * size: (self._head + n_slots) * size] = \
+                raw[n_done * size: (n_done + n_slots) * size]
+            self._head = (self._head + n_slots) % self._buffer_records
+            n_done += n_slots
+            with self._lock:
+                self._n_queued += n_slots
+                self._n_records += n_slots
+                self._max_queue_depth = max(self._max_queue_depth, self._n_queued)
+            self._wake_up.set()
+
+    def _write_slots(self, tail: int, n_slots: int) -> bool:
+        size = self._record.size
+        n_first = min(n_slots, self._buffer_records - tail)
+        try:
+            self._file.write(self._buffer_view[tail * size: (tail + n_first) * size])
+            if n_slots != n_first:
+                self._file.write(self._buffer_view[: (n_slots - n_first) * size])
+            self._file.flush()
+        except (IOError, OSError) as ex:
+            with self._lock:
+                self._writer_error = self._unreported_error = ex
+            return False
+        return True
+
+    def _write_loop(self) -> None:
+        try:
+            while True:
+                if not self._stop:
+                    self._wake_up.wait(self._flush_time)
+                    self._wake_up.clear()
+                with self._lock:
+                    tail, n_slots, stop = self._tail, self._n_queued, self._stop
+                written = self._write_slots(tail, n_slots) if n_slots != 0 else True
+                with self._lock:
+                    self._tail = (tail + n_slots) % self._buffer_records
+                    self._n_queued -= n_slots
+                    if written:
+                        self._n_written += n_slots
+                    else:
+                        self._n_dropped += n_slots
+                    self._drained.notify_all()
+                if stop and n_slots == 0:
+                    break
+        except Exception as ex:
+            with self._lock:
+                self._writer_error = self._unreported_error = ex
+        finally:
+            # ожидающие flush/append_records не должны зависнуть на остановившемся потоке
+            with self._lock:
+                self._writer_done = True
+                self._drained.notify_all()
+
+    def _raise_writer_error(self) -> None:
+        with self._lock:
+            error, self._unreported_error = self._unreported_error, None
+        if error is not None:
+            raise RuntimeError(f"AsyncBinaryLogWriter :: writer thread failed: {error!r}") from error
+
+    def flush(self) -> None:
+        """
+        Дожидается записи на диск всех поставленных в очередь записей.
+        Если фоновый поток завершился с ошибкой или записи были потеряны из-за ошибки записи,
+        бросает RuntimeError с исходной ошибкой в __cause__.
+        """
+        if self._file is None:
+            return
+        self._wake_up.set()
+        with self._drained:
+            # таймаут - страховка на случай, если поток завершился, не успев уведомить ожидающих
+            while not self._drained.wait_for(lambda: self._n_queued == 0 or self._writer_done, self._flush_time):
+                if not self._writer.is_alive():
+                    break
+        self._raise_writer_error()
+
+    def close(self) -> None:
+        if self._file is None:
+            return
+        with self._lock:
+            self._stop = True
+        self._wake_up.set()
+        self._writer.join()
+        self._file.close()
+        self._file = None
+        self._raise_writer_error()
+
+
+def _collect_values(fields: int, t: float, d_t: float, accel, vel, pos, omega, angles) -> Iterable[float]:
+    values = (t, d_t, accel, vel, pos, omega, angles)
+    for bit in _fields_bits(fields):
+        value = values[bit]
+        if _LOG_FIELDS[bit][2] == 1:
+            yield value
+            continue
+        yield from (0.0, 0.0, 0.0) if value is None else value
+
+
+def convert_json_log(json_path: str, binary_path: str, imu_log: bool = True) -> int:
+    """
+    Переводит лог в старом json формате в бинарный.
+    :param json_path: исходный json лог.
+    :param binary_path: куда пишем.
+    :param imu_log: исходный лог - лог инерциалки (иначе лог акселерометра).
+    :return: количество записанных точек.
+    """
+    from .accelerometer_recording import read_imu_log, read_accel_log
+    log = read_imu_log(json_path) if imu_log else read_accel_log(json_path)
+    with BinaryLogWriter(binary_path, IMU_LOG_FIELDS if imu_log else ACCEL_LOG_FIELDS, log.device_name) as writer:
+        writer.append_records(log.records)
+        return writer.records_count
@@ -1,4 +1,5 @@
-from .accelerometer_base import AccelerometerBase
+from .accelerometer_base import AccelerometerBase, ACCELERATION_BIT, OMEGA_BIT, ANGLES_BIT, QUATERNION_BIT, \
+    MAGNETOMETER_BIT, ACCELERATION_LINEAR_BIT
 from .accelerometer_constants import *
 from serial.tools import list_ports
 from typing import Tuple, Any, List
@@ -234,7 +235,23 @@ class AccelerometerBNO055(AccelerometerBase):
     _GRAVITY_SCALE = 1.0 / 100.0
     _DATA_SIZE_MAP = {2: "h", 4: "f", 8: "d"}
 
+    # Регистры выходных данных идут подряд с 0x08 по 0x33, все значения - int16 little endian.
+    # (бит read_config, setter, первый регистр, число значений, масштаб)
+    _READ_FIELDS = ((ACCELERATION_BIT,        '_set_accel',        _VECTOR_ACCELEROMETER, 3, _ACCELEROMETER_SCALE),
+                    (OMEGA_BIT,               '_set_omega',        _VECTOR_GYROSCOPE,     3, _GYROSCOPE_SCALE),
+                    (ANGLES_BIT,              '_set_angles',       _VECTOR_EULER,         3, _EULER_SCALE),
+                    (QUATERNION_BIT,          '_set_quaternion',   _VECTOR_QUATERNION,    4, _QUATERNION_SCALE),
+                    (MAGNETOMETER_BIT,        '_set_magnetometer', _VECTOR_MAGNETOMETER,  3, _MAGNETOMETER_SCALE),
+                    (ACCELERATION_LINEAR_BIT, '_set_lin_accel',    _VECTOR_LINEAR_ACCEL,  3, _LINEAR_ACCEL_SCALE))
+    # максимальный размер блока в одной SMBus транзакции
+    _I2C_BLOCK_SIZE = 32
+
     def __init__(self):
+        self._read_plan_config: int = -1
+        self._read_plan: Tuple[Tuple[Any, int, int, float], ...] = ()
+        self._read_chunks: Tuple[Tuple[int, int, int], ...] = ()
+        self._read_buffer: bytearray = bytearray()
+        self._read_struct: struct.Struct = struct.Struct('<0h')
         super().__init__()
 
     def _read_bytes(self, register: int, bytes_count: int = 1) -> bytes:
@@ -260,6 +277,42 @@ class AccelerometerBNO055(AccelerometerBase):
         except struct.error as _:
             return False, tuple(0.0 for _ in range(block_size))
 
+    def _build_read_plan(self) -> None:
+        """
+        Готовит буфер и struct.Struct под один блок регистров, покрывающий все включённые в read_config поля.
+        """
+        fields = tuple(f for f in AccelerometerBNO055._READ_FIELDS if self.read_config & (1 << f[0]))
+        self._read_plan_config = self.read_config
+        if len(fields) == 0:
+            self._read_plan, self._read_chunks, self._read_buffer = (), (), bytearray()
+            return
+        first = min(register for _, _, register, _, _ in fields)
+        size = max(register + count * 2 for _, _, register, count, _ in fields) - first
+        self._read_buffer = bytearray(size)
+        self._read_struct = struct.Struct(f'<{size // 2}h')
+        self._read_chunks = tuple((first + offset, offset, min(self._I2C_BLOCK_SIZE, size - offset))
+                                  for offset in range(0, size, self._I2C_BLOCK_SIZE))
+        self._read_plan = tuple((getattr(self, setter), (register - first) // 2, count, scale)
+                                for _, setter, register, count, scale in fields)
+
+    def _device_read_into(self) -> bool:
+        if self._read_plan_config != self.read_config:
+            self._build_read_plan()
+        buffer = self._read_buffer
+        for register, offset, size in self._read_chunks:
+            data = self._read_bytes(register, size)
+            if len(data) != size:
+                return False
+            buffer[offset: offset + size] = data
+        values = self._read_struct.unpack_from(buffer)
+        for setter, index, count, scale in self._read_plan:
+            if count == 3:
+                setter(values[index] * scale, values[index + 1] * scale, values[index + 2] * scale)
+            else:
+                setter(values[index] * scale, values[index + 1] * scale, values[index + 2] * scale,
+                       values[index + 3] * scale)
+        return True
+
     def _request_for_device_connection(self) -> bool:
         try:
             # ports = list_ports.comports()
@@ -1,9 +1,13 @@
 from .accelerometer_recording import read_accel_log, AccelMeasurement
 from Utilities.Geometry.quaternion import Quaternion
+from Utilities.Geometry.common import fast_math
 from Utilities.Geometry.matrix4 import Matrix4
 from Utilities.Geometry.vector3 import Vector3
 from matplotlib import pyplot as plt
-from typing import List
+from collections import namedtuple
+from typing import List, Tuple
+import numpy as np
+import math
 
 CALIBRATION_MODE = 0
 BASIS_COMPUTE_MODE = 1
@@ -12,6 +16,138 @@ STOP_MODE = 3
 WARM_UP_MODE = 4
 
 
+class IntegrationResult(namedtuple('IntegrationResult', 'time_values, omegas, angles, accelerations, velocities, '
+                                                       'positions, basis, calib_accel, calib_omega')):
+    """
+    Результат пакетного интегрирования. Первая точка - состояние по завершении калибровки.
+    time_values (N,), omegas, angles, accelerations (в мировой системе, без g), velocities,
+    positions - (N, 3), basis - (N, 3, 3), столбцы - right, up, front.
+    """
+    __slots__ = ()
+
+    def __len__(self) -> int:
+        return self.time_values.size
+
+
+@fast_math
+def _integrate_basis(accel: np.ndarray, omega: np.ndarray, d_t: np.ndarray, up: np.ndarray, front: np.ndarray,
+                     accel_k: float, basis: np.ndarray) -> None:
+    """
+    Комплиментарный фильтр базиса акселерометра (см. AccelIntegrator._integrate). Рекуррентный, поэтому
+    считается циклом. Vector3.cross(a, b) = b x a, здесь раскрыт покомпонентно.
+    """
+    kkk = 0.999
+    ux, uy, uz = up[0], up[1], up[2]
+    fx, fy, fz = front[0], front[1], front[2]
+    for i in range(d_t.shape[0]):
+        wx, wy, wz = omega[i, 0] * d_t[i] * kkk, omega[i, 1] * d_t[i] * kkk, omega[i, 2] * d_t[i] * kkk
+        # u = (u + [w, u] * dt).normalized
+        tx, ty, tz = ux + uy * wz - uz * wy, uy + uz * wx - ux * wz, uz + ux * wy - uy * wx
+        norm = math.sqrt(tx * tx + ty * ty + tz * tz)
+        if norm > 0.0:
+            tx, ty, tz = tx / norm, ty / norm, tz / norm
+        # u = (u * (1 - k) + k * a.normalized).normalized
+        ax, ay, az = accel[i, 0], accel[i, 1], accel[i, 2]
+        norm = math.sqrt(ax * ax + ay * ay + az * az)
+        if norm > 0.0:
+            ax, ay, az = ax / norm, ay / norm, az / norm
+        ux, uy, uz = tx * (1.0 - accel_k) + accel_k * ax, ty * (1.0 - accel_k) + accel_k * ay, \
+            tz * (1.0 - accel_k) + accel_k * az
+        norm = math.sqrt(ux * ux + uy * uy + uz * uz)
+        if norm > 0.0:
+            ux, uy, uz = ux / norm, uy / norm, uz / norm
+        # f = f + [w, f] * dt
+        fx, fy, fz = fx + fy * wz - fz * wy, fy + fz * wx - fx * wz, fz + fx * wy - fy * wx
+        # r = [f, u].normalized
+        rx, ry, rz = uy * fz - uz * fy, uz * fx - ux * fz, ux * fy - uy * fx
+        norm = math.sqrt(rx * rx + ry * ry + rz * rz)
+        if norm > 0.0:
+            rx, ry, rz = rx / norm, ry / norm, rz / norm
+        # f = [u, r].normalized
+        fx, fy, fz = ry * uz - rz * uy, rz * ux - rx * uz, rx * uy - ry * ux
+        norm = math.sqrt(fx * fx + fy * fy + fz * fz)
+        if norm > 0.0:
+            fx, fy, fz = fx / norm, fy / norm, fz / norm
+        basis[i, 0, 0], basis[i, 1, 0], basis[i, 2, 0] = rx, ry, rz
+        basis[i, 0, 1], basis[i, 1, 1], basis[i, 2, 1] = ux, uy, uz
+        basis[i, 0, 2], basis[i, 1, 2], basis[i, 2, 2] = fx, fy, fz
+
+
+def integrate_columns(d_time: np.ndarray, accelerations: np.ndarray, omegas: np.ndarray,
+                      warm_up_time: float = 1.0, calib_time: float = 1.0, accel_k: float = 0.05,
+                      accel_bias: float = 0.095, trust_t: float = 0.1) -> IntegrationResult:
+    """
+    Пакетный аналог AccelIntegrator.integrate над колонками лога. Прогрев, калибровка, детектор покоя,
+    скорости, положения и углы считаются операциями над массивами, рекуррентный базис - в _integrate_basis.
+    :param d_time: (N,) интервалы времени между измерениями
+    :param accelerations: (N, 3) ускорения в системе акселерометра
+    :param omegas: (N, 3) угловые скорости
+    :return: IntegrationResult, пустой, если лог короче прогрева и калибровки
+    """
+    d_time = np.ascontiguousarray(d_time, dtype=np.float64)
+    accelerations = np.ascontiguousarray(accelerations, dtype=np.float64)
+    omegas = np.ascontiguousarray(omegas, dtype=np.float64)
+    n_points = d_time.size
+    # прогрев: пропускаем точки, пока накопленное до них время не превысит warm_up_time
+    elapsed = np.concatenate(((0.0,), np.cumsum(d_time)))
+    calib_begin = int(np.searchsorted(elapsed, warm_up_time, side='right'))
+    # калибровка: усредняем точки, пока накопленное с её начала время меньше calib_time
+    calib_end = calib_begin + int(np.searchsorted(elapsed[calib_begin:] - elapsed[calib_begin], calib_time,
+                                                  side='left'))
+    if calib_end >= n_points or calib_end == calib_begin:
+        empty = np.zeros((0, 3))
+        return IntegrationResult(np.zeros(0), empty, empty, empty, empty, empty, np.zeros((0, 3, 3)),
+                                 np.zeros(3), np.zeros(3))
+    calib_accel = accelerations[calib_begin:calib_end].mean(axis=0)
+    calib_omega = omegas[calib_begin:calib_end].mean(axis=0)
+    calib_basis = Matrix4.build_basis(Vector3(*calib_accel))
+    right, up, front = (np.array(tuple(v)) for v in calib_basis.right_up_front)
+    # калибровочное ускорение в мировой системе координат
+    calib_accel_ws = np.array((right @ calib_accel, up @ calib_accel, front @ calib_accel))
+    angles_0 = Quaternion.from_rotation_matrix(
+        Matrix4.build_transform(*calib_basis.right_up_front, Vector3(*calib_accel))).to_euler_angles()
+
+    d_t = d_time[calib_end:]
+    accel = accelerations[calib_end:]
+    omega = omegas[calib_end:]
+    n_steps = d_t.size
+
+    basis = np.empty((n_steps + 1, 3, 3))
+    basis[0, :, 0], basis[0, :, 1], basis[0, :, 2] = right, up, front
+    _integrate_basis(accel, omega, d_t, up, front, accel_k, basis[1:])
+    r, u, f = basis[1:, :, 0], basis[1:, :, 1], basis[1:, :, 2]
+
+    world_accel = np.empty((n_steps + 1, 3))
+    world_accel[0] = calib_accel
+    world_accel[1:] = accel - (r * calib_accel_ws[0] + u * calib_accel_ws[1] + f * calib_accel_ws[2])
+    # детектор покоя: время, в течении которого изменение ускорения меньше accel_bias
+    still = np.linalg.norm(accel - accelerations[calib_end - 1: -1], axis=1) < accel_bias
+    still_time = np.cumsum(np.where(still, d_t, 0.0))
+    still_time -= np.maximum.accumulate(np.where(still, 0.0, still_time))
+
+    velocities = np.zeros((n_steps + 1, 3))
+    velocities[1:, 2] = np.where(still_time <= trust_t, 0.5, 0.0)
+
+    positions = np.zeros((n_steps + 1, 3))
+    np.cumsum(np.einsum('nij,nj->ni', basis[1:], velocities[1:]) * d_t[:, None], axis=0, out=positions[1:])
+
+    angles = np.empty((n_steps + 1, 3))
+    angles[0] = tuple(angles_0)
+    np.cumsum((omega - calib_omega) * d_t[:, None], axis=0, out=angles[1:])
+    angles[1:] += angles[0]
+
+    omegas_out = np.zeros((n_steps + 1, 3))
+    omegas_out[1:] = omega
+
+    time_values = np.empty(n_steps + 1)
+    time_values[0] = elapsed[calib_end] - elapsed[calib_begin] + warm_up_time
+    np.cumsum(d_t, out=time_values[1:])
+    time_values[1:] += time_values[0]
+
+    return IntegrationResult(time_values, omegas_out, angles, world_accel, velocities, positions, basis,
+                             calib_accel_ws, calib_omega)
+
+
 class AccelIntegrator:
     def __init__(self, log_src: str):
         self._log_file = read_accel_log(log_src, order=0)
@@ -25,6 +161,9 @@ class AccelIntegrator:
         self._prev_accel: Vector3 = Vector3(0.0, 0.0, 0.0)
         self._calib_accel: Vector3 = Vector3(0.0, 0.0, 0.0)
         self._calib_omega: Vector3 = Vector3(0.0, 0.0, 0.0)
+        # оси базиса, ускорение и промежуточный вектор, в которые _integrate пишет на месте
+        self._axes: Tuple[Vector3, Vector3, Vector3, Vector3, Vector3] = \
+            tuple(Vector3(0.0, 0.0, 0.0) for _ in range(5))
         self._accel_bias: float = 0.095
         self._trust_t: float = 0.1
         self._time: float = 0.0
@@ -259,24 +398,28 @@ class AccelIntegrator:
         omega = point.angles_velocity
         basis = self._accel_basis[-1]
         self._omegas.append(omega)
+        r, u, f, a, tmp = self._axes
         #  комплиментарная фильтрация и привязка u к направлению g
         kkk = 0.999
-        u: Vector3 = (basis.up + kkk * Vector3.cross(omega, basis.up) * dt).normalized()
-        u = (u * (1.0 - self._accel_k) + self._accel_k * self._curr_accel.normalized()).normalized()
-        f: Vector3 = (basis.front + kkk * Vector3.cross(omega, basis.front) * dt)
-        r = Vector3.cross(f, u).normalized()
-        f = Vector3.cross(u, r).normalized()
-        # f = f.normalized()
-        # u = u.normalized()
-        # r = r.normalized()
+        # u = (up + kkk * (omega x up) * dt).normalized
+        basis.up_into(u)
+        u.iadd_scaled(Vector3.cross_into(omega, u, tmp), kkk * dt).normalize()
+        # u = (u * (1 - k) + k * accel.normalized).normalized
+        u *= 1.0 - self._accel_k
+        u.iadd_scaled(tmp.copy_from(self._curr_accel).normalize(), self._accel_k).normalize()
+        # f = front + kkk * (omega x front) * dt
+        basis.front_into(f)
+        f.iadd_scaled(Vector3.cross_into(omega, f, tmp), kkk * dt)
+        Vector3.cross_into(f, u, r).normalize()
+        Vector3.cross_into(u, r, f).normalize()
         # получим ускорение в мировой системе координат за вычетом ускорения свободного падения
-        a: Vector3 = Vector3(self._curr_accel.x - (r.x * self._calib_accel.x + u.x * self._calib_accel.y + f.x * self._calib_accel.z),
-                             self._curr_accel.y - (r.y * self._calib_accel.x + u.y * self._calib_accel.y + f.y * self._calib_accel.z),
-                             self._curr_accel.z - (r.z * self._calib_accel.x + u.z * self._calib_accel.y + f.z * self._calib_accel.z))
+        calib = self._calib_accel
+        a.copy_from(self._curr_accel)
+        a.iadd_scaled(r, -calib.x).iadd_scaled(u, -calib.y).iadd_scaled(f, -calib.z)
         """
         Проверка наличия весомых изменений в векторе ускорения в течении времени
         """
-        if (self._curr_accel - self._prev_accel).magnitude() < self._accel_bias:
+        if Vector3.distance(self._curr_accel, self._prev_accel) < self._accel_bias:
             self._time += dt
         else:
             self._time = 0
@@ -285,12 +428,13 @@ class AccelIntegrator:
 
         # v = (self._velocities[-1] + (r * a.x + u * a.y + f * a.z) * dt) \
         #     if self._time <= self._trust_t else Vector3(0.0, 0.0, 0.0)
-        v = 0.50 * Vector3(0.0, 0.0, 1.0) \
-            if self._time <= self._trust_t else Vector3(0.0, 0.0, 0.0)
-        self._angles.append(self._angles[-1] + (point.angles_velocity - self._calib_omega) * dt)
+        v = Vector3(0.0, 0.0, 0.5) if self._time <= self._trust_t else Vector3(0.0, 0.0, 0.0)
+        self._angles.append(Vector3(0.0, 0.0, 0.0).copy_from(self._angles[-1]).iadd_scaled(omega, dt)
+                            .iadd_scaled(self._calib_omega, -dt))
         self._velocities.append(v)
         # self._positions.append(self._positions[-1] + (r * v.x + u * v.y + f * v.y) * dt)
-        self._positions.append(self._positions[-1] + (r * v.x + u * v.y + f * v.z) * dt)
+        self._positions.append(Vector3(0.0, 0.0, 0.0).copy_from(self._positions[-1]).iadd_scaled(r, v.x * dt)
+                               .iadd_scaled(u, v.y * dt).iadd_scaled(f, v.z * dt))
         self._time_values.append(self._time_values[-1] + dt)
         return True
 
@@ -385,8 +529,17 @@ class AccelIntegrator:
         axes.set_title("positions - world space")
         plt.show()
 
+    def integrate_batch(self) -> IntegrationResult:
+        """
+        Пакетное интегрирование всего лога с текущими параметрами (см. integrate_columns).
+        Не изменяет результаты integrate.
+        """
+        return integrate_columns(self._log_file.d_time_values, self._log_file.accelerations,
+                                 self._log_file.angles_velocities, self.warm_up_time, self.calib_time,
+                                 self.accel_k, self.accel_trust_bias, self.accel_trust_time)
+
     def integrate(self):
-        for point in self._log_file.way_points:
+        for point in self._log_file.iter_way_points():
             self._prev_accel = self._curr_accel
             self._curr_accel = point.acceleration
             if self._warm_up(point):
@@ -1,5 +1,5 @@
 from Utilities.real_time_filter import RealTimeFilter
-from .accelerometer_base import AccelerometerBase
+from .accelerometer_base import AccelerometerBase, ACCELERATION_BIT, OMEGA_BIT
 from Utilities.Geometry.vector3 import Vector3
 from Utilities.Geometry import Quaternion
 from Utilities.Geometry import Matrix3
@@ -35,17 +35,31 @@ class BusDummy:
                             MPU6050_ACCEL_Y_OUT_H: lambda x: 0.3333 * GRAVITY_CONSTANT,
                             MPU6050_ACCEL_Z_OUT_H: lambda x: 0.3333 * GRAVITY_CONSTANT}  # BusDummy.accel_z(1.25 * x)}
         self._t_start = time.perf_counter()
+        # образы регистров по адресу устройства: mpu6050 - 1g по z (диапазон 2g),
+        # bno055 - 9.81 м/с^2 по z в ускорении и 1.0 в w кватерниона
+        self._memory = {0x68: bytearray(256), 0x28: bytearray(256)}
+        struct.pack_into('>7h', self._memory[0x68], MPU6050_ACCEL_X_OUT_H, 0, 0, 16384, 0, 0, 0, 0)
+        struct.pack_into('<3h', self._memory[0x28], 0x08, 0, 0, 981)
+        struct.pack_into('<4h', self._memory[0x28], 0x20, 1 << 14, 0, 0, 0)
 
     def SMBus(self, a: int):
         return self
 
-    def read_i2c_block_data(self, a, b, c):
-        # TODO семь 2ух байтных чисел
-        return b'\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00'
+    def read_i2c_block_data(self, a: int, b: int, c: int) -> List[int]:
+        """
+        Блок регистров устройства с адресом a, начиная с регистра b, длиной c байт.
+        """
+        memory = self._memory.get(a, None)
+        if memory is None:
+            memory = self._memory[a] = bytearray(256)
+        return list(memory[b: b + c])
 
     def write_byte_data(self, a: int, b: int, c: int):
         pass
 
+    def write_i2c_block_data(self, a: int, b: int, data: List[int]):
+        pass
+
     def read_byte_data(self, a: int, register: int):
         if register in self.__registers:
             return self.__registers[register](time.perf_counter() - self._t_start)
@@ -134,26 +148,52 @@ class Accelerometer(AccelerometerBase):
     def _request_for_device_disconnection(self) -> bool:
         return True
 
+    # ускорения, температура, угловые скорости - int16 big endian, начиная с MPU6050_ACCEL_X_OUT_H
+    _SAMPLE_STRUCT = struct.Struct('>7h')
+
+    def _read_sample(self) -> Tuple[bool, float, float, float, float, float, float]:
+        """
+        Одно чтение блока регистров в переиспользуемый буфер.
+        :return: флаг успеха, ускорения [м/сек^2], угловые скорости [рад/сек]
+        """
+        flag, ax, ay, az, gx, gy, gz = self._read_i2c_raw()
+        if not flag:
+            return False, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0
+        a_scl = GRAVITY_CONSTANT / Accelerometer._acc_scales.get(self._accel_range_val, MPU6050_ACCEL_SCALE_MODIFIER_2G)
+        g_scl = math.pi / 180.0 / Accelerometer._gyro_scales.get(self._gyro_range_val,
+                                                                 MPU6050_GYRO_SCALE_MODIFIER_250DEG)
+        return True, ax * a_scl, ay * a_scl, az * a_scl, gx * g_scl, gy * g_scl, gz * g_scl
+
     def _device_read_request(self) -> Tuple[bool, Tuple[float, ...]]:
         # TODO сделать асинхронным, добавить ожидание результата со стороны BNO в течении какого-то, по истечении
         #  которого ничего не возвращать.
-        try:
-            raw_data = self.device.read_i2c_block_data(self.address, MPU6050_ACCEL_X_OUT_H, 14)
-            gx, gy, gz, t, ax, ay, az = \
-                tuple(map(lambda a: a if a < 0x8000 else a - 65536, struct.unpack('>7h', raw_data)))
-        except RuntimeError:
-            return False, Vector3(0.0, 0.0, 0.0), Vector3(0.0, 0.0, 0.0)
-
-        g_scl = 1.0 / self.acceleration_scale * GRAVITY_CONSTANT
-        a_scl = 1.0 / self.gyroscope_scale / 180.0 * math.pi
-
+        flag, ax, ay, az, gx, gy, gz = self._read_sample()
+        if not flag:
+            return False, (0.0,)
+        response = []
+        if self.is_accel_read:
+            response.extend((ax, ay, az))
+        if self.is_omega_read:
+            response.extend((gx, gy, gz))
+        return True, tuple(response)
+
+    def _device_read_into(self) -> bool:
+        flag, ax, ay, az, gx, gy, gz = self._read_sample()
+        if not flag:
+            return False
+        read_config = self.read_config
+        if read_config & (1 << ACCELERATION_BIT):
+            self._set_accel(ax, ay, az)
+        if read_config & (1 << OMEGA_BIT):
+            self._set_omega(gx, gy, gz)
+        return True
 
     def __init__(self, address: int = 0x68):
         self._address: int = address  # mpu 6050
         self._i2c_bus = None
-        super().__init__()
-        self._filters: List[List[RealTimeFilter]] = []
+        self._sample_buffer: bytearray = bytearray(Accelerometer._SAMPLE_STRUCT.size)
         self._use_filtering: bool = False
+        super().__init__()
 
     #  def __str__(self):
     #      separator = ",\n"
@@ -184,7 +224,7 @@ class Accelerometer(AccelerometerBase):
 
     def _default_settings(self) -> None:
         super(Accelerometer, self)._default_settings()
-        self._filters.clear()
+        self._filters: List[List[RealTimeFilter]] = []
         for _ in range(6):
             _filter = RealTimeFilter()
             _filter.k_arg = 0.1
@@ -199,35 +239,30 @@ class Accelerometer(AccelerometerBase):
 
     def _read_i2c_raw(self) -> Tuple[bool, int, int, int, int, int, int]:
         try:
-            raw_data = self.device.read_i2c_block_data(self.address, MPU6050_ACCEL_X_OUT_H, 14)
-            gx, gy, gz, t, ax, ay, az = struct.unpack('>7h', raw_data)
-        except RuntimeError:
+            data = self.device.read_i2c_block_data(self.address, MPU6050_ACCEL_X_OUT_H, self._SAMPLE_STRUCT.size)
+        except (RuntimeError, OSError):
+            return False, 0, 0, 0, 0, 0, 0
+        if len(data) != self._SAMPLE_STRUCT.size:
             return False, 0, 0, 0, 0, 0, 0
-        return False, gx, gy, gz, ax, ay, az
+        self._sample_buffer[:] = data
+        ax, ay, az, _, gx, gy, gz = self._SAMPLE_STRUCT.unpack_from(self._sample_buffer)
+        return True, ax, ay, az, gx, gy, gz
 
     def _read_data_i2c(self) -> Tuple[bool, Vector3, Vector3]:
-        try:
-            raw_data = self.device.read_i2c_block_data(self.address, MPU6050_ACCEL_X_OUT_H, 14)
-            gx, gy, gz, t, ax, ay, az = \
-                tuple(map(lambda a: a if a < 0x8000 else a - 65536, struct.unpack('>7h', raw_data)))
-        except RuntimeError:
+        flag, ax, ay, az, gx, gy, gz = self._read_sample()
+        if not flag:
             return False, Vector3(0.0, 0.0, 0.0), Vector3(0.0, 0.0, 0.0)
 
-        g_scl = 1.0 / self.acceleration_scale * GRAVITY_CONSTANT
-        a_scl = 1.0 / self.gyroscope_scale / 180.0 * math.pi
-
         if not self._use_filtering:
-            return True, \
-                   Vector3(float(ax) * a_scl, float(ay) * a_scl, float(az) * a_scl), \
-                   Vector3(float(gx) * g_scl, float(gy) * g_scl, float(gz) * g_scl)
+            return True, Vector3(ax, ay, az), Vector3(gx, gy, gz)
 
         return True, \
-               Vector3(self._filter_value(float(ax) * a_scl, FILTER_AX),
-                       self._filter_value(float(ay) * a_scl, FILTER_AY),
-                       self._filter_value(float(az) * a_scl, FILTER_AZ)), \
-               Vector3(self._filter_value(float(gx) * g_scl, FILTER_GX),
-                       self._filter_value(float(gy) * g_scl, FILTER_GY),
-                       self._filter_value(float(gz) * g_scl, FILTER_GZ))
+               Vector3(self._filter_value(ax, FILTER_AX),
+                       self._filter_value(ay, FILTER_AY),
+                       self._filter_value(az, FILTER_AZ)), \
+               Vector3(self._filter_value(gx, FILTER_GX),
+                       self._filter_value(gy, FILTER_GY),
+                       self._filter_value(gz, FILTER_GZ))
 
     """
     ###############################################
@@ -396,8 +431,8 @@ class Accelerometer(AccelerometerBase):
             self._omega_prev = self._omega_curr
             self._omega_curr = gyro - self._omega_calib
 
-        u: Vector3 = (self.basis.up + Vector3.cross(self.omega, self.basis.up) * self.delta_t).normalized()
-        u = (u * (1.0 - self.k_accel) + self.k_accel * self.acceleration.normalized()).normalized()
+        u: Vector3 = (self.basis.up + Vector3.cross(self.omega, self.basis.up) * self.delta_t).normalized
+        u = (u * (1.0 - self.k_accel) + self.k_accel * self.acceleration.normalized).normalized
         # u: Vector3 = ((self.basis.up * Vector3.dot(self.basis.up, self.acceleration) +
         #                Vector3.cross(self.omega, self.basis.up) * self.delta_t) * self._k_accel +
         #               self.acceleration * (1.0 - self._k_accel))
@@ -405,9 +440,9 @@ class Accelerometer(AccelerometerBase):
         f: Vector3 = (self.basis.front + Vector3.cross(self.omega, self.basis.front) * self.delta_t)
         r = Vector3.cross(f, u)
         f = Vector3.cross(u, r)
-        # f = f.normalized()
-        # u = u.normalized()
-        # r = r.normalized()
+        # f = f.normalized
+        # u = u.normalized
+        # r = r.normalized
         self._basis_prev = self._basis_curr
         self._basis_curr = Matrix3.build_transform(r, u, f)
         self._angle_prev = self._angle_curr
@@ -1,11 +1,14 @@
+from .accelerometer_binary_log import AsyncBinaryLogWriter, ACCEL_LOG_FIELDS, IMU_LOG_FIELDS, LOG_EXTENSION, \
+    is_binary_log, read_binary_log, map_binary_log, log_record_dtype
 from Utilities.Geometry.vector3 import Vector3
 # from inertial_measurement_unit import IMU
 from Utilities.Common.loop_timer import LoopTimer
 from collections import namedtuple
-from typing import List
-import datetime as dt
+from typing import List, Tuple, Union
+import numpy as np
 import json
 import time
+import abc
 
 TIME = "time"
 DTIME = "dtime"
@@ -31,40 +34,6 @@ class AccelMeasurement(namedtuple('AccelMeasurement', 'time, dtime, acceleration
         return super().__new__(cls, time, dtime, acceleration, angles_velocity)
 
 
-class AccelerometerLog:
-    def __init__(self, n: str, t: str, wp: List[AccelMeasurement]):
-        self.device_name: str = n
-        self.log_time_start: str = t
-        self.way_points: List[AccelMeasurement] = wp
-
-    @property
-    def accelerations_x(self) -> List[float]: return [v.acceleration.x for v in self.way_points]
-
-    @property
-    def accelerations_y(self) -> List[float]: return [v.acceleration.y for v in self.way_points]
-
-    @property
-    def accelerations_z(self) -> List[float]: return [v.acceleration.z for v in self.way_points]
-
-    @property
-    def accelerations(self) -> List[Vector3]: return [v.acceleration for v in self.way_points]
-
-    @property
-    def angles_velocities_x(self) -> List[float]: return [v.angles_velocity.x for v in self.way_points]
-
-    @property
-    def angles_velocities_y(self) -> List[float]: return [v.angles_velocity.y for v in self.way_points]
-
-    @property
-    def angles_velocities_z(self) -> List[float]: return [v.angles_velocity.z for v in self.way_points]
-
-    @property
-    def angles_velocities(self) -> List[Vector3]: return [v.angles_velocity for v in self.way_points]
-
-    @property
-    def time_values(self) -> List[float]: return [v.time - self.way_points[0].time for v in self.way_points]
-
-
 class WayPoint(namedtuple('WayPoint', 'time, dtime, acceleration, velocity, position, angles_velocity, angles')):
 
     def __new__(cls,
@@ -81,74 +50,203 @@ class WayPoint(namedtuple('WayPoint', 'time, dtime, acceleration, velocity, posi
 TIME_CUT = 0.0
 
 
-class IMULog:
-    def __init__(self, n: str, t: str, wp: List[WayPoint]):
+def _time_mask(t: np.ndarray, t_cut: float) -> Union[slice, np.ndarray]:
+    """
+    Маска точек с t > t_cut. Для монотонного времени (обычный случай) - срез, не копирующий колонки.
+    """
+    if t.size == 0 or t[0] > t_cut:
+        return slice(None)
+    if np.all(t[1:] >= t[:-1]):
+        return slice(int(np.searchsorted(t, t_cut, side='right')), None)
+    return t > t_cut
+
+
+class _RecordsLog(abc.ABC):
+    """
+    Лог, хранящий точки в структурном массиве numpy (см. log_record_dtype). Колонки отдаются
+    как представления массива без копирования, объекты Vector3 создаются только по запросу way_points.
+    """
+    FIELDS = ACCEL_LOG_FIELDS
+    TIME_CUT = None
+
+    def __init__(self, n: str, t: str, wp: Union[List[tuple], np.ndarray]):
         self.device_name: str = n
         self.log_time_start: str = t
-        self.way_points: List[WayPoint] = wp
+        self._records: np.ndarray = wp if isinstance(wp, np.ndarray) else \
+            _records_from_way_points(wp, log_record_dtype(self.FIELDS))
+        self._columns = {}
+        self._mask = None
+        self._time_values = None
+        self._way_points = None
+
+    def __len__(self) -> int:
+        return self._records.size
 
     @property
-    def accelerations_x(self) -> List[float]: return [v.acceleration.x for v in self.way_points if v.time > TIME_CUT]
+    def records(self) -> np.ndarray:
+        return self._records
+
+    def _column(self, name: str) -> np.ndarray:
+        if name in self._records.dtype.names:
+            return self._records[name]
+        if name not in self._columns:
+            if name == TIME:
+                self._columns[name] = np.cumsum(self._column(DTIME), dtype=float)
+            elif name == DTIME:
+                self._columns[name] = np.diff(self._column(TIME), prepend=self._column(TIME)[:1])
+            else:
+                self._columns[name] = np.zeros((len(self), 3), dtype=np.float32)
+        return self._columns[name]
 
     @property
-    def accelerations_y(self) -> List[float]: return [v.acceleration.y for v in self.way_points if v.time > TIME_CUT]
+    def _time_mask(self) -> Union[slice, np.ndarray]:
+        if self._mask is None:
+            self._mask = slice(None) if self.TIME_CUT is None else _time_mask(self._column(TIME), self.TIME_CUT)
+        return self._mask
+
+    def _values(self, name: str, axis: int = None) -> np.ndarray:
+        column = self._column(name)[self._time_mask]
+        return column if axis is None else column[:, axis]
+
+    def time_range(self, t_begin: float = None, t_end: float = None):
+        """
+        Часть лога с t_begin <= time_values < t_end. Для монотонного времени данные не копируются.
+        """
+        t = self._column(TIME)
+        t_0 = t[0] if t.size != 0 else 0.0
+        t_begin = -np.inf if t_begin is None else t_0 + t_begin
+        t_end = np.inf if t_end is None else t_0 + t_end
+        if np.all(t[1:] >= t[:-1]):
+            i_begin, i_end = np.searchsorted(t, (t_begin, t_end), side='left')
+            return type(self)(self.device_name, self.log_time_start, self._records[i_begin:i_end])
+        return type(self)(self.device_name, self.log_time_start, self._records[(t >= t_begin) & (t < t_end)])
 
     @property
-    def accelerations_z(self) -> List[float]: return [v.acceleration.z for v in self.way_points if v.time > TIME_CUT]
+    def time_values(self) -> np.ndarray:
+        if self._time_values is None:
+            t = self._column(TIME)
+            self._time_values = t[self._time_mask] - (t[0] if t.size != 0 else 0.0)
+        return self._time_values
 
     @property
-    def accelerations(self) -> List[Vector3]: return [v.acceleration for v in self.way_points if v.time > TIME_CUT]
+    def d_time_values(self) -> np.ndarray:
+        return self._values(DTIME)
 
     @property
-    def velocities_x(self) -> List[float]: return [v.velocity.x for v in self.way_points if v.time > TIME_CUT]
+    def accelerations_x(self) -> np.ndarray: return self._values(ACCELERATION, 0)
 
     @property
-    def velocities_y(self) -> List[float]: return [v.velocity.y for v in self.way_points if v.time > TIME_CUT]
+    def accelerations_y(self) -> np.ndarray: return self._values(ACCELERATION, 1)
 
     @property
-    def velocities_z(self) -> List[float]: return [v.velocity.z for v in self.way_points if v.time > TIME_CUT]
+    def accelerations_z(self) -> np.ndarray: return self._values(ACCELERATION, 2)
 
     @property
-    def velocities(self) -> List[Vector3]: return [v.velocity for v in self.way_points if v.time > TIME_CUT]
+    def accelerations(self) -> np.ndarray: return self._values(ACCELERATION)
 
     @property
-    def positions_x(self) -> List[float]: return [v.position.x for v in self.way_points if v.time > TIME_CUT]
+    def angles_velocities_x(self) -> np.ndarray: return self._values(ANGLES_VELOCITY, 0)
 
     @property
-    def positions_y(self) -> List[float]: return [v.position.y for v in self.way_points if v.time > TIME_CUT]
+    def angles_velocities_y(self) -> np.ndarray: return self._values(ANGLES_VELOCITY, 1)
 
     @property
-    def positions_z(self) -> List[float]: return [v.position.z for v in self.way_points if v.time > TIME_CUT]
+    def angles_velocities_z(self) -> np.ndarray: return self._values(ANGLES_VELOCITY, 2)
 
     @property
-    def positions(self) -> List[Vector3]: return [v.position for v in self.way_points if v.time > TIME_CUT]
+    def angles_velocities(self) -> np.ndarray: return self._values(ANGLES_VELOCITY)
+
+    @abc.abstractmethod
+    def _make_way_point(self, index: int) -> tuple:
+        """
+        Точка лога с номером index в виде именованного кортежа (AccelMeasurement, WayPoint, ...),
+        собранная из колонок self._column. Определяется наследником под свой набор полей FIELDS.
+        """
+
+    def iter_way_points(self):
+        """
+        Последовательно создаёт точки лога, не храня их все одновременно.
+        """
+        for index in range(len(self)):
+            yield self._make_way_point(index)
 
     @property
-    def angles_velocities_x(self) -> List[float]: return [v.angles_velocity.x for v in self.way_points if v.time > TIME_CUT]
+    def way_points(self) -> list:
+        """
+        Точки лога в виде именованных кортежей. Создаются при первом обращении.
+        """
+        if self._way_points is None:
+            self._way_points = list(self.iter_way_points())
+        return self._way_points
+
+
+class AccelerometerLog(_RecordsLog):
+    FIELDS = ACCEL_LOG_FIELDS
+
+    def _make_way_point(self, index: int) -> AccelMeasurement:
+        return AccelMeasurement(float(self._column(TIME)[index]),
+                                float(self._column(DTIME)[index]),
+                                Vector3(*self._column(ACCELERATION)[index].tolist()),
+                                Vector3(*self._column(ANGLES_VELOCITY)[index].tolist()))
+
+
+class IMULog(_RecordsLog):
+    FIELDS = IMU_LOG_FIELDS
+    TIME_CUT = TIME_CUT
 
     @property
-    def angles_velocities_y(self) -> List[float]: return [v.angles_velocity.y for v in self.way_points if v.time > TIME_CUT]
+    def velocities_x(self) -> np.ndarray: return self._values(VELOCITY, 0)
 
     @property
-    def angles_velocities_z(self) -> List[float]: return [v.angles_velocity.z for v in self.way_points if v.time > TIME_CUT]
+    def velocities_y(self) -> np.ndarray: return self._values(VELOCITY, 1)
 
     @property
-    def angles_velocities(self) -> List[Vector3]: return [v.angles_velocity for v in self.way_points if v.time > TIME_CUT]
+    def velocities_z(self) -> np.ndarray: return self._values(VELOCITY, 2)
 
     @property
-    def angles_x(self) -> List[float]: return [v.angles.x for v in self.way_points if v.time > TIME_CUT]
+    def velocities(self) -> np.ndarray: return self._values(VELOCITY)
 
     @property
-    def angles_y(self) -> List[float]: return [v.angles.y for v in self.way_points if v.time > TIME_CUT]
+    def positions_x(self) -> np.ndarray: return self._values(POSITION, 0)
 
     @property
-    def angles_z(self) -> List[float]: return [v.angles.z for v in self.way_points if v.time > TIME_CUT]
+    def positions_y(self) -> np.ndarray: return self._values(POSITION, 1)
 
     @property
-    def angles(self) -> List[Vector3]: return [v.angles for v in self.way_points if v.time > TIME_CUT]
+    def positions_z(self) -> np.ndarray: return self._values(POSITION, 2)
 
     @property
-    def time_values(self) -> List[float]: return [v.time - self.way_points[0].time for v in self.way_points if v.time > TIME_CUT]
+    def positions(self) -> np.ndarray: return self._values(POSITION)
+
+    @property
+    def angles_x(self) -> np.ndarray: return self._values(ANGLES, 0)
+
+    @property
+    def angles_y(self) -> np.ndarray: return self._values(ANGLES, 1)
+
+    @property
+    def angles_z(self) -> np.ndarray: return self._values(ANGLES, 2)
+
+    @property
+    def angles(self) -> np.ndarray: return self._values(ANGLES)
+
+    def _make_way_point(self, index: int) -> WayPoint:
+        return WayPoint(float(self._column(TIME)[index]),
+                        float(self._column(DTIME)[index]),
+                        Vector3(*self._column(ACCELERATION)[index].tolist()),
+                        Vector3(*self._column(VELOCITY)[index].tolist()),
+                        Vector3(*self._column(POSITION)[index].tolist()),
+                        Vector3(*self._column(ANGLES_VELOCITY)[index].tolist()),
+                        Vector3(*self._column(ANGLES)[index].tolist()))
+
+
+def _records_from_way_points(way_points: List[tuple], dtype: np.dtype) -> np.ndarray:
+    records = np.zeros(len(way_points), dtype=dtype)
+    for name in dtype.names:
+        if len(way_points) != 0:
+            records[name] = [tuple(getattr(wp, name)) if dtype[name].shape else getattr(wp, name)
+                             for wp in way_points]
+    return records
 
 
 def read_accel(accelerometer) -> str:
@@ -191,48 +289,54 @@ def read_accel_data(accelerometer, reading_time: float = 1.0, time_delta: float
     return records
 
 
+def _binary_log_path(file_path: str) -> str:
+    if file_path.endswith('.json'):
+        return file_path[:-len('.json')] + LOG_EXTENSION
+    return file_path
+
+
 def record_accel_log(file_path: str, accelerometer,
                      reading_time: float = 1.0, time_delta: float = 0.075) -> None:
-    with open(file_path, 'wt') as out_put:
-        print(f"{{\n\"record_date\": \"{dt.datetime.now().strftime('%H; %M; %S')}\",\n", file=out_put)
-        print("\"way_points\" :[", file=out_put)
-        lt = LoopTimer()
-        lt.timeout = time_delta
+    """
+    Пишет измерения акселерометра в бинарный лог (см. accelerometer_binary_log).
+    Расширение .json заменяется на LOG_EXTENSION.
+    """
+    with AsyncBinaryLogWriter(_binary_log_path(file_path), ACCEL_LOG_FIELDS,
+                         type(accelerometer).__name__) as out_put:
         t = 0.0
         while True:
-            with lt:
-                print(read_accel(accelerometer), file=out_put)
-                t += lt.last_loop_time
-                if t >= reading_time:
-                    break
-                print(',', file=out_put)
-        print("\t]\n}", file=out_put)
+            t0 = time.perf_counter()
+            if not accelerometer.read_request():
+                raise RuntimeError("Accelerometer read error")
+            out_put.append_accel(accelerometer)
+            d_t = time.perf_counter() - t0
+            if d_t < time_delta:
+                time.sleep(time_delta - d_t)
+                d_t = time_delta
+            t += d_t
+            if t >= reading_time:
+                break
 
 
 def record_imu_log(file_path: str, imu,
                    reading_time: float = 1.0, time_delta: float = 0.075) -> None:
-    with open(file_path, 'wt') as out_put:
-        print(f"{{\n\"record_date\": \"{dt.datetime.now().strftime('%H; %M; %S')}\",\n", file=out_put)
-        print("\"way_points\" :[", file=out_put)
-        lt = LoopTimer()
-        lt.timeout = time_delta
+    """
+    Пишет состояние инерциалки в бинарный лог (см. accelerometer_binary_log).
+    Расширение .json заменяется на LOG_EXTENSION.
+    """
+    with AsyncBinaryLogWriter(_binary_log_path(file_path), IMU_LOG_FIELDS, type(imu).__name__) as out_put:
         t = 0.0
         while True:
             t0 = time.perf_counter()
             imu.update()
-            print(read_imu(imu), file=out_put)
+            out_put.append_imu(imu)
             d_t = time.perf_counter() - t0
-
-            if d_t > time_delta:
-                t += d_t
-                print(',', file=out_put)
-                continue
-            t += time_delta
-            time.sleep(time_delta - d_t)
+            if d_t < time_delta:
+                time.sleep(time_delta - d_t)
+                d_t = time_delta
+            t += d_t
             if t >= reading_time:
                 break
-            print(',', file=out_put)
-        print("\t]\n}", file=out_put)
 
 
 _read_order = \
@@ -241,101 +345,44 @@ _read_order = \
      2: 'zxy'}
 
 
-def read_accel_log(record_path: str, order: int = 0) -> AccelerometerLog:
-    with open(record_path) as input_json:
-        raw_json = json.load(input_json)
-        if not (WAY_POINTS in raw_json):
-            return AccelerometerLog("error", "error", [])
-        log_time_start = raw_json[LOG_TIME_START] if LOG_TIME_START in raw_json else "no-name"
-        device_name = raw_json[DEVICE_NAME] if DEVICE_NAME in raw_json else "no-time"
-        way_points = [None] * len(raw_json[WAY_POINTS])
-        order = _read_order[order] if order in _read_order else _read_order[0]
-        for item_index, item in enumerate(raw_json[WAY_POINTS]):
-            if ACCELERATION in item:
-                accel = Vector3(float(item[ACCELERATION][order[0]]),  # FOR BNO055 XZY
-                                float(item[ACCELERATION][order[1]]),  # FOR BNO055 XZY
-                                float(item[ACCELERATION][order[2]]))  # FOR BNO055 XZY
-            else:
-                accel = Vector3(0.0, 0.0, 0.0)
+def _read_log_records(record_path: str, fields: int, order: int, use_memmap: bool) -> Tuple[str, str, np.ndarray]:
+    """
+    Читает лог в структурный массив. Бинарный лог при use_memmap и порядке осей 'xyz' отображается в память,
+    json лог разбирается сразу в колонки без создания Vector3.
+    """
+    order = _read_order[order] if order in _read_order else _read_order[0]
+    if is_binary_log(record_path):
+        header, records = map_binary_log(record_path) if use_memmap else read_binary_log(record_path)
+        if order != _read_order[0]:
+            axes = ['xyz'.index(axis) for axis in order]
+            records = np.array(records)
+            for name in records.dtype.names:
+                if records.dtype[name].shape == (3,):
+                    records[name] = records[name][:, axes]
+        return header.device_name, header.log_time_start_str, records
 
-            if ANGLES_VELOCITY in item:
-                ang_vel = Vector3(float(item[ANGLES_VELOCITY][order[0]]),  # FOR BNO055 XZY
-                                  float(item[ANGLES_VELOCITY][order[1]]),  # FOR BNO055 XZY
-                                  float(item[ANGLES_VELOCITY][order[2]]))  # FOR BNO055 XZY
-            else:
-                ang_vel = Vector3(0.0, 0.0, 0.0)
-
-            if TIME in item:
-                t = float(item[TIME])
-            else:
-                t = 0.0
-
-            if DTIME in item:
-                d_t = float(item[DTIME])
-            else:
-                d_t = 0.0
-
-            way_points[item_index] = AccelMeasurement(t, d_t, accel, ang_vel)
-
-        return AccelerometerLog(device_name, log_time_start, way_points)
-
-
-def read_imu_log(record_path: str, order: int = 0) -> IMULog:
     with open(record_path) as input_json:
         raw_json = json.load(input_json)
-        if not (WAY_POINTS in raw_json):
-            return IMULog("error", "error", [])
-        log_time_start = raw_json[LOG_TIME_START] if LOG_TIME_START in raw_json else "no-name"
-        device_name = raw_json[DEVICE_NAME] if DEVICE_NAME in raw_json else "no-time"
-        way_points = [None] * len(raw_json[WAY_POINTS])
-        order = _read_order[order] if order in _read_order else _read_order[0]
-
-        for item_index, item in enumerate(raw_json[WAY_POINTS]):
-            if ACCELERATION in item:
-                accel = Vector3(float(item[ACCELERATION][order[0]]),
-                                float(item[ACCELERATION][order[1]]),
-                                float(item[ACCELERATION][order[2]]))
-            else:
-                accel = Vector3(0.0, 0.0, 0.0)
-
-            if ANGLES_VELOCITY in item:
-                ang_vel = Vector3(float(item[ANGLES_VELOCITY][order[0]]),
-                                  float(item[ANGLES_VELOCITY][order[1]]),
-                                  float(item[ANGLES_VELOCITY][order[2]]))
-            else:
-                ang_vel = Vector3(0.0, 0.0, 0.0)
-
-            if ANGLES in item:
-                angle = Vector3(float(item[ANGLES][order[0]]),
-                                float(item[ANGLES][order[1]]),
-                                float(item[ANGLES][order[2]]))
-            else:
-                angle = Vector3(0.0, 0.0, 0.0)
-
-            if VELOCITY in item:
-                velocity = Vector3(float(item[VELOCITY][order[0]]),
-                                   float(item[VELOCITY][order[1]]),
-                                   float(item[VELOCITY][order[2]]))
-            else:
-                velocity = Vector3(0.0, 0.0, 0.0)
-
-            if POSITION in item:
-                position = Vector3(float(item[POSITION][order[0]]),
-                                   float(item[POSITION][order[1]]),
-                                   float(item[POSITION][order[2]]))
-            else:
-                position = Vector3(0.0, 0.0, 0.0)
-
-            if TIME in item:
-                t = float(item[TIME])
-            else:
-                t = 0.0
-
-            if DTIME in item:
-                d_t = float(item[DTIME])
-            else:
-                d_t = 0.0
-
-            way_points[item_index] = WayPoint(t, d_t, accel, velocity, position, ang_vel, angle)
-
-        return IMULog(device_name, log_time_start, way_points)
+    if not (WAY_POINTS in raw_json):
+        return "error", "error", np.zeros(0, dtype=log_record_dtype(fields))
+    log_time_start = raw_json[LOG_TIME_START] if LOG_TIME_START in raw_json else "no-name"
+    device_name = raw_json[DEVICE_NAME] if DEVICE_NAME in raw_json else "no-time"
+    items = raw_json[WAY_POINTS]
+    dtype = log_record_dtype(fields)
+    records = np.zeros(len(items), dtype=dtype)
+    for name in dtype.names:
+        if dtype[name].shape:
+            records[name] = [(float(item[name][order[0]]),
+                              float(item[name][order[1]]),
+                              float(item[name][order[2]])) if name in item else (0.0, 0.0, 0.0) for item in items]
+        else:
+            records[name] = [float(item[name]) if name in item else 0.0 for item in items]
+    return device_name, log_time_start, records
+
+
+def read_accel_log(record_path: str, order: int = 0, use_memmap: bool = True) -> AccelerometerLog:
+    return AccelerometerLog(*_read_log_records(record_path, ACCEL_LOG_FIELDS, order, use_memmap))
+
+
+def read_imu_log(record_path: str, order: int = 0, use_memmap: bool = True) -> IMULog:
+    return IMULog(*_read_log_records(record_path, IMU_LOG_FIELDS, order, use_memmap))
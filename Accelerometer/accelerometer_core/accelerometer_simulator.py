@@ -0,0 +1,350 @@
+"""
+Симулятор акселерометра: вместо шины данные берутся из записанного лога или заданной траектории.
+
+Подключается вместо реального устройства через AccelerometerBase._device_read_request, поэтому IMU, фильтры и
+запись лога работают с ним без изменений. Отсчёты выдаются с заданной частотой (до единиц кГц) либо в реальном
+времени (чтение блокируется до следующего отсчёта, как чтение с шины), либо без ожидания (время симуляции
+идёт на 1 / rate за чтение - для нагрузочных тестов). Поверх данных добавляются шум, дрейф смещения
+(случайное блуждание), потерянные пакеты и задержка шины.
+
+Пример:
+    track = track_from_trajectory(*circle_trajectory(radius=2.0, period=8.0), duration=60.0, rate=1000.0)
+    acc = AccelerometerSimulator(track, rate=1000.0, accel_noise=0.05, drop_rate=0.01, latency=2e-4)
+    while acc.read_request(): ...
+"""
+from Accelerometer.accelerometer_core.accelerometer_recording import read_imu_log, IMULog
+from Accelerometer.accelerometer_core.accelerometer_constants import GRAVITY_CONSTANT
+from .accelerometer_base import AccelerometerBase
+from collections import namedtuple
+from typing import Callable, Tuple, Union
+import numpy as np
+import math
+import time
+
+# время отсчёта задаётся отдельно, остальные поля в порядке разбора AccelerometerBase._parce_response
+_TRACK_FIELDS = ('time', 'acceleration', 'omega', 'angles', 'quaternion', 'magnetometer', 'acceleration_linear')
+# ниже этого значения ожидание выполняется активным циклом, time.sleep на нём неточен
+_SPIN_WAIT_TIME = 1e-3
+
+
+class SensorTrack(namedtuple('SensorTrack', _TRACK_FIELDS)):
+    """
+    Отсчёты для симулятора. time (N,) - время от начала записи, quaternion (N, 4) - w, x, y, z,
+    остальные поля (N, 3).
+    """
+    __slots__ = ()
+
+    def __len__(self) -> int:
+        return self.time.size
+
+    @property
+    def duration(self) -> float:
+        return float(self.time[-1] - self.time[0]) if self.time.size else 0.0
+
+
+def track_from_log(log: Union[str, IMULog], calib_time: float = 1.0) -> SensorTrack:
+    """
+    Отсчёты из лога акселерометра или IMU. Линейное ускорение - ускорение за вычетом среднего за первые
+    calib_time секунд (в начале записи устройство неподвижно). Поля, которых нет в логе, нулевые.
+    """
+    log = read_imu_log(log) if isinstance(log, str) else log
+    if len(log) == 0:
+        raise RuntimeError("track_from_log :: empty log")
+    t = np.asarray(log.time_values, dtype=np.float64)
+    t = t - t[0]
+    accel = np.asarray(log.accelerations, dtype=np.float64)
+    calib = accel[t <= calib_time] if np.any(t <= calib_time) else accel[:1]
+    quaternion = np.zeros((t.size, 4))
+    quaternion[:, 0] = 1.0
+    return SensorTrack(t, accel, np.asarray(log.angles_velocities, dtype=np.float64),
+                       np.asarray(log.angles, dtype=np.float64), quaternion, np.zeros((t.size, 3)),
+                       accel - calib.mean(axis=0))
+
+
+def _rotations_xyz(angles: np.ndarray) -> np.ndarray:
+    """
+    Матрицы поворота Rz * Ry * Rx для углов (N, 3) в радианах.
+    """
+    cx, cy, cz = np.cos(angles).T
+    sx, sy, sz = np.sin(angles).T
+    r = np.empty((angles.shape[0], 3, 3))
+    r[:, 0, 0], r[:, 0, 1], r[:, 0, 2] = cy * cz, sx * sy * cz - cx * sz, cx * sy * cz + sx * sz
+    r[:, 1, 0], r[:, 1, 1], r[:, 1, 2] = cy * sz, sx * sy * sz + cx * cz, cx * sy * sz - sx * cz
+    r[:, 2, 0], r[:, 2, 1], r[:, 2, 2] = -sy, sx * cy, cx * cy
+    return r
+
+
+def _quaternions(r: np.ndarray) -> np.ndarray:
+    """
+    Кватернионы (w, x, y, z) для матриц поворота (N, 3, 3), как в Quaternion.from_rotation_matrix.
+    """
+    q = np.empty((r.shape[0], 4))
+    q[:, 0] = np.sqrt(np.maximum(0.0, 1.0 + r[:, 0, 0] + r[:, 1, 1] + r[:, 2, 2])) * 0.5
+    q[:, 1] = np.copysign(np.sqrt(np.maximum(0.0, 1.0 + r[:, 0, 0] - r[:, 1, 1] - r[:, 2, 2])) * 0.5,
+                          r[:, 2, 1] - r[:, 1, 2])
+    q[:, 2] = np.copysign(np.sqrt(np.maximum(0.0, 1.0 - r[:, 0, 0] + r[:, 1, 1] - r[:, 2, 2])) * 0.5,
+                          r[:, 0, 2] - r[:, 2, 0])
+    q[:, 3] = np.copysign(np.sqrt(np.maximum(0.0, 1.0 - r[:, 0, 0] - r[:, 1, 1] + r[:, 2, 2])) * 0.5,
+                          r[:, 1, 0] - r[:, 0, 1])
+    return q
+
+
+def track_from_trajectory(position: Callable[[float], Tuple[float, float, float]],
+                          angles: Callable[[float], Tuple[float, float, float]] = None,
+                          duration: float = 10.0, rate: float = 1000.0,
+                          magnetic_field: Tuple[float, float, float] = (0.0, 1.0, 0.0)) -> SensorTrack:
+    """
+    Отсчёты идеального акселерометра, движущегося по заданной траектории.
+    :param position: положение в мировой системе координат от времени, [м]
+    :param angles: углы поворота (x, y, z) от времени, [рад], по умолчанию без поворота
+    :param duration: длительность, [сек]
+    :param rate: частота отсчётов, [Гц]
+    :param magnetic_field: магнитное поле в мировой системе координат
+    """
+    t = np.arange(int(duration * rate) + 1) / rate
+    p = np.array([tuple(position(ti)) for ti in t], dtype=np.float64)
+    a = np.array([tuple(angles(ti)) for ti in t], dtype=np.float64) if angles else np.zeros((t.size, 3))
+    r = _rotations_xyz(a)
+    accel_world = np.gradient(np.gradient(p, t, axis=0), t, axis=0)
+    # R^T * dR/dt - кососимметричная матрица угловой скорости в собственной системе координат
+    w = np.einsum('nji,njk->nik', r, np.gradient(r, t, axis=0))
+    omega = np.stack((w[:, 2, 1], w[:, 0, 2], w[:, 1, 0]), axis=1)
+    accel_linear = np.einsum('nji,nj->ni', r, accel_world)
+    gravity = np.einsum('nji,j->ni', r, np.array((0.0, 0.0, GRAVITY_CONSTANT)))
+    magnetometer = np.einsum('nji,j->ni', r, np.asarray(magnetic_field, dtype=np.float64))
+    return SensorTrack(t, accel_linear + gravity, omega, a, _quaternions(r), magnetometer, accel_linear)
+
+
+def circle_trajectory(radius: float = 1.0, period: float = 10.0, height: float = 0.0) -> \
+        Tuple[Callable[[float], Tuple[float, float, float]], Callable[[float], Tuple[float, float, float]]]:
+    """
+    Движение по окружности в плоскости xy с поворотом по касательной.
+    :return: функции положения и углов для track_from_trajectory
+    """
+    w = 2.0 * math.pi / period
+
+    def position(t: float) -> Tuple[float, float, float]:
+        return radius * math.cos(w * t), radius * math.sin(w * t), height
+
+    def angles(t: float) -> Tuple[float, float, float]:
+        return 0.0, 0.0, w * t
+
+    return position, angles
+
+
+class AccelerometerSimulator(AccelerometerBase):
+    """
+    Акселерометр, читающий отсчёты SensorTrack. См. описание модуля.
+    """
+    def __init__(self, track: SensorTrack, rate: float = 100.0, real_time: bool = True, loop: bool = True,
+                 accel_noise: float = 0.0, omega_noise: float = 0.0, accel_bias_drift: float = 0.0,
+                 omega_bias_drift: float = 0.0, drop_rate: float = 0.0, latency: float = 0.0,
+                 latency_jitter: float = 0.0, seed: int = None):
+        """
+        :param track: отсчёты
+        :param rate: частота выдачи отсчётов, [Гц]
+        :param real_time: ждать появления следующего отсчёта по часам, иначе время симуляции идёт на 1 / rate
+        за каждое чтение
+        :param loop: по окончании отсчётов начинать сначала, иначе чтения завершаются ошибкой
+        :param accel_noise: СКО шума ускорений, [м/сек^2]
+        :param omega_noise: СКО шума угловых скоростей, [рад/сек]
+        :param accel_bias_drift: интенсивность дрейфа смещения ускорений, [м/сек^2/sqrt(сек)]
+        :param omega_bias_drift: интенсивность дрейфа смещения угловых скоростей, [рад/сек/sqrt(сек)]
+        :param drop_rate: вероятность потери пакета
+        :param latency: задержка шины на чтение, [сек]
+        :param latency_jitter: СКО разброса задержки, [сек]
+        """
+        if len(track) == 0:
+            raise RuntimeError("AccelerometerSimulator :: empty sensor track")
+        self._track: SensorTrack = track
+        self._rate: float = 1.0
+        self._drop_rate: float = 0.0
+        self._real_time: bool = real_time
+        self._loop: bool = loop
+        self._accel_noise: float = max(0.0, accel_noise)
+        self._omega_noise: float = max(0.0, omega_noise)
+        self._accel_bias_drift: float = max(0.0, accel_bias_drift)
+        self._omega_bias_drift: float = max(0.0, omega_bias_drift)
+        self._latency: float = max(0.0, latency)
+        self._latency_jitter: float = max(0.0, latency_jitter)
+        self._rng = np.random.default_rng(seed)
+        self._accel_bias = np.zeros(3)
+        self._omega_bias = np.zeros(3)
+        self._sample_index: int = 0
+        self._sample_time: float = 0.0
+        self._sim_t_start: float = 0.0
+        self._reads_count: int = 0
+        self._dropped_count: int = 0
+        self._skipped_count: int = 0
+        self.rate = rate
+        self.drop_rate = drop_rate
+        super().__init__()
+
+    def _request_for_device_connection(self) -> bool:
+        self._device_connection = self._track
+        self._sample_index = 0
+        self._sample_time = 0.0
+        self._sim_t_start = time.perf_counter()
+        return True
+
+    def _request_for_device_disconnection(self) -> bool:
+        self._device_connection = None
+        return True
+
+    def _wait_until(self, t: float) -> None:
+        remaining = t - time.perf_counter()
+        if remaining > _SPIN_WAIT_TIME:
+            time.sleep(remaining - _SPIN_WAIT_TIME)
+        while time.perf_counter() < t:
+            pass
+
+    def _next_sample_time(self) -> float:
+        """
+        Время следующего отсчёта. В реальном времени ждёт его появления, а если чтение отстало - пропускает
+        устаревшие отсчёты.
+        """
+        t = self._sample_index / self._rate
+        if not self._real_time:
+            return t
+        now = time.perf_counter() - self._sim_t_start
+        if now < t:
+            self._wait_until(self._sim_t_start + t)
+            return t
+        latest = int(now * self._rate)
+        self._skipped_count += latest - self._sample_index
+        self._sample_index = latest
+        return latest / self._rate
+
+    def _device_read_request(self) -> Tuple[bool, Tuple[float, ...]]:
+        if self._device_connection is None:
+            return False, (0.0,)
+        t = self._next_sample_time()
+        track = self._track
+        if self._loop:
+            track_t = t % track.duration if track.duration > 0.0 else 0.0
+        elif t > track.duration:
+            return False, (0.0,)
+        else:
+            track_t = t
+        index = min(int(np.searchsorted(track.time, track_t + track.time[0], side='right')) - 1, len(track) - 1)
+        index = max(index, 0)
+        self._sample_index += 1
+        self._reads_count += 1
+        dt = t - self._sample_time
+        self._sample_time = t
+
+        if self._latency > 0.0 or self._latency_jitter > 0.0:
+            latency = self._latency + (self._rng.normal(0.0, self._latency_jitter) if self._latency_jitter else 0.0)
+            if latency > 0.0:
+                self._wait_until(time.perf_counter() + latency)
+
+        if self._drop_rate > 0.0 and self._rng.random() < self._drop_rate:
+            self._dropped_count += 1
+            return False, (0.0,)
+
+        noise = self._rng.standard_normal(12)
+        if dt > 0.0:
+            self._accel_bias += noise[6:9] * (self._accel_bias_drift * math.sqrt(dt))
+            self._omega_bias += noise[9:12] * (self._omega_bias_drift * math.sqrt(dt))
+        accel_error = noise[0:3] * self._accel_noise + self._accel_bias
+        omega_error = noise[3:6] * self._omega_noise + self._omega_bias
+
+        response = []
+        if self.is_accel_read:
+            response.extend((track.acceleration[index] + accel_error).tolist())
+        if self.is_omega_read:
+            response.extend((track.omega[index] + omega_error).tolist())
+        if self.is_angles_read:
+            response.extend(track.angles[index].tolist())
+        if self.is_quaternion_read:
+            response.extend(track.quaternion[index].tolist())
+        if self.is_magnetometer_read:
+            response.extend(track.magnetometer[index].tolist())
+        if self.is_lin_accel_read:
+            response.extend((track.acceleration_linear[index] + accel_error).tolist())
+        return True, tuple(response)
+
+    def _update_time(self) -> None:
+        """
+        Время измерения - время отсчёта симуляции, как метка времени от устройства.
+        """
+        if self._curr_t < 0:
+            self._prev_t = self._sample_time
+        else:
+            self._prev_t = self._curr_t
+        self._curr_t = self._sample_time
+
+    @property
+    def track(self) -> SensorTrack:
+        return self._track
+
+    @property
+    def rate(self) -> float:
+        """
+        Частота выдачи отсчётов, [Гц].
+        """
+        return self._rate
+
+    @rate.setter
+    def rate(self, value: float) -> None:
+        sample_time = self._sample_index / self._rate
+        self._rate = min(max(1.0, float(value)), 10000.0)
+        self._sample_index = int(sample_time * self._rate)
+
+    @property
+    def drop_rate(self) -> float:
+        """
+        Вероятность потери пакета.
+        """
+        return self._drop_rate
+
+    @drop_rate.setter
+    def drop_rate(self, value: float) -> None:
+        self._drop_rate = min(max(0.0, float(value)), 1.0)
+
+    @property
+    def latency(self) -> float:
+        """
+        Задержка шины на чтение, [сек].
+        """
+        return self._latency
+
+    @latency.setter
+    def latency(self, value: float) -> None:
+        self._latency = max(0.0, float(value))
+
+    @property
+    def accel_bias(self) -> Tuple[float, float, float]:
+        """
+        Текущее смещение ускорений, накопленное дрейфом.
+        """
+        return tuple(self._accel_bias.tolist())
+
+    @property
+    def omega_bias(self) -> Tuple[float, float, float]:
+        """
+        Текущее смещение угловых скоростей, накопленное дрейфом.
+        """
+        return tuple(self._omega_bias.tolist())
+
+    @property
+    def sample_time(self) -> float:
+        """
+        Время последнего выданного отсчёта, [сек].
+        """
+        return self._sample_time
+
+    @property
+    def reads_count(self) -> int:
+        return self._reads_count
+
+    @property
+    def dropped_count(self) -> int:
+        return self._dropped_count
+
+    @property
+    def skipped_count(self) -> int:
+        """
+        Отсчёты, пропущенные из-за того, что чтение не успевало за частотой в режиме реального времени.
+        """
+        return self._skipped_count
@@ -0,0 +1,376 @@
+"""
+Перебор параметров интегрирования IMU (k_gravity, trust_acc_time, accel_threshold, omega_threshold) на записанном логе.
+
+Лог воспроизводится так же, как его обрабатывает IMU._imu_integration:
+1. базис акселерометра обновляется комплиментарным фильтром AccelerometerBase._build_basis с k_filter_arg = k_gravity,
+   начальный базис строится по среднему ускорению за время калибровки;
+2. линейное ускорение - ускорение за вычетом G вдоль оси z базиса, переведённое в мировую систему координат;
+3. скорость интегрируется и обнуляется, если ускорение не менялось дольше trust_acc_time (изменение меньше
+   accel_threshold) или изменение угловой скорости меньше omega_threshold;
+4. положение - интеграл скорости.
+
+Колонки лога один раз копируются в разделяемую память, процессы пула подключаются к ней без копирования.
+Рекуррентный базис зависит только от k_gravity, поэтому задачи группируются по k_gravity, а остальные параметры
+считаются операциями над массивами.
+
+Пример:
+python -m Accelerometer.accelerometer_core.imu_parameter_sweep record.imulog --metric drift --samples 256 \
+    --results sweep.csv
+"""
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from collections import namedtuple
+from typing import Dict, Iterable, List, Sequence, Tuple, Union
+import itertools
+import argparse
+import math
+import csv
+import os
+
+import numpy as np
+
+from Accelerometer.accelerometer_core.accelerometer_constants import GRAVITY_CONSTANT
+from Accelerometer.accelerometer_core.accelerometer_recording import read_accel_log, read_imu_log
+from Utilities.Geometry.common import fast_math
+
+DRIFT_METRIC = "drift"
+CLOSURE_METRIC = "closure"
+TRACK_METRIC = "track"
+METRICS = (DRIFT_METRIC, CLOSURE_METRIC, TRACK_METRIC)
+
+# границы параметров как в сеттерах IMU
+PARAMETERS_RANGES = {"k_gravity":       (0.0,  1.0),
+                     "trust_acc_time":  (0.05, 1.0),
+                     "accel_threshold": (0.0,  10.0),
+                     "omega_threshold": (0.0,  10.0)}
+
+# минимальная длина пути для метрики drift, м: более короткие траектории (параметры, при которых интегрирование
+# практически всегда остановлено) считаются неподвижными и получают бесконечную оценку
+DRIFT_MIN_PATH = 0.1
+
+# dtime, ускорение, угловая скорость
+_COLUMNS_COUNT = 7
+
+
+class IMUParameters(namedtuple('IMUParameters', 'k_gravity, trust_acc_time, accel_threshold, omega_threshold')):
+    __slots__ = ()
+
+    def __new__(cls, k_gravity: float = 0.99, trust_acc_time: float = 0.1, accel_threshold: float = 0.1,
+                omega_threshold: float = 0.1):
+        values = (k_gravity, trust_acc_time, accel_threshold, omega_threshold)
+        return super().__new__(cls, *(min(max(lo, float(v)), hi) for v, (lo, hi) in
+                                      zip(values, PARAMETERS_RANGES.values())))
+
+
+class SweepResult(namedtuple('SweepResult', 'rank, parameters, score, final_position, path_length')):
+    __slots__ = ()
+
+    def __str__(self):
+        p = self.parameters
+        x, y, z = self.final_position
+        return f"|{self.rank:>5}|{self.score:>12.5f}|{p.k_gravity:>10.4f}|{p.trust_acc_time:>10.4f}|" \
+               f"{p.accel_threshold:>10.4f}|{p.omega_threshold:>10.4f}|{x:>9.3f}|{y:>9.3f}|{z:>9.3f}|" \
+               f"{self.path_length:>10.3f}|"
+
+
+def parameters_grid(k_gravity: Iterable[float] = (0.99,), trust_acc_time: Iterable[float] = (0.1,),
+                    accel_threshold: Iterable[float] = (0.1,),
+                    omega_threshold: Iterable[float] = (0.1,)) -> List[IMUParameters]:
+    """
+    Все комбинации перечисленных значений параметров.
+    """
+    return list(dict.fromkeys(IMUParameters(*values) for values in
+                              itertools.product(k_gravity, trust_acc_time, accel_threshold, omega_threshold)))
+
+
+def parameters_random(n_samples: int, ranges: Dict[str, Tuple[float, float]] = None,
+                      seed: int = None) -> List[IMUParameters]:
+    """
+    n_samples равномерно распределённых наборов параметров.
+    :param ranges: границы параметров по имени, по умолчанию PARAMETERS_RANGES
+    """
+    ranges = dict(PARAMETERS_RANGES, **(ranges if ranges else {}))
+    rng = np.random.default_rng(seed)
+    values = [rng.uniform(*ranges[name], n_samples) for name in IMUParameters._fields]
+    return [IMUParameters(*v) for v in zip(*values)]
+
+
+@fast_math
+def _integrate_basis(accel: np.ndarray, omega: np.ndarray, d_t: np.ndarray, front: np.ndarray, k_gravity: float,
+                     basis: np.ndarray) -> None:
+    """
+    AccelerometerBase._build_basis для всего лога. Vector3.cross(a, b) = b x a, здесь раскрыт покомпонентно.
+    Начальный базис: ось z вдоль front, ось y - (0, 1, 0), ортогонализованная к z.
+    """
+    zx, zy, zz = front[0], front[1], front[2]
+    yx, yy, yz = 0.0, 1.0, 0.0
+    # x = [z, y], y = [x, z]
+    xx, xy, xz = yy * zz - yz * zy, yz * zx - yx * zz, yx * zy - yy * zx
+    norm = math.sqrt(xx * xx + xy * xy + xz * xz)
+    if norm > 0.0:
+        xx, xy, xz = xx / norm, xy / norm, xz / norm
+    yx, yy, yz = zy * xz - zz * xy, zz * xx - zx * xz, zx * xy - zy * xx
+    for i in range(d_t.shape[0]):
+        wx, wy, wz = omega[i, 0] * d_t[i], omega[i, 1] * d_t[i], omega[i, 2] * d_t[i]
+        # y = (y + [w, y] * dt).normalized
+        tx, ty, tz = yx + yy * wz - yz * wy, yy + yz * wx - yx * wz, yz + yx * wy - yy * wx
+        norm = math.sqrt(tx * tx + ty * ty + tz * tz)
+        if norm > 0.0:
+            yx, yy, yz = tx / norm, ty / norm, tz / norm
+        # z = (z + [w, z] * dt).normalized
+        tx, ty, tz = zx + zy * wz - zz * wy, zy + zz * wx - zx * wz, zz + zx * wy - zy * wx
+        norm = math.sqrt(tx * tx + ty * ty + tz * tz)
+        if norm > 0.0:
+            tx, ty, tz = tx / norm, ty / norm, tz / norm
+        # z = (z * (1 - k) + k * a.normalized).normalized
+        ax, ay, az = accel[i, 0], accel[i, 1], accel[i, 2]
+        norm = math.sqrt(ax * ax + ay * ay + az * az)
+        if norm > 0.0:
+            ax, ay, az = ax / norm, ay / norm, az / norm
+        tx, ty, tz = tx * (1.0 - k_gravity) + k_gravity * ax, ty * (1.0 - k_gravity) + k_gravity * ay, \
+            tz * (1.0 - k_gravity) + k_gravity * az
+        norm = math.sqrt(tx * tx + ty * ty + tz * tz)
+        if norm > 0.0:
+            zx, zy, zz = tx / norm, ty / norm, tz / norm
+        # x = [z, y].normalized
+        tx, ty, tz = yy * zz - yz * zy, yz * zx - yx * zz, yx * zy - yy * zx
+        norm = math.sqrt(tx * tx + ty * ty + tz * tz)
+        if norm > 0.0:
+            xx, xy, xz = tx / norm, ty / norm, tz / norm
+        # y = [x, z].normalized
+        tx, ty, tz = zy * xz - zz * xy, zz * xx - zx * xz, zx * xy - zy * xx
+        norm = math.sqrt(tx * tx + ty * ty + tz * tz)
+        if norm > 0.0:
+            yx, yy, yz = tx / norm, ty / norm, tz / norm
+        basis[i, 0, 0], basis[i, 1, 0], basis[i, 2, 0] = xx, xy, xz
+        basis[i, 0, 1], basis[i, 1, 1], basis[i, 2, 1] = yx, yy, yz
+        basis[i, 0, 2], basis[i, 1, 2], basis[i, 2, 2] = zx, zy, zz
+
+
+def _reset_cumsum(values: np.ndarray, keep: np.ndarray) -> np.ndarray:
+    """
+    Накопленная сумма values, обнуляемая в точках, где keep == False.
+    """
+    total = np.cumsum(values * keep.reshape(keep.shape + (1,) * (values.ndim - 1)), axis=0)
+    last_reset = np.maximum.accumulate(np.where(keep, -1, np.arange(keep.size)))
+    base = np.where((last_reset >= 0).reshape(keep.shape + (1,) * (values.ndim - 1)),
+                    total[np.maximum(last_reset, 0)], 0.0)
+    return total - base
+
+
+def _linear_accelerations(columns: np.ndarray, calib_count: int, k_gravity: float) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Линейное ускорение в собственной и мировой системе координат для заданного k_gravity.
+    """
+    d_t, accel, omega = columns[:, 0], columns[:, 1:4], columns[:, 4:7]
+    front = accel[:max(calib_count, 1)].mean(axis=0)
+    norm = np.linalg.norm(front)
+    front = front / norm if norm > 0.0 else np.array((0.0, 0.0, 1.0))
+    basis = np.empty((d_t.size, 3, 3))
+    _integrate_basis(accel, omega, d_t, front, k_gravity, basis)
+    accel_local = accel - GRAVITY_CONSTANT * basis[:, :, 2]
+    return accel_local, np.einsum('nji,nj->ni', basis, accel_local)
+
+
+def _integrate_positions(columns: np.ndarray, accel_local: np.ndarray, accel_world: np.ndarray,
+                         parameters: IMUParameters) -> np.ndarray:
+    """
+    Скорость и положение по IMU._imu_integration для уже посчитанных ускорений.
+    """
+    d_t, omega = columns[:, 0], columns[:, 4:7]
+    accel_delta = np.zeros(d_t.size)
+    accel_delta[1:] = np.linalg.norm(np.diff(accel_local, axis=0), axis=1)
+    omega_delta = np.zeros(d_t.size)
+    omega_delta[1:] = np.linalg.norm(np.diff(omega, axis=0), axis=1)
+    acc_check_time = _reset_cumsum(d_t, accel_delta <= parameters.accel_threshold)
+    moving = (acc_check_time <= parameters.trust_acc_time) & (omega_delta >= parameters.omega_threshold)
+    velocities = _reset_cumsum(accel_world * d_t[:, None], moving)
+    return np.cumsum(velocities * d_t[:, None], axis=0)
+
+
+def _score(positions: np.ndarray, time_values: np.ndarray, metric: str, reference: np.ndarray,
+           path_length: float, min_path: float = DRIFT_MIN_PATH) -> float:
+    if positions.shape[0] == 0:
+        return math.inf
+    if metric == DRIFT_METRIC:
+        # смещение конечной точки, отнесённое к пройденному пути: отношение к длительности записи
+        # было бы наилучшим у параметров, при которых положение вообще не меняется
+        return float(np.linalg.norm(positions[-1]) / path_length) if path_length >= max(min_path, 1e-12) \
+            else math.inf
+    if metric == CLOSURE_METRIC:
+        return float(np.linalg.norm(positions[-1] - reference[-1, 1:]))
+    # TRACK_METRIC
+    mask = (time_values >= reference[0, 0]) & (time_values <= reference[-1, 0])
+    if not np.any(mask):
+        return math.inf
+    track = np.stack([np.interp(time_values[mask], reference[:, 0], reference[:, i]) for i in (1, 2, 3)], axis=1)
+    return float(np.sqrt(np.mean(np.sum((positions[mask] - track) ** 2, axis=1))))
+
+
+def _evaluate(columns: np.ndarray, calib_count: int, k_gravity: float, parameters: Sequence[IMUParameters],
+              metric: str, reference: np.ndarray,
+              min_path: float = DRIFT_MIN_PATH) -> List[Tuple[IMUParameters, float, tuple, float]]:
+    accel_local, accel_world = _linear_accelerations(columns, calib_count, k_gravity)
+    columns, accel_local, accel_world = columns[calib_count:], accel_local[calib_count:], accel_world[calib_count:]
+    time_values = np.cumsum(columns[:, 0])
+    results = []
+    for p in parameters:
+        positions = _integrate_positions(columns, accel_local, accel_world, p)
+        final_position = tuple(float(v) for v in positions[-1]) if positions.shape[0] else (0.0, 0.0, 0.0)
+        path_length = float(np.linalg.norm(np.diff(positions, axis=0), axis=1).sum())
+        results.append((p, _score(positions, time_values, metric, reference, path_length, min_path),
+                        final_position, path_length))
+    return results
+
+
+_shared_block: shared_memory.SharedMemory = None
+_shared_columns: np.ndarray = None
+
+
+def _attach_columns(block_name: str, n_rows: int) -> None:
+    """
+    Инициализатор процессов пула: подключение к колонкам лога в разделяемой памяти.
+    """
+    global _shared_block, _shared_columns
+    _shared_block = shared_memory.SharedMemory(name=block_name)
+    _shared_columns = np.ndarray((n_rows, _COLUMNS_COUNT), dtype=np.float64, buffer=_shared_block.buf)
+
+
+def _evaluate_shared(calib_count: int, k_gravity: float, parameters: Sequence[IMUParameters], metric: str,
+                     reference: np.ndarray, min_path: float) -> List[Tuple[IMUParameters, float, tuple, float]]:
+    return _evaluate(_shared_columns, calib_count, k_gravity, parameters, metric, reference, min_path)
+
+
+def read_reference_track(reference_path: str) -> np.ndarray:
+    """
+    Опорная траектория (M, 4): время от начала записи, x, y, z.
+    Текстовый файл - колонки t x y z, иначе IMU лог (колонки time и position).
+    """
+    if os.path.splitext(reference_path)[1].lower() in ('.txt', '.csv'):
+        track = np.loadtxt(reference_path, delimiter=',' if reference_path.lower().endswith('.csv') else None,
+                           ndmin=2)
+        if track.shape[1] < 4:
+            raise RuntimeError(f"read_reference_track :: expected t, x, y, z columns in {reference_path}")
+        track = track[:, :4].astype(np.float64)
+    else:
+        log = read_imu_log(reference_path)
+        track = np.column_stack((log.time_values, log.positions)).astype(np.float64)
+    if track.shape[0] == 0:
+        raise RuntimeError(f"read_reference_track :: empty reference track {reference_path}")
+    track[:, 0] -= track[0, 0]
+    return track
+
+
+def run_parameter_sweep(log_path: str, parameters: Sequence[IMUParameters], metric: str = DRIFT_METRIC,
+                        reference: Union[str, np.ndarray] = None, calib_time: float = 1.0,
+                        workers: int = None, min_path: float = DRIFT_MIN_PATH) -> List[SweepResult]:
+    """
+    Оценивает все наборы параметров на логе в пуле процессов.
+    :param log_path: путь к логу акселерометра или IMU (json или бинарный)
+    :param parameters: наборы параметров, см. parameters_grid и parameters_random
+    :param metric: drift - смещение конечной точки от начальной, отнесённое к пройденному пути (для записей,
+    которые начинаются и заканчиваются в одной точке), closure - расстояние до конечной точки опорной траектории,
+    track - СКО отклонения от опорной траектории
+    :param reference: опорная траектория (M, 4) или путь к ней, см. read_reference_track
+    :param calib_time: время от начала записи, по которому строится начальный базис; в интегрировании не участвует
+    :param workers: число процессов, по умолчанию - число ядер
+    :param min_path: для метрики drift - минимальная длина пути, м; у более коротких траекторий оценка inf
+    :return: результаты, упорядоченные по возрастанию оценки
+    """
+    if metric not in METRICS:
+        raise RuntimeError(f"run_parameter_sweep :: unknown metric \"{metric}\", expected one of {METRICS}")
+    if isinstance(reference, str):
+        reference = read_reference_track(reference)
+    if metric != DRIFT_METRIC and reference is None:
+        raise RuntimeError(f"run_parameter_sweep :: metric \"{metric}\" requires reference track")
+    reference = np.zeros((1, 4)) if reference is None else np.asarray(reference, dtype=np.float64)
+
+    log = read_accel_log(log_path)
+    if len(log) == 0:
+        raise RuntimeError(f"run_parameter_sweep :: empty log {log_path}")
+    d_time = np.asarray(log.d_time_values, dtype=np.float64)
+    calib_count = int(np.searchsorted(np.cumsum(d_time), calib_time, side='left'))
+
+    by_k_gravity: Dict[float, List[IMUParameters]] = {}
+    for p in parameters:
+        by_k_gravity.setdefault(p.k_gravity, []).append(p)
+    workers = min(workers if workers else os.cpu_count() or 1, max(len(by_k_gravity), 1))
+
+    block = shared_memory.SharedMemory(create=True, size=d_time.size * _COLUMNS_COUNT * 8)
+    try:
+        columns = np.ndarray((d_time.size, _COLUMNS_COUNT), dtype=np.float64, buffer=block.buf)
+        columns[:, 0] = d_time
+        columns[:, 1:4] = log.accelerations
+        columns[:, 4:7] = log.angles_velocities
+        evaluated = []
+        if workers <= 1:
+            for k_gravity, group in by_k_gravity.items():
+                evaluated.extend(_evaluate(columns, calib_count, k_gravity, group, metric, reference, min_path))
+        else:
+            with ProcessPoolExecutor(workers, initializer=_attach_columns, initargs=(block.name, d_time.size)) as pool:
+                futures = [pool.submit(_evaluate_shared, calib_count, k_gravity, group, metric, reference, min_path)
+                           for k_gravity, group in by_k_gravity.items()]
+                for future in futures:
+                    evaluated.extend(future.result())
+        del columns
+    finally:
+        block.close()
+        block.unlink()
+
+    evaluated.sort(key=lambda item: item[1])
+    return [SweepResult(rank, *item) for rank, item in enumerate(evaluated, 1)]
+
+
+def sweep_results_table(results: Sequence[SweepResult]) -> str:
+    header = f"|{'rank':>5}|{'score':>12}|{'k_gravity':>10}|{'trust_t':>10}|{'accel_thr':>10}|{'omega_thr':>10}|" \
+             f"{'x':>9}|{'y':>9}|{'z':>9}|{'path':>10}|"
+    return "\n".join(itertools.chain((header, '-' * len(header)), (str(r) for r in results)))
+
+
+def write_sweep_results(results: Sequence[SweepResult], results_path: str) -> None:
+    """
+    Записывает упорядоченные результаты в csv.
+    """
+    with open(results_path, 'wt', newline='') as output:
+        writer = csv.writer(output)
+        writer.writerow(("rank", "score", *IMUParameters._fields, "x", "y", "z", "path_length"))
+        for r in results:
+            writer.writerow((r.rank, r.score, *r.parameters, *r.final_position, r.path_length))
+
+
+def _values_list(values: str) -> List[float]:
+    return [float(v) for v in values.split(',')]
+
+
+def main(args: Sequence[str] = None) -> List[SweepResult]:
+    parser = argparse.ArgumentParser(description="IMU integration parameters sweep")
+    parser.add_argument("log", help="accelerometer or IMU log")
+    parser.add_argument("--metric", default=DRIFT_METRIC, choices=METRICS)
+    parser.add_argument("--reference", default=None, help="reference track: t x y z text file or IMU log")
+    parser.add_argument("--samples", type=int, default=0, help="random samples count, grid is used if 0")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--k-gravity", type=_values_list, default=[0.9, 0.95, 0.99])
+    parser.add_argument("--trust-acc-time", type=_values_list, default=[0.05, 0.1, 0.25, 0.5])
+    parser.add_argument("--accel-threshold", type=_values_list, default=[0.05, 0.1, 0.25, 0.5])
+    parser.add_argument("--omega-threshold", type=_values_list, default=[0.0, 0.05, 0.1, 0.25])
+    parser.add_argument("--calib-time", type=float, default=1.0)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--min-path", type=float, default=DRIFT_MIN_PATH,
+                        help="drift metric: shorter integrated paths are ranked last")
+    parser.add_argument("--results", default=None, help="ranked results csv")
+    parser.add_argument("--top", type=int, default=20, help="rows to print")
+    args = parser.parse_args(args)
+    if args.samples > 0:
+        parameters = parameters_random(args.samples, seed=args.seed)
+    else:
+        parameters = parameters_grid(args.k_gravity, args.trust_acc_time, args.accel_threshold, args.omega_threshold)
+    results = run_parameter_sweep(args.log, parameters, args.metric, args.reference, args.calib_time, args.workers,
+                                  args.min_path)
+    if args.results:
+        write_sweep_results(results, args.results)
+    print(sweep_results_table(results[:args.top]))
+    return results
+
+
+if __name__ == "__main__":
+    main()
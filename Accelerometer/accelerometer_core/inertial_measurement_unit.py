@@ -2,7 +2,9 @@ from Utilities.Device.device import Device, START_MODE, BEGIN_MODE_MESSAGE, RUNN
     device_progres_bar
 from .accelerometer_base import AccelerometerBase
 from .accelerometer_bno055 import AccelerometerBNO055
+from .accelerometer_binary_log import AsyncBinaryLogWriter, IMU_LOG_FIELDS, LOG_EXTENSION
 from .accelerometer_settings import load_accelerometer_settings
+from Utilities.Geometry.incremental_regression import IncrementalLinearRegression
 from Utilities.Geometry.vector3 import Vector3
 import datetime as dt
 import os
@@ -73,31 +75,14 @@ WAY_POINTS = "way_points"
 #         return k * x + (self._y_sum - k * self._x_sum) / self._cap
 
 
-class LinearRegressor:
-    def __init__(self):
-        self._x = []
-        self._y = []
-        self._cap = 32
-
-    def __call__(self, x, y):
-        return self.update(x, y)
-
-    def update(self, x, y) -> float:
-        self._x.append(x)
-        self._y.append(y)
-        if len(self._x) < 2:
-            return y
-
-        if len(self._x) == self._cap:
-            del self._x[0]
-            del self._y[0]
+class LinearRegressor(IncrementalLinearRegression):
+    """
+    Значение линейной регрессии по последним 32 отсчётам, суммы обновляются за O(1) на отсчёт.
+    """
+    __slots__ = ()
 
-        sum_x = sum(xi for xi in self._x)
-        sum_y = sum(yi for yi in self._y)
-        sum_xy = sum(xi * yi for xi, yi in zip(self._x, self._y))
-        sum_xx = sum(xi * xi for xi in self._x)
-        k = (sum_xy - sum_x * sum_y / self._cap) / (sum_xx - sum_x * sum_x / self._cap)
-        return k * x + (sum_y - k * sum_x) / self._cap
+    def __init__(self):
+        super().__init__(window=32)
 
 
 # TODO запись актуальных калибровочных данных и поиск логов калибровки при запуске (DONE)
@@ -115,10 +100,14 @@ class IMU(Device):
     6. Может работать единовременно в режиме интегрирования или интегрирования и записи
     """
 
-    def __init__(self):  # , forward: Vector3 = None):
+    def __init__(self, accelerometer: AccelerometerBase = None):  # , forward: Vector3 = None):
+        """
+        :param accelerometer: источник измерений, по умолчанию AccelerometerBNO055
+        (например, AccelerometerSimulator для работы без оборудования)
+        """
         super().__init__()
-        self._accelerometer: AccelerometerBNO055 = AccelerometerBNO055()
-        self._file_handle = None
+        self._accelerometer: AccelerometerBase = AccelerometerBNO055() if accelerometer is None else accelerometer
+        self._file_handle: AsyncBinaryLogWriter = None
         self._file_name = ""
         # время простоя перед запуском
         self._start_time: float = 1.0
@@ -277,7 +266,7 @@ class IMU(Device):
         """
         Угловые скорости
         """
-        return self._accelerometer.omega if self._accelerometer.omega.magnitude() > self.omega_threshold else Vector3()
+        return self._accelerometer.omega if self._accelerometer.omega.magnitude > self.omega_threshold else Vector3(0.0, 0.0, 0.0)
 
     @property
     def angles(self) -> Vector3:
@@ -377,7 +366,7 @@ class IMU(Device):
             return
         if not self.begin_mode(RECORDING_MODE):
             return
-        self._file_name = f"imu_log_({dt.datetime.now().strftime('%H; %M; %S')}).json" \
+        self._file_name = f"imu_log_({dt.datetime.now().strftime('%H; %M; %S')}){LOG_EXTENSION}" \
             if results_save_path is None else results_save_path
 
     def end_record(self) -> None:
@@ -453,7 +442,7 @@ class IMU(Device):
             """
             self.stop_all()
             self._accelerometer.read_request(self.k_gravity)
-            self._accelerometer.build_basis(self._accelerometer.magnetometer.normalized())
+            self._accelerometer.build_basis(self._accelerometer.magnetometer.normalized)
             self._pos = Vector3(0.0, 0.0, 0.0)
             self._vel = Vector3(0.0, 0.0, 0.0)
             self._vel_raw = Vector3(0.0, 0.0, 0.0)
@@ -468,18 +457,17 @@ class IMU(Device):
             return
         delta_t = self.delta_t
         # Оценка времени, когда изменение модуля вектора ускорения меньше acceleration_noize_level
-        accel_delta = self.accelerometer.d_acceleration_linear.magnitude()
-        omega_delta = self.accelerometer.d_omega.magnitude()
+        accelerometer = self._accelerometer
+        accel_delta = Vector3.distance(accelerometer.acceleration_linear, accelerometer.acceleration_linear_prev)
+        omega_delta = Vector3.distance(accelerometer.omega, accelerometer.omega_prev)
         self._acc_check_time = 0.0 if accel_delta > self.accel_threshold else self._acc_check_time + delta_t
         # локальный базис акселерометра
         # basis = self._accelerometer.basis
         # ускорение в локальном базисе акселерометра
         # a = basis.transpose() * self._accelerometer.acceleration_local_space
-        a = self._accelerometer.acceleration_linear
+        a = accelerometer.acceleration_linear
         # интегрирование скорости
-        t = self.mode_active_time(INTEGRATE_MODE)
-
-        self._vel += a * delta_t
+        self._vel.iadd_scaled(a, delta_t)
 
         multiplier = 0.0 if self._acc_check_time > self.trust_acc_time else 1.0
         multiplier *= 0.0 if omega_delta < self.omega_threshold else 1.0
@@ -490,7 +478,7 @@ class IMU(Device):
         #                 self._velosity_z(t, self._vel.z))
         # self._vel = self._vel * 0.98 + 0.01 * v_reg
 
-        self._pos += self.velocity * delta_t
+        self._pos.iadd_scaled(self._vel, delta_t)
         # self.send_log_message(device_progres_bar(t / self._start_time if self.start_time > 0.001 else 1.0, "", 55, '|', '_'))
 
         # p_reg = Vector3(self._position_x(t, self._pos.x),
@@ -572,42 +560,27 @@ class IMU(Device):
     def _record(self, message: int) -> bool:
         if message == BEGIN_MODE_MESSAGE:
             try:
-                self._file_handle = open(self._file_name, 'wt')
+                self._file_handle = AsyncBinaryLogWriter(self._file_name, IMU_LOG_FIELDS, type(self).__name__)
             except IOError as ex:
                 self._file_handle = None
                 self.send_log_message(f"Unable to open accelerometer record file\n{ex.args}")
                 return False
-
-            print(f"{{\n\"record_date\": \"{dt.datetime.now().strftime('%H; %M; %S')}\",\n", file=self._file_handle,
-                  end="")
-            print("\"way_points\" :[\n", file=self._file_handle, end="")
-
             return True
 
         if message == RUNNING_MODE_MESSAGE:
-            print(f"\t{{\n"
-                  f"\t\t\"{DTIME}\"           : {self.delta_t},\n"
-                  f"\t\t\"{TIME}\"            : {self.curr_t},\n"
-                  f"\t\t\"{ACCELERATION}\"    : {self.acceleration},\n"
-                  f"\t\t\"{VELOCITY}\"        : {self.velocity},\n"
-                  f"\t\t\"{POSITION}\"        : {self.position},\n"
-                  f"\t\t\"{ANGLES_VELOCITY}\" : {self.omega},\n"
-                  f"\t\t\"{ANGLES}\"          : {self.angles}\n"
-                  f"\t}},\n", file=self._file_handle, end="")
-
+            self._file_handle.append_imu(self)
             return True
 
         if message == END_MODE_MESSAGE:
             if self._file_handle is None:
                 return False
-            self._file_handle.seek(self._file_handle.tell() - 3, 0)
-            print("\n\t]\n}", file=self._file_handle, end="")
             try:
                 self._file_handle.close()
             except IOError as ex:
                 self.send_log_message(f"Unable to close accelerometer record file\n{ex.args}")
                 return False
+            self.send_log_message(f"Record finished: {self._file_handle.written_count} samples written, "
+                                  f"{self._file_handle.dropped_count} dropped, "
+                                  f"max queue depth {self._file_handle.max_queue_depth}\n")
+            self._file_handle = None
         return False
-
-
-
@@ -0,0 +1,82 @@
+import os
+import tempfile
+import threading
+import numpy as np
+from Accelerometer.accelerometer_core.accelerometer_binary_log import AsyncBinaryLogWriter, ACCEL_LOG_FIELDS, \
+    log_record_dtype, read_binary_log
+
+
+def _records(n: int, offset: int = 0) -> np.ndarray:
+    records = np.zeros(n, dtype=log_record_dtype(ACCEL_LOG_FIELDS))
+    for index, name in enumerate(records.dtype.names):
+        values = np.arange(offset, offset + n) + index * 0.1
+        records[name] = values if records[name].ndim == 1 else values[:, None]
+    return records
+
+
+def _values(record) -> tuple:
+    return tuple(np.concatenate([np.atleast_1d(record[name]) for name in record.dtype.names]).tolist())
+
+
+class _BrokenFile:
+    """
+    Файл, запись в который завершает фоновый поток не файловой ошибкой.
+    """
+    def write(self, data):
+        raise ValueError("broken file")
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def _call_with_timeout(func, timeout: float = 5.0):
+    result = {}
+
+    def run():
+        try:
+            func()
+        except Exception as ex:
+            result['error'] = ex
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    thread.join(timeout)
+    assert not thread.is_alive(), "call did not return"
+    return result.get('error')
+
+
+def test_append_records_through_ring():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "records.imulog")
+        first, second = _records(100), _records(7, 100)
+        with AsyncBinaryLogWriter(path, ACCEL_LOG_FIELDS, ring_records=16, flush_records=4) as writer:
+            writer.append_records(first)
+            writer.append(*_values(second[0]))
+            writer.append_records(second[1:])
+            writer.flush()
+            assert writer.written_count == 107
+            assert writer.records_count == 107
+        _, records = read_binary_log(path)
+        assert np.array_equal(records, np.concatenate((first, second)))
+
+
+def test_flush_reports_dead_writer():
+    with tempfile.TemporaryDirectory() as directory:
+        writer = AsyncBinaryLogWriter(os.path.join(directory, "broken.imulog"), ACCEL_LOG_FIELDS, flush_time=0.01)
+        file, writer._file = writer._file, _BrokenFile()
+        writer.append(*_values(_records(1)[0]))
+        error = _call_with_timeout(writer.flush)
+        assert isinstance(error, RuntimeError) and isinstance(error.__cause__, ValueError)
+        assert isinstance(writer.writer_error, ValueError)
+        assert not writer.append(*_values(_records(1)[0]))
+        error = _call_with_timeout(lambda: writer.append_records(_records(writer.ring_capacity + 1)))
+        assert isinstance(error, RuntimeError)
+        _call_with_timeout(writer.close)
+        file.close()
+
+
+if __name__ == "__main__":
+    test_append_records_through_ring()
+    test_flush_reports_dead_writer()
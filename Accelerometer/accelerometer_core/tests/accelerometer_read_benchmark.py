@@ -0,0 +1,47 @@
+from Accelerometer.accelerometer_core.accelerometer_bno055 import AccelerometerBNO055
+from Accelerometer.accelerometer_core.accelerometer_mpu6050 import Accelerometer, BusDummy
+import timeit
+
+
+def _bench(label: str, function, repeats: int = 5, number: int = 20000) -> float:
+    t = min(timeit.repeat(function, repeat=repeats, number=number)) / number
+    print(f"|{label:40}|{t * 1e6:10.3f} us|")
+    return t
+
+
+def _read_data_i2c_update(device: Accelerometer) -> None:
+    """
+    Прежнее обновление состояния mpu6050: новые Vector3 на каждое чтение.
+    """
+    flag, accel, gyro = device._read_data_i2c()
+    if flag:
+        device._accel_prev = device._accel_curr
+        device._accel_curr = accel
+        device._omega_prev = device._omega_curr
+        device._omega_curr = gyro - device._omega_calib
+
+
+def accelerometer_read_benchmark(number: int = 20000):
+    """
+    Сравнение прежнего разбора ответа (bno055 - чтение и кортеж на каждое поле, _parce_response;
+    mpu6050 - новые Vector3 на каждое чтение) и _device_read_into (один блок регистров, struct.unpack_from,
+    обновление на месте) на BusDummy.
+    """
+    bno = AccelerometerBNO055()
+    bno._device_connection = BusDummy()
+    mpu = Accelerometer()
+    mpu._device_connection = BusDummy()
+    baselines = (("bno055 read request + parce response", bno,
+                  lambda: bno._parce_response(bno._device_read_request()[1])),
+                 ("mpu6050 read data i2c + update", mpu, lambda: _read_data_i2c_update(mpu)))
+    for label, device, baseline in baselines:
+        name = label.split()[0]
+        t_tuple = _bench(label, baseline, number=number)
+        t_into = _bench(f"{name} read into", device._device_read_into, number=number)
+        _bench(f"{name} read_request (with basis update)", device.read_request, number=number // 4)
+        print(f"|{name + ' speed up':40}|{t_tuple / t_into:11.2f}x|")
+        print(f"{name}: acceleration {device.acceleration}, omega {device.omega}")
+
+
+if __name__ == "__main__":
+    accelerometer_read_benchmark()
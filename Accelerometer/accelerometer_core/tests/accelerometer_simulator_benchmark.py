@@ -0,0 +1,51 @@
+from Accelerometer.accelerometer_core.accelerometer_simulator import AccelerometerSimulator, track_from_trajectory, \
+    circle_trajectory
+from Accelerometer.accelerometer_core.accelerometer_binary_log import AsyncBinaryLogWriter, ACCEL_LOG_FIELDS
+import tempfile
+import time
+import os
+
+
+def _run(label: str, device: AccelerometerSimulator, reads: int, writer: AsyncBinaryLogWriter = None) -> None:
+    t = time.perf_counter()
+    success = 0
+    for _ in range(reads):
+        if device.read_request():
+            success += 1
+            if writer is not None:
+                writer.append_accel(device)
+    t = time.perf_counter() - t
+    print(f"|{label:36}|{reads / t:12.1f} reads/sec|{t / reads * 1e6:9.2f} us|"
+          f" ok {success:7}| dropped {device.dropped_count:5}| skipped {device.skipped_count:6}|")
+
+
+def accelerometer_simulator_benchmark(rate: float = 1000.0, reads: int = 20000, real_time_duration: float = 2.0):
+    """
+    Нагрузочный тест чтения, фильтров и записи лога на симуляторе без оборудования.
+    """
+    track = track_from_trajectory(*circle_trajectory(radius=2.0, period=8.0), duration=30.0, rate=rate)
+    options = dict(rate=rate, real_time=False, accel_noise=0.05, omega_noise=0.01, accel_bias_drift=0.01,
+                   omega_bias_drift=0.001, drop_rate=0.01, seed=0)
+
+    _run("read_request", AccelerometerSimulator(track, **options), reads)
+
+    device = AccelerometerSimulator(track, **options)
+    device.use_filtering = True
+    _run("read_request + filters", device, reads)
+
+    with tempfile.TemporaryDirectory() as directory:
+        device = AccelerometerSimulator(track, **options)
+        with AsyncBinaryLogWriter(os.path.join(directory, "simulated.imulog"), ACCEL_LOG_FIELDS,
+                                  "AccelerometerSimulator") as writer:
+            _run("read_request + async recorder", device, reads, writer)
+        print(f"recorder: written {writer.written_count}, dropped {writer.dropped_count}, "
+              f"max queue depth {writer.max_queue_depth}")
+
+    options.update(real_time=True, latency=2e-4, latency_jitter=5e-5)
+    device = AccelerometerSimulator(track, **options)
+    _run(f"real time {rate:.0f} Hz, 0.2 ms latency", device, int(rate * real_time_duration))
+    print(f"simulated time {device.sample_time:.3f} sec, accel bias {device.accel_bias}")
+
+
+if __name__ == "__main__":
+    accelerometer_simulator_benchmark()
@@ -0,0 +1,146 @@
+from Accelerometer.accelerometer_core.accelerometer_simulator import AccelerometerSimulator, track_from_trajectory, \
+    circle_trajectory
+from Accelerometer.accelerometer_core.accelerometer_binary_log import BinaryLogWriter, ACCEL_LOG_FIELDS
+from Accelerometer.accelerometer_core.accelerometer_integrator import AccelIntegrator, INTEGRATE_MODE
+from Utilities.Geometry import Vector3, Matrix3, Matrix4, Quaternion
+from typing import Callable
+import tempfile
+import time
+import os
+
+_GEOMETRY_TYPES = (Vector3, Matrix3, Matrix4, Quaternion)
+
+
+class _AllocationsCounter:
+    """
+    Считает созданные за время работы объекты Vector3, Matrix3, Matrix4 и Quaternion.
+    """
+    def __init__(self):
+        self.count = 0
+        self._inits = {}
+
+    def __enter__(self):
+        for cls in _GEOMETRY_TYPES:
+            init = cls.__init__
+            self._inits[cls] = init
+
+            def counted_init(obj, *args, _init=init):
+                self.count += 1
+                _init(obj, *args)
+            cls.__init__ = counted_init
+        return self
+
+    def __exit__(self, *args):
+        for cls, init in self._inits.items():
+            cls.__init__ = init
+
+
+def _build_basis_reference(device: AccelerometerSimulator, k_filter_arg: float = 0.01) -> Matrix3:
+    basis = device.basis
+    y_axis = (basis.up + Vector3.cross(device.omega, basis.up) * device.delta_t).normalized
+    z_axis = (basis.front + Vector3.cross(device.omega, basis.front) * device.delta_t).normalized
+    z_axis = (z_axis * (1.0 - k_filter_arg) + k_filter_arg * device.acceleration.normalized).normalized
+    x_axis = Vector3.cross(z_axis, y_axis).normalized
+    y_axis = Vector3.cross(x_axis, z_axis).normalized
+    return Matrix3(x_axis.x, y_axis.x, z_axis.x, x_axis.y, y_axis.y, z_axis.y, x_axis.z, y_axis.z, z_axis.z)
+
+
+def _imu_step_reference(device: AccelerometerSimulator, state: list) -> None:
+    vel, pos = state
+    accel_delta = device.d_acceleration_linear.magnitude
+    omega_delta = device.d_omega.magnitude
+    vel += device.acceleration_linear * device.delta_t
+    vel *= 1.0 if accel_delta >= 0.0 and omega_delta >= 0.0 else 0.0
+    pos += vel * device.delta_t
+
+
+def _imu_step(device: AccelerometerSimulator, state: list) -> None:
+    vel, pos = state
+    accel_delta = Vector3.distance(device.acceleration_linear, device.acceleration_linear_prev)
+    omega_delta = Vector3.distance(device.omega, device.omega_prev)
+    vel.iadd_scaled(device.acceleration_linear, device.delta_t)
+    vel *= 1.0 if accel_delta >= 0.0 and omega_delta >= 0.0 else 0.0
+    pos.iadd_scaled(vel, device.delta_t)
+
+
+def _integrate_reference(self: AccelIntegrator, point) -> bool:
+    if self._mode != INTEGRATE_MODE:
+        return False
+    dt = point.dtime
+    omega = point.angles_velocity
+    basis = self._accel_basis[-1]
+    self._omegas.append(omega)
+    kkk = 0.999
+    u = (basis.up + kkk * Vector3.cross(omega, basis.up) * dt).normalized
+    u = (u * (1.0 - self._accel_k) + self._accel_k * self._curr_accel.normalized).normalized
+    f = (basis.front + kkk * Vector3.cross(omega, basis.front) * dt)
+    r = Vector3.cross(f, u).normalized
+    f = Vector3.cross(u, r).normalized
+    c = self._calib_accel
+    a = Vector3(self._curr_accel.x - (r.x * c.x + u.x * c.y + f.x * c.z),
+                self._curr_accel.y - (r.y * c.x + u.y * c.y + f.y * c.z),
+                self._curr_accel.z - (r.z * c.x + u.z * c.y + f.z * c.z))
+    if (self._curr_accel - self._prev_accel).magnitude < self._accel_bias:
+        self._time += dt
+    else:
+        self._time = 0
+    self._accel_basis.append(Matrix4.build_transform(r, u, f, a))
+    v = 0.50 * Vector3(0.0, 0.0, 1.0) if self._time <= self._trust_t else Vector3(0.0, 0.0, 0.0)
+    self._angles.append(self._angles[-1] + (point.angles_velocity - self._calib_omega) * dt)
+    self._velocities.append(v)
+    self._positions.append(self._positions[-1] + (r * v.x + u * v.y + f * v.z) * dt)
+    self._time_values.append(self._time_values[-1] + dt)
+    return True
+
+
+def _report(label: str, samples: int, run: Callable[[], None]) -> None:
+    t = time.perf_counter()
+    run()
+    t = time.perf_counter() - t
+    with _AllocationsCounter() as counter:
+        run()
+    print(f"|{label:36}|{counter.count / samples:8.2f} allocs/sample|{t / samples * 1e6:9.2f} us/sample|")
+
+
+def geometry_inplace_benchmark(samples: int = 20000):
+    """
+    Число временных объектов геометрии и время на одно измерение в циклах интегрирования
+    до (выражения с операторами) и после перевода на операции на месте.
+    """
+    track = track_from_trajectory(*circle_trajectory(radius=2.0, period=8.0), duration=30.0, rate=1000.0)
+    device = AccelerometerSimulator(track, rate=1000.0, real_time=False, accel_noise=0.05, omega_noise=0.01, seed=0)
+    device.read_request()
+    device.read_request()
+
+    state = [Vector3(0.0, 0.0, 0.0), Vector3(0.0, 0.0, 0.0)]
+    _report("IMU velocity/position step, operators", samples,
+            lambda: [_imu_step_reference(device, state) for _ in range(samples)])
+    _report("IMU velocity/position step, in place", samples,
+            lambda: [_imu_step(device, state) for _ in range(samples)])
+
+    reference = _build_basis_reference(device)
+    device._build_basis()
+    error = max(abs(a - b) for a, b in zip(reference, device.basis))
+    print(f"build basis: max difference with operators version {error:.3e}")
+    _report("build basis, operators", samples, lambda: [_build_basis_reference(device) for _ in range(samples)])
+    _report("build basis, in place", samples, lambda: [device._build_basis() for _ in range(samples)])
+
+    with tempfile.TemporaryDirectory() as directory:
+        log_path = os.path.join(directory, "simulated.imulog")
+        device = AccelerometerSimulator(track, rate=1000.0, real_time=False, accel_noise=0.05, omega_noise=0.01,
+                                        seed=0)
+        with BinaryLogWriter(log_path, ACCEL_LOG_FIELDS, "AccelerometerSimulator") as writer:
+            for _ in range(samples):
+                if device.read_request():
+                    writer.append_accel(device)
+        integrate = AccelIntegrator._integrate
+        AccelIntegrator._integrate = _integrate_reference
+        try:
+            _report("AccelIntegrator.integrate, operators", samples, lambda: AccelIntegrator(log_path).integrate())
+        finally:
+            AccelIntegrator._integrate = integrate
+        _report("AccelIntegrator.integrate, in place", samples, lambda: AccelIntegrator(log_path).integrate())
+
+
+if __name__ == "__main__":
+    geometry_inplace_benchmark()
@@ -0,0 +1,38 @@
+import os
+import math
+import tempfile
+from Accelerometer.accelerometer_core.accelerometer_binary_log import BinaryLogWriter, ACCEL_LOG_FIELDS
+from Accelerometer.accelerometer_core.accelerometer_constants import GRAVITY_CONSTANT
+from Accelerometer.accelerometer_core.imu_parameter_sweep import DRIFT_METRIC, parameters_grid, run_parameter_sweep
+
+
+def _write_back_and_forth_log(path: str, d_t: float = 0.01) -> None:
+    """
+    Покой 1 с, движение вдоль x вперёд и обратно за 4 с, покой 1 с.
+    """
+    with BinaryLogWriter(path, ACCEL_LOG_FIELDS) as writer:
+        t = 0.0
+        for _ in range(int(round(6.0 / d_t))):
+            phase = t - 1.0
+            a_x = math.sin(math.pi * phase) if 0.0 <= phase < 2.0 else \
+                -math.sin(math.pi * (phase - 2.0)) if 2.0 <= phase < 4.0 else 0.0
+            writer.append(t, d_t, a_x, 0.0, GRAVITY_CONSTANT, 0.0, 0.0, 0.0)
+            t += d_t
+
+
+def test_drift_zero_motion_does_not_win():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "back_and_forth.imulog")
+        _write_back_and_forth_log(path)
+        # omega_threshold = 10 останавливает интегрирование на всём логе - положение не меняется
+        parameters = parameters_grid(k_gravity=(0.0,), trust_acc_time=(1.0,), accel_threshold=(0.0,),
+                                     omega_threshold=(0.0, 10.0))
+        results = run_parameter_sweep(path, parameters, DRIFT_METRIC, workers=1)
+        best, still = results
+        assert best.parameters.omega_threshold == 0.0
+        assert best.path_length > 1.0 and math.isfinite(best.score)
+        assert still.path_length == 0.0 and still.score == math.inf
+
+
+if __name__ == "__main__":
+    test_drift_zero_motion_does_not_win()
@@ -1,3 +1,4 @@
+from Utilities.CV.frame_features import FrameFeatureStore, match_points
 import numpy as np
 import cv2
 
@@ -11,7 +12,9 @@ class SLAM:
         FLANN_INDEX_LSH = 6
         index_params = {"algorithm": FLANN_INDEX_LSH, "table_number": 6, "key_size": 12, "multi_probe_level": 1}
         search_params = {"checks": 50}
-        self.flann = cv2.FlannBasedMatcher(indexParams=index_params, searchParams=search_params)
+        # кадр детектируется один раз: как curr в паре (prev, curr) и как prev в следующей паре
+        self._features = FrameFeatureStore(
+            self.orb, lambda: cv2.FlannBasedMatcher(indexParams=index_params, searchParams=search_params), 3)
         self._curr_frame = None
         self._prev_frame = None
         self._transform_m = np.eye(4, dtype=np.float32)
@@ -26,17 +29,17 @@ class SLAM:
             self._curr_frame = frame
             return None
         # Find the keypoints and descriptors with ORB
-        kp1, des1 = self.orb.detectAndCompute(self._prev_frame, None)
-        kp2, des2 = self.orb.detectAndCompute(self._curr_frame, None)
-        if len(kp1) < 5:
+        features_1 = self._features.features(self._prev_frame)
+        features_2 = self._features.features(self._curr_frame)
+        if len(features_1) < 5:
             return None
-        if len(kp2) < 5:
+        if len(features_2) < 5:
             return None
 
         self._prev_frame = self._curr_frame
         self._curr_frame = frame
         # Find matches
-        matches = self.flann.knnMatch(des1, des2, k=2)
+        matches = self._features.knn_match(features_1, features_2, k=2)
 
         # Find the matches there do not have a to high distance
         good = []
@@ -47,9 +50,7 @@ class SLAM:
         except ValueError:
             pass
         # Get the image points form the good matches
-        q1 = np.float32([kp1[m.queryIdx].pt for m in good])
-        q2 = np.float32([kp2[m.trainIdx].pt for m in good])
-        return q1, q2
+        return match_points(features_1, features_2, good)
 
     def _decompose_essential_mat(self, e_mat, q1, q2):
         def sum_z_cal_relative_scale(r_m, t_m):
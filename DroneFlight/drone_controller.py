@@ -1,11 +1,17 @@
-from Utilities.flight_odometer import FlightOdometer
+from Utilities.CV import CameraHandle, FlightOdometer, FrameFeatures
+from Utilities.Common import Pipeline, Timer
 from Utilities.Geometry import Quaternion
-from Utilities.CV import CameraHandle
 from Mavlink import DroneConnection
+from typing import Tuple, Union
 from threading import Thread
-from Utilities import Timer
-from typing import Union
-import asyncio
+import numpy as np
+import time
+import cv2
+
+# кадр конвейера: изображение, ориентация и высота на момент захвата
+_Frame = Tuple[np.ndarray, Quaternion, float]
+# кадр после стадии features: к кадру добавлены его особые точки
+_FeaturesFrame = Tuple[np.ndarray, Quaternion, float, FrameFeatures]
 
 
 class DroneController:
@@ -22,6 +28,13 @@ class DroneController:
         self._drone_connection: DroneConnection = DroneConnection()
         self._update_time = 1.0
         self._timer: Timer = Timer()  # как часто будем запускать алгоритм
+        self._capture_time = 0.0
+        self._downscale = 1.0
+        # захват -> предобработка -> особые точки -> положение, каждая стадия в своём потоке,
+        # в очередях между стадиями хранится только последний кадр
+        self._pipeline: Pipeline = Pipeline(self._capture, (("preprocess", self._preprocess),
+                                                            ("features", self._features),
+                                                            ("pose", self._pose)), queue_size=1)
 
     @property
     def odometer(self) -> FlightOdometer:
@@ -35,13 +48,62 @@ class DroneController:
     def camera(self) -> CameraHandle:
         return self._camera
 
+    @property
+    def pipeline(self) -> Pipeline:
+        """
+        Счётчики стадий: print(controller.pipeline).
+        """
+        return self._pipeline
+
+    @property
+    def downscale(self) -> float:
+        """
+        Масштаб кадра перед поиском особых точек (1.0 - без изменения).
+        """
+        return self._downscale
+
+    @downscale.setter
+    def downscale(self, value: float) -> None:
+        assert isinstance(value, float)
+        self._downscale = min(max(value, 0.05), 1.0)
+
+    def _capture(self) -> Union[_Frame, None]:
+        # не чаще, чем раз в update_time
+        time.sleep(max(0.0, self.update_time - (time.perf_counter() - self._capture_time)))
+        self._capture_time = time.perf_counter()
+        with self._timer:
+            if not self._camera.read_frame():
+                print("camera frame reading error...")
+                return None
+            # телеметрия запрашивается в момент захвата, чтобы соответствовать кадру
+            return (self._camera.curr_frame,
+                    Quaternion(*self._drone_connection.get_quaternion()),
+                    self._drone_connection.get_altitude_mono())
+
+    def _preprocess(self, frame: _Frame) -> _Frame:
+        image, rotation, altitude = frame
+        image = self._camera.undistort(image)
+        if self._downscale < 1.0:
+            image = cv2.resize(image, None, fx=self._downscale, fy=self._downscale, interpolation=cv2.INTER_AREA)
+        return image, rotation, altitude
+
+    def _features(self, frame: _Frame) -> _FeaturesFrame:
+        # особые точки передаются дальше вместе с кадром, стадия pose детектор не вызывает,
+        # особые точки предыдущего кадра хранит FlightOdometer
+        return (*frame, self._odometer.image_matcher.detect_features(frame[0]))
+
+    def _pose(self, frame: _FeaturesFrame) -> _FeaturesFrame:
+        self._odometer.compute(*frame)
+        return frame
+
     def _update(self):
-        if self._camera.read_frame():
-            print("camera frame reading error...")
+        """
+        Последовательное выполнение всех стадий для одного кадра (без конвейера).
+        """
+        frame = self._capture()
+        if frame is None:
             return
-        self._odometer.compute(self._camera.camera_cv.undistorted_frame,
-                               Quaternion(*self._drone_connection.get_quaternion()),
-                               self._drone_connection.get_altitude_mono())
+        self._pose(self._features(self._preprocess(frame)))
         # вектор положения дрона, рассчитанный на основе одометрии
         # position = self._odometer.position  # {x-coordinate; y-coordinate; z-altitude}
         # position_gps = GPSLocation(position)  # какой-нибудь способ по переводу из координат на плоскости в GPS
@@ -67,16 +129,14 @@ class DroneController:
         assert isinstance(value, float)
         self._update_time = max(value, 0.0)
 
-    async def _main_loop(self):
-        # _main_loop ВЫПОЛНЯЕТСЯ БЕСКОНЕЧНО !!!
+    def run(self):
+        # КОНВЕЙЕР ВЫПОЛНЯЕТСЯ ДО ВЫЗОВА stop !!!
         # ДЛЯ ОГРАНИЧЕНИЯ ВРЕМЕНИ ВЫПОЛНЕНИЯ НЕОБХОДИМО ОТСЛЕЖИВАТЬ СТАТУС ПОДКЛЮЧЕНИЯ К PIXHAWK
-        while True:
-            with self._timer:
-                self._update()
-            await asyncio.sleep(max(0.0, self.update_time - self._timer.inner_time))
+        self._pipeline.start()
+        self._pipeline.wait()
 
-    def run(self):
-        asyncio.run(self._main_loop())
+    def stop(self):
+        self._pipeline.stop()
 
     def run_in_separated_thread(self) -> Thread:
         _thread = Thread(target=self.run, daemon=True)
@@ -1,4 +1,4 @@
-from Utilities.Geometry import Vector3, BoundingBox, Transform3d
+from Utilities.Geometry import Vector3, BoundingBox, Transform3d, Vector3Array, Matrix4Array
 from Utilities.Geometry import Vector2
 from typing import Tuple, List, Union
 from Utilities.Geometry import Voxel
@@ -233,11 +233,14 @@ class TrisMeshGL:
         self._faces.clear()
 
     def transform_mesh(self, transform: Transform3d = None) -> None:
-        for i in range(len(self._vertices)):
-            self._vertices[i] = transform.transform_vect(self._vertices[i], 1.0)
-
-        for i in range(len(self._normals)):
-            self._normals[i] = transform.transform_vect(self._normals[i], 0.0).normalize()
+        matrix = transform.transform_matrix
+        if len(self._vertices) != 0:
+            vertices = Matrix4Array.transform_points(matrix, Vector3Array.from_vectors(self._vertices))
+            self._vertices[:] = vertices.to_vectors()
+
+        if len(self._normals) != 0:
+            normals = Matrix4Array.transform_directions(matrix, Vector3Array.from_vectors(self._normals))
+            self._normals[:] = normals.normalize().to_vectors()
 
     def merge(self, other):
         v_offset  = self.vertices_count
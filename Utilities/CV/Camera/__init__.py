@@ -1,7 +1,7 @@
 from .camera_calibration import undistort_image, compute_camera_calibration_data
 from .camera_calibration import load_camera_calib_args, load_camera_calib_info
 from .camera_calibration import save_camera_calib_args, save_camera_calib_info
-from .camera_calibration import CameraCalibrationArgs, CameraCalibrationInfo
+from .camera_calibration import CameraCalibrationArgs, CameraCalibrationInfo, UndistortionMaps
 from .camera_constants import *
 
 from .camera import Camera
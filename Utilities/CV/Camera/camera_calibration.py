@@ -257,6 +257,96 @@ def undistort_image(image: np.ndarray, camera_calibration_info: CameraCalibratio
     return undistorted_image
 
 
+class UndistortionMaps:
+    """
+    Таблицы remap для компенсации дисторсии кадров размера width x height.
+    Строятся один раз через cv2.initUndistortRectifyMap (в формате с фиксированной точкой CV_16SC2, как
+    внутри cv2.undistort), далее каждый кадр - один cv2.remap. Результат совпадает с undistort_image:
+    матрица камеры из cv2.getOptimalNewCameraMatrix(alpha=1), обрезка по roi заложена в сами таблицы.
+    """
+    __slots__ = ('_camera_matrix', '_distortion', '_size', '_roi', '_map_1', '_map_2', '_output')
+
+    def __init__(self, camera_calibration_info: CameraCalibrationInfo, width: int, height: int,
+                 fixed_point: bool = True):
+        self._camera_matrix = np.array(camera_calibration_info.camera_matrix, dtype=float)
+        self._distortion = np.array(camera_calibration_info.distortion_coefficients, dtype=float)
+        self._size = (int(width), int(height))
+        new_camera_matrix, roi = cv2.getOptimalNewCameraMatrix(self._camera_matrix, self._distortion,
+                                                               self._size, 1, self._size)
+        x, y, w, h = roi
+        self._roi = (int(x), int(y), int(w), int(h))
+        # сдвиг главной точки на начало roi: таблицы сразу строят обрезанный кадр
+        new_camera_matrix = np.array(new_camera_matrix, dtype=float)
+        new_camera_matrix[0, 2] -= x
+        new_camera_matrix[1, 2] -= y
+        self._map_1, self._map_2 = cv2.initUndistortRectifyMap(self._camera_matrix, self._distortion, None,
+                                                               new_camera_matrix, (w, h),
+                                                               cv2.CV_16SC2 if fixed_point else cv2.CV_32FC1)
+        self._output: Union[np.ndarray, None] = None
+
+    @classmethod
+    def load(cls, file_path: str) -> Union['UndistortionMaps', None]:
+        """
+        :return: None, если файла нет или его не удалось прочитать (сообщение выводит вызывающий).
+        """
+        if not os.path.isfile(file_path):
+            return None
+        try:
+            with np.load(file_path) as data:
+                maps = cls.__new__(cls)
+                maps._camera_matrix = data['camera_matrix']
+                maps._distortion = data['distortion']
+                maps._size = tuple(int(v) for v in data['size'])
+                maps._roi = tuple(int(v) for v in data['roi'])
+                maps._map_1 = data['map_1']
+                maps._map_2 = data['map_2']
+                maps._output = None
+                return maps
+        except (OSError, KeyError, ValueError):
+            return None
+
+    def save(self, file_path: str) -> None:
+        np.savez(file_path, camera_matrix=self._camera_matrix, distortion=self._distortion,
+                 size=np.array(self._size), roi=np.array(self._roi), map_1=self._map_1, map_2=self._map_2)
+
+    @property
+    def size(self) -> tuple:
+        """
+        Размер исходного кадра (width, height).
+        """
+        return self._size
+
+    @property
+    def roi(self) -> tuple:
+        """
+        Область исходного кадра (x, y, width, height), размер результата - (width, height).
+        """
+        return self._roi
+
+    def matches(self, camera_calibration_info: CameraCalibrationInfo, width: int, height: int) -> bool:
+        """
+        Построены ли таблицы для этих параметров калибровки и размера кадра.
+        """
+        return self._size == (width, height) and \
+            np.array_equal(self._camera_matrix, camera_calibration_info.camera_matrix) and \
+            np.array_equal(self._distortion.ravel(), np.asarray(camera_calibration_info.distortion_coefficients).ravel())
+
+    def undistort(self, image: np.ndarray, out: Union[np.ndarray, None] = None) -> np.ndarray:
+        """
+        :param out: буфер результата; None - новый массив на каждый вызов.
+        """
+        return cv2.remap(image, self._map_1, self._map_2, cv2.INTER_LINEAR, dst=out)
+
+    def undistort_into_buffer(self, image: np.ndarray) -> np.ndarray:
+        """
+        Результат во внутреннем буфере, который переиспользуется следующим вызовом.
+        """
+        shape = (self._roi[3], self._roi[2]) + image.shape[2:]
+        if self._output is None or self._output.shape != shape or self._output.dtype != image.dtype:
+            self._output = np.empty(shape, dtype=image.dtype)
+        return cv2.remap(image, self._map_1, self._map_2, cv2.INTER_LINEAR, dst=self._output)
+
+
 # if __name__ == "__main__":
 #     calib_args = CameraCalibrationArgs(ches_board_size=(6, 9))
 #     # save_camera_calib_args('calibration_args.json', calib_args)
@@ -1,5 +1,5 @@
-from .camera_calibration import load_camera_calib_info, undistort_image, save_camera_calib_info
-from .camera_calibration import CameraCalibrationInfo
+from .camera_calibration import load_camera_calib_info, save_camera_calib_info
+from .camera_calibration import CameraCalibrationInfo, UndistortionMaps
 from typing import Union, TextIO
 from . import camera_constants
 import numpy as np
@@ -18,6 +18,9 @@ class CameraHandle:
         self._log_stream = sys.stdout  # console print default stream
         self._enable_logging: bool = True
         self._calib_params: Union[CameraCalibrationInfo, None] = None
+        # таблицы компенсации дисторсии, перестраиваются при смене калибровки или размера кадра
+        self._undistortion_maps: Union[UndistortionMaps, None] = None
+        self._undistortion_maps_path: Union[str, None] = None
         if not any(isinstance(port, t_type) for t_type in (int, str)):
             self.make_log_message(f"CV camera arg type {type(port)} is unsupported\n default port = 0 assigned\n")
             port = 0
@@ -123,17 +126,31 @@ class CameraHandle:
 
     @calib_params.setter
     def calib_params(self, params: CameraCalibrationInfo) -> None:
-        if isinstance(params, bool):
+        if isinstance(params, CameraCalibrationInfo):
             self._calib_params = params
+            self._undistortion_maps = None
+            self._undistortion_maps_path = None
+            self._undistorted_rebuild = True
 
-    def load_calib_params(self, file_path: str) -> bool:
+    def load_calib_params(self, file_path: str, persist_maps: bool = False) -> bool:
+        """
+        :param persist_maps: хранить таблицы компенсации дисторсии рядом с файлом калибровки
+         (<file_path без расширения>_undistort_maps.npz) и загружать их оттуда при следующем запуске.
+        """
         if not isinstance(file_path, str):
             self.make_log_message(f"Unable to load camera calibration params. File path {file_path} is not string...")
             return False
         if not os.path.exists(file_path):
             self.make_log_message(f"Unable to load camera calibration params. File path {file_path} does not exist...")
             return False
-        self._calib_params = load_camera_calib_info(file_path)
+        calib_params = load_camera_calib_info(file_path)
+        if not isinstance(calib_params, CameraCalibrationInfo):
+            self.make_log_message(f"Unable to load camera calibration params. File {file_path} "
+                                  f"does not contain calibration info...")
+            return False
+        self.calib_params = calib_params
+        if persist_maps:
+            self._undistortion_maps_path = f"{os.path.splitext(file_path)[0]}_undistort_maps.npz"
         return True
 
     def save_calib_params(self, file_path: str) -> bool:
@@ -168,6 +185,7 @@ class CameraHandle:
     @width.setter
     def width(self, w: int) -> None:
         if self.camera_cv.set(camera_constants.CAP_PROP_FRAME_WIDTH, w):
+            self._undistortion_maps = None
             return
         self.make_log_message(f"incorrect devices width {w}\n")
 
@@ -178,6 +196,7 @@ class CameraHandle:
     @height.setter
     def height(self, h: int) -> None:
         if self.camera_cv.set(camera_constants.CAP_PROP_FRAME_HEIGHT, h):
+            self._undistortion_maps = None
             return
         self.make_log_message(f"incorrect devices height {h}\n")
 
@@ -264,11 +283,42 @@ class CameraHandle:
         self._curr_frame = cam_frame
         return True
 
+    def _maps(self, width: int, height: int) -> UndistortionMaps:
+        maps = self._undistortion_maps
+        if maps is not None and maps.size == (width, height):
+            return maps
+        path = self._undistortion_maps_path
+        maps = UndistortionMaps.load(path) if path is not None else None
+        if maps is None and path is not None and os.path.isfile(path):
+            self.make_log_message(f"Unable to load undistortion maps from {path}, maps will be rebuilt\n")
+        if maps is None or not maps.matches(self._calib_params, width, height):
+            maps = UndistortionMaps(self._calib_params, width, height)
+            if path is not None:
+                try:
+                    maps.save(path)
+                except OSError as ex:
+                    self.make_log_message(f"Unable to save undistortion maps to {path}: {ex}\n")
+        self._undistortion_maps = maps
+        return maps
+
+    def undistort(self, image: np.ndarray) -> np.ndarray:
+        """
+        Компенсация дисторсии произвольного кадра камеры, результат - новый массив.
+        """
+        if self._calib_params is None:
+            return image
+        return self._maps(image.shape[1], image.shape[0]).undistort(image)
+
     @property
     def undistorted_frame(self) -> np.ndarray:
+        """
+        Текущий кадр без дисторсии. Буфер результата переиспользуется следующим кадром,
+        чтобы сохранить кадр дольше, нужна копия (или undistort(curr_frame)).
+        """
         if self._calib_params is None:
             return self.curr_frame
         if self._undistorted_rebuild:
-            self._undistorted_frame = undistort_image(self.curr_frame, self._calib_params)
+            frame = self.curr_frame
+            self._undistorted_frame = self._maps(frame.shape[1], frame.shape[0]).undistort_into_buffer(frame)
             self._undistorted_rebuild = False
         return self._undistorted_frame
@@ -1,8 +1,31 @@
-from .Camera import undistort_image, compute_camera_calibration_data
-from .Camera import load_camera_calib_args, load_camera_calib_info
-from .Camera import save_camera_calib_info, save_camera_calib_args
-from .Camera import CameraIU, CameraHandle, Camera
-from .Camera.CameraActions import CameraAction
-from .Camera import camera_constants
-from .flight_odometer import FlightOdometer
-from .image_matcher import ImageMatcher
+import importlib as _importlib
+
+# имена, загружаемые при первом обращении (подпакет Camera тянет PyQt5, image_matcher - matplotlib),
+# поэтому Utilities.CV.kitti и Utilities.CV.frame_features импортируются без них: модуль -> имена
+_LAZY_MODULES = {
+    ".Camera": ("undistort_image", "compute_camera_calibration_data", "load_camera_calib_args",
+                "load_camera_calib_info", "save_camera_calib_info", "save_camera_calib_args",
+                "CameraIU", "CameraHandle", "Camera", "camera_constants"),
+    ".Camera.CameraActions": ("CameraAction",),
+    ".flight_odometer": ("FlightOdometer",),
+    ".image_matcher": ("ImageMatcher",),
+    ".frame_features": ("FrameFeatures", "FrameFeatureStore"),
+}
+
+_LAZY_ATTRIBUTES = {name: module for module, names in _LAZY_MODULES.items() for name in names}
+
+
+def __getattr__(name: str):
+    if name not in _LAZY_ATTRIBUTES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    module_name = _LAZY_ATTRIBUTES[name]
+    module = _importlib.import_module(module_name, __name__)
+    # импорт подпакета Camera записывает в атрибут Camera сам подпакет, поэтому связываются все имена модуля:
+    # Utilities.CV.Camera - класс камеры, как при прежнем явном импорте
+    for module_attribute in _LAZY_MODULES[module_name]:
+        globals()[module_attribute] = getattr(module, module_attribute)
+    return globals()[name]
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_ATTRIBUTES))
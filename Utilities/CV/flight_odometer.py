@@ -1,5 +1,6 @@
 from Utilities.Geometry import Camera, Matrix3, Vector3, Plane, Vector2, Matrix4, Quaternion, Ray
 from .image_matcher import ImageMatcher
+from .frame_features import FrameFeatures
 from Utilities.Common import Timer
 from typing import Tuple, Union
 import numpy as np
@@ -11,13 +12,8 @@ class FlightOdometer:
     def _camera_frustum_ground_border(camera: Camera, ground_level: float = 0.0) -> Tuple[Vector2, ...]:
         p = Plane(origin=Vector3(0, -ground_level, 0), normal=Vector3(0, 0, 1))
         # {1.0, 1.0} | {1.0, -1.0} | {-1.0, -1.0} | {-1.0, 1.0}
-        points = (p.intersect_by_ray(camera.emit_ray( 1.0,  1.0)).end_point,
-                  p.intersect_by_ray(camera.emit_ray( 1.0, -1.0)).end_point,
-                  p.intersect_by_ray(camera.emit_ray(-1.0, -1.0)).end_point,
-                  p.intersect_by_ray(camera.emit_ray(-1.0,  1.0)).end_point)
-        # [print(p) for p in points]
-        # print('=======================================')
-        return tuple(Vector2(p.x, p.y) for p in points)
+        points = camera.cast_rays(np.array([1.0, 1.0, -1.0, -1.0]), np.array([1.0, -1.0, -1.0, 1.0]), p)
+        return tuple(Vector2(float(x), float(y)) for x, y in points.to_np_array()[:, :2])
 
     def __repr__(self):
         return f"  {{\n" \
@@ -53,6 +49,9 @@ class FlightOdometer:
         self._curr_frame: Union[np.ndarray, None] = None
         # previous camera frame
         self._prev_frame: Union[np.ndarray, None] = None
+        # особые точки текущего и предыдущего кадров, предыдущий кадр повторно не обрабатывается детектором
+        self._curr_features: Union[FrameFeatures, None] = None
+        self._prev_features: Union[FrameFeatures, None] = None
         # ground level transform
         self._curr_gt_transform: Matrix3 = Matrix3.identity()
         self._prev_gt_transform: Matrix3 = Matrix3.identity()
@@ -109,32 +108,38 @@ class FlightOdometer:
         self._prev_acceleration = self.acceleration
         self._curr_acceleration = (self.velocity - self.prev_velocity ) * delta_time
 
-    def _compute(self, image: np.ndarray, rotation: Quaternion, altitude: float) -> None:
+    def _compute(self, image: np.ndarray, rotation: Quaternion, altitude: float,
+                 features: Union[FrameFeatures, None]) -> None:
         image_w, image_h = image.shape[1], image.shape[0]
         self._update_camera_transform_transforms(rotation, altitude, image_w, image_h)
         self._prev_frame = self._curr_frame
         self._curr_frame = image
+        self._prev_features = self._curr_features
+        self._curr_features = self._image_matcher.detect_features(image) if features is None else features
         if self._prev_frame is None:
             return
-        if self._image_matcher.match_images(self._prev_frame,
-                                            self._curr_frame,
-                                            self._prev_proj_mat,
-                                            self._curr_proj_mat):
+        if self._image_matcher.match_features(self._prev_features,
+                                              self._curr_features,
+                                              self._prev_proj_mat,
+                                              self._curr_proj_mat):
             self._build_transforms()
         else:
             # extrapolate values
             ...
 
-    def compute(self, image: np.ndarray, rotation: Quaternion, altitude: float) -> None:
+    def compute(self, image: np.ndarray, rotation: Quaternion, altitude: float,
+                features: FrameFeatures = None) -> None:
         """
         Основной метод, который вызывается для расчёта одометрии
         :param image: изображение, полученное с камеры (np.ndarray)
          должно быть полутоновым (cv2.imread(image_1_src, cv2.IMREAD_GRAYSCALE))
         :param rotation: кватернион системы координат акселерометра
         :param altitude: текущая высота полёта
+        :param features: особые точки image (image_matcher.detect_features), если найдены заранее,
+         например отдельной стадией конвейера; None - детектор вызывается здесь
         """
         with self._timer:
-            self._compute(image, rotation, altitude)
+            self._compute(image, rotation, altitude, features)
             if self._logging:
                 print(f'{self._separator}{repr(self)}', file=self._file_handle, end='')
                 self._separator = ',\n'
@@ -150,6 +155,10 @@ class FlightOdometer:
         self._separator = ''
         print("\n  ]\n}", file=self._file_handle, end='')
 
+    @property
+    def image_matcher(self) -> ImageMatcher:
+        return self._image_matcher
+
     @property
     def velocity(self) -> Vector3:
         """
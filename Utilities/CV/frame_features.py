@@ -0,0 +1,203 @@
+from collections import OrderedDict
+from typing import Callable, Hashable, List, Tuple, Union
+import numpy as np
+import threading
+import cv2
+
+
+class FrameFeatures:
+    """
+    Особые точки и дескрипторы одного кадра.
+    points - координаты особых точек, np.ndarray (n, 2) float32, индексы совпадают с queryIdx/trainIdx сопоставлений.
+    key_points - исходные cv2.KeyPoint (нужны только для отрисовки).
+    Индекс FLANN по дескрипторам кадра строится по требованию один раз и хранится вместе с кадром.
+    """
+    __slots__ = ('_frame_id', '_image', '_key_points', '_points', '_descriptors', '_index')
+
+    def __init__(self, frame_id: Hashable, image: np.ndarray, key_points: Tuple[cv2.KeyPoint, ...],
+                 descriptors: Union[np.ndarray, None]):
+        self._frame_id = frame_id
+        self._image = image
+        self._key_points = key_points
+        self._points = cv2.KeyPoint_convert(key_points).reshape((-1, 2)) if len(key_points) != 0 else \
+            np.zeros((0, 2), dtype=np.float32)
+        self._descriptors = descriptors
+        self._index = None
+
+    def __len__(self) -> int:
+        return self._points.shape[0]
+
+    def __repr__(self):
+        return f"{{\"frame_id\": {self._frame_id!r}, \"points\": {len(self)}, \"indexed\": {self._index is not None}}}"
+
+    @property
+    def frame_id(self) -> Hashable:
+        return self._frame_id
+
+    @property
+    def image(self) -> np.ndarray:
+        return self._image
+
+    @property
+    def key_points(self) -> Tuple[cv2.KeyPoint, ...]:
+        return self._key_points
+
+    @property
+    def points(self) -> np.ndarray:
+        return self._points
+
+    @property
+    def descriptors(self) -> Union[np.ndarray, None]:
+        return self._descriptors
+
+    @property
+    def has_descriptors(self) -> bool:
+        return self._descriptors is not None and len(self._descriptors) != 0
+
+    def index(self, matcher_factory: Callable[[], cv2.DescriptorMatcher]) -> cv2.DescriptorMatcher:
+        """
+        Сопоставитель, обученный на дескрипторах кадра (кадр - обучающая выборка, trainIdx - индексы его точек).
+        """
+        if self._index is None:
+            self._index = matcher_factory()
+            self._index.add([self._descriptors])
+            self._index.train()
+        return self._index
+
+
+class FrameFeatureStore:
+    """
+    Кэш особых точек последних capacity кадров: каждый кадр обрабатывается детектором ровно один раз,
+    при последовательном сопоставлении пар (k - 1, k), (k, k + 1) кадр k берётся из кэша.
+    Кадры вытесняются в порядке давности использования.
+    Ключ кадра - frame_id, если он не задан - сам объект изображения (кэш хранит ссылку на изображение,
+    поэтому id(image) не может быть переиспользован, пока кадр в кэше).
+    Кэш можно заполнять из одного потока (стадия детектора конвейера), а читать из другого:
+    операции со словарём кадров под блокировкой, детектор вызывается вне её, но под своей блокировкой
+    (один объект cv2.Feature2D не используется двумя потоками одновременно).
+    Конвейеру, который передаёт FrameFeatures между стадиями, кэш не нужен - см. detect.
+    """
+    __slots__ = ('_detector', '_matcher_factory', '_matcher', '_use_index', '_capacity', '_frames', '_lock',
+                 '_detector_lock', '_detections', '_hits')
+
+    def __init__(self, detector, matcher_factory: Callable[[], cv2.DescriptorMatcher],
+                 capacity: int = 4, use_index: bool = True):
+        """
+        :param detector: cv2.Feature2D (ORB, SIFT, ...).
+        :param matcher_factory: создание сопоставителя (например cv2.FlannBasedMatcher с параметрами).
+        :param capacity: число хранимых кадров.
+        :param use_index: строить и хранить индекс FLANN для каждого кадра, сопоставляемого как обучающий.
+        """
+        if capacity < 1:
+            raise RuntimeError(f"FrameFeatureStore :: capacity must be positive, got {capacity}")
+        self._detector = detector
+        self._matcher_factory = matcher_factory
+        self._matcher = None if use_index else matcher_factory()
+        self._use_index = use_index
+        self._capacity = capacity
+        self._frames: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self._detector_lock = threading.Lock()
+        self._detections = 0
+        self._hits = 0
+
+    def __len__(self) -> int:
+        return len(self._frames)
+
+    def __contains__(self, frame_id: Hashable) -> bool:
+        return frame_id in self._frames
+
+    def __repr__(self):
+        return f"{{\"capacity\": {self._capacity}, \"frames\": {len(self)}, " \
+               f"\"detections\": {self._detections}, \"hits\": {self._hits}}}"
+
+    @property
+    def capacity(self) -> int:
+        return self._capacity
+
+    @property
+    def detections(self) -> int:
+        """
+        Число вызовов детектора.
+        """
+        return self._detections
+
+    @property
+    def hits(self) -> int:
+        """
+        Число запросов, обслуженных из кэша.
+        """
+        return self._hits
+
+    @property
+    def detector(self):
+        return self._detector
+
+    def clear(self) -> None:
+        with self._lock:
+            self._frames.clear()
+
+    def evict(self, frame_id: Hashable) -> None:
+        with self._lock:
+            self._frames.pop(frame_id, None)
+
+    def get(self, frame_id: Hashable) -> Union[FrameFeatures, None]:
+        return self._frames.get(frame_id)
+
+    def detect(self, image: np.ndarray, frame_id: Hashable = None) -> FrameFeatures:
+        """
+        Особые точки кадра без обращения к кэшу: результат не сохраняется, хранить его должен вызывающий.
+        """
+        key_points, descriptors = self._detect(image)
+        return FrameFeatures(('image', id(image)) if frame_id is None else frame_id, image, key_points, descriptors)
+
+    def _detect(self, image: np.ndarray) -> Tuple[Tuple[cv2.KeyPoint, ...], Union[np.ndarray, None]]:
+        with self._detector_lock:
+            key_points, descriptors = self._detector.detectAndCompute(image, None)
+        with self._lock:
+            self._detections += 1
+        return tuple(key_points), descriptors
+
+    def features(self, image: np.ndarray, frame_id: Hashable = None) -> FrameFeatures:
+        key = ('image', id(image)) if frame_id is None else frame_id
+        with self._lock:
+            frame = self._frames.get(key)
+            if frame is not None and (frame_id is not None or frame.image is image):
+                self._frames.move_to_end(key)
+                self._hits += 1
+                return frame
+        frame = FrameFeatures(key, image, *self._detect(image))
+        with self._lock:
+            self._frames[key] = frame
+            self._frames.move_to_end(key)
+            while len(self._frames) > self._capacity:
+                self._frames.popitem(last=False)
+        return frame
+
+    def knn_match(self, query: FrameFeatures, train: FrameFeatures, k: int = 2) -> List[Tuple[cv2.DMatch, ...]]:
+        """
+        k ближайших дескрипторов кадра train для каждого дескриптора кадра query,
+        эквивалентно matcher.knnMatch(query.descriptors, train.descriptors, k).
+        """
+        if not (query.has_descriptors and train.has_descriptors):
+            return []
+        if self._use_index:
+            return train.index(self._matcher_factory).knnMatch(query.descriptors, k=k)
+        return self._matcher.knnMatch(query.descriptors, train.descriptors, k=k)
+
+
+def match_indices(matches) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Массивы queryIdx и trainIdx списка cv2.DMatch.
+    """
+    query_idx = np.fromiter((m.queryIdx for m in matches), dtype=np.int64, count=len(matches))
+    train_idx = np.fromiter((m.trainIdx for m in matches), dtype=np.int64, count=len(matches))
+    return query_idx, train_idx
+
+
+def match_points(query: FrameFeatures, train: FrameFeatures, matches) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Координаты сопоставленных точек (n, 2) float32 обоих кадров для списка cv2.DMatch.
+    """
+    query_idx, train_idx = match_indices(matches)
+    return query.points[query_idx], train.points[train_idx]
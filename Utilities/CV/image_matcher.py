@@ -1,5 +1,6 @@
-from Utilities.Geometry import Matrix3, Vector2
+from Utilities.Geometry import Matrix3
 from Utilities.Geometry import set_indent_level
+from .frame_features import FrameFeatures, FrameFeatureStore, match_points
 from matplotlib import pyplot as plt
 from Utilities import io_utils
 from typing import Union
@@ -37,6 +38,16 @@ def _filter_matches(matches, threshold=0.5):
     return good_matches  # [pair[0] for pair in matches if pair[0].distance < threshold * pair[1].distance]
 
 
+def _project_points(points: np.ndarray, proj_transform: Union[Matrix3, None]) -> np.ndarray:
+    """
+    Matrix3.perspective_multiply для массива точек (n, 2) float32 одним вызовом
+    (cv2.perspectiveTransform быстрее perspective_multiply_points, см. Benchmarks -k keypoints).
+    """
+    if proj_transform is None or len(points) == 0:
+        return points
+    return cv2.perspectiveTransform(points.reshape((-1, 1, 2)), proj_transform.to_np_array()).reshape((-1, 2))
+
+
 def _matches_mask(matches, threshold=0.5):
     return [[1, 0] if m.distance < threshold * n.distance else [0, 0] for m, n in matches]
 
@@ -59,7 +70,7 @@ def _draw_matches(image_1, kp_1, image_2, kp_2, matches, threshold=0.5, homograp
 
 
 class ImageMatcher:
-    __slots__ = ("_matcher", "_detector", "_threshold", "_img_1", "_img_2", "_kp_1",
+    __slots__ = ("_matcher", "_detector", "_features", "_threshold", "_img_1", "_img_2", "_kp_1",
                  "_kp_2", "_des_1", "_des_2", "_matches", "_good_matches", "_homography")
 
     def __repr__(self):
@@ -146,41 +157,49 @@ class ImageMatcher:
         self._homography = Matrix3.identity()
         if sift_or_orb:
             self._detector = cv2.SIFT_create()
-            self._matcher = _flann_sift()
+            self._matcher = _flann_sift
         else:
             self._detector = cv2.ORB_create(1000)
-            self._matcher = _flann_orb()
+            self._matcher = _flann_orb
+        # кадр k сопоставляется в парах (k - 1, k) и (k, k + 1), детектор для него вызывается один раз
+        self._features = FrameFeatureStore(self._detector, self._matcher, capacity=4)
 
     def match_images(self, image_1: np.ndarray, image_2: np.ndarray,
                      proj_transform_1: Matrix3 = None,
-                     proj_transform_2: Matrix3 = None) -> bool:
-
-        self._img_1 = image_1
-        self._img_2 = image_2
-
-        self._kp_1, self._des_1 = self._detector.detectAndCompute(self._img_1, None)
-        self._kp_2, self._des_2 = self._detector.detectAndCompute(self._img_2, None)
-
-        self._matches = self._matcher.knnMatch(self._des_1, self._des_2, k=2)
+                     proj_transform_2: Matrix3 = None,
+                     frame_id_1=None, frame_id_2=None) -> bool:
+        """
+        frame_id_1, frame_id_2 - ключи кадров в кэше особых точек, если не заданы, ключом служит сам объект
+        изображения (повторная передача того же объекта не вызывает детектор повторно).
+        """
+        return self.match_features(self._features.features(image_1, frame_id_1),
+                                   self._features.features(image_2, frame_id_2),
+                                   proj_transform_1, proj_transform_2)
+
+    def detect_features(self, image: np.ndarray, frame_id=None) -> FrameFeatures:
+        """
+        Особые точки кадра без кэширования (для конвейера, передающего FrameFeatures между стадиями).
+        """
+        return self._features.detect(image, frame_id)
+
+    def match_features(self, features_1: FrameFeatures, features_2: FrameFeatures,
+                       proj_transform_1: Matrix3 = None,
+                       proj_transform_2: Matrix3 = None) -> bool:
+        """
+        match_images для уже найденных особых точек, детектор не вызывается.
+        """
+        self._img_1 = features_1.image
+        self._img_2 = features_2.image
+        self._kp_1, self._des_1 = features_1.key_points, features_1.descriptors
+        self._kp_2, self._des_2 = features_2.key_points, features_2.descriptors
+
+        self._matches = self._features.knn_match(features_1, features_2, k=2)
         self._good_matches = _filter_matches(self._matches, self._threshold)
 
-        # maintaining list of index of descriptors
-        # in query descriptors
-        if proj_transform_1 is None:
-            pts_1 = np.float32([self._kp_1[m.queryIdx].pt for m in self._good_matches]).reshape(-1, 1, 2)
-        else:
-            points = tuple(tuple(proj_transform_1.perspective_multiply(Vector2(*self._kp_1[m.queryIdx].pt)))
-                           for m in self._good_matches)
-            pts_1 = np.float32(points).reshape(-1, 1, 2)
-
-        # maintaining list of index of descriptors
-        # in train descriptors
-        if proj_transform_2 is None:
-            pts_2 = np.float32([self._kp_2[m.trainIdx].pt for m in self._good_matches]).reshape(-1, 1, 2)
-        else:
-            points = tuple(tuple(proj_transform_2.perspective_multiply(Vector2(*self._kp_2[m.trainIdx].pt)))
-                           for m in self._good_matches)
-            pts_2 = np.float32(points).reshape(-1, 1, 2)
+        # координаты точек сопоставлений в кадрах query и train, проекция - одним умножением на весь массив
+        pts_1, pts_2 = match_points(features_1, features_2, self._good_matches)
+        pts_1 = _project_points(pts_1, proj_transform_1).reshape(-1, 1, 2)
+        pts_2 = _project_points(pts_2, proj_transform_2).reshape(-1, 1, 2)
 
         # finding  perspective transformation
         # between two planes
@@ -216,6 +235,10 @@ class ImageMatcher:
         _draw_matches(self._img_1, self._kp_1, self._img_2, self._kp_2,
                       self._matches, self._threshold, self._homography)
 
+    @property
+    def features(self) -> FrameFeatureStore:
+        return self._features
+
     @property
     def threshold(self) -> float:
         return self._threshold
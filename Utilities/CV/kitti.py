@@ -0,0 +1,100 @@
+"""
+Загрузка последовательностей KITTI (калибровка, истинные положения) и оценка положения камеры
+по сопоставленным точкам двух кадров через существенную матрицу. Зависит только от numpy и cv2.
+"""
+import numpy as np
+import cv2 as cv
+
+
+def build_transform(r: np.ndarray, t: np.ndarray) -> np.ndarray:
+    """
+    Build transform matrix
+    :param r: rotation 3x3 matrix
+    :param t: translation 3x1 vector
+    :return:
+    """
+    tr = np.eye(4, dtype=np.float32)
+    tr[:3, :3] = r
+    tr[:3, 3] = t
+    return tr
+
+
+def load_calib(path: str):
+    """
+    Loads the calibration of the camera
+    Parameters
+    ----------
+    filepath (str): The file path to the camera file
+    Returns
+    -------
+    K (ndarray): Intrinsic parameters
+    P (ndarray): Projection matrix
+    """
+    with open(path, 'r') as f:
+        params = np.fromstring(f.readline(), dtype=np.float32, sep=' ')
+        P = np.reshape(params, (3, 4))
+        K = P[0:3, 0:3]
+    return K, P
+
+
+def load_poses(filepath):
+    """
+     Loads the GT poses
+     Parameters
+     ----------
+     filepath (str): The file path to the poses file
+     Returns
+     -------
+     poses (ndarray): The GT poses
+     """
+    poses = []
+    with open(filepath, 'r') as f:
+        for line in f.readlines():
+            t = np.fromstring(line, dtype=np.float32, sep=' ')
+            t = t.reshape(3, 4)
+            t = np.vstack((t, (0.0, 0.0, 0.0, 1.0)))
+            poses.append(t)
+    return poses
+
+
+def decompose_essential_mat(essential_matrix: np.ndarray, q_1: np.ndarray, q_2: np.ndarray, camera_p) -> np.ndarray:
+    rot_1, rot_2, trans = cv.decomposeEssentialMat(essential_matrix)
+
+    trans = np.squeeze(trans)
+
+    transformations = (build_transform(rot_1, trans), build_transform(rot_2, trans),
+                       build_transform(rot_1, -trans), build_transform(rot_2, -trans))
+
+    # camera = np.concatenate((camera_k, np.zeros((3, 1))), axis=1) equal to camera_p
+    projections = (camera_p @ transformations[0], camera_p @ transformations[1],
+                   camera_p @ transformations[2], camera_p @ transformations[3])
+    z_sums = -1e32  # []
+    z_scale = -1.0  # []
+    z_sums_curr = 0
+    transformation = None
+    target_points = None
+    for T, P in zip(transformations, projections):
+        hom_q1 = cv.triangulatePoints(camera_p, P, q_1.T, q_2.T)  # Camera Tracking System
+        hom_q2 = np.matmul(T, hom_q1)
+        hom_q1[:3, :] /= hom_q1[3, :]  # Пространственные координаты особых точек, которые видит камера 1
+        hom_q2[:3, :] /= hom_q2[3, :]  # Пространственные координаты особых точек, которые видит камера 2
+
+        hom_q1[3, :] = 1.0
+        hom_q2[3, :] = 1.0
+
+        z_sums_curr = sum(hom_q2[2, :] > 0) + sum(hom_q1[2, :] > 0)
+        if z_sums_curr < z_sums:
+            continue
+        # Find the number of points there has positive z coordinate in both cameras
+        z_sums = z_sums_curr
+        z_scale = np.mean(np.linalg.norm(hom_q1.T[:-1] - hom_q1.T[1:], axis=-1) /
+                          np.linalg.norm(hom_q2.T[:-1] - hom_q2.T[1:], axis=-1))
+        transformation = T
+        transformation[:3, 3] *= z_scale
+
+    return transformation, hom_q2
+
+
+def get_pose(q_1: np.ndarray, q_2: np.ndarray, camera_k: np.ndarray, camera_p: np.ndarray):
+    e_m, e_m_mask = cv.findEssentialMat(q_1, q_2, camera_k)  # , threshold=2.)
+    return decompose_essential_mat(e_m, q_1, q_2, camera_p)
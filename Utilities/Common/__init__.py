@@ -5,6 +5,8 @@ from .bitset32 import clear_bit
 from .bitset32 import set_bit
 from .bitset32 import BitSet32
 from .circ_buffer import CircBuffer
+from .order_statistics import WindowOrderStatistics
 from .loop_timer import LoopTimer
 from .timer import Timer
+from .pipeline import Pipeline, DropOldestQueue, StageStats
 from .color import Color
@@ -0,0 +1,172 @@
+from typing import List, Union
+import random
+import math
+
+
+class _SkipNode:
+    __slots__ = ('value', 'next', 'width')
+
+    def __init__(self, value: float, levels: int):
+        self.value: float = value
+        self.next: List[Union['_SkipNode', None]] = [None] * levels
+        self.width: List[int] = [1] * levels
+
+
+class WindowOrderStatistics:
+    """
+    Скользящее окно последних capacity значений с порядковыми статистиками (медиана, процентили, k-ый по величине).
+    Значения хранятся в индексируемом skip-list, поэтому добавление, вытеснение и запрос статистики
+    выполняются за O(log(capacity)) без пересортировки окна.
+    """
+    def __init__(self, cap: int, seed: int = 0):
+        if cap <= 0:
+            raise RuntimeError(f"WindowOrderStatistics :: capacity must be positive, got {cap}")
+        self._random: random.Random = random.Random(seed)
+        self._levels: int = 1 + int(math.log2(cap))
+        self._tail: _SkipNode = _SkipNode(math.inf, 0)
+        self._head: _SkipNode = _SkipNode(-math.inf, self._levels)
+        self._window: List[float] = [0.0 for _ in range(cap)]
+        self._indent: int = 0
+        self._n_items: int = 0
+        self.clear()
+
+    def __getitem__(self, rank: int) -> float:
+        """
+        Значение с порядковым номером rank в отсортированном окне (отрицательный rank - с конца)
+        """
+        if rank < 0:
+            rank += self.n_items
+        if rank >= self.n_items or rank < 0:
+            raise IndexError(f"WindowOrderStatistics :: trying to access rank: {rank}, while items amount is "
+                             f"{self.n_items}")
+        node = self._head
+        rank += 1
+        for level in range(self._levels - 1, -1, -1):
+            while node.width[level] <= rank:
+                rank -= node.width[level]
+                node = node.next[level]
+        return node.value
+
+    def __len__(self) -> int:
+        return self._n_items
+
+    def __iter__(self):
+        node = self._head.next[0]
+        while node is not self._tail:
+            yield node.value
+            node = node.next[0]
+
+    def __str__(self):
+        return f"[{', '.join(str(item) for item in self)}]"
+
+    @property
+    def n_items(self) -> int:
+        return self._n_items
+
+    @property
+    def capacity(self) -> int:
+        return len(self._window)
+
+    @property
+    def sorted(self) -> list:
+        return list(self)
+
+    @property
+    def min(self) -> float:
+        return self[0]
+
+    @property
+    def max(self) -> float:
+        return self[-1]
+
+    @property
+    def median(self) -> float:
+        return self.percentile(50.0)
+
+    def percentile(self, q: float) -> float:
+        """
+        Процентиль q в диапазоне [0, 100] с линейной интерполяцией между соседними значениями (как numpy.percentile)
+        """
+        if self.n_items == 0:
+            raise IndexError("WindowOrderStatistics :: percentile :: window is empty")
+        position = min(max(q, 0.0), 100.0) * 0.01 * (self.n_items - 1)
+        rank = int(position)
+        t = position - rank
+        if t == 0.0:
+            return self[rank]
+        lower, upper = self[rank], self[rank + 1]
+        # равные соседи (в том числе два inf) без вычитания: inf - inf = nan
+        return lower if lower == upper else lower + (upper - lower) * t
+
+    def _insert(self, value: float) -> None:
+        chain: List[Union[_SkipNode, None]] = [None] * self._levels
+        steps: List[int] = [0] * self._levels
+        node, tail = self._head, self._tail
+        for level in range(self._levels - 1, -1, -1):
+            # хвост больше любого значения, в том числе inf, поэтому сравнивается по идентичности
+            while node.next[level] is not tail and node.next[level].value <= value:
+                steps[level] += node.width[level]
+                node = node.next[level]
+            chain[level] = node
+        levels = min(self._levels, 1 + int(-math.log2(1.0 - self._random.random())))
+        new_node = _SkipNode(value, levels)
+        step = 0
+        for level in range(levels):
+            prev_node = chain[level]
+            new_node.next[level] = prev_node.next[level]
+            prev_node.next[level] = new_node
+            new_node.width[level] = prev_node.width[level] - step
+            prev_node.width[level] = step + 1
+            step += steps[level]
+        for level in range(levels, self._levels):
+            chain[level].width[level] += 1
+
+    def _remove(self, value: float) -> None:
+        chain: List[Union[_SkipNode, None]] = [None] * self._levels
+        node = self._head
+        for level in range(self._levels - 1, -1, -1):
+            while node.next[level].value < value:
+                node = node.next[level]
+            chain[level] = node
+        node = chain[0].next[0]
+        if node is self._tail or node.value != value:
+            raise RuntimeError(f"WindowOrderStatistics :: remove :: value {value} is not in the window")
+        for level in range(len(node.next)):
+            prev_node = chain[level]
+            prev_node.width[level] += node.width[level] - 1
+            prev_node.next[level] = node.next[level]
+        for level in range(len(node.next), self._levels):
+            chain[level].width[level] -= 1
+
+    def append(self, value: float) -> None:
+        """
+        Добавляет новое значение в окно, при заполненном окне вытесняет самое старое.
+        ±inf допустимы, NaN не упорядочивается и приводит к RuntimeError.
+        """
+        if value != value:
+            raise RuntimeError("WindowOrderStatistics :: append :: NaN can not be ordered")
+        if self.n_items == self.capacity:
+            self._remove(self._window[self._indent])
+            self._window[self._indent] = value
+            self._indent = (self._indent + 1) % self.capacity
+        else:
+            self._window[(self._indent + self._n_items) % self.capacity] = value
+            self._n_items += 1
+        self._insert(value)
+
+    def fill(self, value: float) -> None:
+        """
+        Заполняет всё окно значением value
+        """
+        self.clear()
+        for _ in range(self.capacity):
+            self.append(value)
+
+    def clear(self) -> None:
+        """
+        Очищает окно
+        """
+        self._indent = 0
+        self._n_items = 0
+        self._head.next = [self._tail] * self._levels
+        self._head.width = [1] * self._levels
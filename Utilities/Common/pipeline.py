@@ -0,0 +1,258 @@
+from typing import Any, Callable, Iterable, Tuple, Union
+from collections import deque
+import threading
+import time
+
+
+class DropOldestQueue:
+    """
+    Ограниченная очередь между стадиями конвейера: put никогда не блокирует,
+    при переполнении вытесняется самый старый элемент (обрабатываются самые свежие кадры).
+    """
+    __slots__ = ('_items', '_condition', '_dropped', '_closed')
+
+    def __init__(self, capacity: int = 1):
+        if capacity < 1:
+            raise RuntimeError(f"DropOldestQueue :: capacity must be positive, got {capacity}")
+        self._items: deque = deque(maxlen=capacity)
+        self._condition = threading.Condition()
+        self._dropped: int = 0
+        self._closed: bool = False
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    @property
+    def capacity(self) -> int:
+        return self._items.maxlen
+
+    @property
+    def dropped(self) -> int:
+        return self._dropped
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    def put(self, item: Any) -> bool:
+        """
+        :return: False, если ради item был вытеснен элемент очереди.
+        """
+        with self._condition:
+            overflow = len(self._items) == self._items.maxlen
+            if overflow:
+                self._dropped += 1
+            self._items.append(item)
+            self._condition.notify()
+        return not overflow
+
+    def get(self, timeout: float = None) -> Union[Any, None]:
+        """
+        :return: самый старый элемент или None, если очередь закрыта или истекло время ожидания.
+        """
+        with self._condition:
+            if not self._condition.wait_for(lambda: self._items or self._closed, timeout):
+                return None
+            return self._items.popleft() if self._items else None
+
+    def reset_dropped(self) -> None:
+        self._dropped = 0
+
+    def close(self) -> None:
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+    def open(self) -> None:
+        with self._condition:
+            self._items.clear()
+            self._closed = False
+
+
+class StageStats:
+    """
+    Счётчики стадии конвейера. Пишутся только потоком стадии.
+    """
+    __slots__ = ('name', 'processed', 'skipped', 'errors', 'dropped', 'last_time', 'max_time', 'total_time',
+                 'last_error')
+
+    def __init__(self, name: str):
+        self.name: str = name
+        self.processed: int = 0  # вызовы стадии, завершившиеся результатом
+        self.skipped: int = 0  # вызовы, вернувшие None (нет кадра, нечего передавать дальше)
+        self.errors: int = 0
+        self.dropped: int = 0  # элементы, вытесненные из входной очереди стадии
+        self.last_time: float = 0.0
+        self.max_time: float = 0.0
+        self.total_time: float = 0.0
+        self.last_error: Union[Exception, None] = None
+
+    def __str__(self):
+        return f"{{\"name\": \"{self.name}\", \"processed\": {self.processed}, \"skipped\": {self.skipped}, " \
+               f"\"errors\": {self.errors}, \"dropped\": {self.dropped}, \"mean_time\": {self.mean_time:.6f}, " \
+               f"\"last_time\": {self.last_time:.6f}, \"max_time\": {self.max_time:.6f}}}"
+
+    @property
+    def calls(self) -> int:
+        return self.processed + self.skipped + self.errors
+
+    @property
+    def mean_time(self) -> float:
+        return self.total_time / self.calls if self.calls != 0 else 0.0
+
+    def reset(self) -> None:
+        self.processed = self.skipped = self.errors = self.dropped = 0
+        self.last_time = self.max_time = self.total_time = 0.0
+        self.last_error = None
+
+
+class Pipeline:
+    """
+    Конвейер из последовательных стадий, каждая стадия - отдельный поток, между стадиями - DropOldestQueue.
+    Источник (source) вызывается в своём потоке без входной очереди (например, чтение кадра с камеры).
+    Стадия получает результат предыдущей, None означает "дальше не передавать".
+    Пропускная способность определяется самой медленной стадией, а не суммой задержек всех стадий
+    (cv2 и numpy отпускают GIL на время вычислений, поэтому потоков достаточно).
+        pipeline = Pipeline(camera_read, (("undistort", undistort), ("pose", odometer_update)))
+        pipeline.start()
+        ...
+        pipeline.stop()
+    """
+    __slots__ = ('_source', '_stages', '_queues', '_stats', '_threads', '_running', '_output', '_poll_time',
+                 '_on_error')
+
+    def __init__(self, source: Union[Callable[[], Any], None], stages: Iterable[Tuple[str, Callable[[Any], Any]]],
+                 queue_size: int = 1, poll_time: float = 0.1,
+                 on_error: Callable[[str, Exception], None] = None):
+        """
+        :param source: функция без аргументов, поставляющая элементы; None - элементы подаются через push.
+        :param stages: (имя, функция) в порядке выполнения.
+        :param queue_size: размер очереди перед каждой стадией.
+        :param poll_time: период проверки остановки ожидающими стадиями, с.
+        :param on_error: вызывается потоком стадии для каждого исключения стадии (имя стадии, исключение);
+         по умолчанию печатается первая ошибка стадии и каждая смена типа ошибки.
+        """
+        self._source = source
+        self._stages: Tuple[Tuple[str, Callable[[Any], Any]], ...] = tuple(stages)
+        if len(self._stages) == 0:
+            raise RuntimeError("Pipeline :: at least one stage is required")
+        self._queues: Tuple[DropOldestQueue, ...] = tuple(DropOldestQueue(queue_size) for _ in self._stages)
+        self._stats: Tuple[StageStats, ...] = ((StageStats("source"),) if source is not None else ()) + \
+            tuple(StageStats(name) for name, _ in self._stages)
+        self._threads = []
+        self._running = threading.Event()
+        self._output = None
+        self._poll_time = poll_time
+        self._on_error = on_error
+
+    def __str__(self):
+        sep = ',\n'
+        return f"{{\n\t\"running\": {str(self.is_running).lower()},\n\t\"stages\": [\n" \
+               f"{sep.join(f'{chr(9) * 2}{stats}' for stats in self.stats)}\n\t]\n}}"
+
+    @property
+    def is_running(self) -> bool:
+        return self._running.is_set()
+
+    @property
+    def stats(self) -> Tuple[StageStats, ...]:
+        for queue, stats in zip(self._queues, self._stats[-len(self._queues):]):
+            stats.dropped = queue.dropped
+        return self._stats
+
+    @property
+    def output(self) -> Union[Any, None]:
+        """
+        Последний результат последней стадии.
+        """
+        return self._output
+
+    def _report_error(self, stats: StageStats, error: Exception) -> None:
+        if self._on_error is not None:
+            self._on_error(stats.name, error)
+            return
+        if type(error) is not type(stats.last_error):
+            print(f"Pipeline :: stage \"{stats.name}\" failed ({stats.errors} errors): {error!r}")
+
+    def _call(self, func: Callable, stats: StageStats, *args) -> Union[Any, None]:
+        t = time.perf_counter()
+        try:
+            result = func(*args)
+        except Exception as ex:
+            stats.errors += 1
+            self._report_error(stats, ex)
+            stats.last_error = ex
+            result = None
+        else:
+            if result is None:
+                stats.skipped += 1
+            else:
+                stats.processed += 1
+        t = time.perf_counter() - t
+        stats.last_time = t
+        stats.total_time += t
+        stats.max_time = max(stats.max_time, t)
+        return result
+
+    def _source_loop(self) -> None:
+        stats, output = self._stats[0], self._queues[0]
+        while self._running.is_set():
+            item = self._call(self._source, stats)
+            if item is not None:
+                output.put(item)
+
+    def _stage_loop(self, index: int) -> None:
+        (_, func), source = self._stages[index], self._queues[index]
+        stats = self._stats[index + (1 if self._source is not None else 0)]
+        output = self._queues[index + 1] if index + 1 < len(self._queues) else None
+        while self._running.is_set():
+            item = source.get(self._poll_time)
+            if item is None:
+                continue
+            item = self._call(func, stats, item)
+            if item is None:
+                continue
+            if output is None:
+                self._output = item
+            else:
+                output.put(item)
+
+    def push(self, item: Any) -> bool:
+        """
+        Подача элемента на вход первой стадии. :return: False, если из очереди был вытеснен элемент.
+        """
+        return self._queues[0].put(item)
+
+    def start(self) -> None:
+        if self.is_running:
+            return
+        for queue in self._queues:
+            queue.open()
+        self._running.set()
+        self._threads = [threading.Thread(target=self._stage_loop, args=(index,), daemon=True,
+                                          name=f"pipeline-{name}") for index, (name, _) in enumerate(self._stages)]
+        if self._source is not None:
+            self._threads.append(threading.Thread(target=self._source_loop, daemon=True, name="pipeline-source"))
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self, timeout: float = None) -> None:
+        self._running.clear()
+        for queue in self._queues:
+            queue.close()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def wait(self, timeout: float = None) -> None:
+        """
+        Ожидание остановки конвейера (из другого потока через stop).
+        """
+        for thread in tuple(self._threads):
+            thread.join(timeout)
+
+    def reset_stats(self) -> None:
+        for stats in self._stats:
+            stats.reset()
+        for queue in self._queues:
+            queue.reset_dropped()
@@ -0,0 +1,60 @@
+"""
+Проверка WindowOrderStatistics по numpy.percentile на том же окне.
+Запуск: python -m pytest Utilities/Common/tests или как скрипт.
+"""
+from Utilities.Common.order_statistics import WindowOrderStatistics
+import numpy as np
+import math
+
+
+def _check_window(stats: WindowOrderStatistics, window: list) -> None:
+    assert stats.sorted == sorted(window)
+    assert stats.min == min(window)
+    assert stats.max == max(window)
+    assert stats[len(window) // 2] == sorted(window)[len(window) // 2]
+
+
+def test_matches_sorted_window():
+    rnd = np.random.default_rng(3)
+    stats, window = WindowOrderStatistics(64), []
+    for value in rnd.normal(size=500).tolist():
+        stats.append(value)
+        window = (window + [value])[-64:]
+        _check_window(stats, window)
+        assert math.isclose(stats.median, float(np.percentile(window, 50.0)))
+
+
+def test_infinite_values():
+    rnd = np.random.default_rng(5)
+    stats, window = WindowOrderStatistics(256), []
+    values = rnd.normal(size=600).tolist()
+    values[10] = values[300] = math.inf
+    values[20] = values[301] = -math.inf
+    values[302] = math.inf
+    for value in values:
+        stats.append(value)
+        window = (window + [value])[-256:]
+        _check_window(stats, window)
+    stats.fill(math.inf)
+    assert stats.sorted == [math.inf] * 256 and stats.median == math.inf
+    stats.append(1.0)
+    assert stats.min == 1.0 and stats.max == math.inf
+
+
+def test_nan_rejected():
+    stats = WindowOrderStatistics(8)
+    stats.append(1.0)
+    try:
+        stats.append(math.nan)
+    except RuntimeError:
+        pass
+    else:
+        raise AssertionError("NaN must be rejected")
+    assert stats.sorted == [1.0]
+
+
+if __name__ == "__main__":
+    test_matches_sorted_window()
+    test_infinite_values()
+    test_nan_rejected()
+    print("order_statistics: ok")
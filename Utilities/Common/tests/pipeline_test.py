@@ -0,0 +1,126 @@
+"""
+Проверка DropOldestQueue и Pipeline: вытеснение старых элементов, остановка, учёт ошибок стадий.
+Запуск: python -m pytest Utilities/Common/tests или как скрипт.
+"""
+from Utilities.Common.pipeline import DropOldestQueue, Pipeline
+import contextlib
+import threading
+import time
+import io
+
+
+def _wait_until(predicate, timeout: float = 5.0) -> bool:
+    t_end = time.perf_counter() + timeout
+    while not predicate():
+        if time.perf_counter() > t_end:
+            return False
+        time.sleep(0.005)
+    return True
+
+
+def test_drop_oldest_queue():
+    queue = DropOldestQueue(2)
+    assert [queue.put(item) for item in range(5)] == [True, True, False, False, False]
+    assert queue.dropped == 3 and len(queue) == 2
+    assert queue.get(0.0) == 3 and queue.get(0.0) == 4
+    assert queue.get(0.01) is None
+    queue.reset_dropped()
+    assert queue.dropped == 0
+    # close будит ожидающий get
+    result = []
+    reader = threading.Thread(target=lambda: result.append(queue.get()))
+    reader.start()
+    queue.close()
+    reader.join(5.0)
+    assert not reader.is_alive() and result == [None] and queue.closed
+    queue.open()
+    assert not queue.closed and len(queue) == 0
+
+
+def test_pipeline_drops_oldest_for_slow_stage():
+    release = threading.Event()
+    seen = []
+
+    def slow(item):
+        release.wait(5.0)
+        seen.append(item)
+        return item
+
+    pipeline = Pipeline(None, (("slow", slow),), queue_size=1, poll_time=0.01)
+    pipeline.start()
+    pipeline.push(0)
+    assert _wait_until(lambda: len(pipeline._queues[0]) == 0)  # стадия взяла 0 и ждёт
+    assert [pipeline.push(item) for item in (1, 2, 3)] == [True, False, False]
+    release.set()
+    assert _wait_until(lambda: pipeline.output == 3)
+    pipeline.stop(5.0)
+    assert seen == [0, 3]
+    stats = pipeline.stats[0]
+    assert stats.dropped == 2 and stats.processed == 2
+
+
+def test_pipeline_stop_and_wait():
+    counter = iter(range(1 << 30))
+    pipeline = Pipeline(lambda: next(counter), (("double", lambda item: item * 2),
+                                                ("skip_odd", lambda item: item if item % 4 == 0 else None)),
+                        poll_time=0.01)
+    pipeline.start()
+    assert pipeline.is_running
+    assert _wait_until(lambda: pipeline.output is not None and pipeline.output > 0)
+    waiter = threading.Thread(target=pipeline.wait)
+    waiter.start()
+    time.sleep(0.05)
+    assert waiter.is_alive()
+    pipeline.stop(5.0)
+    waiter.join(5.0)
+    assert not waiter.is_alive() and not pipeline.is_running
+    assert all(not thread.is_alive() for thread in threading.enumerate() if thread.name.startswith("pipeline-"))
+    source, double, skip_odd = pipeline.stats
+    assert source.processed > 0 and double.processed > 0 and skip_odd.skipped > 0
+    assert pipeline.output % 4 == 0
+    pipeline.reset_stats()
+    assert all(stats.calls == 0 and stats.dropped == 0 for stats in pipeline.stats)
+
+
+def test_pipeline_counts_errors():
+    def fail_odd(item):
+        if item % 2:
+            raise ValueError(item)
+        if item == 4:
+            raise KeyError(item)
+        return item
+
+    errors = []
+    pipeline = Pipeline(None, (("fail_odd", fail_odd),), queue_size=8, poll_time=0.01,
+                        on_error=lambda name, error: errors.append((name, type(error))))
+    pipeline.start()
+    for item in range(6):
+        pipeline.push(item)
+    assert _wait_until(lambda: pipeline.stats[0].calls == 6)
+    pipeline.stop(5.0)
+    stats = pipeline.stats[0]
+    assert stats.errors == 4 and stats.processed == 2 and stats.skipped == 0
+    assert isinstance(stats.last_error, ValueError)
+    assert errors == [("fail_odd", ValueError), ("fail_odd", ValueError), ("fail_odd", KeyError),
+                      ("fail_odd", ValueError)]
+
+    # без on_error печатается первая ошибка и каждая смена её типа
+    pipeline = Pipeline(None, (("fail_odd", fail_odd),), queue_size=8, poll_time=0.01)
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        pipeline.start()
+        for item in range(6):
+            pipeline.push(item)
+        assert _wait_until(lambda: pipeline.stats[0].calls == 6)
+        pipeline.stop(5.0)
+    lines = output.getvalue().splitlines()
+    assert len(lines) == 3
+    assert all("fail_odd" in line for line in lines)
+    assert [("KeyError" in line) for line in lines] == [False, True, False]
+
+
+if __name__ == "__main__":
+    test_drop_oldest_queue()
+    test_pipeline_drops_oldest_for_slow_stage()
+    test_pipeline_stop_and_wait()
+    test_pipeline_counts_errors()
@@ -0,0 +1,6 @@
+"""
+Замеры производительности геометрической библиотеки: скалярные типы, пакетные типы, JIT ядра и numpy.
+Запуск: python -m Utilities.Geometry.Benchmarks --help
+"""
+from .runner import BenchmarkCase, benchmark_case, benchmark_cases, run_benchmarks
+from .runner import save_results, load_results, compare_results
@@ -0,0 +1,49 @@
+"""
+python -m Utilities.Geometry.Benchmarks [-k pattern] [-o results.json] [--baseline baseline.json]
+                                        [--update-baseline] [--tolerance 0.25] [--min-time 0.2]
+Код возврата 1, если хотя бы один случай замедлился относительно базового запуска больше tolerance.
+Базовый запуск зависит от машины, по умолчанию хранится в рабочей директории (baseline.json, в git не добавляется),
+создаётся ключом --update-baseline.
+"""
+from .runner import run_benchmarks, save_results, load_results, compare_results
+import argparse
+import sys
+import os
+
+_DEFAULT_BASELINE = "baseline.json"
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(prog="python -m Utilities.Geometry.Benchmarks")
+    parser.add_argument("-k", "--pattern", default=None, help="run only cases with pattern in name")
+    parser.add_argument("-o", "--output", default=None, help="write results to json file")
+    parser.add_argument("--baseline", default=_DEFAULT_BASELINE,
+                        help="baseline json file, default is baseline.json in the working directory")
+    parser.add_argument("--update-baseline", action="store_true", help="overwrite baseline with this run")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative slowdown")
+    parser.add_argument("--min-time", type=float, default=0.2, help="measuring time per case, s")
+    parser.add_argument("--repeats", type=int, default=5, help="samples per case, median is reported")
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.pattern, args.min_time, args.repeats)
+    if args.output:
+        save_results(results, args.output)
+    if args.update_baseline:
+        save_results(results, args.baseline)
+        print(f"baseline saved to {os.path.abspath(args.baseline)}")
+        return 0
+    baseline = load_results(args.baseline)
+    if baseline is None:
+        print(f"no baseline at {os.path.abspath(args.baseline)}, run with --update-baseline to create it")
+        return 0
+    print()
+    regressions = compare_results(results, baseline, args.tolerance)
+    if regressions:
+        print(f"\n{len(regressions)} case(s) slower than baseline by more than {args.tolerance:.0%}:")
+        print("\n".join(f"\t{name}" for name in regressions))
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
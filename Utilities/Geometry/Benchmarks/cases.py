@@ -0,0 +1,419 @@
+"""
+Случаи замеров геометрической библиотеки. Варианты:
+scalar - объекты Vector3, Matrix4, Quaternion..., batch - Vector3Array, Matrix4Array, QuaternionArray и
+векторизованные функции, numpy - эквивалент средствами numpy для сравнения.
+"""
+from Utilities.Geometry import Vector2, Vector3, Quaternion, Matrix3, Matrix4, Camera, Plane
+from Utilities.Geometry import Vector3Array, QuaternionArray, Matrix4Array, BiCubicInterpolator
+from Utilities.Geometry import IncrementalLinearRegression, windowed_linear_regression, windowed_poly_regression
+from Utilities.Geometry import interpolators, march_squares, fourier, mutils
+from .runner import benchmark_case
+import numpy as np
+
+try:
+    import cv2
+except ImportError:
+    cv2 = None  # случаи сопоставления особых точек cv2 не регистрируются
+
+_BATCH = 1024
+_rnd = np.random.default_rng(0)
+
+_M44_VALUES = (1.0, 2.0, 0.0, 4.0, 5.0, 6.0, 7.0, 8.0, 9.0, 10.0, 11.0, 12.0, 13.0, 0.0, 15.0, 16.0)
+_M44 = Matrix4(*_M44_VALUES)
+_NP_M44 = np.array(_M44_VALUES).reshape((4, 4))
+_NP_M44_BATCH = _rnd.random((_BATCH, 4, 4)) + np.eye(4) * 4.0
+_M44_BATCH = Matrix4Array(_NP_M44_BATCH)
+_M33 = Matrix3(1.1, 0.1, 3.0, 0.05, 0.9, -2.0, 0.001, 0.002, 1.0)
+
+_V3_A, _V3_B = Vector3(1.0, 2.0, 3.0), Vector3(-3.0, 0.5, 2.0)
+_V3_BATCH_A = Vector3Array(_rnd.random((_BATCH, 3)))
+_V3_BATCH_B = Vector3Array(_rnd.random((_BATCH, 3)))
+_V3_LIST = _V3_BATCH_A.to_vectors()
+_PTS_2D = _rnd.random((_BATCH, 2)) * 100.0
+
+_ANGLES = _rnd.random((3, _BATCH))
+_Q_A = Quaternion.from_euler_angles(0.1, 0.2, 0.3)
+_Q_B = Quaternion.from_euler_angles(-0.3, 0.5, 0.1)
+_Q_BATCH_A = QuaternionArray.from_euler_angles(*_ANGLES)
+_Q_BATCH_B = QuaternionArray.from_euler_angles(*_ANGLES[::-1])
+
+_GRID = np.sin(np.linspace(0.0, 6.0, 64))[None, :] * np.cos(np.linspace(0.0, 4.0, 64))[:, None]
+_XS = _rnd.random(_BATCH)
+_YS = _rnd.random(_BATCH)
+_INTERPOLATOR = BiCubicInterpolator(_GRID)
+_MAP = _rnd.random((1024, 1024))
+_FIELD = np.hypot(*np.meshgrid(np.linspace(-1.0, 1.0, 128), np.linspace(-1.0, 1.0, 128)))
+
+_SIGNAL = _rnd.random(1024)
+_IMAGE = _rnd.random((256, 256))
+_IMAGE_SHIFTED = np.roll(_IMAGE, (5, -3), axis=(0, 1))
+
+
+def _camera() -> Camera:
+    camera = Camera()
+    camera.look_at(Vector3(0.0, 0.0, 0.0), Vector3(0.5, 0.3, 10.0), Vector3(0.0, 1.0, 0.0))
+    return camera
+
+
+_SCREEN_X = _rnd.random(_BATCH) * 2.0 - 1.0
+_SCREEN_Y = _rnd.random(_BATCH) * 2.0 - 1.0
+_GROUND = Plane(origin=Vector3(0.0, 0.0, 0.0), normal=Vector3(0.0, 0.0, 1.0))
+
+
+# construction
+@benchmark_case("construction", "numpy")
+def numpy_eye_4x4():
+    np.eye(4)
+
+
+@benchmark_case("construction")
+def matrix4_identity():
+    Matrix4.identity()
+
+
+@benchmark_case("construction")
+def matrix4_from_values():
+    Matrix4(*_M44_VALUES)
+
+
+@benchmark_case("construction")
+def vector3_from_values():
+    Vector3(1.0, 2.0, 3.0)
+
+
+@benchmark_case("construction")
+def quaternion_from_euler_angles():
+    Quaternion.from_euler_angles(0.1, 0.2, 0.3)
+
+
+@benchmark_case("construction", "batch", items=_BATCH)
+def matrix4_array_identity():
+    Matrix4Array.identity(_BATCH)
+
+
+@benchmark_case("construction", "batch", items=_BATCH)
+def quaternion_array_from_euler_angles():
+    QuaternionArray.from_euler_angles(*_ANGLES)
+
+
+@benchmark_case("construction", "batch", items=_BATCH)
+def vector3_array_from_vectors():
+    Vector3Array.from_vectors(_V3_LIST)
+
+
+# arithmetic
+@benchmark_case("arithmetic")
+def vector3_add():
+    _V3_A + _V3_B
+
+
+@benchmark_case("arithmetic")
+def vector3_cross():
+    Vector3.cross(_V3_A, _V3_B)
+
+
+@benchmark_case("arithmetic", "batch", items=_BATCH)
+def vector3_array_add():
+    _V3_BATCH_A + _V3_BATCH_B
+
+
+@benchmark_case("arithmetic", "batch", items=_BATCH)
+def vector3_array_cross():
+    Vector3Array.cross(_V3_BATCH_A, _V3_BATCH_B)
+
+
+@benchmark_case("arithmetic", "numpy")
+def numpy_matmul_4x4():
+    _NP_M44 @ _NP_M44
+
+
+@benchmark_case("arithmetic")
+def matrix4_mul():
+    _M44 * _M44
+
+
+@benchmark_case("arithmetic", setup=lambda: (Matrix4.identity(),))
+def matrix4_mul_into(out: Matrix4):
+    Matrix4.mul_into(_M44, _M44, out)
+
+
+@benchmark_case("arithmetic", "batch", items=_BATCH)
+def matrix4_array_mul():
+    _M44_BATCH * _M44_BATCH
+
+
+@benchmark_case("arithmetic", "numpy", items=_BATCH)
+def numpy_matmul_batch():
+    np.matmul(_NP_M44_BATCH, _NP_M44_BATCH)
+
+
+@benchmark_case("arithmetic")
+def matrix4_multiply_by_point():
+    _M44.multiply_by_point(_V3_A)
+
+
+@benchmark_case("arithmetic", "batch", items=_BATCH)
+def matrix4_array_transform_points():
+    Matrix4Array.transform_points(_M44, _V3_BATCH_A)
+
+
+# inversion
+@benchmark_case("inversion", "numpy")
+def numpy_inv_4x4():
+    np.linalg.inv(_NP_M44)
+
+
+@benchmark_case("inversion")
+def matrix4_inverted():
+    _M44.inverted
+
+
+@benchmark_case("inversion")
+def matrix3_inverted():
+    _M33.inverted
+
+
+@benchmark_case("inversion", "batch", items=_BATCH)
+def matrix4_array_inverted():
+    _M44_BATCH.inverted
+
+
+@benchmark_case("inversion", "numpy", items=_BATCH)
+def numpy_inv_batch():
+    np.linalg.inv(_NP_M44_BATCH)
+
+
+# quaternion
+@benchmark_case("quaternion")
+def quaternion_mul():
+    _Q_A * _Q_B
+
+
+@benchmark_case("quaternion", setup=lambda: (Quaternion(1.0, 0.0, 0.0, 0.0),))
+def quaternion_mul_into(out: Quaternion):
+    Quaternion.mul_into(_Q_A, _Q_B, out)
+
+
+@benchmark_case("quaternion")
+def quaternion_rotate():
+    _Q_A.rotate(_V3_A)
+
+
+@benchmark_case("quaternion", setup=lambda: (Vector3(0.0, 0.0, 0.0),))
+def quaternion_rotate_into(out: Vector3):
+    _Q_A.rotate_into(_V3_A, out)
+
+
+@benchmark_case("quaternion")
+def quaternion_slerp():
+    Quaternion.slerp(_Q_A, _Q_B, 0.3)
+
+
+@benchmark_case("quaternion")
+def quaternion_to_rotation_matrix():
+    _Q_A.to_rotation_matrix()
+
+
+@benchmark_case("quaternion", "batch", items=_BATCH)
+def quaternion_array_mul():
+    _Q_BATCH_A * _Q_BATCH_B
+
+
+@benchmark_case("quaternion", "batch", items=_BATCH)
+def quaternion_array_rotate():
+    _Q_BATCH_A.rotate(_V3_BATCH_A)
+
+
+@benchmark_case("quaternion", "batch", items=_BATCH)
+def quaternion_array_slerp():
+    QuaternionArray.slerp(_Q_BATCH_A, _Q_BATCH_B, 0.3)
+
+
+@benchmark_case("quaternion", "batch", items=_BATCH)
+def quaternion_array_to_rotation_matrices():
+    _Q_BATCH_A.to_rotation_matrices()
+
+
+# perspective
+@benchmark_case("perspective")
+def matrix3_perspective_multiply():
+    _M33.perspective_multiply(Vector2(12.0, 34.0))
+
+
+@benchmark_case("perspective", "batch", items=_BATCH)
+def matrix3_perspective_multiply_points():
+    _M33.perspective_multiply_points(_PTS_2D)
+
+
+@benchmark_case("perspective", "batch", items=_BATCH)
+def matrix4_array_perspective_multiply():
+    _M44_BATCH.perspective_multiply(_V3_BATCH_A)
+
+
+@benchmark_case("perspective", setup=lambda: (_camera(),))
+def camera_emit_ray_plane_intersect(camera: Camera):
+    _GROUND.intersect_by_ray(camera.emit_ray(0.3, -0.2))
+
+
+@benchmark_case("perspective", "batch", items=_BATCH, setup=lambda: (_camera(),))
+def camera_cast_rays_plane(camera: Camera):
+    camera.cast_rays(_SCREEN_X, _SCREEN_Y, _GROUND)
+
+
+# проекция особых точек сопоставлений (ImageMatcher.match_images), типичное число совпадений SIFT
+_N_MATCHES = 2000
+_KEY_POINTS = (_rnd.random((_N_MATCHES, 2)) * 640.0).astype(np.float32)
+
+
+@benchmark_case("keypoints", items=_N_MATCHES)
+def keypoints_project_loop():
+    np.float32(tuple(tuple(_M33.perspective_multiply(Vector2(*p))) for p in _KEY_POINTS.tolist()))
+
+
+@benchmark_case("keypoints", "batch", items=_N_MATCHES)
+def keypoints_project_batch():
+    _M33.perspective_multiply_points(_KEY_POINTS).astype(np.float32)
+
+
+if cv2 is not None:
+    _DMATCHES = tuple(cv2.DMatch(int(q), int(t), 1.0) for q, t in
+                      zip(_rnd.permutation(_N_MATCHES), _rnd.permutation(_N_MATCHES)))
+    _CV_KEY_POINTS = tuple(cv2.KeyPoint(float(x), float(y), 1.0) for x, y in _KEY_POINTS)
+
+    @benchmark_case("keypoints", "numpy", items=_N_MATCHES)
+    def keypoints_project_cv2():
+        cv2.perspectiveTransform(_KEY_POINTS.reshape((-1, 1, 2)), _M33.to_np_array())
+
+    @benchmark_case("keypoints", items=_N_MATCHES)
+    def keypoints_gather_loop():
+        np.float32([_CV_KEY_POINTS[m.queryIdx].pt for m in _DMATCHES])
+
+    @benchmark_case("keypoints", "batch", items=_N_MATCHES)
+    def keypoints_gather_indices():
+        _KEY_POINTS[np.fromiter((m.queryIdx for m in _DMATCHES), dtype=np.int64, count=len(_DMATCHES))]
+
+
+# interpolators
+@benchmark_case("interpolators", jit=True)
+def bi_linear_interp_pt():
+    interpolators.bi_linear_interp_pt(0.3, 0.7, _GRID)
+
+
+@benchmark_case("interpolators", "batch", items=_BATCH, jit=True)
+def bi_linear_cut():
+    interpolators.bi_linear_cut(0.0, 0.0, 1.0, 1.0, _BATCH, _GRID)
+
+
+@benchmark_case("interpolators", jit=True)
+def bi_qubic_interp_pt():
+    interpolators.bi_qubic_interp_pt(0.3, 0.7, _GRID)
+
+
+@benchmark_case("interpolators", "batch", items=_BATCH, jit=True)
+def bi_qubic_cut():
+    interpolators.bi_qubic_cut(0.0, 0.0, 1.0, 1.0, _BATCH, _GRID)
+
+
+@benchmark_case("interpolators", "batch", items=_BATCH)
+def bicubic_interpolator_call():
+    _INTERPOLATOR(_XS, _YS)
+
+
+@benchmark_case("interpolators", "batch", items=_BATCH)
+def bicubic_interpolator_cut():
+    _INTERPOLATOR.cut(0.0, 0.0, 1.0, 1.0, _BATCH)
+
+
+@benchmark_case("interpolators", "batch")
+def bicubic_interpolator_build():
+    BiCubicInterpolator(_GRID)
+
+
+@benchmark_case("interpolators", "batch", items=_MAP.size)
+def compute_derivatives_2_map():
+    mutils.compute_derivatives_2(_MAP)
+
+
+@benchmark_case("interpolators", "batch", items=_MAP.size,
+                setup=lambda: (tuple(np.empty(_MAP.shape) for _ in range(3)),))
+def compute_derivatives_2_map_out(out: tuple):
+    mutils.compute_derivatives_2(_MAP, out=out)
+
+
+@benchmark_case("interpolators", "batch", items=_MAP.size)
+def compute_normals_map():
+    mutils.compute_normals(_MAP)
+
+
+# regression
+@benchmark_case("regression", setup=lambda: (IncrementalLinearRegression(window=256),))
+def incremental_linear_regression_update(regression: IncrementalLinearRegression):
+    regression.update(0.3, 0.7)
+
+
+@benchmark_case("regression", "numpy")
+def linear_regression_window_refit():
+    mutils.linear_regression(_XS[:256], _YS[:256])
+
+
+@benchmark_case("regression", "batch", items=_BATCH - 255)
+def windowed_linear_regression_256():
+    windowed_linear_regression(_XS, _YS, 256)
+
+
+@benchmark_case("regression", "batch", items=(_BATCH - 256) // 8 + 1)
+def windowed_poly_regression_256():
+    windowed_poly_regression(_XS, _YS, 256, 3, step=8)
+
+
+# march squares
+@benchmark_case("march_squares", "batch")
+def march_squares_2d_array():
+    march_squares.march_squares_2d(_FIELD, threshold=0.5)
+
+
+@benchmark_case("march_squares", "batch")
+def march_squares_contours_array():
+    march_squares.march_squares_contours(_FIELD, threshold=0.5)
+
+
+@benchmark_case("march_squares", "batch")
+def march_squares_2d_function():
+    march_squares.march_squares_2d(lambda x, y: x * x + y * y, Vector2(-1.0, -1.0), Vector2(1.0, 1.0),
+                                   (64, 64), threshold=0.5)
+
+
+# fft
+@benchmark_case("fft", "batch")
+def fft_1024():
+    fourier.fft(_SIGNAL)
+
+
+@benchmark_case("fft", "batch")
+def rfft_1024():
+    fourier.rfft(_SIGNAL)
+
+
+@benchmark_case("fft", "numpy")
+def numpy_fft_1024():
+    np.fft.fft(_SIGNAL)
+
+
+@benchmark_case("fft", "batch")
+def fft_2d_256():
+    fourier.fft_2d(_IMAGE)
+
+
+@benchmark_case("fft", "batch")
+def rfft_2d_256():
+    fourier.rfft_2d(_IMAGE)
+
+
+@benchmark_case("fft", "numpy")
+def numpy_fft_2d_256():
+    np.fft.fft2(_IMAGE)
+
+
+@benchmark_case("fft", "batch")
+def phase_correlation_256():
+    fourier.phase_correlation(_IMAGE, _IMAGE_SHIFTED)
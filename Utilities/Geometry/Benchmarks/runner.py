@@ -0,0 +1,192 @@
+from Utilities.Geometry.common import jit_enabled, set_jit_enabled
+from typing import Callable, Dict, List, Tuple, Union
+import importlib.util
+import subprocess
+import datetime
+import platform
+import time
+import json
+import sys
+import os
+
+import numpy as np
+
+
+class BenchmarkCase:
+    """
+    Замер одной операции: func(*setup()) вызывается много раз, аргументы создаются один раз.
+    items - число элементарных операций за вызов (размер пакета), время в отчёте делится на него,
+    поэтому скалярный вызов и пакетный можно сравнивать напрямую.
+    jit - операция использует ядра JitKernel, дополнительно замеряется вариант без компиляции.
+    """
+    __slots__ = ('name', 'group', 'variant', 'func', 'setup', 'items', 'jit')
+
+    def __init__(self, name: str, group: str, variant: str, func: Callable, setup: Callable[[], tuple],
+                 items: int = 1, jit: bool = False):
+        self.name: str = name
+        self.group: str = group
+        self.variant: str = variant
+        self.func: Callable = func
+        self.setup: Callable[[], tuple] = setup
+        self.items: int = items
+        self.jit: bool = jit
+
+
+_CASES: List[BenchmarkCase] = []
+
+
+def benchmark_case(group: str, variant: str = "scalar", items: int = 1, jit: bool = False,
+                   setup: Callable[[], tuple] = lambda: (), name: str = None):
+    """
+    Регистрация функции как случая замера:
+        @benchmark_case("inversion", "batch", items=1024, setup=lambda: (Matrix4Array(...),))
+        def matrix4_array_inverted(m): m.inverted
+    Имя случая: group.name, имя функции по умолчанию.
+    """
+    def register(func: Callable) -> Callable:
+        _CASES.append(BenchmarkCase(f"{group}.{name if name else func.__name__}", group, variant, func, setup,
+                                    items, jit))
+        return func
+    return register
+
+
+def benchmark_cases() -> Tuple[BenchmarkCase, ...]:
+    return tuple(_CASES)
+
+
+def _time_calls(func: Callable, args: tuple, calls: int) -> float:
+    t = time.perf_counter()
+    for _ in range(calls):
+        func(*args)
+    return time.perf_counter() - t
+
+
+def _calibrate(func: Callable, args: tuple, sample_time: float) -> int:
+    """
+    Число вызовов в одной выборке, чтобы выборка длилась не меньше sample_time.
+    """
+    calls = 1
+    while True:
+        t = _time_calls(func, args, calls)
+        if t >= sample_time or calls >= 1 << 24:
+            return calls
+        calls = min(calls * 100, max(calls * 2, int(1.1 * calls * sample_time / max(t, 1e-9))))
+
+
+def _measure(case: BenchmarkCase, min_time: float, repeats: int) -> Dict[str, Union[str, int, float]]:
+    args = case.setup()
+    # первый вызов отдельно: компиляция ядер, заполнение кэшей
+    t = time.perf_counter()
+    case.func(*args)
+    first_call = time.perf_counter() - t
+    calls = _calibrate(case.func, args, min_time / repeats)
+    samples = sorted(_time_calls(case.func, args, calls) / calls for _ in range(repeats))
+    median = samples[len(samples) // 2]
+    return {"group": case.group, "variant": case.variant, "items": case.items, "calls": calls,
+            "repeats": repeats, "first_call_s": first_call, "median_s": median, "min_s": samples[0],
+            "per_item_ns": median / case.items * 1e9, "per_item_min_ns": samples[0] / case.items * 1e9}
+
+
+def _git_commit() -> Union[str, None]:
+    try:
+        result = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)), timeout=10.0)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return result.stdout.strip() if result.returncode == 0 else None
+
+
+def _environment() -> Dict[str, Union[str, bool, None]]:
+    return {"time": datetime.datetime.now().isoformat(timespec="seconds"),
+            "commit": _git_commit(),
+            "platform": platform.platform(),
+            "machine": platform.machine(),
+            "processor": platform.processor(),
+            "python": sys.version.split()[0],
+            "numpy": np.__version__,
+            "numba": importlib.util.find_spec("numba") is not None,
+            "jit_enabled": jit_enabled()}
+
+
+def run_benchmarks(pattern: str = None, min_time: float = 0.2, repeats: int = 5, verbose: bool = True) -> dict:
+    """
+    Запуск всех зарегистрированных случаев (или тех, в имени которых есть pattern).
+    Случаи с jit=True замеряются дважды: name[jit] - с ядрами numba (если numba доступна),
+    name[python] - с отключённой компиляцией.
+    :return: {"environment": {...}, "results": {имя: {...}}}, пригодно для save_results.
+    """
+    from . import cases  # регистрация случаев
+    results: Dict[str, dict] = {}
+    environment = _environment()
+    if verbose:
+        print(f"|{'case':56}|{'variant':8}|{'items':>8}|{'median, us':>12}|{'per item, ns':>13}|")
+    for case in _CASES:
+        if pattern and pattern not in case.name:
+            continue
+        modes: List[Tuple[str, bool]] = [("", jit_enabled())]
+        if case.jit:
+            modes = ([("[jit]", True)] if environment["numba"] and jit_enabled() else []) + [("[python]", False)]
+        for suffix, jit in modes:
+            name = case.name + suffix
+            enabled = jit_enabled()
+            set_jit_enabled(jit)
+            try:
+                result = _measure(case, min_time, repeats)
+            except Exception as ex:
+                if verbose:
+                    print(f"|{name:56}| failed: {type(ex).__name__}: {ex}")
+                continue
+            finally:
+                set_jit_enabled(enabled)
+            results[name] = result
+            if verbose:
+                print(f"|{name:56}|{case.variant:8}|{case.items:8}|{result['median_s'] * 1e6:12.2f}|"
+                      f"{result['per_item_ns']:13.1f}|")
+    return {"environment": environment, "results": results}
+
+
+def save_results(results: dict, file_path: str) -> None:
+    directory = os.path.dirname(os.path.abspath(file_path))
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+    with open(file_path, "wt") as output:
+        json.dump(results, output, indent=2, sort_keys=True)
+
+
+def load_results(file_path: str) -> Union[dict, None]:
+    if not os.path.isfile(file_path):
+        return None
+    with open(file_path, "rt") as file:
+        return json.load(file)
+
+
+def compare_results(results: dict, baseline: dict, tolerance: float = 0.25, verbose: bool = True) -> List[str]:
+    """
+    Сравнение минимального по выборкам времени на элемент с базовым запуском (минимум меньше медианы
+    зависит от фоновой нагрузки). Сравниваются случаи текущего запуска, в том числе запуска с фильтром.
+    :param tolerance: допустимое относительное замедление (0.25 - на 25%).
+    :return: имена случаев, замедлившихся больше допустимого.
+    """
+    regressions = []
+    current, reference = results["results"], baseline["results"]
+    if verbose:
+        environment = baseline.get("environment", {})
+        print(f"baseline: {environment.get('time')} commit {environment.get('commit')}, "
+              f"{environment.get('platform')}, python {environment.get('python')}, numpy {environment.get('numpy')}")
+        print(f"|{'case':56}|{'baseline, ns':>13}|{'current, ns':>13}|{'ratio':>7}|")
+    for name in current:
+        if name not in reference:
+            if verbose:
+                print(f"|{name:56}| not in baseline")
+            continue
+        t_base, t_curr = reference[name]["per_item_min_ns"], current[name]["per_item_min_ns"]
+        ratio = t_curr / t_base if t_base > 0.0 else float('inf')
+        status = ""
+        if ratio > 1.0 + tolerance:
+            status = " SLOWER"
+            regressions.append(name)
+        elif ratio < 1.0 / (1.0 + tolerance):
+            status = " faster"
+        if verbose:
+            print(f"|{name:56}|{t_base:13.1f}|{t_curr:13.1f}|{ratio:7.2f}|{status}")
+    return regressions
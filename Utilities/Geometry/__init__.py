@@ -6,31 +6,66 @@ __license__ = "GNU Lesser General Public License v3"
 from .common import NUMERICAL_MAX_VALUE, NUMERICAL_MIN_VALUE, PI, TWO_PI, HALF_PI
 from .common import NUMERICAL_ACCURACY, NUMERICAL_FORMAT_4F, NUMERICAL_FORMAT_8F
 from .common import DEG_TO_RAD, RAD_TO_DEG, parallel_range, fast_math, parallel, indent, set_indent_level
-from .perspective_transform_2d import PerspectiveTransform2d, perspective_transform_test
-from .transform_3d import Transform3d, deg_to_rad, transform_3d_test
-from .transform_2d import Transform2d, transform_2d_test
-from .bounding_rect import BoundingRect
-from .bounding_box import BoundingBox
-from .quaternion import Quaternion, quaternion_4_test
-from .vector4 import Vector4, vector_4_test
-from .vector3 import Vector3, vector_3_test
-from .vector2 import Vector2, vector_2_test
-from .matrix4 import Matrix4, matrix_4_test
-from .matrix3 import Matrix3, matrix_3_test
-from .camera import Camera
-from .plane import Plane
-from .voxel import Voxel
-from .ray import Ray
-from .mutils import dec_to_rad, rad_to_dec, compute_derivatives_2_at_pt, compute_derivatives_at_pt
-from .mutils import linear_regression, bi_linear_regression, n_linear_regression
-from .mutils import compute_derivatives_2, compute_derivatives, compute_normals
-from .mutils import square_equation, clamp, dec_to_rad_pt, rad_to_dec_pt
-from .mutils import second_order_surface, quadratic_shape_fit
-from .mutils import poly_regression, quadratic_regression_2d
-from .mutils import poly_fit, polynom, quadratic_shape_fit
-from .fourier import fft, fft_2d, ifft, ifft_2d
-from .interpolators import bi_linear_cut_along_curve, bi_cubic_interp_derivatives_pt, bi_cubic_interp_derivatives2_pt
-from .interpolators import bi_cubic_interp_derivatives, bi_cubic_interp_derivatives2, bi_qubic_interp, bi_qubic_cut
-from .interpolators import bi_linear_interp_derivatives2_pt, bi_linear_interp_derivatives, bi_qubic_cut_along_curve
-from .interpolators import bi_linear_interp_derivatives2, bi_linear_interp, bi_linear_cut
-from .interpolators import bi_linear_interp_pt, bi_linear_interp_derivatives_pt
+from .common import JitKernel, jit_kernels, jit_report, jit_enabled, set_jit_enabled
+import importlib as _importlib
+
+# имена, загружаемые при первом обращении: модуль -> имена
+_LAZY_MODULES = {
+    ".perspective_transform_2d": ("PerspectiveTransform2d", "perspective_transform_test"),
+    ".transform_3d": ("Transform3d", "deg_to_rad", "transform_3d_test"),
+    ".transform_2d": ("Transform2d", "transform_2d_test"),
+    ".bounding_rect": ("BoundingRect",),
+    ".bounding_box": ("BoundingBox",),
+    ".quaternion": ("Quaternion", "quaternion_4_test"),
+    ".vector4": ("Vector4", "vector_4_test"),
+    ".vector3": ("Vector3", "vector_3_test"),
+    ".vector2": ("Vector2", "vector_2_test"),
+    ".matrix4": ("Matrix4", "matrix_4_test"),
+    ".matrix3": ("Matrix3", "matrix_3_test"),
+    ".vector3_array": ("Vector3Array",),
+    ".matrix4_array": ("Matrix4Array",),
+    ".quaternion_array": ("QuaternionArray",),
+    ".camera": ("Camera",),
+    ".plane": ("Plane",),
+    ".voxel": ("Voxel",),
+    ".ray": ("Ray",),
+    ".mutils": ("dec_to_rad", "rad_to_dec", "compute_derivatives_2_at_pt", "compute_derivatives_at_pt",
+                "linear_regression", "bi_linear_regression", "n_linear_regression",
+                "compute_derivatives_2", "compute_derivatives", "compute_normals",
+                "square_equation", "clamp", "dec_to_rad_pt", "rad_to_dec_pt",
+                "second_order_surface", "quadratic_shape_fit", "poly_regression", "quadratic_regression_2d",
+                "poly_fit", "polynom"),
+    ".fourier": ("fft", "fft_2d", "ifft", "ifft_2d", "rfft", "irfft", "rfft_2d", "irfft_2d",
+                 "phase_correlation", "PhaseCorrelator"),
+    ".interpolators": ("bi_linear_cut_along_curve", "bi_cubic_interp_derivatives_pt", "bi_cubic_interp_derivatives2_pt",
+                       "bi_cubic_interp_derivatives", "bi_cubic_interp_derivatives2", "bi_qubic_interp", "bi_qubic_cut",
+                       "bi_linear_interp_derivatives2_pt", "bi_linear_interp_derivatives", "bi_qubic_cut_along_curve",
+                       "bi_linear_interp_derivatives2", "bi_linear_interp", "bi_linear_cut",
+                       "bi_linear_interp_pt", "bi_linear_interp_derivatives_pt"),
+    ".bicubic_interpolator": ("BiCubicInterpolator",),
+    ".incremental_regression": ("IncrementalLinearRegression", "IncrementalPolyRegression",
+                                "IncrementalNLinearRegression", "batch_least_squares", "windowed_linear_regression",
+                                "windowed_poly_regression", "windowed_n_linear_regression"),
+}
+
+_LAZY_ATTRIBUTES = {name: module for module, names in _LAZY_MODULES.items() for name in names}
+
+
+def __getattr__(name: str):
+    if name not in _LAZY_ATTRIBUTES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(_importlib.import_module(_LAZY_ATTRIBUTES[name], __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_ATTRIBUTES))
+
+
+import os as _os
+if _os.environ.get("UTILITIES_JIT_REPORT", "0") != "0":
+    # в отчёт попадают ядра загруженных модулей
+    for _module in _LAZY_MODULES:
+        _importlib.import_module(_module, __name__)
+    print(jit_report())
@@ -0,0 +1,307 @@
+from .interpolators import _cubic_poly
+from .vector3_array import Vector3Array, _as_xyz
+from typing import Tuple, Union
+from collections import OrderedDict
+import numpy as np
+
+
+def _derivatives_2(points: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Производные по х, по y и по xy во всех узлах сразу, те же формулы, что и в compute_derivatives_2_at_pt.
+    """
+    rows, cols = points.shape
+    row_0 = np.maximum(np.arange(rows) - 1, 0)
+    row_1 = np.minimum(np.arange(rows) + 1, rows - 1)
+    col_0 = np.maximum(np.arange(cols) - 1, 0)
+    col_1 = np.minimum(np.arange(cols) + 1, cols - 1)
+    points_dx = (points[:, col_1] - points[:, col_0]) * 0.5
+    points_dy = (points[row_1, :] - points[row_0, :]) * 0.5
+    points_dxy = (points[row_1][:, col_1] - points[row_1][:, col_0]) * 0.25 - \
+                 (points[row_0][:, col_1] - points[row_0][:, col_0]) * 0.25
+    return points_dx, points_dy, points_dxy
+
+
+def _bi_cubic_coefficients(b: np.ndarray) -> np.ndarray:
+    """
+    Коэффициенты бикубического полинома ячеек по значениям и производным в её углах.
+    :param b: массив (N, 16): значения, df/dx, df/dy, df/dx/dy в углах p00, p01, p10, p11.
+    :return: массив (N, 16) коэффициентов для _cubic_poly (формулы из bi_qubic_interp_pt).
+    """
+    b = [b[:, i] for i in range(16)]
+    c = np.empty((b[0].size, 16), dtype=float)
+    c[:, 1] = 1.0 * b[8]
+    c[:, 0] = 1.0 * b[0]
+    c[:, 2] = -3.0 * b[0] + 3.0 * b[2] - 2.0 * b[8] - 1.0 * b[10]
+    c[:, 3] = 2.0 * b[0] - 2.0 * b[2] + 1.0 * b[8] + 1.0 * b[10]
+    c[:, 4] = 1.0 * b[4]
+    c[:, 5] = 1.0 * b[12]
+    c[:, 6] = -3.0 * b[4] + 3.0 * b[6] - 2.0 * b[12] - 1.0 * b[14]
+    c[:, 7] = 2.0 * b[4] - 2.0 * b[6] + 1.0 * b[12] + 1.0 * b[14]
+    c[:, 8] = -3.0 * b[0] + 3.0 * b[1] - 2.0 * b[4] - 1.0 * b[5]
+    c[:, 9] = -3.0 * b[8] + 3.0 * b[9] - 2.0 * b[12] - 1.0 * b[13]
+    c[:, 10] = 9.0 * b[0] - 9.0 * b[1] - 9.0 * b[2] + 9.0 * b[3] + 6.0 * b[4] + 3.0 * b[5] - 6.0 * b[6] - 3.0 * b[7]\
+        + 6.0 * b[8] - 6.0 * b[9] + 3.0 * b[10] - 3.0 * b[11] + 4.0 * b[12] + 2.0 * b[13] + 2.0 * b[14] + 1.0 * b[15]
+    c[:, 11] = -6.0 * b[0] + 6.0 * b[1] + 6.0 * b[2] - 6.0 * b[3] - 4.0 * b[4] - 2.0 * b[5] + 4.0 * b[6] + 2.0 * b[7]\
+        - 3.0 * b[8] + 3.0 * b[9] - 3.0 * b[10] + 3.0 * b[11] - 2.0 * b[12] - 1.0 * b[13] - 2.0 * b[14] - 1.0 * b[15]
+    c[:, 12] = 2.0 * b[0] - 2.0 * b[1] + 1.0 * b[4] + 1.0 * b[5]
+    c[:, 13] = 2.0 * b[8] - 2.0 * b[9] + 1.0 * b[12] + 1.0 * b[13]
+    c[:, 14] = -6.0 * b[0] + 6.0 * b[1] + 6.0 * b[2] - 6.0 * b[3] - 3.0 * b[4] - 3.0 * b[5] + 3.0 * b[6] + 3.0 * b[7]\
+        - 4.0 * b[8] + 4.0 * b[9] - 2.0 * b[10] + 2.0 * b[11] - 2.0 * b[12] - 2.0 * b[13] - 1.0 * b[14] - 1.0 * b[15]
+    c[:, 15] = 4.0 * b[0] - 4.0 * b[1] - 4.0 * b[2] + 4.0 * b[3] + 2.0 * b[4] + 2.0 * b[5] - 2.0 * b[6] - 2.0 * b[7]\
+        + 2.0 * b[8] - 2.0 * b[9] + 2.0 * b[10] - 2.0 * b[11] + 1.0 * b[12] + 1.0 * b[13] + 1.0 * b[14] + 1.0 * b[15]
+    return c
+
+
+def _cubic_poly_batch(tx: np.ndarray, ty: np.ndarray, m: np.ndarray) -> np.ndarray:
+    """
+    _cubic_poly для массивов точек, m - массив (N, 16) коэффициентов ячеек этих точек.
+    """
+    ty2 = ty * ty
+    ty3 = ty2 * ty
+    tx2 = tx * tx
+    tx3 = tx2 * tx
+    return (m[:, 0] + m[:, 1] * ty + m[:, 2] * ty2 + m[:, 3] * ty3) + \
+           (m[:, 4] + m[:, 5] * ty + m[:, 6] * ty2 + m[:, 7] * ty3) * tx + \
+           (m[:, 8] + m[:, 9] * ty + m[:, 10] * ty2 + m[:, 11] * ty3) * tx2 + \
+           (m[:, 12] + m[:, 13] * ty + m[:, 14] * ty2 + m[:, 15] * ty3) * tx3
+
+
+class BiCubicInterpolator:
+    """
+    Бикубическая интерполяция по сетке узлов points на области width x height, результат совпадает
+    с bi_qubic_interp_pt. Производные в узлах считаются один раз при создании, коэффициенты полиномов ячеек
+    хранятся в массиве (rows, cols, 16) (lazy=False) или считаются по запросу и хранятся
+    в LRU кэше на cache_size ячеек (lazy=True, для больших карт высот).
+    """
+    __slots__ = ('_points', '_points_dx', '_points_dy', '_points_dxy', '_width', '_height',
+                 '_coefficients', '_cache', '_cache_size')
+
+    def __init__(self, points: np.ndarray, width: float = 1.0, height: float = 1.0,
+                 lazy: bool = False, cache_size: int = 4096):
+        points = np.asarray(points, dtype=float)
+        if points.ndim != 2:
+            raise RuntimeError("BiCubicInterpolator :: points array has to be 2 dimensional")
+        if points.shape[0] < 2 or points.shape[1] < 2:
+            raise RuntimeError("BiCubicInterpolator :: points array has to be at least 2 x 2")
+        self._points: np.ndarray = points
+        self._points_dx, self._points_dy, self._points_dxy = _derivatives_2(points)
+        self._width: float = float(width)
+        self._height: float = float(height)
+        self._cache: OrderedDict = OrderedDict()
+        self._cache_size: int = max(1, int(cache_size))
+        self._coefficients: Union[np.ndarray, None] = None
+        if not lazy:
+            rows, cols = points.shape
+            cells_rows, cells_cols = np.divmod(np.arange(points.size), cols)
+            self._coefficients = self._cells_coefficients(cells_rows, cells_cols).reshape((rows, cols, 16))
+
+    @property
+    def points(self) -> np.ndarray:
+        return self._points
+
+    @property
+    def width(self) -> float:
+        return self._width
+
+    @property
+    def height(self) -> float:
+        return self._height
+
+    @property
+    def lazy(self) -> bool:
+        return self._coefficients is None
+
+    @property
+    def derivatives(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        (df/dx, df/dy, df/dx/dy) в узлах сетки.
+        """
+        return self._points_dx, self._points_dy, self._points_dxy
+
+    @property
+    def cached_cells(self) -> int:
+        return len(self._cache)
+
+    def _cells_coefficients(self, rows_: np.ndarray, cols_: np.ndarray) -> np.ndarray:
+        rows, cols = self._points.shape
+        rows_1 = np.minimum(rows_ + 1, rows - 1)
+        cols_1 = np.minimum(cols_ + 1, cols - 1)
+        # p00____p01
+        # |       |
+        # |       |
+        # p10____p11
+        corners_rows = np.stack((rows_, rows_, rows_1, rows_1), axis=-1)
+        corners_cols = np.stack((cols_, cols_1, cols_, cols_1), axis=-1)
+        b = np.hstack((self._points    [corners_rows, corners_cols],
+                       self._points_dx [corners_rows, corners_cols],
+                       self._points_dy [corners_rows, corners_cols],
+                       self._points_dxy[corners_rows, corners_cols]))
+        return _bi_cubic_coefficients(b)
+
+    def _cells_cached(self, rows_: np.ndarray, cols_: np.ndarray) -> np.ndarray:
+        cols = self._points.shape[1]
+        cells, inverse = np.unique(rows_ * cols + cols_, return_inverse=True)
+        coefficients = np.empty((cells.size, 16), dtype=float)
+        missing = []
+        for index, cell in enumerate(cells.tolist()):
+            if cell in self._cache:
+                self._cache.move_to_end(cell)
+                coefficients[index] = self._cache[cell]
+            else:
+                missing.append(index)
+        if len(missing) != 0:
+            missing = np.array(missing)
+            missing_rows, missing_cols = np.divmod(cells[missing], cols)
+            coefficients[missing] = self._cells_coefficients(missing_rows, missing_cols)
+            for index in missing.tolist():
+                self._cache[int(cells[index])] = coefficients[index]
+            while len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
+        return coefficients[inverse.reshape(-1)]
+
+    def _cells(self, x: np.ndarray, y: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        rows, cols = self._points.shape
+        x = np.clip(x, 0.0, self._width)
+        y = np.clip(y, 0.0, self._height)
+        cols_ = ((x / self._width) * (cols - 1)).astype(int)
+        rows_ = ((y / self._height) * (rows - 1)).astype(int)
+        dx_ = self._width / (cols - 1.0)
+        dy_ = self._height / (rows - 1.0)
+        return rows_, cols_, (x - dx_ * cols_) / dx_, (y - dy_ * rows_) / dy_
+
+    def interp_pt(self, x: float, y: float) -> float:
+        """
+        Значение в точке (x, y), как bi_qubic_interp_pt(x, y, points, width, height).
+        """
+        rows_, cols_, tx, ty = self._cells(np.array([x], dtype=float), np.array([y], dtype=float))
+        if self._coefficients is None:
+            c = self._cells_cached(rows_, cols_)[0]
+        else:
+            c = self._coefficients[rows_[0], cols_[0]]
+        return float(_cubic_poly(float(tx[0]), float(ty[0]), c))
+
+    def __call__(self, x: Union[float, np.ndarray], y: Union[float, np.ndarray]) -> np.ndarray:
+        """
+        Значения в точках (x[i], y[i]), результат имеет форму x и y.
+        """
+        x, y = np.broadcast_arrays(np.asarray(x, dtype=float), np.asarray(y, dtype=float))
+        shape = x.shape
+        rows_, cols_, tx, ty = self._cells(x.reshape(-1), y.reshape(-1))
+        if self._coefficients is None:
+            c = self._cells_cached(rows_, cols_)
+        else:
+            c = self._coefficients[rows_, cols_]
+        return _cubic_poly_batch(tx, ty, c).reshape(shape)
+
+    def interp(self, x: np.ndarray, y: np.ndarray) -> np.ndarray:
+        """
+        Значения на сетке x, y, результат формы (y.size, x.size), как у bi_qubic_interp.
+        """
+        x, y = np.meshgrid(np.asarray(x, dtype=float).reshape(-1), np.asarray(y, dtype=float).reshape(-1))
+        return self(x, y)
+
+    def cut(self, x_0: float, y_0: float, x_1: float, y_1: float, steps_n: int) -> \
+            Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Сечение поверхности вдоль прямой через две точки, как bi_qubic_cut.
+        :return: (x, y, f(x, y)) точек сечения.
+        """
+        dx = x_1 - x_0
+        dy = y_1 - y_0
+        rho = dx * dx + dy * dy
+        if rho > 1e-12:
+            rho = np.sqrt(rho)
+            dx /= rho
+            dy /= rho
+        else:
+            dx = 0.0
+            dy = 0.0
+        dt = 1.0 / (steps_n - 1)
+        steps = np.arange(steps_n, dtype=float)
+        points_x = dt * dx * steps + x_0
+        points_y = dt * dy * steps + y_0
+        return points_x, points_y, self(points_x, points_y)
+
+    def cut_along_curve(self, x_pts: np.ndarray, y_pts: np.ndarray) -> np.ndarray:
+        """
+        Сечение поверхности вдоль кривой, заданной в виде массива точек, как bi_qubic_cut_along_curve.
+        """
+        n = min(x_pts.size, y_pts.size)
+        return self(x_pts[:n], y_pts[:n])
+
+    def _surface_offset(self, origins: np.ndarray, directions: np.ndarray, lengths: np.ndarray) -> np.ndarray:
+        """
+        Высота поверхности минус z точек лучей. Отрезки лучей заранее обрезаны по области карты,
+        x, y ограничиваются ей только для защиты от ошибок округления на границе.
+        """
+        if lengths.ndim == 2:
+            points = origins[:, None, :] + directions[:, None, :] * lengths[..., None]
+        else:
+            points = origins + directions * lengths[:, None]
+        x = np.clip(points[..., 0], 0.0, self._width)
+        y = np.clip(points[..., 1], 0.0, self._height)
+        return self(x, y) - points[..., 2]
+
+    @staticmethod
+    def _clip_by_slab(t_0: np.ndarray, t_1: np.ndarray, o: np.ndarray, d: np.ndarray,
+                      lo: float, hi: float) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Пересечение отрезков лучей [t_0, t_1] со слоем lo <= o + d * t <= hi по одной координате.
+        Для лучей, параллельных слою и лежащих вне его, отрезок становится пустым (t_0 > t_1).
+        """
+        parallel = d == 0.0
+        with np.errstate(divide='ignore', invalid='ignore'):
+            t_a = (lo - o) / d
+            t_b = (hi - o) / d
+        outside = parallel & ((o < lo) | (o > hi))
+        t_0 = np.where(parallel, t_0, np.maximum(t_0, np.minimum(t_a, t_b)))
+        t_1 = np.where(parallel, t_1, np.minimum(t_1, np.maximum(t_a, t_b)))
+        return t_0, np.where(outside, -np.inf, t_1)
+
+    def intersect_by_rays(self, directions: Vector3Array, origins: Vector3Array,
+                          steps: int = 64, refine: int = 20) -> np.ndarray:
+        """
+        Длины лучей до первого пересечения с картой высот z = f(x, y), x в [0, width], y в [0, height].
+        Лучи проходятся steps шагами по части луча между плоскостями минимальной и максимальной высоты карты
+        внутри области карты, пересечение - первый переход точки луча с уровня выше поверхности на уровень ниже,
+        точка пересечения уточняется делением отрезка пополам refine раз.
+        Для лучей без пересечения (в том числе вошедших в область через боковую грань ниже поверхности
+        и не пересёкших её сверху) длина nan.
+        """
+        d = _as_xyz(directions)
+        o = np.broadcast_to(_as_xyz(origins), d.shape)
+        lengths = np.full(d.shape[0], np.nan)
+        h_min, h_max = float(self._points.min()), float(self._points.max())
+        d_z = d[:, 2]
+        rays = np.flatnonzero(d_z != 0.0)
+        if rays.size == 0:
+            return lengths
+        t_top = (h_max - o[rays, 2]) / d_z[rays]
+        t_bottom = (h_min - o[rays, 2]) / d_z[rays]
+        t_0 = np.maximum(np.minimum(t_top, t_bottom), 0.0)
+        t_1 = np.maximum(t_top, t_bottom)
+        t_0, t_1 = self._clip_by_slab(t_0, t_1, o[rays, 0], d[rays, 0], 0.0, self._width)
+        t_0, t_1 = self._clip_by_slab(t_0, t_1, o[rays, 1], d[rays, 1], 0.0, self._height)
+        keep = t_1 >= t_0
+        rays, t_0, t_1 = rays[keep], t_0[keep], t_1[keep]
+        if rays.size == 0:
+            return lengths
+        d, o = d[rays], o[rays]
+
+        ts = t_0[:, None] + (t_1 - t_0)[:, None] * np.linspace(0.0, 1.0, max(2, steps))[None, :]
+        below = self._surface_offset(o, d, ts) >= 0.0
+        # переход сверху вниз между соседними отсчётами: отсчёт перед пересечением всегда внутри области
+        crossing = below[:, 1:] & ~below[:, :-1]
+        hit = crossing.any(axis=1)
+        first = np.argmax(crossing, axis=1) + 1
+        rays, ts, first, d, o = rays[hit], ts[hit], first[hit], d[hit], o[hit]
+        rows = np.arange(rays.size)
+        t_hi = ts[rows, first]
+        t_lo = ts[rows, first - 1]
+        for _ in range(refine):
+            t_mid = (t_lo + t_hi) * 0.5
+            below = self._surface_offset(o, d, t_mid) >= 0.0
+            t_hi = np.where(below, t_mid, t_hi)
+            t_lo = np.where(below, t_lo, t_mid)
+        lengths[rays] = t_hi
+        return lengths
@@ -1,10 +1,13 @@
 from .common import NUMERICAL_ACCURACY
+from .vector3_array import Vector3Array
+from typing import Tuple, Union
 from .bounding_box import BoundingBox
 from .transform_3d import Transform3d
 from .matrix4 import Matrix4
 from .vector3 import Vector3
 from .vector4 import Vector4
 from .ray import Ray
+import numpy as np
 import math
 
 PERSPECTIVE_PROJECTION_MODE = 0
@@ -13,7 +16,7 @@ ORTHOGRAPHIC_PROJECTION_MODE = 1
 
 class Camera:
     __slots__ = "_projection_mode", "_projection", "_inv_projection", "_transform",\
-                "_z_far", "_z_near", "_fov", "_aspect", "_ortho_size", "_raw_projection"
+                "_z_far", "_z_near", "_fov", "_aspect", "_ortho_size", "_raw_projection", "_rays_cache"
 
     def __init__(self):
         self._projection_mode = PERSPECTIVE_PROJECTION_MODE
@@ -26,6 +29,7 @@ class Camera:
         self._aspect: float = 10.0
         self._ortho_size: float = 10.0
         self._raw_projection = False
+        self._rays_cache = (-1, None)
         self._build_projection()
 
     def __str__(self) -> str:
@@ -243,6 +247,47 @@ class Camera:
                    self.transform.transform_vect(Vector3(x * 0.5 * self.ortho_size,
                                                          y * 0.5 * self.ortho_size / self.aspect, 0), 1.0))
 
+    def _rays_transform(self) -> np.ndarray:
+        """
+        Матрица transform в виде массива numpy (4, 4), пересчитывается только при изменении transform
+        (сравнивается счётчик изменений Transform3d.version, а не сама матрица).
+        """
+        version = self._transform.version
+        if self._rays_cache[0] != version:
+            self._rays_cache = (version, np.array(tuple(self._transform.transform_matrix)).reshape((4, 4)))
+        return self._rays_cache[1]
+
+    def emit_rays(self, x: Union[np.ndarray, float], y: Union[np.ndarray, float]) -> Tuple[Vector3Array, Vector3Array]:
+        """
+        Лучи через точки экрана (x[i], y[i]) в диапазоне [-1, 1], как emit_ray для массива координат.
+        :return: (направления, начала лучей) в мировой системе координат.
+        """
+        x = np.clip(np.asarray(x, dtype=float).reshape(-1), -1.0, 1.0)
+        y = np.clip(np.asarray(y, dtype=float).reshape(-1), -1.0, 1.0)
+        m = self._rays_transform()
+        if self.perspective_mode:
+            tan_a_half = math.tan(self.fov * 0.5 * math.pi / 180.0)
+            pt1 = np.stack((tan_a_half * x * self.z_near, tan_a_half * y / self.aspect * self.z_near,
+                            np.full(x.shape, float(self.z_near))), axis=-1)
+            pt2 = np.stack((tan_a_half * x * self.z_far,  tan_a_half * y / self.aspect * self.z_far,
+                            np.full(x.shape, float(self.z_far))), axis=-1)
+            directions = Vector3Array((pt2 - pt1) @ m[:3, :3].T).normalize()
+            return directions, Vector3Array(pt1 @ m[:3, :3].T + m[:3, 3])
+        directions = Vector3Array(np.repeat(m[None, :3, 2], x.size, axis=0)).normalize()
+        origins = np.stack((x * 0.5 * self.ortho_size, y * 0.5 * self.ortho_size / self.aspect,
+                            np.zeros(x.shape)), axis=-1)
+        return directions, Vector3Array(origins @ m[:3, :3].T + m[:3, 3])
+
+    def cast_rays(self, x: Union[np.ndarray, float], y: Union[np.ndarray, float], target) -> Vector3Array:
+        """
+        Точки пересечения лучей emit_rays(x, y) с target - Plane или картой высот BiCubicInterpolator
+        (любой объект с методом intersect_by_rays(directions, origins) -> длины лучей).
+        Для лучей без пересечения координаты точки - nan.
+        """
+        directions, origins = self.emit_rays(x, y)
+        lengths = target.intersect_by_rays(directions, origins)
+        return Vector3Array(origins.to_np_array() + directions.to_np_array() * lengths[:, None])
+
     def cast_object(self, b_box: BoundingBox) -> bool:
         for pt in b_box.points:
             pt = self.to_clip_space(pt)
@@ -1,3 +1,5 @@
+import importlib.util
+import warnings
 import inspect
 
 NUMERICAL_ACCURACY = 1e-9
@@ -24,38 +26,210 @@ def indent():
     return _indent
 
 
-def _numba_error_decorator(func):
-    def wrapped(*args, **kwargs):
+JIT_COMPILED = "compiled"
+JIT_LAZY     = "lazy"
+JIT_FALLBACK = "fallback"
+JIT_PYTHON   = "python"
+
+_JIT_KERNELS = []
+_jit_enabled = True
+
+
+def set_jit_enabled(value: bool) -> None:
+    """
+    False - все ядра вызывают исходные python функции (для сравнения и отладки).
+    """
+    global _jit_enabled
+    _jit_enabled = bool(value)
+
+
+def jit_enabled() -> bool:
+    return _jit_enabled
+
+
+def _error_message(ex: Exception) -> str:
+    return f"{type(ex).__name__}: {str(ex).splitlines()[0] if str(ex) else ''}"
+
+
+class JitKernel:
+    """
+    Ядро, компилируемое numba (cache=True - скомпилированный код сохраняется на диск и переживает перезапуск).
+    Компилируется при первом вызове: с явными сигнатурами - сразу под все сигнатуры, иначе - под типы аргументов.
+    Если numba не может скомпилировать ядро, оно один раз переключается на исходную python функцию.
+    Ошибки выполнения уже скомпилированного ядра пробрасываются как есть.
+    """
+    def __init__(self, func, options: dict, signatures: tuple):
+        self.py_func = func
+        self.options = options
+        self.signatures = signatures
+        self.status = JIT_LAZY
+        self.error = None
+        self._dispatcher = None
+        self._python_types = set()
+        self.__name__ = func.__name__
+        self.__qualname__ = func.__qualname__
+        self.__module__ = func.__module__
+        self.__doc__ = func.__doc__
+        self.__wrapped__ = func
+
+    def _get_dispatcher(self):
+        """
+        Диспетчер numba создаётся при первом вызове ядра (numba импортируется только в этот момент).
+        """
+        if self._dispatcher is None and self.status != JIT_FALLBACK:
+            try:
+                _numba = _load_numba()
+                func_globals = self.py_func.__globals__
+                if func_globals.get("parallel_range") is range:
+                    func_globals["parallel_range"] = _numba.prange
+                self._dispatcher = _numba.njit(*self.signatures, cache=True, **self.options)(self.py_func)
+                if self.signatures:
+                    self.status = JIT_COMPILED
+            except Exception as ex:
+                self._fall_back(ex)
+        return self._dispatcher
+
+    def __repr__(self):
+        return f"JitKernel({self.__module__}.{self.__qualname__}, {self.status})"
+
+    def _fall_back(self, ex: Exception) -> None:
+        self.status = JIT_FALLBACK
+        self.error = _error_message(ex)
+        self._dispatcher = None
+
+    def _arg_types(self, args: tuple):
         try:
-            return func(*args, **kwargs)
-        except Exception as e:
-            print('Exception in %s : %s' % (func.__name__, e))
-    return wrapped
-
-
-class CustomDecorator:
-
-    def __init__(self, f):
-        self.f = f
-
-    def __call__(self, cls):
-        for name, m in inspect.getmembers(cls, inspect.ismethod):
-            setattr(cls, name, self.f(m))
+            return tuple(self._dispatcher.typeof_pyval(arg) for arg in args)
+        except Exception:
+            return None
+
+    def __call__(self, *args, **kwargs):
+        if not _jit_enabled or self._get_dispatcher() is None:
+            return self.py_func(*args, **kwargs)
+        if self._python_types and self._arg_types(args) in self._python_types:
+            return self.py_func(*args, **kwargs)
+        try:
+            result = self._dispatcher(*args, **kwargs)
+        except Exception as ex:
+            # ошибки компиляции бывают не только NumbaError (например, ImportError для linalg без scipy)
+            arg_types = self._arg_types(args)
+            if not isinstance(ex, _COMPILE_ERRORS) and arg_types in self._dispatcher.overloads:
+                raise
+            if len(self._dispatcher.overloads) == 0 or arg_types is None:
+                self._fall_back(ex)
+            else:
+                # уже скомпилированные сигнатуры остаются, эти типы аргументов идут в python
+                self._python_types.add(arg_types)
+                self.error = _error_message(ex)
+            return self.py_func(*args, **kwargs)
+        self.status = JIT_COMPILED
+        return result
+
+
+class _PythonKernel:
+    """
+    Запись о ядре, оставшемся python функцией (numba не установлена).
+    """
+    status = JIT_PYTHON
+    error = None
+    signatures = ()
+
+    def __init__(self, func, options: dict):
+        self.py_func = func
+        self.options = options
+        self.__name__ = func.__name__
+        self.__qualname__ = func.__qualname__
+        self.__module__ = func.__module__
+
+
+def jit_kernels() -> list:
+    """
+    Все ядра, объявленные через fast_math и parallel, в порядке объявления.
+    """
+    return list(_JIT_KERNELS)
+
+
+def jit_report() -> str:
+    """
+    Таблица ядер: скомпилировано, ждёт первого вызова, в python fallback (с причиной) или numba нет.
+    """
+    rows = [f"|{'kernel':72}|{'mode':10}|{'status':9}|"]
+    for kernel in _JIT_KERNELS:
+        mode = "parallel" if kernel.options.get("parallel", False) else "fast_math"
+        row = f"|{kernel.__module__ + '.' + kernel.__qualname__:72}|{mode:10}|{kernel.status:9}|"
+        rows.append(row if kernel.error is None else f"{row} {kernel.error}")
+    statuses = [kernel.status for kernel in _JIT_KERNELS]
+    rows.append(", ".join(f"{status}: {statuses.count(status)}"
+                          for status in (JIT_COMPILED, JIT_LAZY, JIT_FALLBACK, JIT_PYTHON)))
+    return "\n".join(rows)
+
+
+class JitDecorator:
+    """
+    @fast_math - ленивая компиляция при первом вызове.\n
+    @fast_math("float64(float64, float64)", ...) - компиляция сразу под указанные сигнатуры.\n
+    Для класса декорируются его статические методы.
+    """
+    def __init__(self, **options):
+        self.options = options
+
+    def _wrap(self, func, signatures: tuple):
+        if not _NUMBA_AVAILABLE:
+            _JIT_KERNELS.append(_PythonKernel(func, self.options))
+            return func
+        kernel = JitKernel(func, self.options, signatures)
+        _JIT_KERNELS.append(kernel)
+        return kernel
+
+    def _wrap_class(self, cls, signatures: tuple):
+        for name, member in list(vars(cls).items()):
+            if isinstance(member, staticmethod):
+                setattr(cls, name, staticmethod(self._wrap(member.__func__, signatures)))
         return cls
 
-
-parallel_range = None
-fast_math      = None
-parallel       = None
-
-
-try:
-    import numba
-    parallel_range = numba.prange
-    fast_math      = CustomDecorator(numba.njit(fastmath=True))
-    parallel       = CustomDecorator(numba.njit(parallel=True, fastmath=True))
-except ImportError as err:
-    parallel_range = range
-    fast_math      = CustomDecorator(_numba_error_decorator)
-    parallel       = CustomDecorator(_numba_error_decorator)
-    print(f"ImportError:: {err}")
+    def __call__(self, *signatures):
+        if len(signatures) == 1 and inspect.isclass(signatures[0]):
+            return self._wrap_class(signatures[0], ())
+        if len(signatures) == 1 and inspect.isfunction(signatures[0]):
+            return self._wrap(signatures[0], ())
+
+        def decorator(obj):
+            if inspect.isclass(obj):
+                return self._wrap_class(obj, signatures)
+            return self._wrap(obj, signatures)
+        return decorator
+
+
+parallel_range = range
+fast_math      = JitDecorator(fastmath=True)
+parallel       = JitDecorator(parallel=True, fastmath=True)
+
+numba = None
+_COMPILE_ERRORS = ()
+_NUMBA_AVAILABLE = importlib.util.find_spec("numba") is not None
+if not _NUMBA_AVAILABLE:
+    # ImportWarning по умолчанию не выводится, виден с -W default
+    warnings.warn("numba is not installed, jit kernels run as plain python functions", ImportWarning)
+
+
+def _load_numba():
+    """
+    Импорт numba при первом вызове ядра, а не при импорте модулей с ядрами.
+    """
+    global numba, _COMPILE_ERRORS
+    if numba is not None:
+        return numba
+    import numba as _numba
+    from numba.core.errors import NumbaError, UnsupportedBytecodeError
+    from numba.extending import typeof_impl
+
+    @typeof_impl.register(JitKernel)
+    def _typeof_jit_kernel(val, c):
+        # ядро, вызываемое из другого ядра, видно numba как его диспетчер
+        if val._get_dispatcher() is None:
+            raise ValueError(f"{val.__qualname__} is not compiled")
+        return _numba.typeof(val._dispatcher)
+
+    _COMPILE_ERRORS = (NumbaError, UnsupportedBytecodeError)
+    numba = _numba
+    return numba
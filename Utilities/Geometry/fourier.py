@@ -1,120 +1,274 @@
-from .common import parallel, parallel_range, fast_math
-import matplotlib.pyplot as plt
-from typing import Tuple
+from typing import Dict, List, Tuple, Union
 import numpy as np
 
+# размер -> (перестановка бит-реверса, поворотные множители стадий)
+_FFT_PLANS: Dict[int, Tuple[np.ndarray, List[np.ndarray]]] = {}
+# размер -> поворотные множители сборки спектра вещественного сигнала
+_RFFT_TWIDDLES: Dict[int, np.ndarray] = {}
+# форма -> двумерное окно Ханна
+_WINDOWS: Dict[Tuple[int, int], np.ndarray] = {}
+
 
-@fast_math
 def _pow_of_2(values: Tuple[int, ...]) -> Tuple[int, ...]:
     return tuple(2 ** int(np.log2(v)) for v in values)
 
 
-@fast_math
 def _array_to_pow_2_size(array: np.ndarray) -> np.ndarray:
-    pow_of_2_size = _pow_of_2((array.size,))
-    if pow_of_2_size == array.size:
+    pow_of_2_size, = _pow_of_2((array.shape[-1],))
+    if pow_of_2_size == array.shape[-1]:
         return array
-    return array[:pow_of_2_size[0]]
+    return array[..., :pow_of_2_size]
 
 
-@fast_math
 def _img_to_pow_2_size(img: np.ndarray) -> np.ndarray:
+    """
+    Центральная часть изображения с размерами степени двойки.
+    """
     if img.ndim < 2:
         raise RuntimeError("img_to_pow_2_size:: image has to be 2-dimensional, but 1-dimensional was given...")
-    rows, cols = img.shape
-    rows2, cols2 = _pow_of_2(rows, cols)
+    rows, cols = img.shape[0], img.shape[1]
+    rows2, cols2 = _pow_of_2((rows, cols))
     if rows == rows2 and cols2 == cols:
         return img
     return _img_crop(img, ((rows - rows2) >> 1, (rows + rows2) >> 1),
                      ((cols - cols2) >> 1, (cols + cols2) >> 1))
 
 
-@fast_math
-def _img_crop(img: np.ndarray, rows_bound: Tuple[float, float], cols_bound: Tuple[float, float]) -> np.ndarray:
+def _img_crop(img: np.ndarray, rows_bound: Tuple[int, int], cols_bound: Tuple[int, int]) -> np.ndarray:
     if img.ndim < 2:
         raise RuntimeError("img_crop:: image has to be 2-dimensional, but 1-dimensional was given...")
-    rows, cols, _ = img.shape
+    rows, cols = img.shape[0], img.shape[1]
     x_min = max(cols_bound[0], 0)
-    x_max = max(cols_bound[0], cols)
-    y_min = max(rows_bound[1], 0)
-    y_max = max(rows_bound[1], rows)
-    return img[y_min: y_max, x_min: x_max, :]
-
-
-@fast_math
-def _fast_fourier_transform(sequence: np.ndarray) -> None:
-    _n = sequence.size
-    _k = _n
-    theta_t = 3.14159265358979323846264338328 / _n
-    phi_t = complex(np.cos(theta_t), -np.sin(theta_t))
-    while _k > 1:
-        _t_n = _k
-        _k >>= 1
-        phi_t = phi_t * phi_t
-        _t = 1.0
-        for _l in range(0, _k):
-            for a in range(_l, _n, _t_n):
-                b = a + _k
-                t = sequence[a] - sequence[b]
-                sequence[a] += sequence[b]
-                sequence[b] = t * _t
-            _t *= phi_t
-    _m = int(np.log2(_n))
-    for a in range(_n):
-        b = a
-        b = (((b & 0xaaaaaaaa) >> 1) | ((b & 0x55555555) << 1))
-        b = (((b & 0xcccccccc) >> 2) | ((b & 0x33333333) << 2))
-        b = (((b & 0xf0f0f0f0) >> 4) | ((b & 0x0f0f0f0f) << 4))
-        b = (((b & 0xff00ff00) >> 8) | ((b & 0x00ff00ff) << 8))
-        b = ((b >> 16) | (b << 16)) >> (32 - _m)
-        if b > a:
-            t = sequence[a]
-            sequence[a] = sequence[b]
-            sequence[b] = t
-
-
-@fast_math
+    x_max = min(cols_bound[1], cols)
+    y_min = max(rows_bound[0], 0)
+    y_max = min(rows_bound[1], rows)
+    return img[y_min: y_max, x_min: x_max, ...]
+
+
+def _fft_plan(n: int) -> Tuple[np.ndarray, List[np.ndarray]]:
+    """
+    Перестановка бит-реверса и поворотные множители exp(-2pi i k / m) всех стадий для размера n,
+    считаются один раз на размер.
+    """
+    if n in _FFT_PLANS:
+        return _FFT_PLANS[n]
+    bits = int(np.log2(n))
+    indices = np.arange(n)
+    reverse = np.zeros(n, dtype=int)
+    for bit in range(bits):
+        reverse |= ((indices >> bit) & 1) << (bits - 1 - bit)
+    twiddles = []
+    half = 1
+    while half < n:
+        twiddles.append(np.exp(-1j * np.pi * np.arange(half) / half))
+        half <<= 1
+    _FFT_PLANS[n] = (reverse, twiddles)
+    return _FFT_PLANS[n]
+
+
+def _rfft_twiddles(n: int) -> np.ndarray:
+    if n not in _RFFT_TWIDDLES:
+        _RFFT_TWIDDLES[n] = np.exp(-2j * np.pi * np.arange(n // 2 + 1) / n)
+    return _RFFT_TWIDDLES[n]
+
+
+def _fft_batch(x: np.ndarray) -> np.ndarray:
+    """
+    Радикс-2 БПФ вдоль последней оси, бабочки каждой стадии считаются сразу для всех строк.
+    :param x: комплексный массив (..., n), n - степень двойки.
+    """
+    shape = x.shape
+    n = shape[-1]
+    if n == 1:
+        return x.astype(complex)
+    reverse, twiddles = _fft_plan(n)
+    x = x.reshape((-1, n))[:, reverse].astype(complex)
+    batch = x.shape[0]
+    half = 1
+    for twiddle in twiddles:
+        x = x.reshape((batch, n // (2 * half), 2, half))
+        even = x[:, :, 0, :]
+        odd = x[:, :, 1, :] * twiddle
+        x = np.concatenate((even + odd, even - odd), axis=-1)
+        half <<= 1
+    return x.reshape(shape)
+
+
+def _ifft_batch(x: np.ndarray) -> np.ndarray:
+    return _fft_batch(x.conjugate()).conjugate() / x.shape[-1]
+
+
+def _rfft_batch(x: np.ndarray) -> np.ndarray:
+    """
+    БПФ вещественного сигнала вдоль последней оси через комплексное БПФ половинной длины.
+    :param x: вещественный массив (..., n), n - степень двойки.
+    :return: комплексный массив (..., n / 2 + 1) неотрицательных частот.
+    """
+    n = x.shape[-1]
+    if n < 2:
+        return x.astype(complex)
+    z = _fft_batch(x[..., 0::2] + 1j * x[..., 1::2])
+    z = np.concatenate((z, z[..., :1]), axis=-1)
+    z_conj = z[..., ::-1].conjugate()
+    # спектры чётных и нечётных отсчётов
+    even = (z + z_conj) * 0.5
+    odd = (z - z_conj) * -0.5j
+    return even + _rfft_twiddles(n) * odd
+
+
+def _irfft_batch(x: np.ndarray) -> np.ndarray:
+    """
+    Обратное к _rfft_batch, x - комплексный массив (..., n / 2 + 1).
+    """
+    n = 2 * (x.shape[-1] - 1)
+    if n < 2:
+        return x.real.copy()
+    x_conj = x[..., ::-1].conjugate()
+    even = (x + x_conj) * 0.5
+    odd = (x - x_conj) * 0.5 * _rfft_twiddles(n).conjugate()
+    z = _ifft_batch((even + 1j * odd)[..., :-1])
+    result = np.empty(x.shape[:-1] + (n,), dtype=float)
+    result[..., 0::2] = z.real
+    result[..., 1::2] = z.imag
+    return result
+
+
 def fft(x: np.ndarray, do_copy: bool = True) -> np.ndarray:
-    _x = _array_to_pow_2_size(x).copy() if do_copy else _array_to_pow_2_size(x)
-    _fast_fourier_transform(_x)
-    return _x
+    """
+    БПФ последовательности, длина обрезается до степени двойки.
+    do_copy оставлен для совместимости, результат всегда новый массив.
+    """
+    return _fft_batch(_array_to_pow_2_size(np.asarray(x)))
 
 
-@fast_math
 def ifft(x: np.ndarray, do_copy: bool = True) -> np.ndarray:
-    _x = _array_to_pow_2_size(x).copy() if do_copy else _array_to_pow_2_size(x)
-    _x = _x.conjugate()
-    _fast_fourier_transform(_x)
-    _x = _x.conjugate()
-    _x /= _x.size
-    return _x
+    return _ifft_batch(_array_to_pow_2_size(np.asarray(x)))
+
+
+def rfft(x: np.ndarray) -> np.ndarray:
+    """
+    БПФ вещественной последовательности, только n / 2 + 1 неотрицательных частот.
+    """
+    return _rfft_batch(_array_to_pow_2_size(np.asarray(x, dtype=float)))
+
+
+def irfft(x: np.ndarray) -> np.ndarray:
+    """
+    Вещественная последовательность длины 2 * (x.size - 1) по спектру из rfft.
+    """
+    return _irfft_batch(np.asarray(x, dtype=complex))
 
 
-@parallel
 def fft_2d(x: np.ndarray, do_copy: bool = True) -> np.ndarray:
     if x.ndim != 2:
         raise ValueError("fft2 :: x.ndim != 2")
-    _x = _img_to_pow_2_size(x.copy()) if do_copy else _img_to_pow_2_size(x)
-    for i in parallel_range(_x.shape[0]):
-        _x[i, :] = fft(_x[i, :])
-    for i in parallel_range(_x.shape[1]):
-        _x[:, i] = fft(_x[:, i])
-    return _x
+    _x = _fft_batch(_img_to_pow_2_size(x))
+    return _fft_batch(_x.T).T
 
 
-@parallel
 def ifft_2d(x: np.ndarray, do_copy: bool = True) -> np.ndarray:
     if x.ndim != 2:
         raise ValueError("fft2 :: x.ndim != 2")
-    _x = x.copy() if do_copy else x
-    for i in parallel_range(_x.shape[0]):
-        _x[i, :] = ifft(_x[i, :])
-    for i in parallel_range(_x.shape[1]):
-        _x[:, i] = ifft(_x[:, i])
-    return _x
+    _x = _ifft_batch(_img_to_pow_2_size(x))
+    return _ifft_batch(_x.T).T
+
+
+def rfft_2d(x: np.ndarray) -> np.ndarray:
+    """
+    Двумерное БПФ вещественного изображения, результат (rows, cols / 2 + 1).
+    """
+    if x.ndim != 2:
+        raise ValueError("rfft_2d :: x.ndim != 2")
+    _x = _rfft_batch(_img_to_pow_2_size(np.asarray(x, dtype=float)))
+    return _fft_batch(_x.T).T
+
+
+def irfft_2d(x: np.ndarray) -> np.ndarray:
+    if x.ndim != 2:
+        raise ValueError("irfft_2d :: x.ndim != 2")
+    return _irfft_batch(_ifft_batch(np.asarray(x, dtype=complex).T).T)
+
+
+def _hann_window(shape: Tuple[int, int]) -> np.ndarray:
+    if shape not in _WINDOWS:
+        _WINDOWS[shape] = np.outer(np.hanning(shape[0]), np.hanning(shape[1]))
+    return _WINDOWS[shape]
+
+
+def _gray_pow_2(frame: np.ndarray) -> np.ndarray:
+    frame = np.asarray(frame, dtype=float)
+    if frame.ndim == 3:
+        frame = frame.mean(axis=-1)
+    if frame.ndim != 2:
+        raise RuntimeError(f"phase_correlation :: expected 2 or 3 dimensional frame, got {frame.ndim}")
+    return _img_to_pow_2_size(frame)
+
+
+def _frame_spectrum(frame: np.ndarray, window: bool) -> np.ndarray:
+    frame = _gray_pow_2(frame)
+    frame = frame - frame.mean()
+    return rfft_2d(frame * _hann_window(frame.shape) if window else frame)
+
+
+def _subpixel_offset(v_m: float, v_0: float, v_p: float) -> float:
+    # вершина параболы через три соседних значения
+    denominator = v_m - 2.0 * v_0 + v_p
+    return 0.0 if abs(denominator) < 1e-12 else 0.5 * (v_m - v_p) / denominator
+
+
+def _correlation_peak(spectrum_0: np.ndarray, spectrum_1: np.ndarray) -> Tuple[float, float, float]:
+    cross = spectrum_1 * spectrum_0.conjugate()
+    cross /= np.maximum(np.abs(cross), 1e-12)
+    surface = irfft_2d(cross)
+    rows, cols = surface.shape
+    row, col = np.unravel_index(int(np.argmax(surface)), surface.shape)
+    response = float(surface[row, col])
+    d_row = _subpixel_offset(surface[row - 1, col], response, surface[(row + 1) % rows, col])
+    d_col = _subpixel_offset(surface[row, col - 1], response, surface[row, (col + 1) % cols])
+    # сдвиги больше половины размера соответствуют отрицательным
+    row = row - rows if row > rows // 2 else row
+    col = col - cols if col > cols // 2 else col
+    return float(col + d_col), float(row + d_row), response
+
+
+def phase_correlation(frame_0: np.ndarray, frame_1: np.ndarray, window: bool = True) -> Tuple[float, float, float]:
+    """
+    Оценка сдвига frame_1 относительно frame_0 фазовой корреляцией. Кадры обрезаются до размеров степени двойки
+    (центральная часть), цветные переводятся в оттенки серого.
+    :param window: умножать кадры на окно Ханна (уменьшает влияние краёв).
+    :return: (dx, dy, response), dx, dy - сдвиг в пикселях (с субпиксельным уточнением),
+    response - высота пика корреляции (1.0 для чистого циклического сдвига).
+    """
+    return _correlation_peak(_frame_spectrum(frame_0, window), _frame_spectrum(frame_1, window))
+
+
+class PhaseCorrelator:
+    """
+    Фазовая корреляция последовательных кадров, спектр предыдущего кадра хранится и повторно не считается.
+    """
+    __slots__ = ('_window', '_spectrum')
+
+    def __init__(self, window: bool = True):
+        self._window: bool = window
+        self._spectrum: Union[np.ndarray, None] = None
+
+    def reset(self) -> None:
+        self._spectrum = None
+
+    def update(self, frame: np.ndarray) -> Union[Tuple[float, float, float], None]:
+        """
+        :return: (dx, dy, response) сдвига frame относительно предыдущего кадра или None для первого кадра
+        или кадра другого размера.
+        """
+        spectrum = _frame_spectrum(frame, self._window)
+        previous, self._spectrum = self._spectrum, spectrum
+        if previous is None or previous.shape != spectrum.shape:
+            return None
+        return _correlation_peak(previous, spectrum)
 
 
 if __name__ == "__main__":
+    import matplotlib.pyplot as plt
     x = np.sin(np.linspace(0, 2, 16))
     x_ft = fft(x)
     plt.plot(np.real(ifft(x_ft)), 'r')
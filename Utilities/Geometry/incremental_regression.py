@@ -0,0 +1,385 @@
+from numpy.lib.stride_tricks import sliding_window_view
+from numpy.linalg import LinAlgError
+from typing import Tuple, Union
+import numpy as np
+
+
+def _check_estimator_args(class_name: str, window: int, forgetting: float) -> None:
+    if window < 0:
+        raise RuntimeError(f"{class_name} :: window must be non negative, got {window}")
+    if not 0.0 < forgetting <= 1.0:
+        raise RuntimeError(f"{class_name} :: forgetting factor must be in (0, 1], got {forgetting}")
+
+
+class IncrementalLinearRegression:
+    """
+    Линейная регрессия y = k * x + b, суммы Σx, Σy, Σxy, Σxx обновляются за O(1) на отсчёт.
+    window > 0 - скользящее окно последних window отсчётов (вытесняемый отсчёт вычитается из сумм),
+    forgetting < 1 - экспоненциальное забывание, вес отсчёта возрастом a равен forgetting^a.
+    x отсчитываются от первого x, это уменьшает потерю точности в суммах для больших x (например, времени).
+    Суммы окна раз в window вытеснений пересчитываются заново, ошибка округления не накапливается.
+    """
+    __slots__ = ('_window', '_forgetting', '_evicted_weight', '_x_0', '_n', '_sum_x', '_sum_y', '_sum_xy',
+                 '_sum_xx', '_xs', '_ys', '_head', '_evictions')
+
+    def __init__(self, window: int = 0, forgetting: float = 1.0):
+        _check_estimator_args("IncrementalLinearRegression", window, forgetting)
+        self._window: int = window
+        self._forgetting: float = forgetting
+        # вес вытесняемого из окна отсчёта к моменту вытеснения: вычитание идёт до умножения сумм на forgetting
+        self._evicted_weight: float = forgetting ** (window - 1) if window else 0.0
+        self._xs: list = [0.0] * window
+        self._ys: list = [0.0] * window
+        self.reset()
+
+    def __call__(self, x: float, y: float) -> float:
+        return self.update(x, y)
+
+    def reset(self) -> None:
+        self._x_0: Union[float, None] = None
+        self._n: float = 0.0
+        self._sum_x: float = 0.0
+        self._sum_y: float = 0.0
+        self._sum_xy: float = 0.0
+        self._sum_xx: float = 0.0
+        self._head: int = 0
+        self._evictions: int = 0
+
+    @property
+    def window(self) -> int:
+        return self._window
+
+    @property
+    def forgetting(self) -> float:
+        return self._forgetting
+
+    @property
+    def n_points(self) -> int:
+        """
+        Число отсчётов в оценке (для окна - не больше window).
+        """
+        return min(self._head, self._window) if self._window else self._head
+
+    @property
+    def weight(self) -> float:
+        """
+        Сумма весов отсчётов (равна n_points без забывания).
+        """
+        return self._n
+
+    def _recompute(self) -> None:
+        n = self.n_points
+        # начало отсчёта x переносится на самый старый отсчёт окна
+        shift = self._xs[(self._head - n) % self._window]
+        self._x_0 += shift
+        self._n = self._sum_x = self._sum_y = self._sum_xy = self._sum_xx = 0.0
+        for age in range(n - 1, -1, -1):
+            index = (self._head - 1 - age) % self._window
+            self._xs[index] -= shift
+            self._accumulate(self._xs[index], self._ys[index])
+
+    def _accumulate(self, x: float, y: float) -> None:
+        f = self._forgetting
+        self._n = self._n * f + 1.0
+        self._sum_x = self._sum_x * f + x
+        self._sum_y = self._sum_y * f + y
+        self._sum_xy = self._sum_xy * f + x * y
+        self._sum_xx = self._sum_xx * f + x * x
+
+    def update(self, x: float, y: float) -> float:
+        """
+        Добавляет отсчёт (x, y).
+        :return: значение регрессии в точке x (y, пока отсчётов меньше двух).
+        """
+        if self._x_0 is None:
+            self._x_0 = x
+        x_value, x = x, x - self._x_0
+        if self._window:
+            index = self._head % self._window
+            if self._head >= self._window:
+                x_old, y_old = self._xs[index], self._ys[index]
+                w = self._evicted_weight
+                self._n -= w
+                self._sum_x -= w * x_old
+                self._sum_y -= w * y_old
+                self._sum_xy -= w * x_old * y_old
+                self._sum_xx -= w * x_old * x_old
+                self._evictions += 1
+            self._xs[index], self._ys[index] = x, y
+        self._head += 1
+        self._accumulate(x, y)
+        if self._window and self._evictions >= self._window:
+            self._evictions = 0
+            self._recompute()
+        if self.n_points < 2:
+            return y
+        k, b = self._solve()
+        return k * (x_value - self._x_0) + b
+
+    def _solve(self) -> Tuple[float, float]:
+        # в координатах со сдвигом x_0
+        det = self._sum_xx * self._n - self._sum_x * self._sum_x
+        if abs(det) <= 1e-12 * max(self._sum_xx * self._n, 1e-300):
+            return 0.0, self._sum_y / self._n if self._n > 0.0 else 0.0
+        k = (self._sum_xy * self._n - self._sum_x * self._sum_y) / det
+        return k, (self._sum_y - k * self._sum_x) / self._n
+
+    @property
+    def coefficients(self) -> Tuple[float, float]:
+        """
+        (k, b), как у linear_regression. Без отсчётов (0, 0).
+        """
+        if self._x_0 is None:
+            return 0.0, 0.0
+        k, b = self._solve()
+        return k, b - k * self._x_0
+
+    def predict(self, x: Union[float, np.ndarray]) -> Union[float, np.ndarray]:
+        k, b = self.coefficients
+        return k * x + b
+
+
+class _IncrementalLeastSquares:
+    """
+    Взвешенный МНК по признакам f: A = Σw f f^T, c = Σw f y обновляются за O(n_features^2) на отсчёт,
+    коэффициенты - решение A b = c. Окно и забывание как у IncrementalLinearRegression.
+    """
+    __slots__ = ('_window', '_forgetting', '_evicted_weight', '_a', '_c', '_features', '_targets', '_head',
+                 '_evictions', '_solution')
+
+    def __init__(self, n_features: int, window: int = 0, forgetting: float = 1.0):
+        _check_estimator_args(type(self).__name__, window, forgetting)
+        self._window: int = window
+        self._forgetting: float = forgetting
+        self._evicted_weight: float = forgetting ** (window - 1) if window else 0.0
+        self._a: np.ndarray = np.zeros((n_features, n_features), dtype=float)
+        self._c: np.ndarray = np.zeros(n_features, dtype=float)
+        self._features: np.ndarray = np.zeros((window, n_features), dtype=float)
+        self._targets: np.ndarray = np.zeros(window, dtype=float)
+        self.reset()
+
+    def reset(self) -> None:
+        self._a[...] = 0.0
+        self._c[...] = 0.0
+        self._head: int = 0
+        self._evictions: int = 0
+        self._solution: Union[np.ndarray, None] = None
+
+    @property
+    def window(self) -> int:
+        return self._window
+
+    @property
+    def forgetting(self) -> float:
+        return self._forgetting
+
+    @property
+    def n_points(self) -> int:
+        return min(self._head, self._window) if self._window else self._head
+
+    def _recompute(self) -> None:
+        n = self.n_points
+        indices = (self._head - n + np.arange(n)) % self._window
+        features, targets = self._features[indices], self._targets[indices]
+        weights = self._forgetting ** np.arange(n - 1, -1, -1, dtype=float)
+        self._a[...] = (features * weights[:, None]).T @ features
+        self._c[...] = (features * weights[:, None]).T @ targets
+
+    def _update(self, features: np.ndarray, target: float) -> None:
+        if self._window:
+            index = self._head % self._window
+            if self._head >= self._window:
+                f_old = self._features[index]
+                w = self._evicted_weight
+                self._a -= w * np.outer(f_old, f_old)
+                self._c -= (w * self._targets[index]) * f_old
+                self._evictions += 1
+            self._features[index] = features
+            self._targets[index] = target
+        self._head += 1
+        if self._forgetting != 1.0:
+            self._a *= self._forgetting
+            self._c *= self._forgetting
+        self._a += np.outer(features, features)
+        self._c += target * features
+        if self._window and self._evictions >= self._window:
+            self._evictions = 0
+            self._recompute()
+        self._solution = None
+
+    @property
+    def coefficients(self) -> np.ndarray:
+        """
+        Решение нормальных уравнений, при вырожденной матрице - решение минимальной нормы.
+        """
+        if self._solution is None:
+            try:
+                self._solution = np.linalg.solve(self._a, self._c)
+            except LinAlgError:
+                self._solution = np.linalg.lstsq(self._a, self._c, rcond=None)[0]
+        return self._solution
+
+
+class IncrementalPolyRegression(_IncrementalLeastSquares):
+    """
+    Полиномиальная регрессия y = Σ_j x^j * bj, j < order, коэффициенты как у poly_regression.
+    Как и в IncrementalLinearRegression, степени считаются от x - x_0 (x_0 - первый x, при пересчёте окна -
+    самый старый отсчёт окна), иначе для x порядка времени в секундах матрица нормальных уравнений вырождена.
+    """
+    __slots__ = ('_order', '_powers', '_x_0')
+
+    def __init__(self, order: int = 5, window: int = 0, forgetting: float = 1.0):
+        if order < 1:
+            raise RuntimeError(f"IncrementalPolyRegression :: order must be positive, got {order}")
+        self._order: int = order
+        self._powers: np.ndarray = np.arange(order)
+        super().__init__(order, window, forgetting)
+
+    def __call__(self, x: float, y: float) -> float:
+        return self.update(x, y)
+
+    def reset(self) -> None:
+        super().reset()
+        self._x_0: Union[float, None] = None
+
+    @property
+    def order(self) -> int:
+        return self._order
+
+    def _recompute(self) -> None:
+        if self._order > 1:
+            # начало отсчёта x переносится на самый старый отсчёт окна, x - x_0 хранится в столбце степени 1
+            n = self.n_points
+            shift = self._features[(self._head - n) % self._window, 1]
+            self._x_0 += shift
+            self._features[...] = (self._features[:, 1:2] - shift) ** self._powers
+        super()._recompute()
+
+    def update(self, x: float, y: float) -> float:
+        """
+        :return: значение регрессии в точке x (y, пока отсчётов меньше order).
+        """
+        if self._x_0 is None:
+            self._x_0 = float(x)
+        self._update((float(x) - self._x_0) ** self._powers, y)
+        if self.n_points < self._order:
+            return y
+        return float(self.predict(x))
+
+    @property
+    def coefficients(self) -> np.ndarray:
+        """
+        Коэффициенты bj относительно x (не x - x_0), как у poly_regression.
+        """
+        if self._x_0 is None:
+            return np.zeros(self._order, dtype=float)
+        raw = np.polynomial.Polynomial(super().coefficients)(np.polynomial.Polynomial((-self._x_0, 1.0))).coef
+        b = np.zeros(self._order, dtype=float)
+        b[:raw.size] = raw[:self._order]
+        return b
+
+    def predict(self, x: Union[float, np.ndarray]) -> Union[float, np.ndarray]:
+        # схема Горнера по x - x_0
+        if self._x_0 is None:
+            return np.zeros_like(x, dtype=float)
+        b = super().coefficients
+        x = np.asarray(x, dtype=float) - self._x_0
+        result = np.zeros_like(x, dtype=float) + b[-1]
+        for bj in b[-2::-1]:
+            result = result * x + bj
+        return result
+
+
+class IncrementalNLinearRegression(_IncrementalLeastSquares):
+    """
+    Регрессия f = Σ ki * xi + b по строкам [x_0, ..., x_n-1, f], коэффициенты [k_0, ..., k_n-1, b]
+    как у n_linear_regression.
+    """
+    __slots__ = ()
+
+    def __init__(self, n_dimension: int, window: int = 0, forgetting: float = 1.0):
+        if n_dimension < 2:
+            raise RuntimeError(f"IncrementalNLinearRegression :: row has to contain at least one argument and value,"
+                               f" got dimension {n_dimension}")
+        super().__init__(n_dimension, window, forgetting)
+
+    def update(self, row: np.ndarray) -> None:
+        features = np.ones(self._c.size, dtype=float)
+        features[:-1] = row[:-1]
+        self._update(features, float(row[-1]))
+
+    def predict(self, args: np.ndarray) -> Union[float, np.ndarray]:
+        """
+        :param args: аргументы [x_0, ..., x_n-1] или массив строк аргументов (N, n).
+        """
+        b = self.coefficients
+        return np.asarray(args, dtype=float) @ b[:-1] + b[-1]
+
+
+def batch_least_squares(design: np.ndarray, targets: np.ndarray) -> np.ndarray:
+    """
+    Независимые задачи МНК design[i] @ b[i] = targets[i] одним вызовом.
+    np.linalg.lstsq не принимает стопки матриц, псевдообратная по стопке даёт то же решение минимальной нормы.
+    :param design: (W, m, n) матрицы плана.
+    :param targets: (W, m) значения.
+    :return: (W, n) коэффициенты.
+    """
+    design = np.asarray(design, dtype=float)
+    targets = np.asarray(targets, dtype=float)
+    if design.ndim != 3 or targets.shape != design.shape[:2]:
+        raise RuntimeError(f"batch_least_squares :: expected design (W, m, n) and targets (W, m), "
+                           f"got {design.shape} and {targets.shape}")
+    return np.einsum('wnm,wm->wn', np.linalg.pinv(design), targets)
+
+
+def _windows(values: np.ndarray, window: int, step: int, func_name: str) -> np.ndarray:
+    if window < 2 or step < 1:
+        raise RuntimeError(f"{func_name} :: window must be at least 2 and step positive, got {window}, {step}")
+    if values.shape[0] < window:
+        raise RuntimeError(f"{func_name} :: log of {values.shape[0]} samples is shorter than window {window}")
+    # (W, ..., window) -> (W, window, ...)
+    return np.moveaxis(sliding_window_view(values, window, axis=0)[::step], -1, 1)
+
+
+def windowed_linear_regression(x: np.ndarray, y: np.ndarray, window: int, step: int = 1) -> \
+        Tuple[np.ndarray, np.ndarray]:
+    """
+    linear_regression для всех окон x[i * step: i * step + window] лога сразу.
+    :return: массивы (k, b) по окнам.
+    """
+    assert x.size == y.size, "windowed_linear_regression::error::x.size != y.size"
+    xs = _windows(np.asarray(x, dtype=float), window, step, "windowed_linear_regression")
+    ys = _windows(np.asarray(y, dtype=float), window, step, "windowed_linear_regression")
+    # отсчёт x от начала окна, как в IncrementalLinearRegression
+    x_0 = xs[:, :1]
+    xs = xs - x_0
+    sum_x, sum_y = xs.sum(axis=1), ys.sum(axis=1)
+    sum_xy, sum_xx = (xs * ys).sum(axis=1), (xs * xs).sum(axis=1)
+    det = sum_xx * window - sum_x * sum_x
+    with np.errstate(divide='ignore', invalid='ignore'):
+        k = np.where(det != 0.0, (sum_xy * window - sum_x * sum_y) / det, 0.0)
+    return k, (sum_y - k * sum_x) / window - k * x_0[:, 0]
+
+
+def windowed_poly_regression(x: np.ndarray, y: np.ndarray, window: int, order: int = 5, step: int = 1) -> \
+        np.ndarray:
+    """
+    poly_regression для всех окон лога сразу.
+    :return: (W, order) коэффициенты bj полиномов y = Σx^j*bj по окнам.
+    """
+    assert x.size == y.size, "windowed_poly_regression::error::x.size != y.size"
+    xs = _windows(np.asarray(x, dtype=float), window, step, "windowed_poly_regression")
+    ys = _windows(np.asarray(y, dtype=float), window, step, "windowed_poly_regression")
+    return batch_least_squares(xs[..., None] ** np.arange(order), ys)
+
+
+def windowed_n_linear_regression(data_rows: np.ndarray, window: int, step: int = 1) -> np.ndarray:
+    """
+    n_linear_regression для всех окон строк [x_0, ..., x_n-1, f] сразу.
+    :return: (W, n + 1) коэффициенты [k_0, ..., k_n-1, b] по окнам.
+    """
+    assert data_rows.ndim == 2, "windowed_n_linear_regression::error::data_rows.ndim != 2"
+    rows = _windows(np.asarray(data_rows, dtype=float), window, step, "windowed_n_linear_regression")
+    design = np.ones(rows.shape, dtype=float)
+    design[..., :-1] = rows[..., :-1]
+    return batch_least_squares(design, rows[..., -1])
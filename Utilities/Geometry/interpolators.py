@@ -1,7 +1,7 @@
 from .mutils import clamp, compute_derivatives_2_at_pt, compute_derivatives_2
 from .common import NUMERICAL_ACCURACY, fast_math, parallel_range, parallel
 from typing import Tuple
-from cmath import sqrt
+from math import sqrt
 import numpy as np
 
 
@@ -512,6 +512,18 @@ def bi_cubic_interp_derivatives2(x: np.ndarray, y: np.ndarray, points: np.ndarra
 
 
 @parallel
+def _bi_qubic_interp(x: np.ndarray, y: np.ndarray, points: np.ndarray, points_dx: np.ndarray,
+                     points_dy: np.ndarray, points_dxy: np.ndarray, width: float, height: float) -> np.ndarray:
+    result = np.zeros((y.size, x.size), dtype=float)
+    for i in parallel_range(result.size):
+        # divmod внутри prange numba типизирует как float
+        res_row_ = i // x.size
+        res_col_ = i - res_row_ * x.size
+        result[res_row_, res_col_] = _bi_qubic_interp_pt(x[res_col_], y[res_row_], points, points_dx,
+                                                         points_dy, points_dxy, width, height)
+    return result
+
+
 def bi_qubic_interp(x: np.ndarray, y: np.ndarray,
                     points: np.ndarray, width: float = 1.0, height: float = 1.0) -> np.ndarray:
     """
@@ -523,15 +535,9 @@ def bi_qubic_interp(x: np.ndarray, y: np.ndarray,
     :param height: высота области интерполяции.
     :return:
     """
-    result = np.zeros((y.size, x.size), dtype=float)
-
+    # производные считаются numpy целиком для сетки, сама интерполяция - ядром
     points_dx, points_dy, points_dxy = compute_derivatives_2(points)
-
-    for i in parallel_range(result.size):
-        res_row_, res_col_ = divmod(i, x.size)
-        result[res_row_, res_col_] = _bi_qubic_interp_pt(x[res_col_], y[res_row_], points, points_dx,
-                                                         points_dy, points_dxy, width, height)
-    return result
+    return _bi_qubic_interp(x, y, points, points_dx, points_dy, points_dxy, width, height)
 
 
 @parallel
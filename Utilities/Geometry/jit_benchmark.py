@@ -0,0 +1,150 @@
+"""
+Сравнение времени работы ядер fast_math / parallel в скомпилированном numba виде и в виде python функций.
+Запуск: python -m Utilities.Geometry.jit_benchmark
+"""
+from Utilities.Geometry.common import JitKernel, jit_kernels, jit_report, set_jit_enabled
+from Utilities.Geometry import interpolators, mutils
+from Utilities import filter_bank
+from typing import Callable, Dict, Tuple
+import numpy as np
+import time
+
+# ядра из остальных пакетов попадают в отчёт, только если пакет импортируется
+try:
+    from Utilities.DataAnalysis import clustering_utils
+except ImportError as _err:
+    print(f"ImportError:: {_err}")
+try:
+    from Accelerometer.accelerometer_core import accelerometer_integrator, imu_parameter_sweep
+except ImportError as _err:
+    print(f"ImportError:: {_err}")
+
+_rnd = np.random.default_rng(0)
+_GRID = _rnd.random((32, 32))
+_XS = _rnd.random(1024)
+_YS = _rnd.random(1024)
+_COLUMNS = _rnd.random((4096, 8))
+_BASIS_N = 4096
+_ACCEL = _rnd.normal(0.0, 0.1, (_BASIS_N, 3)) + np.array([0.0, 9.8, 0.0])
+_OMEGA = _rnd.normal(0.0, 0.1, (_BASIS_N, 3))
+_DT = np.full(_BASIS_N, 1e-3)
+
+
+# аргументы для каждого ядра: имя модуля.имя ядра -> фабрика аргументов (массивы, изменяемые на месте, создаются заново)
+_CASES: Dict[str, Callable[[], tuple]] = {
+    "Utilities.DataAnalysis.clustering_utils.clamp": lambda: (300, 0, 255),
+    "Utilities.DataAnalysis.clustering_utils.pack_color_code": lambda: (22, 33, 55),
+    "Utilities.DataAnalysis.clustering_utils.unpack_color_code": lambda: ("#162137",),
+    "Utilities.DataAnalysis.clustering_utils.gaussian_cluster": lambda: (0.0, 0.0, 0.1, 0.1, 1024),
+    "Utilities.DataAnalysis.clustering_utils.color_map_nonlinear": lambda: (8,),
+    "Utilities.DataAnalysis.clustering_utils.distance": lambda: (_XS, _YS),
+    "Utilities.DataAnalysis.clustering_utils.gauss_core": lambda: (_XS, 0.5),
+    "Utilities.DataAnalysis.clustering_utils.flat_core": lambda: (_XS, 0.5),
+    "Utilities.filter_bank._run_avg_columns":
+        lambda: (_COLUMNS, np.full(8, 0.08), np.zeros(8), np.empty_like(_COLUMNS)),
+    "Utilities.filter_bank._kalman_columns":
+        lambda: (_COLUMNS, np.full(8, 0.08), np.full(8, 0.9), np.full(8, 0.333), np.zeros(8),
+                 np.empty_like(_COLUMNS)),
+    "Utilities.Geometry.interpolators.bi_linear_interp_pt": lambda: (0.3, 0.7, _GRID),
+    "Utilities.Geometry.interpolators.bi_linear_interp_derivatives_pt": lambda: (0.3, 0.7, _GRID),
+    "Utilities.Geometry.interpolators.bi_linear_interp_derivatives2_pt": lambda: (0.3, 0.7, _GRID),
+    "Utilities.Geometry.interpolators.bi_linear_interp_derivatives": lambda: (_XS[:64], _YS[:64], _GRID),
+    "Utilities.Geometry.interpolators.bi_linear_interp_derivatives2": lambda: (_XS[:64], _YS[:64], _GRID),
+    "Utilities.Geometry.interpolators.bi_linear_interp": lambda: (_XS[:64], _YS[:64], _GRID),
+    "Utilities.Geometry.interpolators.bi_linear_cut": lambda: (0.0, 0.0, 1.0, 1.0, 1024, _GRID),
+    "Utilities.Geometry.interpolators.bi_linear_cut_along_curve": lambda: (_XS, _YS, _GRID),
+    "Utilities.Geometry.interpolators._cubic_poly": lambda: (0.3, 0.7, _XS[:16]),
+    "Utilities.Geometry.interpolators._bi_qubic_interp_pt":
+        lambda: (0.3, 0.7, _GRID, *mutils.compute_derivatives_2(_GRID)),
+    "Utilities.Geometry.interpolators.bi_qubic_interp_pt": lambda: (0.3, 0.7, _GRID),
+    "Utilities.Geometry.interpolators.bi_cubic_interp_derivatives_pt": lambda: (0.3, 0.7, _GRID),
+    "Utilities.Geometry.interpolators.bi_cubic_interp_derivatives2_pt": lambda: (0.3, 0.7, _GRID),
+    "Utilities.Geometry.interpolators.bi_cubic_interp_derivatives": lambda: (_XS[:32], _YS[:32], _GRID),
+    "Utilities.Geometry.interpolators.bi_cubic_interp_derivatives2": lambda: (_XS[:32], _YS[:32], _GRID),
+    "Utilities.Geometry.interpolators._bi_qubic_interp":
+        lambda: (_XS[:32], _YS[:32], _GRID, *mutils.compute_derivatives_2(_GRID), 1.0, 1.0),
+    "Utilities.Geometry.interpolators.bi_qubic_cut": lambda: (0.0, 0.0, 1.0, 1.0, 512, _GRID),
+    "Utilities.Geometry.interpolators.bi_qubic_cut_along_curve": lambda: (_XS[:256], _YS[:256], _GRID),
+    "Utilities.Geometry.mutils.linear_regression": lambda: (_XS, _YS),
+    "Utilities.Geometry.mutils.bi_linear_regression": lambda: (_XS, _YS, _XS * 2.0 + _YS),
+    "Utilities.Geometry.mutils.polynom": lambda: (_XS, _XS[:6]),
+    "Utilities.Geometry.mutils.poly_regression": lambda: (_XS, _YS, 5),
+    "Utilities.Geometry.mutils.poly_fit": lambda: (_XS, _XS, _YS, 5),
+    "Utilities.Geometry.mutils.n_linear_regression": lambda: (_COLUMNS[:, :4].copy(),),
+    "Utilities.Geometry.mutils.quadratic_regression_2d": lambda: (_XS, _YS, _XS * _YS),
+    "Utilities.Geometry.mutils.second_order_surface": lambda: (_XS, _YS, _XS[:6]),
+    "Utilities.Geometry.mutils.quadratic_shape_fit": lambda: (_YS, _XS, _XS, _YS, _XS * _YS),
+    "Utilities.Geometry.mutils._in_range": lambda: (0.5, 0.0, 1.0),
+    "Utilities.Geometry.mutils.square_equation": lambda: (1.0, -3.0, 2.0),
+    "Utilities.Geometry.mutils.clamp": lambda: (1.5, 0.0, 1.0),
+    "Utilities.Geometry.mutils.dec_to_rad_pt": lambda: (0.3, 0.7),
+    "Utilities.Geometry.mutils.rad_to_dec_pt": lambda: (0.3, 0.7),
+    "Utilities.Geometry.mutils.dec_to_rad": lambda: (_XS, _YS),
+    "Utilities.Geometry.mutils.rad_to_dec": lambda: (_XS, _YS),
+    "Utilities.Geometry.mutils.compute_derivatives_2_at_pt": lambda: (_GRID, 5, 7),
+    "Utilities.Geometry.mutils.compute_derivatives_at_pt": lambda: (_GRID, 5, 7),
+    "Accelerometer.accelerometer_core.accelerometer_integrator._integrate_basis":
+        lambda: (_ACCEL, _OMEGA, _DT, np.array([0.0, 1.0, 0.0]), np.array([0.0, 0.0, 1.0]), 0.01,
+                 np.empty((_BASIS_N, 3, 3))),
+    "Accelerometer.accelerometer_core.imu_parameter_sweep._integrate_basis":
+        lambda: (_ACCEL, _OMEGA, _DT, np.array([0.0, 0.0, 1.0]), 0.01, np.empty((_BASIS_N, 3, 3))),
+}
+
+
+def _time_call(func: Callable, args_factory: Callable[[], tuple], min_time: float) -> Tuple[float, int]:
+    """
+    Среднее время одного вызова func (без времени создания аргументов) и число вызовов.
+    """
+    total, calls = 0.0, 0
+    while total < min_time:
+        args = args_factory()
+        t = time.perf_counter()
+        func(*args)
+        total += time.perf_counter() - t
+        calls += 1
+    return total / calls, calls
+
+
+def jit_benchmark(min_time: float = 0.05) -> None:
+    """
+    Для каждого ядра: время первого вызова (компиляция или загрузка из кэша), время вызова скомпилированного
+    ядра и исходной python функции.
+    """
+    print(f"|{'kernel':72}|{'status':9}|{'first call, ms':>15}|{'jit, us':>12}|{'python, us':>12}|{'speed up':>9}|")
+    for kernel in jit_kernels():
+        name = f"{kernel.__module__}.{kernel.__qualname__}"
+        if name not in _CASES:
+            print(f"|{name:72}|{kernel.status:9}| no benchmark case")
+            continue
+        args_factory = _CASES[name]
+        if not isinstance(kernel, JitKernel):
+            try:
+                py_time, _ = _time_call(kernel.py_func, args_factory, min_time)
+            except Exception as ex:
+                print(f"|{name:72}|{kernel.status:9}| python call failed: {type(ex).__name__}: {ex}")
+                continue
+            print(f"|{name:72}|{kernel.status:9}|{'-':>15}|{'-':>12}|{py_time * 1e6:12.2f}|{'-':>9}|")
+            continue
+        try:
+            args = args_factory()
+            t = time.perf_counter()
+            kernel(*args)
+            first_call = time.perf_counter() - t
+            jit_time, _ = _time_call(kernel, args_factory, min_time)
+            # вложенные ядра тоже вызываются как python функции
+            set_jit_enabled(False)
+            try:
+                py_time, _ = _time_call(kernel, args_factory, min_time)
+            finally:
+                set_jit_enabled(True)
+        except Exception as ex:
+            print(f"|{name:72}|{kernel.status:9}| call failed: {type(ex).__name__}: {ex}")
+            continue
+        print(f"|{name:72}|{kernel.status:9}|{first_call * 1e3:15.2f}|{jit_time * 1e6:12.2f}|"
+              f"{py_time * 1e6:12.2f}|{py_time / jit_time:9.2f}|")
+    print()
+    print(jit_report())
+
+
+if __name__ == "__main__":
+    jit_benchmark()
@@ -1,126 +1,184 @@
-from .common import NUMERICAL_ACCURACY, fast_math, parallel, parallel_range
+from .common import NUMERICAL_ACCURACY
 from typing import Callable, Tuple, List, Union
-from .interpolators import bi_linear_interp_pt
 from .vector2 import Vector2
 import numpy as np
 
-
-@fast_math
-def _interp(_a: float, _b: float, t) -> float:
-    return _a + (_b - _a) * t
-
-
-@fast_math
-def _signum(_a: float) -> float:
-    return 1.0 if _a >= 0.0 else -1.0
-
-
-@fast_math
-def _squares_nearest_interp(col, row, dx, dy):
-    return (col + dx * 0.5, row),\
-           (col + dx, row + dy * 0.5),\
-           (col + dx * 0.5, row + dy),\
-           (col, row + dy * 0.5)
-
-
-@fast_math
-def _squares_linear_interp(col, row, dx, dy, a_val, b_val, c_val, d_val, threshold):
-    d_t = b_val - a_val
-    a = (_interp(col, col + dx, _signum(threshold - a_val)), row) if abs(d_t) < NUMERICAL_ACCURACY else \
-        (_interp(col, col + dx, (threshold - a_val) / d_t), row)
-
-    d_t = c_val - b_val
-    b = (col + dx, _interp(row, row + dy, _signum(threshold - b_val))) if abs(d_t) < NUMERICAL_ACCURACY else\
-        (col + dx, _interp(row, row + dy, (threshold - b_val) / d_t))
-
-    d_t = c_val - d_val
-    c = (_interp(col, col + dx, _signum(threshold - d_val)), row + dy) if abs(d_t) < NUMERICAL_ACCURACY else \
-        (_interp(col, col + dx, (threshold - d_val) / d_t), row + dy)
-
-    d_t = d_val - a_val
-    d = (col, _interp(row, row + dy, _signum(threshold - a_val))) if abs(d_t) < NUMERICAL_ACCURACY else \
-        (col, _interp(row, row + dy, (threshold - a_val) / d_t))
-    return a, b, c, d
-
-
-@fast_math
-def _eval_field_function(field: Callable[[float, float], float], col, row, dx, dy):
-    return field(col, row), field(col + dx, row), field(col + dx, row + dy), field(col, row + dy)
+# отрезки контура в ячейке для каждого состояния (узлы a, b, c, d дают биты 8, 4, 2, 1), рёбра ячейки:
+# d____2____c
+# |         |
+# 3         1
+# |____0____|
+# a         b
+_SECTIONS_CONNECTION_TABLE = {
+    1:  ((2, 3),),
+    2:  ((1, 2),),
+    3:  ((1, 3),),
+    4:  ((0, 1),),
+    5:  ((0, 3), (1, 2)),
+    6:  ((0, 2),),
+    7:  ((0, 3),),
+    8:  ((0, 3),),
+    9:  ((0, 2),),
+    10: ((0, 1), (2, 3)),
+    11: ((0, 1),),
+    12: ((1, 3),),
+    13: ((1, 2),),
+    14: ((2, 3),),
+}
 
 
-@fast_math
-def _compute_state(a_val, b_val, c_val, d_val, threshold):
-    state = 0
-    state += 8 if a_val >= threshold else 0
-    state += 4 if b_val >= threshold else 0
-    state += 2 if c_val >= threshold else 0
-    state += 1 if d_val >= threshold else 0
-    return state
+def _bi_linear_resample(array: np.ndarray, rows: int, cols: int) -> np.ndarray:
+    """
+    Значения array в узлах сетки rows x cols на той же области, формулы из bi_linear_interp_pt.
+    """
+    src_rows, src_cols = array.shape
+    x = np.linspace(0.0, 1.0, cols) * (src_cols - 1)
+    y = np.linspace(0.0, 1.0, rows) * (src_rows - 1)
+    col_ = x.astype(int)
+    row_ = y.astype(int)
+    col_1 = np.minimum(col_ + 1, src_cols - 1)
+    row_1 = np.minimum(row_ + 1, src_rows - 1)
+    tx = (x - col_)[None, :]
+    ty = (y - row_)[:, None]
+    q00 = array[row_][:, col_]
+    q01 = array[row_][:, col_1]
+    q10 = array[row_1][:, col_]
+    q11 = array[row_1][:, col_1]
+    return q00 + (q01 - q00) * tx + (q10 - q00) * ty + tx * ty * (q00 - q01 - q10 + q11)
+
+
+def _eval_field_function(field: Callable[[float, float], float], xs: np.ndarray, ys: np.ndarray) -> np.ndarray:
+    """
+    Значения поля в узлах сетки, по одному вызову field на узел.
+    """
+    return np.array([[field(x, y) for x in xs.tolist()] for y in ys.tolist()], dtype=float)
+
+
+def _edges_interp(v_0: np.ndarray, v_1: np.ndarray, threshold: float, interpolate: bool) -> np.ndarray:
+    """
+    Параметр точки пересечения уровня threshold на рёбрах от узлов v_0 к узлам v_1.
+    """
+    if not interpolate:
+        return np.full(v_0.shape, 0.5)
+    d_t = v_1 - v_0
+    flat = np.abs(d_t) < NUMERICAL_ACCURACY
+    return np.where(flat, np.where(threshold - v_0 >= 0.0, 1.0, -1.0),
+                    (threshold - v_0) / np.where(flat, 1.0, d_t))
+
+
+def _march_squares_segments(values: np.ndarray, min_bound: Tuple[float, float], max_bound: Tuple[float, float],
+                            threshold: float, interpolate: bool) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Отрезки контура по значениям поля в узлах сетки. Состояния всех ячеек и точки пересечения всех рёбер
+    считаются за один проход по массиву.
+    :param values: значения поля в узлах, строки - ось y, столбцы - ось x.
+    :return: (точки рёбер (n_edges, 2), индексы рёбер концов отрезков (n_segments, 2)).
+    """
+    rows, cols = values.shape
+    xs = np.linspace(min_bound[0], max_bound[0], cols)
+    ys = np.linspace(min_bound[1], max_bound[1], rows)
+
+    # горизонтальные рёбра (rows, cols - 1), затем вертикальные (rows - 1, cols)
+    t_h = _edges_interp(values[:, :-1], values[:, 1:], threshold, interpolate)
+    t_v = _edges_interp(values[:-1, :], values[1:, :], threshold, interpolate)
+    points_h = np.stack((xs[:-1] + (xs[1:] - xs[:-1]) * t_h, np.broadcast_to(ys[:, None], t_h.shape)), axis=-1)
+    points_v = np.stack((np.broadcast_to(xs[None, :], t_v.shape), ys[:-1, None] + (ys[1:] - ys[:-1])[:, None] * t_v),
+                        axis=-1)
+    points = np.vstack((points_h.reshape((-1, 2)), points_v.reshape((-1, 2))))
+
+    above = values >= threshold
+    states = above[:-1, :-1] * 8 + above[:-1, 1:] * 4 + above[1:, 1:] * 2 + above[1:, :-1] * 1
+
+    n_h = rows * (cols - 1)
+    cell_rows, cell_cols = np.indices(states.shape)
+    cell_edges = np.stack((cell_rows * (cols - 1) + cell_cols,         # a
+                           n_h + cell_rows * cols + cell_cols + 1,     # b
+                           (cell_rows + 1) * (cols - 1) + cell_cols,   # c
+                           n_h + cell_rows * cols + cell_cols), axis=-1)  # d
+
+    segments = []
+    for state, sections in _SECTIONS_CONNECTION_TABLE.items():
+        edges = cell_edges[states == state]
+        if edges.shape[0] == 0:
+            continue
+        for e_0, e_1 in sections:
+            segments.append(edges[:, (e_0, e_1)])
+    if len(segments) == 0:
+        return points, np.zeros((0, 2), dtype=int)
+    return points, np.vstack(segments)
+
+
+def _join_segments(segments: np.ndarray) -> List[List[int]]:
+    """
+    Сшивает отрезки с общими рёбрами в ломаные. Каждое ребро сетки принадлежит не более чем двум отрезкам,
+    концы отрезков с одинаковым ребром находятся сортировкой индексов рёбер.
+    :return: списки индексов рёбер ломаных, у замкнутых первый и последний индексы совпадают.
+    """
+    n_segments = segments.shape[0]
+    if n_segments == 0:
+        return []
+    ends = segments.reshape(-1)
+    order = np.argsort(ends, kind='stable')
+    sorted_ends = ends[order]
+    pairs = np.flatnonzero(sorted_ends[1:] == sorted_ends[:-1])
+    partner = np.full(ends.size, -1, dtype=int)
+    partner[order[pairs]] = order[pairs + 1]
+    partner[order[pairs + 1]] = order[pairs]
+
+    ends = ends.tolist()
+    partner = partner.tolist()
+    visited = [False] * n_segments
+    polylines = []
+
+    def walk(end: int) -> List[int]:
+        polyline = [ends[end]]
+        while not visited[end >> 1]:
+            visited[end >> 1] = True
+            end ^= 1
+            polyline.append(ends[end])
+            end = partner[end]
+            if end == -1:
+                break
+        return polyline
+
+    # сначала разомкнутые ломаные от свободных концов, затем замкнутые
+    for end in range(len(ends)):
+        if partner[end] == -1 and not visited[end >> 1]:
+            polylines.append(walk(end))
+    for segment in range(n_segments):
+        if not visited[segment]:
+            polylines.append(walk(segment << 1))
+    return polylines
+
+
+def _field_values(field: Union[Callable[[float, float], float], np.ndarray],
+                  min_bound: Vector2, max_bound: Vector2,
+                  march_resolution: Union[Tuple[int, int], None]) -> np.ndarray:
+    if isinstance(field, np.ndarray):
+        if field.ndim != 2:
+            raise RuntimeError("march_squares_2d :: field array has to be 2 dimensional")
+        if march_resolution is None:
+            return field.astype(float)
+        return _bi_linear_resample(field.astype(float), max(march_resolution[1], 3), max(march_resolution[0], 3))
+    if isinstance(field, Callable):
+        march_resolution = (128, 128) if march_resolution is None else march_resolution
+        rows, cols = max(march_resolution[1], 3), max(march_resolution[0], 3)
+        return _eval_field_function(field, np.linspace(min_bound.x, max_bound.x, cols),
+                                    np.linspace(min_bound.y, max_bound.y, rows))
+    raise ValueError(f"unsupported field type: {type(field)}")
 
 
-_SECTIONS_CONNECTION_ALGORYTHM = {
-    1: lambda shape, a, b, c, d: shape.append((c, d)),
-    2: lambda shape, a, b, c, d: shape.append((b, c)),
-    3: lambda shape, a, b, c, d: shape.append((b, d)),
-    4: lambda shape, a, b, c, d: shape.append((a, b)),
-    5: lambda shape, a, b, c, d: (shape.append((a, d)), shape.append((b, c))),
-    6: lambda shape, a, b, c, d: shape.append((a, c)),
-    7: lambda shape, a, b, c, d: shape.append((a, d)),
-    8: lambda shape, a, b, c, d: shape.append((a, d)),
-    9: lambda shape, a, b, c, d: shape.append((a, c)),
-    10: lambda shape, a, b, c, d: (shape.append((a, b)), shape.append((c, d))),
-    11: lambda shape, a, b, c, d: shape.append((a, b)),
-    12: lambda shape, a, b, c, d: shape.append((b, d)),
-    13: lambda shape, a, b, c, d: shape.append((b, c)),
-    14: lambda shape, a, b, c, d: shape.append((c, d)),
-}
+def _check_bounds(min_bound: Vector2, max_bound: Vector2,
+                  march_resolution: Union[Tuple[int, int], None]) -> Tuple[Vector2, Vector2]:
+    assert march_resolution is None or \
+           (len(march_resolution) == 2 and all(isinstance(v, int) for v in march_resolution))
 
+    min_bound = Vector2(-5.0, -5.0) if min_bound is None else min_bound
+    assert isinstance(min_bound, Vector2)
 
-def _array_of_points_wrapper(array: np.ndarray, min_bound: Vector2, max_bound: Vector2):
-    return lambda x, y: bi_linear_interp_pt((x - min_bound.x) / (max_bound.x -  min_bound.x),
-                                            (y - min_bound.y) / (max_bound.y -  min_bound.y),
-                                            array, 1.0, 1.0)
-
-
-@parallel
-def _march_squares_2d(field: Callable[[float, float], float],
-                      min_bound: Tuple[float, float], max_bound: Tuple[float, float],
-                      march_resolution: Tuple[int, int], threshold: float,
-                      interpolate: bool) -> List[Tuple[Tuple[float, float], Tuple[float, float]]]:
-
-    rows, cols = max(march_resolution[1], 3), max(march_resolution[0], 3)
-    cols_ = cols - 1
-    rows_ = cols - 1
-    dx = (max_bound[0] - min_bound[0]) / cols_
-    dy = (max_bound[1] - min_bound[1]) / rows_
-    min_bound_y = min_bound[0]
-    min_bound_x = min_bound[1]
-
-    shape: List[Tuple[Tuple[float, float], Tuple[float, float]]] = []
-    if interpolate:
-        for index in parallel_range(cols_ * rows_):
-            row_index, col_index = divmod(index, cols_)
-            row = row_index * dy + min_bound_y
-            col = col_index * dx + min_bound_x
-            a_val, b_val, c_val, d_val = _eval_field_function(field, col, row, dx, dy)
-            state = _compute_state(a_val, b_val, c_val, d_val, threshold)
-            if state not in _SECTIONS_CONNECTION_ALGORYTHM:
-                continue
-            a, b, c, d = _squares_linear_interp(col, row, dx, dy, a_val, b_val, c_val, d_val, threshold)
-            _SECTIONS_CONNECTION_ALGORYTHM[state](shape, a, b, c, d)
-        return shape
-
-    for index in parallel_range(cols_ * rows_):
-        row_index, col_index = divmod(index, cols_)
-        row = row_index * dy + min_bound_y
-        col = col_index * dx + min_bound_x
-        a_val, b_val, c_val, d_val = _eval_field_function(field, col, row, dx, dy)
-        state = _compute_state(a_val, b_val, c_val, d_val, threshold)
-        if state not in _SECTIONS_CONNECTION_ALGORYTHM:
-            continue
-        a, b, c, d = _squares_nearest_interp(col, row, dx, dy)
-        _SECTIONS_CONNECTION_ALGORYTHM[state](shape, a, b, c, d)
-    return shape
+    max_bound = Vector2( 5.0,  5.0) if max_bound is None else max_bound
+    assert isinstance(max_bound, Vector2)
+    return min_bound, max_bound
 
 
 def march_squares_2d(field: Union[Callable[[float, float], float], np.ndarray],
@@ -129,21 +187,35 @@ def march_squares_2d(field: Union[Callable[[float, float], float], np.ndarray],
                      march_resolution: Tuple[int, int] = None,
                      threshold: float = 0.5,
                      interpolate: bool = True) -> List[Tuple[Vector2, Vector2]]:
-
-    march_resolution = (128, 128) if march_resolution is None else march_resolution
-    assert len(march_resolution) == 2 and all(isinstance(v, int) for v in march_resolution)
-
-    min_bound = Vector2(-5.0, -5.0) if min_bound is None else min_bound
-    assert isinstance(min_bound, Vector2)
-
-    max_bound = Vector2( 5.0,  5.0) if max_bound is None else max_bound
-    assert isinstance(max_bound, Vector2)
-
-    if isinstance(field, np.ndarray):
-        field = _array_of_points_wrapper(field, min_bound, max_bound)
-        shape = _march_squares_2d(field, tuple(min_bound), tuple(max_bound), march_resolution, threshold, interpolate)
-        return [(Vector2(*v[0]), Vector2(*v[1])) for v in shape]
-    if isinstance(field, Callable):
-        shape = _march_squares_2d(field, tuple(min_bound), tuple(max_bound), march_resolution, threshold, interpolate)
-        return [(Vector2(*v[0]), Vector2(*v[1])) for v in shape]
-    raise ValueError(f"unsupported field type: {type(field)}")
+    """
+    Отрезки изолинии уровня threshold.
+    :param field: функция f(x, y) или массив значений на области min_bound - max_bound (строки - ось y).
+    :param march_resolution: число узлов сетки (по x, по y). Для функции по умолчанию (128, 128), массив
+    по умолчанию используется без передискретизации.
+    """
+    min_bound, max_bound = _check_bounds(min_bound, max_bound, march_resolution)
+    values = _field_values(field, min_bound, max_bound, march_resolution)
+    points, segments = _march_squares_segments(values, tuple(min_bound), tuple(max_bound), threshold, interpolate)
+    return [(Vector2(*p_0), Vector2(*p_1)) for p_0, p_1 in points[segments].tolist()]
+
+
+def march_squares_contours(field: Union[Callable[[float, float], float], np.ndarray],
+                           min_bound: Vector2 = None,
+                           max_bound: Vector2 = None,
+                           march_resolution: Tuple[int, int] = None,
+                           threshold: float = 0.5,
+                           interpolate: bool = True) -> List[List[Vector2]]:
+    """
+    Изолинии уровня threshold в виде упорядоченных ломаных, параметры как у march_squares_2d.
+    У замкнутых ломаных первая и последняя точки совпадают. Ломаные можно передавать
+    в poly_strip и GLScene.create_line.
+    """
+    min_bound, max_bound = _check_bounds(min_bound, max_bound, march_resolution)
+    values = _field_values(field, min_bound, max_bound, march_resolution)
+    points, segments = _march_squares_segments(values, tuple(min_bound), tuple(max_bound), threshold, interpolate)
+    polylines = _join_segments(segments)
+    if len(polylines) == 0:
+        return []
+    points = points[np.concatenate(polylines)].tolist()
+    offsets = np.cumsum([0] + [len(polyline) for polyline in polylines]).tolist()
+    return [[Vector2(*p) for p in points[start: end]] for start, end in zip(offsets[:-1], offsets[1:])]
@@ -183,10 +183,10 @@ class Matrix3:
 
     @classmethod
     def build_basis(cls, ey: Vector3, ez: Vector3 = None) -> 'Matrix3':
-        assert isinstance(ey, Vector2)
+        assert isinstance(ey, Vector3)
         if ez is None:
             ez = Vector3(0.0, 0.0, 1.0)
-        assert isinstance(ez, Vector2)
+        assert isinstance(ez, Vector3)
         ey = ey.normalized
         ez = ez.normalized
         ex = Vector3.cross(ez, ey).normalize()
@@ -311,6 +311,69 @@ class Matrix3:
     def right_up_front(self) -> Tuple[Vector3, Vector3, Vector3]:
         return self.right, self.up, self.front
 
+    def right_into(self, out: Vector3) -> Vector3:
+        return out.assign(self._m00, self._m10, self._m20)
+
+    def up_into(self, out: Vector3) -> Vector3:
+        return out.assign(self._m01, self._m11, self._m21)
+
+    def front_into(self, out: Vector3) -> Vector3:
+        return out.assign(self._m02, self._m12, self._m22)
+
+    def assign_columns(self, right: Vector3, up: Vector3, front: Vector3) -> 'Matrix3':
+        """
+        Записывает столбцы right, up, front на месте, как build_transform, но без создания новой матрицы.
+        """
+        self._m00, self._m01, self._m02 = right.x, up.x, front.x
+        self._m10, self._m11, self._m12 = right.y, up.y, front.y
+        self._m20, self._m21, self._m22 = right.z, up.z, front.z
+        return self
+
+    def copy_from(self, other: 'Matrix3') -> 'Matrix3':
+        for attr in Matrix3.__slots__:
+            setattr(self, attr, getattr(other, attr))
+        return self
+
+    def mul_vector_into(self, vector: Vector3, out: Vector3) -> Vector3:
+        """
+        self * vector, записанный в out. out может совпадать с vector.
+        """
+        x, y, z = vector.x, vector.y, vector.z
+        return out.assign(self._m00 * x + self._m01 * y + self._m02 * z,
+                          self._m10 * x + self._m11 * y + self._m12 * z,
+                          self._m20 * x + self._m21 * y + self._m22 * z)
+
+    def transposed_mul_vector_into(self, vector: Vector3, out: Vector3) -> Vector3:
+        """
+        self.transposed * vector, записанный в out, без транспонирования матрицы.
+        """
+        x, y, z = vector.x, vector.y, vector.z
+        return out.assign(self._m00 * x + self._m10 * y + self._m20 * z,
+                          self._m01 * x + self._m11 * y + self._m21 * z,
+                          self._m02 * x + self._m12 * y + self._m22 * z)
+
+    @staticmethod
+    def mul_into(a: 'Matrix3', b: 'Matrix3', out: 'Matrix3') -> 'Matrix3':
+        """
+        Произведение a * b, записанное в out. out может совпадать с a или b.
+        """
+        a00, a01, a02 = a._m00, a._m01, a._m02
+        a10, a11, a12 = a._m10, a._m11, a._m12
+        a20, a21, a22 = a._m20, a._m21, a._m22
+        b00, b01, b02 = b._m00, b._m01, b._m02
+        b10, b11, b12 = b._m10, b._m11, b._m12
+        b20, b21, b22 = b._m20, b._m21, b._m22
+        out._m00 = a00 * b00 + a01 * b10 + a02 * b20
+        out._m01 = a00 * b01 + a01 * b11 + a02 * b21
+        out._m02 = a00 * b02 + a01 * b12 + a02 * b22
+        out._m10 = a10 * b00 + a11 * b10 + a12 * b20
+        out._m11 = a10 * b01 + a11 * b11 + a12 * b21
+        out._m12 = a10 * b02 + a11 * b12 + a12 * b22
+        out._m20 = a20 * b00 + a21 * b10 + a22 * b20
+        out._m21 = a20 * b01 + a21 * b11 + a22 * b21
+        out._m22 = a20 * b02 + a21 * b12 + a22 * b22
+        return out
+
     def invert(self):
         det: float = (self.m00 * (self.m11 * self.m22 - self.m21 * self.m12) -
                       self.m01 * (self.m10 * self.m22 - self.m12 * self.m20) +
@@ -498,13 +561,23 @@ class Matrix3:
                        self.m10 * point.x + self.m11 * point.y)
 
     def to_np_array(self) -> np.ndarray:
-        return np.array(self).reshape((3, 3))
+        return np.array(tuple(self)).reshape((3, 3))
 
     def perspective_multiply(self,  point: Vector2) -> Vector2:
         assert isinstance(point, Vector2)
         p = self * Vector3(point.x, point.y, 1.0)
         return Vector2(p.x / p.z, p.y / p.z)
 
+    def perspective_multiply_points(self, points: np.ndarray) -> np.ndarray:
+        """
+        perspective_multiply для массива точек (N, 2) за один вызов.
+        :return: массив (N, 2)
+        """
+        points = np.asarray(points, dtype=np.float64).reshape((-1, 2))
+        m = self.to_np_array()
+        p = points @ m[:, :2].T + m[:, 2]
+        return p[:, :2] / p[:, 2:]
+
     @classmethod
     def perspective_transform_from_four_points(cls, *args):
         assert (all(isinstance(item, Vector2) for item in args) and len(args) == 4)
@@ -414,6 +414,86 @@ class Matrix4:
     def right_up_front(self) -> Tuple[Vector3, Vector3, Vector3]:
         return self.right, self.up, self.front
 
+    def right_into(self, out: Vector3) -> Vector3:
+        return out.assign(self._m00, self._m10, self._m20)
+
+    def up_into(self, out: Vector3) -> Vector3:
+        return out.assign(self._m01, self._m11, self._m21)
+
+    def front_into(self, out: Vector3) -> Vector3:
+        return out.assign(self._m02, self._m12, self._m22)
+
+    def origin_into(self, out: Vector3) -> Vector3:
+        return out.assign(self._m03, self._m13, self._m23)
+
+    def assign_columns(self, right: Vector3, up: Vector3, front: Vector3, origin: Vector3 = None) -> 'Matrix4':
+        """
+        Записывает столбцы right, up, front, origin на месте, как build_transform, но без создания новой матрицы.
+        """
+        self._m00, self._m01, self._m02 = right.x, up.x, front.x
+        self._m10, self._m11, self._m12 = right.y, up.y, front.y
+        self._m20, self._m21, self._m22 = right.z, up.z, front.z
+        if origin is None:
+            self._m03, self._m13, self._m23 = 0.0, 0.0, 0.0
+        else:
+            self._m03, self._m13, self._m23 = origin.x, origin.y, origin.z
+        self._m30, self._m31, self._m32, self._m33 = 0.0, 0.0, 0.0, 1.0
+        return self
+
+    def copy_from(self, other: 'Matrix4') -> 'Matrix4':
+        for attr in Matrix4.__slots__:
+            setattr(self, attr, getattr(other, attr))
+        return self
+
+    def multiply_by_point_into(self, point: Vector3, out: Vector3) -> Vector3:
+        """
+        multiply_by_point, записанный в out. out может совпадать с point.
+        """
+        x, y, z = point.x, point.y, point.z
+        return out.assign(self._m00 * x + self._m01 * y + self._m02 * z + self._m03,
+                          self._m10 * x + self._m11 * y + self._m12 * z + self._m13,
+                          self._m20 * x + self._m21 * y + self._m22 * z + self._m23)
+
+    def multiply_by_direction_into(self, direction: Vector3, out: Vector3) -> Vector3:
+        """
+        multiply_by_direction, записанный в out. out может совпадать с direction.
+        """
+        x, y, z = direction.x, direction.y, direction.z
+        return out.assign(self._m00 * x + self._m01 * y + self._m02 * z,
+                          self._m10 * x + self._m11 * y + self._m12 * z,
+                          self._m20 * x + self._m21 * y + self._m22 * z)
+
+    @staticmethod
+    def mul_into(a: 'Matrix4', b: 'Matrix4', out: 'Matrix4') -> 'Matrix4':
+        """
+        Произведение a * b, записанное в out. out может совпадать с a или b.
+        """
+        a00, a01, a02, a03 = a._m00, a._m01, a._m02, a._m03
+        a10, a11, a12, a13 = a._m10, a._m11, a._m12, a._m13
+        a20, a21, a22, a23 = a._m20, a._m21, a._m22, a._m23
+        a30, a31, a32, a33 = a._m30, a._m31, a._m32, a._m33
+        b00, b01, b02, b03 = b._m00, b._m01, b._m02, b._m03
+        b10, b11, b12, b13 = b._m10, b._m11, b._m12, b._m13
+        b20, b21, b22, b23 = b._m20, b._m21, b._m22, b._m23
+        b30, b31, b32, b33 = b._m30, b._m31, b._m32, b._m33
+        out._m00 = a00 * b00 + a01 * b10 + a02 * b20 + a03 * b30
+        out._m01 = a00 * b01 + a01 * b11 + a02 * b21 + a03 * b31
+        out._m02 = a00 * b02 + a01 * b12 + a02 * b22 + a03 * b32
+        out._m03 = a00 * b03 + a01 * b13 + a02 * b23 + a03 * b33
+        out._m10 = a10 * b00 + a11 * b10 + a12 * b20 + a13 * b30
+        out._m11 = a10 * b01 + a11 * b11 + a12 * b21 + a13 * b31
+        out._m12 = a10 * b02 + a11 * b12 + a12 * b22 + a13 * b32
+        out._m13 = a10 * b03 + a11 * b13 + a12 * b23 + a13 * b33
+        out._m20 = a20 * b00 + a21 * b10 + a22 * b20 + a23 * b30
+        out._m21 = a20 * b01 + a21 * b11 + a22 * b21 + a23 * b31
+        out._m22 = a20 * b02 + a21 * b12 + a22 * b22 + a23 * b32
+        out._m23 = a20 * b03 + a21 * b13 + a22 * b23 + a23 * b33
+        out._m30 = a30 * b00 + a31 * b10 + a32 * b20 + a33 * b30
+        out._m31 = a30 * b01 + a31 * b11 + a32 * b21 + a33 * b31
+        out._m32 = a30 * b02 + a31 * b12 + a32 * b22 + a33 * b32
+        out._m33 = a30 * b03 + a31 * b13 + a32 * b23 + a33 * b33
+        return out
+
     def transpose(self):
         self.m01, self.m10 = self.m10, self.m01
         self.m02, self.m20 = self.m20, self.m02
@@ -702,7 +782,7 @@ class Matrix4:
                        self.m20 * point.x + self.m21 * point.y + self.m22 * point.z)
 
     def to_np_array(self) -> np.ndarray:
-        return np.array(self).reshape((4, 4))
+        return np.array(tuple(self)).reshape((4, 4))
 
 
 def matrix_4_test():
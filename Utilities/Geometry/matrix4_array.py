@@ -0,0 +1,197 @@
+from .common import NUMERICAL_FORMAT_4F as _4F
+from .vector3_array import Vector3Array, _as_xyz
+from typing import Iterable, List, Union
+from .matrix4 import Matrix4
+from .vector3 import Vector3
+import numpy as np
+
+
+def _as_m44(value) -> Union[np.ndarray, None]:
+    if isinstance(value, Matrix4Array):
+        return value._data
+    if isinstance(value, Matrix4):
+        return np.array(tuple(value)).reshape((4, 4))
+    return None
+
+
+class Matrix4Array:
+    """
+    N матриц Matrix4 в одном массиве numpy формы (N, 4, 4), строки матриц как у Matrix4 (m00, m01, m02, m03, ...).
+    Точки и направления преобразуются всеми матрицами сразу. Одиночный Matrix4 или Vector3 в аргументах
+    применяется ко всем элементам.
+    """
+    __slots__ = ('_data',)
+
+    def __init__(self, data: Union[np.ndarray, Iterable] = None):
+        if data is None:
+            data = np.zeros((0, 4, 4))
+        data = np.asarray(data, dtype=np.float64)
+        if data.ndim != 3 or data.shape[1:] != (4, 4):
+            raise RuntimeError(f"Matrix4Array :: expected array of shape (N, 4, 4), got {data.shape}")
+        self._data: np.ndarray = data
+
+    @classmethod
+    def identity(cls, n: int) -> 'Matrix4Array':
+        return cls(np.repeat(np.eye(4)[None, :, :], n, axis=0))
+
+    @classmethod
+    def from_matrices(cls, matrices: Iterable[Matrix4]) -> 'Matrix4Array':
+        return cls(np.array([tuple(m) for m in matrices], dtype=np.float64).reshape((-1, 4, 4)))
+
+    @classmethod
+    def from_np_array(cls, array: np.ndarray) -> 'Matrix4Array':
+        """
+        Оборачивает массив (N, 4, 4) без копирования.
+        """
+        assert isinstance(array, np.ndarray)
+        return cls(array)
+
+    @classmethod
+    def build_transforms(cls, right: Vector3Array, up: Vector3Array, front: Vector3Array,
+                         origin: Vector3Array = None) -> 'Matrix4Array':
+        """
+        Матрицы со столбцами right, up, front, origin, как Matrix4.build_transform
+        """
+        data = np.zeros((len(right), 4, 4))
+        data[:, :3, 0] = _as_xyz(right)
+        data[:, :3, 1] = _as_xyz(up)
+        data[:, :3, 2] = _as_xyz(front)
+        if origin is not None:
+            data[:, :3, 3] = _as_xyz(origin)
+        data[:, 3, 3] = 1.0
+        return cls(data)
+
+    def to_np_array(self) -> np.ndarray:
+        return self._data
+
+    def to_matrices(self) -> List[Matrix4]:
+        return [Matrix4(*m) for m in self._data.reshape((-1, 16)).tolist()]
+
+    def __len__(self) -> int:
+        return self._data.shape[0]
+
+    def __iter__(self):
+        for m in self._data.reshape((-1, 16)).tolist():
+            yield Matrix4(*m)
+
+    def __getitem__(self, index) -> Union[Matrix4, 'Matrix4Array']:
+        if isinstance(index, int) or isinstance(index, np.integer):
+            return Matrix4(*self._data[index].flat)
+        return Matrix4Array(self._data[index])
+
+    def __setitem__(self, index, value) -> None:
+        data = _as_m44(value)
+        if data is None:
+            raise RuntimeError(f"Matrix4Array::SetItem::wrong argument type {type(value)}")
+        self._data[index] = data
+
+    def __eq__(self, other):
+        if not isinstance(other, Matrix4Array):
+            return False
+        return self._data.shape == other._data.shape and bool(np.all(self._data == other._data))
+
+    def __str__(self) -> str:
+        return "[\n" + ",\n".join("\t{" + ", ".join(f"{v:{_4F}}" for v in m) + "}"
+                                  for m in self._data.reshape((-1, 16)).tolist()) + "\n]"
+
+    def __copy__(self) -> 'Matrix4Array':
+        return Matrix4Array(self._data.copy())
+
+    copy = __copy__
+
+    @property
+    def right(self) -> Vector3Array:
+        return Vector3Array(self._data[:, :3, 0])
+
+    @property
+    def up(self) -> Vector3Array:
+        return Vector3Array(self._data[:, :3, 1])
+
+    @property
+    def front(self) -> Vector3Array:
+        return Vector3Array(self._data[:, :3, 2])
+
+    @property
+    def origin(self) -> Vector3Array:
+        return Vector3Array(self._data[:, :3, 3])
+
+    @property
+    def transposed(self) -> 'Matrix4Array':
+        return Matrix4Array(self._data.transpose((0, 2, 1)).copy())
+
+    @property
+    def inverted(self) -> 'Matrix4Array':
+        return Matrix4Array(np.linalg.inv(self._data))
+
+    @property
+    def determinant(self) -> np.ndarray:
+        return np.linalg.det(self._data)
+
+    def __mul__(self, other) -> 'Matrix4Array':
+        data = _as_m44(other)
+        if data is not None:
+            return Matrix4Array(np.matmul(self._data, data))
+        if isinstance(other, int) or isinstance(other, float):
+            return Matrix4Array(self._data * other)
+        raise RuntimeError(f"Matrix4Array::Mul::wrong argument type {type(other)}")
+
+    def __rmul__(self, other) -> 'Matrix4Array':
+        data = _as_m44(other)
+        if data is not None:
+            return Matrix4Array(np.matmul(data, self._data))
+        if isinstance(other, int) or isinstance(other, float):
+            return Matrix4Array(self._data * other)
+        raise RuntimeError(f"Matrix4Array::RMul::wrong argument type {type(other)}")
+
+    def __imul__(self, other) -> 'Matrix4Array':
+        data = _as_m44(other)
+        if data is not None:
+            self._data[:] = np.matmul(self._data, data)
+            return self
+        if isinstance(other, int) or isinstance(other, float):
+            self._data *= other
+            return self
+        raise RuntimeError(f"Matrix4Array::IMul::wrong argument type {type(other)}")
+
+    def _points(self, points: Union[Vector3Array, Vector3]) -> np.ndarray:
+        p = _as_xyz(points)
+        if p is None or isinstance(p, float):
+            raise RuntimeError(f"Matrix4Array :: expected Vector3Array or Vector3, got {type(points)}")
+        return p
+
+    def multiply_by_point(self, points: Union[Vector3Array, Vector3]) -> Vector3Array:
+        """
+        Matrix4.multiply_by_point для каждой пары матрица-точка
+        """
+        p = self._points(points)
+        m = self._data
+        return Vector3Array(np.einsum('nij,nj->ni', m[:, :3, :3], np.broadcast_to(p, (m.shape[0], 3))) +
+                            m[:, :3, 3])
+
+    def multiply_by_direction(self, directions: Union[Vector3Array, Vector3]) -> Vector3Array:
+        p = self._points(directions)
+        m = self._data
+        return Vector3Array(np.einsum('nij,nj->ni', m[:, :3, :3], np.broadcast_to(p, (m.shape[0], 3))))
+
+    def perspective_multiply(self, points: Union[Vector3Array, Vector3]) -> Vector3Array:
+        """
+        Точки (x, y, z, 1), умноженные на матрицы проекции и поделённые на w.
+        """
+        p = self._points(points)
+        m = self._data
+        p = np.broadcast_to(p, (m.shape[0], 3))
+        xyzw = np.einsum('nij,nj->ni', m[:, :, :3], p) + m[:, :, 3]
+        return Vector3Array(xyzw[:, :3] / xyzw[:, 3:])
+
+    @staticmethod
+    def transform_points(matrix: Matrix4, points: Vector3Array) -> Vector3Array:
+        """
+        Одна матрица для всех точек: Matrix4.multiply_by_point над массивом точек.
+        """
+        m = _as_m44(matrix)
+        return Vector3Array(_as_xyz(points) @ m[:3, :3].T + m[:3, 3])
+
+    @staticmethod
+    def transform_directions(matrix: Matrix4, directions: Vector3Array) -> Vector3Array:
+        m = _as_m44(matrix)
+        return Vector3Array(_as_xyz(directions) @ m[:3, :3].T)
@@ -266,7 +266,7 @@ def quadratic_shape_fit(y: np.ndarray, x: np.ndarray,
     return second_order_surface(x, y, fit_params)
 
 
-@fast_math
+@fast_math("boolean(float64, float64, float64)")
 def _in_range(val: float, x_0: float, x_1: float) -> bool:
     """
     Проверяет вхождение числа в диапазон.\n
@@ -306,7 +306,7 @@ def clamp(val: float, min_: float, max_: float) -> float:
     return val
 
 
-@fast_math
+@fast_math("UniTuple(float64, 2)(float64, float64)")
 def dec_to_rad_pt(x: float, y: float) -> Tuple[float, float]:
     """
     Переводи пару координат из декартовой системы в полярную.\n
@@ -317,7 +317,7 @@ def dec_to_rad_pt(x: float, y: float) -> Tuple[float, float]:
     return np.sqrt(x * x + y * y), np.arctan2(y, x)
 
 
-@fast_math
+@fast_math("UniTuple(float64, 2)(float64, float64)")
 def rad_to_dec_pt(rho: float, phi: float) -> Tuple[float, float]:
     """
     Переводи пару координат из полярной системы в декартову.\n
@@ -448,103 +448,101 @@ def compute_derivatives_at_pt(points: np.ndarray, row: int, col: int) -> Tuple[f
            (points[row_1, col] - points[row_0, col]) * 0.5
 
 
-@parallel
-def compute_derivatives_2(points: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
-    """
-    Вычисляет производные по х, по y и по xy. Используется центральный разностный аналог
-    :param points: двумерный список узловых точек
-    :return: (df/dx, df/dy, df/dx/dy), каждый элемент np.ndarray
-    """
-    if points.ndim != 2:
-        raise RuntimeError("compute_derivatives_2 :: points array has to be 2 dimensional")
-
-    rows, colons = points.shape
-
-    points_dx = np.zeros_like(points)
-    points_dy = np.zeros_like(points)
-    points_dxy = np.zeros_like(points)
-
-    for i in parallel_range(points.size):
-        row_, col_ = divmod(i, colons)
+def _grid_dtype(points: np.ndarray) -> np.dtype:
+    # float32 карты остаются float32, целочисленные считаются в float64
+    return points.dtype if np.issubdtype(points.dtype, np.floating) else np.dtype(np.float64)
 
-        row_1 = min(rows - 1, row_ + 1)
-        row_0 = max(0, row_ - 1)
 
-        col_1 = min(colons - 1, col_ + 1)
-        col_0 = max(0, col_ - 1)
+def _check_grid(points: np.ndarray, func_name: str) -> np.ndarray:
+    points = np.asarray(points)
+    if points.ndim < 2:
+        raise RuntimeError(f"{func_name} :: points array has to be at least 2 dimensional")
+    return points
 
-        points_dx[row_, col_] = (points[row_, col_1] - points[row_, col_0]) * 0.5
 
-        points_dy[row_, col_] = (points[row_1, col_] - points[row_0, col_]) * 0.5
+def _check_out(out: np.ndarray, shape: Tuple[int, ...], func_name: str) -> np.ndarray:
+    if out.shape != shape:
+        raise RuntimeError(f"{func_name} :: out array shape {out.shape} does not match {shape}")
+    return out
 
-        dx_1 = (points[row_1, col_1] -
-                points[row_1, col_0]) * 0.25
-        dx_2 = (points[row_0, col_1] -
-                points[row_0, col_0]) * 0.25
-        points_dxy[row_, col_] = (dx_2 - dx_1)
 
+def _central_difference(points: np.ndarray, axis: int, out: np.ndarray) -> np.ndarray:
+    """
+    (f[i + 1] - f[i - 1]) / 2 вдоль оси axis (-1 - столбцы, -2 - строки), индексы на краях ограничиваются
+    размером сетки, как в compute_derivatives_at_pt. out может быть видом на другой массив, но не points.
+    """
+    n = points.shape[axis]
+    if n == 1:
+        out[...] = 0.0
+        return out
+    inner = [slice(None)] * points.ndim
+    upper = [slice(None)] * points.ndim
+    lower = [slice(None)] * points.ndim
+    inner[axis], upper[axis], lower[axis] = slice(1, -1), slice(2, None), slice(None, -2)
+    np.subtract(points[tuple(upper)], points[tuple(lower)], out=out[tuple(inner)])
+    for edge, i_1, i_0 in ((0, 1, 0), (-1, -1, -2)):
+        inner[axis], upper[axis], lower[axis] = edge, i_1, i_0
+        np.subtract(points[tuple(upper)], points[tuple(lower)], out=out[tuple(inner)])
+    out *= 0.5
+    return out
+
+
+def compute_derivatives_2(points: np.ndarray, out: Tuple[np.ndarray, np.ndarray, np.ndarray] = None) \
+        -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Вычисляет производные по х, по y и по xy. Используется центральный разностный аналог
+    :param points: двумерный список узловых точек или стопка сеток (..., rows, cols)
+    :param out: три массива формы points для результата (повторное использование буферов)
+    :return: (df/dx, df/dy, df/dx/dy), каждый элемент np.ndarray. Знак df/dx/dy противоположен
+    compute_derivatives_2_at_pt, на это рассчитан bi_qubic_interp
+    """
+    points = _check_grid(points, "compute_derivatives_2")
+    if out is None:
+        out = tuple(np.empty(points.shape, dtype=_grid_dtype(points)) for _ in range(3))
+    points_dx, points_dy, points_dxy = (_check_out(o, points.shape, "compute_derivatives_2") for o in out)
+    _central_difference(points, -1, points_dx)
+    _central_difference(points, -2, points_dy)
+    _central_difference(points_dx, -2, points_dxy)
+    np.negative(points_dxy, out=points_dxy)
     return points_dx, points_dy, points_dxy
 
 
-@parallel
-def compute_derivatives(points: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+def compute_derivatives(points: np.ndarray, out: Tuple[np.ndarray, np.ndarray] = None) \
+        -> Tuple[np.ndarray, np.ndarray]:
     """
-    Вычисляет производные по х, по y и по xy. Используется центральный разностный аналог
-    :param points: двумерный список узловых точек
+    Вычисляет производные по х и по y. Используется центральный разностный аналог
+    :param points: двумерный список узловых точек или стопка сеток (..., rows, cols)
+    :param out: два массива формы points для результата
     :return: (df/dx, df/dy), каждый элемент np.ndarray
     """
-    if points.ndim != 2:
-        raise RuntimeError("compute_derivatives_2 :: points array has to be 2 dimensional")
-
-    rows, colons = points.shape
-
-    points_dx = np.zeros_like(points)
-    points_dy = np.zeros_like(points)
-
-    for i in parallel_range(points.size):
-        row_, col_ = divmod(i, colons)
-
-        row_1 = min(rows - 1, row_ + 1)
-        row_0 = max(0, row_ - 1)
-
-        col_1 = min(colons - 1, col_ + 1)
-        col_0 = max(0, col_ - 1)
-
-        points_dx[row_, col_] = (points[row_, col_1] - points[row_, col_0]) * 0.5
-
-        points_dy[row_, col_] = (points[row_1, col_] - points[row_0, col_]) * 0.5
-
+    points = _check_grid(points, "compute_derivatives")
+    if out is None:
+        out = tuple(np.empty(points.shape, dtype=_grid_dtype(points)) for _ in range(2))
+    points_dx, points_dy = (_check_out(o, points.shape, "compute_derivatives") for o in out)
+    _central_difference(points, -1, points_dx)
+    _central_difference(points, -2, points_dy)
     return points_dx, points_dy
 
 
-@parallel
-def compute_normals(points: np.ndarray) -> np.ndarray:
-    if points.ndim != 2:
-        raise RuntimeError("compute_derivatives_2 :: points array has to be 2 dimensional")
-
-    rows, cols = points.shape
-
-    points_n = np.zeros((rows, cols, 3,), dtype=float)
-
-    for i in parallel_range(points.size):
-        row_, col_ = divmod(i, cols)
-
-        row_1 = min(rows - 1, row_ + 1)
-        row_0 = max(0, row_ - 1)
-
-        col_1 = min(cols - 1, col_ + 1)
-        col_0 = max(0, col_ - 1)
-
-        _dx = (points[row_, col_1] - points[row_, col_0]) * 0.5
-
-        _dy = (points[row_1, col_] - points[row_0, col_]) * 0.5
-
-        _rho = np.sqrt(1.0 + _dx * _dx + _dy * _dy)
-
-        points_n[row_, col_, 0] = _dx / _rho
-
-        points_n[row_, col_, 1] = _dy / _rho
-
-        points_n[row_, col_, 2] = 1.0 / _rho
-
-    return points_n
+def compute_normals(points: np.ndarray, out: np.ndarray = None) -> np.ndarray:
+    """
+    Нормали карты высот (df/dx, df/dy, 1) / sqrt(1 + df/dx^2 + df/dy^2).
+    :param points: двумерный список узловых точек или стопка сеток (..., rows, cols)
+    :param out: массив формы (..., rows, cols, 3) для результата
+    :return: np.ndarray (..., rows, cols, 3)
+    """
+    points = _check_grid(points, "compute_normals")
+    if out is None:
+        out = np.empty(points.shape + (3,), dtype=_grid_dtype(points))
+    _check_out(out, points.shape + (3,), "compute_normals")
+    # производные в непрерывных массивах: операции над видами out[..., i] с шагом 3 заметно медленнее
+    points_dx, points_dy = compute_derivatives(points)
+    rho_inv = points_dx * points_dx
+    rho_inv += points_dy * points_dy
+    rho_inv += 1.0
+    np.sqrt(rho_inv, out=rho_inv)
+    np.reciprocal(rho_inv, out=rho_inv)
+    np.multiply(points_dx, rho_inv, out=out[..., 0])
+    np.multiply(points_dy, rho_inv, out=out[..., 1])
+    out[..., 2] = rho_inv
+    return out
@@ -1,5 +1,7 @@
+from .vector3_array import Vector3Array, _as_xyz
 from .vector3 import Vector3
 from .ray import Ray
+import numpy as np
 
 
 class Plane:
@@ -84,6 +86,19 @@ class Plane:
                       Vector3.dot(ray.origin, self.normal)) / Vector3.dot(ray.direction, self.normal)
         return ray
 
+    def intersect_by_rays(self, directions: Vector3Array, origins: Vector3Array) -> np.ndarray:
+        """
+        Длины лучей до пересечения с плоскостью, как intersect_by_ray для массива лучей.
+        origins - Vector3Array той же длины или один Vector3 для всех лучей.
+        Для лучей, параллельных плоскости, длина nan.
+        """
+        n = np.array((self._normal.x, self._normal.y, self._normal.z))
+        d_n = _as_xyz(directions) @ n
+        o_n = _as_xyz(origins) @ n
+        with np.errstate(divide='ignore', invalid='ignore'):
+            lengths = (Vector3.dot(self.origin, self.normal) - o_n) / d_n
+        return np.where(d_n == 0.0, np.nan, lengths)
+
     @classmethod
     def from_three_points(cls, p1: Vector3, p2: Vector3, p3: Vector3):
         assert isinstance(p1, Vector3)
@@ -1,4 +1,4 @@
-from .common import NUMERICAL_FORMAT_4F as _4F, DEG_TO_RAD
+from .common import NUMERICAL_FORMAT_4F as _4F, NUMERICAL_ACCURACY, DEG_TO_RAD
 from dataclasses import dataclass
 from .matrix4 import Matrix4
 from .vector3 import Vector3
@@ -52,6 +52,33 @@ class Quaternion:
         self._ey = float(args[2])
         self._ez = float(args[3])
 
+    def assign(self, ew: float, ex: float, ey: float, ez: float) -> 'Quaternion':
+        """
+        Записывает новые значения на месте, без создания нового кватерниона.
+        """
+        self._ew = float(ew)
+        self._ex = float(ex)
+        self._ey = float(ey)
+        self._ez = float(ez)
+        return self
+
+    def copy_from(self, other: 'Quaternion') -> 'Quaternion':
+        self._ew = other._ew
+        self._ex = other._ex
+        self._ey = other._ey
+        self._ez = other._ez
+        return self
+
+    def iadd_scaled(self, other: 'Quaternion', scale: float) -> 'Quaternion':
+        """
+        self += other * scale на месте, без промежуточных кватернионов.
+        """
+        self._ew += other._ew * scale
+        self._ex += other._ex * scale
+        self._ey += other._ey * scale
+        self._ez += other._ez * scale
+        return self
+
     def __iter__(self):
         yield self._ew
         yield self._ex
@@ -273,7 +300,32 @@ class Quaternion:
 
     def rotate(self, vector: Vector3) -> Vector3:
         assert isinstance(vector, Vector3)
-        return Vector3(*(((self * Quaternion(0.0, vector.x, vector.y, vector.z)) * self.invert())[1:]))
+        return self.rotate_into(vector, Vector3(0.0, 0.0, 0.0))
+
+    def rotate_into(self, vector: Vector3, out: Vector3) -> Vector3:
+        """
+        Поворот вектора q * v * q^-1 единичным кватернионом, записанный в out. out может совпадать с vector.
+        """
+        ew, ex, ey, ez = self._ew, self._ex, self._ey, self._ez
+        vx, vy, vz = vector.x, vector.y, vector.z
+        # в __mul__ векторное произведение берётся с обратным знаком, поэтому
+        # t = 2 * (v x q.xyz), v' = v + ew * t + t x q.xyz
+        tx = 2.0 * (vy * ez - vz * ey)
+        ty = 2.0 * (vz * ex - vx * ez)
+        tz = 2.0 * (vx * ey - vy * ex)
+        return out.assign(vx + ew * tx + ty * ez - tz * ey,
+                          vy + ew * ty + tz * ex - tx * ez,
+                          vz + ew * tz + tx * ey - ty * ex)
+
+    @staticmethod
+    def mul_into(a: 'Quaternion', b: 'Quaternion', out: 'Quaternion') -> 'Quaternion':
+        """
+        Произведение a * b, записанное в out. out может совпадать с a или b.
+        """
+        return out.assign(a._ew * b._ew - a._ex * b._ex - a._ey * b._ey - a._ez * b._ez,
+                          a._ew * b._ex + a._ex * b._ew - a._ey * b._ez + a._ez * b._ey,
+                          a._ew * b._ey + a._ex * b._ez + a._ey * b._ew - a._ez * b._ex,
+                          a._ew * b._ez - a._ex * b._ey + a._ey * b._ex + a._ez * b._ew)
 
     def to_rotation_matrix(self) -> Matrix4:
         xx = self.ex * self.ex * 2.0
@@ -344,6 +396,25 @@ class Quaternion:
         assert isinstance(b, Quaternion)
         return sum(ai * bi for ai, bi in zip(a, b))
 
+    @classmethod
+    def slerp(cls, a, b, t: float):
+        """
+        Сферическая интерполяция между единичными кватернионами a и b по кратчайшей дуге, t в [0, 1].
+        """
+        assert isinstance(a, Quaternion)
+        assert isinstance(b, Quaternion)
+        cos_theta = Quaternion.dot(a, b)
+        sign = -1.0 if cos_theta < 0.0 else 1.0
+        cos_theta = min(abs(cos_theta), 1.0)
+        theta = math.acos(cos_theta)
+        sin_theta = math.sin(theta)
+        if sin_theta < NUMERICAL_ACCURACY:
+            k_a, k_b = 1.0 - t, t * sign
+        else:
+            k_a, k_b = math.sin((1.0 - t) * theta) / sin_theta, sign * math.sin(t * theta) / sin_theta
+        return cls(a.ew * k_a + b.ew * k_b, a.ex * k_a + b.ex * k_b,
+                   a.ey * k_a + b.ey * k_b, a.ez * k_a + b.ez * k_b).normalize()
+
     @classmethod
     def max(cls, a, b):
         assert isinstance(a, Quaternion)
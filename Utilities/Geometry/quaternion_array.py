@@ -0,0 +1,252 @@
+from .common import NUMERICAL_FORMAT_4F as _4F, NUMERICAL_ACCURACY, DEG_TO_RAD
+from .vector3_array import Vector3Array, _as_xyz
+from .matrix4_array import Matrix4Array
+from typing import Iterable, List, Union
+from .quaternion import Quaternion
+from .vector3 import Vector3
+import numpy as np
+
+
+def _as_wxyz(value) -> Union[np.ndarray, None]:
+    if isinstance(value, QuaternionArray):
+        return value._data
+    if isinstance(value, Quaternion):
+        return np.array((value.ew, value.ex, value.ey, value.ez))
+    return None
+
+
+def _mul_wxyz(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    # те же формулы, что и в Quaternion.__mul__
+    aw, ax, ay, az = a[..., 0], a[..., 1], a[..., 2], a[..., 3]
+    bw, bx, by, bz = b[..., 0], b[..., 1], b[..., 2], b[..., 3]
+    return np.stack((aw * bw - ax * bx - ay * by - az * bz,
+                     aw * bx + ax * bw - ay * bz + az * by,
+                     aw * by + ax * bz + ay * bw - az * bx,
+                     aw * bz - ax * by + ay * bx + az * bw), axis=-1)
+
+
+class QuaternionArray:
+    """
+    N кватернионов Quaternion в одном массиве numpy формы (N, 4), порядок компонент как у Quaternion: ew, ex, ey, ez.
+    Преобразования в массив numpy и обратно выполняются без копирования.
+    """
+    __slots__ = ('_data',)
+
+    def __init__(self, data: Union[np.ndarray, Iterable] = None):
+        if data is None:
+            data = np.zeros((0, 4))
+        data = np.asarray(data, dtype=np.float64)
+        if data.ndim != 2 or data.shape[1] != 4:
+            raise RuntimeError(f"QuaternionArray :: expected array of shape (N, 4), got {data.shape}")
+        self._data: np.ndarray = data
+
+    @classmethod
+    def identity(cls, n: int) -> 'QuaternionArray':
+        data = np.zeros((n, 4))
+        data[:, 0] = 1.0
+        return cls(data)
+
+    @classmethod
+    def from_quaternions(cls, quaternions: Iterable[Quaternion]) -> 'QuaternionArray':
+        return cls(np.array([tuple(q) for q in quaternions], dtype=np.float64).reshape((-1, 4)))
+
+    @classmethod
+    def from_np_array(cls, array: np.ndarray) -> 'QuaternionArray':
+        """
+        Оборачивает массив (N, 4) без копирования.
+        """
+        assert isinstance(array, np.ndarray)
+        return cls(array)
+
+    def to_np_array(self) -> np.ndarray:
+        return self._data
+
+    def to_quaternions(self) -> List[Quaternion]:
+        return [Quaternion(*q) for q in self._data.tolist()]
+
+    def __len__(self) -> int:
+        return self._data.shape[0]
+
+    def __iter__(self):
+        for q in self._data.tolist():
+            yield Quaternion(*q)
+
+    def __getitem__(self, index) -> Union[Quaternion, 'QuaternionArray']:
+        if isinstance(index, int) or isinstance(index, np.integer):
+            return Quaternion(*self._data[index])
+        return QuaternionArray(self._data[index])
+
+    def __setitem__(self, index, value) -> None:
+        data = _as_wxyz(value)
+        if data is None:
+            raise RuntimeError(f"QuaternionArray::SetItem::wrong argument type {type(value)}")
+        self._data[index] = data
+
+    def __eq__(self, other):
+        if not isinstance(other, QuaternionArray):
+            return False
+        return self._data.shape == other._data.shape and bool(np.all(self._data == other._data))
+
+    def __str__(self) -> str:
+        return "[\n" + ",\n".join(f"\t{{\"ew\": {w:{_4F}}, \"ex\": {x:{_4F}}, \"ey\": {y:{_4F}}, \"ez\": {z:{_4F}}}}"
+                                  for w, x, y, z in self._data.tolist()) + "\n]"
+
+    def __copy__(self) -> 'QuaternionArray':
+        return QuaternionArray(self._data.copy())
+
+    copy = __copy__
+
+    @property
+    def ew(self) -> np.ndarray:
+        return self._data[:, 0]
+
+    @property
+    def ex(self) -> np.ndarray:
+        return self._data[:, 1]
+
+    @property
+    def ey(self) -> np.ndarray:
+        return self._data[:, 2]
+
+    @property
+    def ez(self) -> np.ndarray:
+        return self._data[:, 3]
+
+    @property
+    def conjugated(self) -> 'QuaternionArray':
+        return QuaternionArray(self._data * np.array((1.0, -1.0, -1.0, -1.0)))
+
+    @property
+    def magnitude_sqr(self) -> np.ndarray:
+        return np.einsum('ij,ij->i', self._data, self._data)
+
+    @property
+    def magnitude(self) -> np.ndarray:
+        return np.sqrt(self.magnitude_sqr)
+
+    def normalize(self) -> 'QuaternionArray':
+        magnitude = self.magnitude
+        np.divide(self._data, magnitude[:, None], out=self._data, where=magnitude[:, None] > 0.0)
+        return self
+
+    @property
+    def normalized(self) -> 'QuaternionArray':
+        return QuaternionArray(self._data.copy()).normalize()
+
+    @property
+    def inverted(self) -> 'QuaternionArray':
+        """
+        Сопряжённые нормированные кватернионы, как Quaternion.inverted
+        """
+        return self.normalized.conj()
+
+    def conj(self) -> 'QuaternionArray':
+        self._data[:, 1:] *= -1.0
+        return self
+
+    def __neg__(self) -> 'QuaternionArray':
+        return QuaternionArray(-self._data)
+
+    def __mul__(self, other) -> Union['QuaternionArray', Vector3Array]:
+        data = _as_wxyz(other)
+        if data is not None:
+            return QuaternionArray(np.atleast_2d(_mul_wxyz(self._data, data)))
+        if isinstance(other, Vector3Array) or isinstance(other, Vector3):
+            return self.rotate(other)
+        if isinstance(other, int) or isinstance(other, float):
+            return QuaternionArray(self._data * other)
+        raise RuntimeError(f"QuaternionArray::Mul::wrong argument type {type(other)}")
+
+    def __rmul__(self, other) -> 'QuaternionArray':
+        data = _as_wxyz(other)
+        if data is not None:
+            return QuaternionArray(np.atleast_2d(_mul_wxyz(data, self._data)))
+        if isinstance(other, int) or isinstance(other, float):
+            return QuaternionArray(self._data * other)
+        raise RuntimeError(f"QuaternionArray::RMul::wrong argument type {type(other)}")
+
+    def __imul__(self, other) -> 'QuaternionArray':
+        data = _as_wxyz(other)
+        if data is not None:
+            self._data[:] = _mul_wxyz(self._data, data)
+            return self
+        if isinstance(other, int) or isinstance(other, float):
+            self._data *= other
+            return self
+        raise RuntimeError(f"QuaternionArray::IMul::wrong argument type {type(other)}")
+
+    def rotate(self, vectors: Union[Vector3Array, Vector3]) -> Vector3Array:
+        """
+        Поворот векторов единичными кватернионами, как Quaternion.rotate. vectors - Vector3Array той же длины
+        или один Vector3, повёрнутый каждым кватернионом.
+        """
+        v = _as_xyz(vectors)
+        if v is None or isinstance(v, float):
+            raise RuntimeError(f"QuaternionArray::Rotate::wrong argument type {type(vectors)}")
+        q = self._data
+        ew, ex, ey, ez = q[:, 0], q[:, 1], q[:, 2], q[:, 3]
+        vx, vy, vz = v[..., 0], v[..., 1], v[..., 2]
+        # см. Quaternion.rotate_into: t = 2 * (v x q.xyz), v' = v + ew * t + t x q.xyz
+        tx = 2.0 * (vy * ez - vz * ey)
+        ty = 2.0 * (vz * ex - vx * ez)
+        tz = 2.0 * (vx * ey - vy * ex)
+        return Vector3Array(np.stack((vx + ew * tx + ty * ez - tz * ey,
+                                      vy + ew * ty + tz * ex - tx * ez,
+                                      vz + ew * tz + tx * ey - ty * ex), axis=-1))
+
+    @staticmethod
+    def dot(a, b) -> np.ndarray:
+        return np.sum(_as_wxyz(a) * _as_wxyz(b), axis=-1)
+
+    @classmethod
+    def slerp(cls, a, b, t: Union[float, np.ndarray]) -> 'QuaternionArray':
+        """
+        Сферическая интерполяция между единичными кватернионами a и b (QuaternionArray или Quaternion) с параметром t
+        (число или массив (N,)). Выбирается кратчайшая дуга, как в Quaternion.slerp.
+        """
+        a, b = np.atleast_2d(_as_wxyz(a)), np.atleast_2d(_as_wxyz(b))
+        t = np.asarray(t, dtype=np.float64).reshape((-1, 1))
+        cos_theta = np.sum(a * b, axis=-1, keepdims=True)
+        b = np.where(cos_theta < 0.0, -b, b)
+        cos_theta = np.abs(cos_theta)
+        theta = np.arccos(np.minimum(cos_theta, 1.0))
+        sin_theta = np.sin(theta)
+        close = sin_theta < NUMERICAL_ACCURACY
+        sin_theta = np.where(close, 1.0, sin_theta)
+        k_a = np.where(close, 1.0 - t, np.sin((1.0 - t) * theta) / sin_theta)
+        k_b = np.where(close, t, np.sin(t * theta) / sin_theta)
+        return cls(a * k_a + b * k_b).normalize()
+
+    def to_rotation_matrices(self) -> Matrix4Array:
+        """
+        Матрицы поворота, как Quaternion.to_rotation_matrix
+        """
+        q = self._data
+        w, x, y, z = q[:, 0], q[:, 1], q[:, 2], q[:, 3]
+        xx, xy, xz = x * x * 2.0, x * y * 2.0, x * z * 2.0
+        yy, yz, zz = y * y * 2.0, y * z * 2.0, z * z * 2.0
+        wx, wy, wz = w * x * 2.0, w * y * 2.0, w * z * 2.0
+        m = np.zeros((q.shape[0], 4, 4))
+        m[:, 0, 0], m[:, 0, 1], m[:, 0, 2] = 1.0 - (yy + zz), xy + wz, xz - wy
+        m[:, 1, 0], m[:, 1, 1], m[:, 1, 2] = xy - wz, 1.0 - (xx + zz), yz + wx
+        m[:, 2, 0], m[:, 2, 1], m[:, 2, 2] = xz + wy, yz - wx, 1.0 - (xx + yy)
+        m[:, 3, 3] = 1.0
+        return Matrix4Array(m)
+
+    @classmethod
+    def from_euler_angles(cls, roll: np.ndarray, pitch: np.ndarray, yaw: np.ndarray,
+                          in_radians: bool = True) -> 'QuaternionArray':
+        scale = 0.5 if in_radians else 0.5 * DEG_TO_RAD
+        roll, pitch, yaw = (np.asarray(v, dtype=np.float64) * scale for v in (roll, pitch, yaw))
+        cr, sr = np.cos(roll), np.sin(roll)
+        cp, sp = np.cos(pitch), np.sin(pitch)
+        cy, sy = np.cos(yaw), np.sin(yaw)
+        return cls(np.atleast_2d(np.stack((cr * cp * cy + sr * sp * sy, sr * cp * cy - cr * sp * sy,
+                                           cr * sp * cy + sr * cp * sy, cr * cp * sy - sr * sp * cy), axis=-1)))
+
+    def to_euler_angles(self) -> Vector3Array:
+        w, x, y, z = self.ew, self.ex, self.ey, self.ez
+        ax = np.arctan2(2.0 * (w * x + y * z), 1.0 - 2.0 * (x * x + y * y))
+        ay = np.arcsin (np.clip(2.0 * (w * y - z * x), -1.0, 1.0))
+        az = np.arctan2(2.0 * (w * z + x * y), 1.0 - 2.0 * (y * y + z * z))
+        return Vector3Array(np.stack((ax, ay, az), axis=-1))
@@ -0,0 +1,80 @@
+"""
+Проверка BiCubicInterpolator.intersect_by_rays по скалярному обходу лучей с interp_pt.
+Запуск: python -m pytest Utilities/Geometry/tests или как скрипт.
+"""
+from Utilities.Geometry.bicubic_interpolator import BiCubicInterpolator
+from Utilities.Geometry.vector3_array import Vector3Array
+import numpy as np
+import math
+
+
+def _ramp(n: int = 8) -> BiCubicInterpolator:
+    # z = x на [0, 1] x [0, 1]
+    return BiCubicInterpolator(np.tile(np.linspace(0.0, 1.0, n), (n, 1)))
+
+
+def _intersect_scalar(surface: BiCubicInterpolator, origin, direction, t_max: float = 10.0,
+                      steps: int = 4000, refine: int = 40) -> float:
+    """
+    Первый переход точки луча внутри области карты с уровня выше поверхности на уровень ниже.
+    """
+    def offset(t):
+        x, y, z = (o + d * t for o, d in zip(origin, direction))
+        if not (0.0 <= x <= surface.width and 0.0 <= y <= surface.height):
+            return None
+        return surface.interp_pt(x, y) - z
+
+    t_prev, prev = 0.0, offset(0.0)
+    for i in range(1, steps + 1):
+        t = t_max * i / steps
+        curr = offset(t)
+        if prev is not None and curr is not None and prev < 0.0 <= curr:
+            t_lo, t_hi = t_prev, t
+            for _ in range(refine):
+                t_mid = (t_lo + t_hi) * 0.5
+                if offset(t_mid) >= 0.0:
+                    t_hi = t_mid
+                else:
+                    t_lo = t_mid
+            return t_hi
+        t_prev, prev = t, curr
+    return math.nan
+
+
+def _intersect(surface: BiCubicInterpolator, origins: np.ndarray, directions: np.ndarray) -> np.ndarray:
+    return surface.intersect_by_rays(Vector3Array(directions), Vector3Array(origins), steps=256, refine=40)
+
+
+def test_side_entry_below_surface():
+    surface = _ramp()
+    origin, direction = (1.5, 0.5, 0.6), (-1.0, 0.0, -0.1)
+    lengths = _intersect(surface, np.array([origin]), np.array([direction]))
+    assert math.isnan(lengths[0])
+    assert math.isnan(_intersect_scalar(surface, origin, direction))
+
+
+def test_rays_match_scalar():
+    rnd = np.random.default_rng(3)
+    grid = np.linspace(0.0, 1.0, 9)
+    surface = BiCubicInterpolator(0.3 * np.sin(3.0 * grid[None, :]) * np.cos(2.0 * grid[:, None]) + 0.5)
+    n = 32
+    origins = np.column_stack((rnd.uniform(-0.5, 1.5, n), rnd.uniform(-0.5, 1.5, n), rnd.uniform(0.2, 1.5, n)))
+    targets = np.column_stack((rnd.uniform(0.0, 1.0, n), rnd.uniform(0.0, 1.0, n), rnd.uniform(0.0, 1.0, n)))
+    directions = targets - origins
+    lengths = _intersect(surface, origins, directions)
+    hits = 0
+    for i in range(n):
+        expected = _intersect_scalar(surface, origins[i], directions[i], t_max=2.0)
+        if math.isnan(expected):
+            assert math.isnan(lengths[i]), i
+            continue
+        hits += 1
+        assert abs(lengths[i] - expected) < 1e-6, (i, lengths[i], expected)
+        x, y, z = origins[i] + directions[i] * lengths[i]
+        assert abs(surface.interp_pt(x, y) - z) < 1e-6
+    assert hits > 0
+
+
+if __name__ == "__main__":
+    test_side_entry_below_surface()
+    test_rays_match_scalar()
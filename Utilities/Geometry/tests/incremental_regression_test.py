@@ -0,0 +1,64 @@
+"""
+Проверка оценок incremental_regression по взвешенному МНК np.linalg.lstsq с весами forgetting^возраст
+по последним window отсчётам. Запуск: python -m pytest Utilities/Geometry/tests или как скрипт.
+"""
+from Utilities.Geometry.incremental_regression import IncrementalLinearRegression, IncrementalPolyRegression
+import numpy as np
+
+
+def _weighted_lstsq(design: np.ndarray, targets: np.ndarray, window: int, forgetting: float) -> np.ndarray:
+    design, targets = design[-window:], targets[-window:]
+    sqrt_w = np.sqrt(forgetting ** np.arange(design.shape[0] - 1, -1, -1, dtype=float))
+    return np.linalg.lstsq(design * sqrt_w[:, None], targets * sqrt_w, rcond=None)[0]
+
+
+def _signal(n: int, x_0: float = 0.0):
+    rnd = np.random.default_rng(7)
+    x = x_0 + np.cumsum(rnd.uniform(0.05, 0.15, n))
+    return x, np.sin(x - x_0) * 3.0 + 0.5 * (x - x_0) + rnd.normal(0.0, 0.1, n)
+
+
+def test_linear_window_forgetting():
+    x, y = _signal(300)
+    for window, forgetting in ((32, 0.95), (17, 0.8), (32, 1.0)):
+        estimator = IncrementalLinearRegression(window, forgetting)
+        for i in range(x.size):
+            estimator.update(x[i], y[i])
+            if i >= 1:
+                n = i + 1
+                k, b = _weighted_lstsq(np.column_stack((x[:n], np.ones(n))), y[:n], window, forgetting)
+                assert np.allclose(estimator.coefficients, (k, b), atol=1e-8), (window, forgetting, i)
+
+
+def test_poly_window_forgetting():
+    x, y = _signal(300)
+    order = 4
+    for window, forgetting in ((40, 0.95), (25, 0.9)):
+        estimator = IncrementalPolyRegression(order, window, forgetting)
+        for i in range(x.size):
+            estimator.update(x[i], y[i])
+            n = i + 1
+            if n >= order:
+                reference = _weighted_lstsq(x[:n, None] ** np.arange(order), y[:n], window, forgetting)
+                assert np.allclose(estimator.coefficients, reference, rtol=1e-6, atol=1e-6), (window, forgetting, i)
+
+
+def test_poly_timestamp_scale():
+    # x порядка времени в секундах: сравнение значений регрессии, коэффициенты от x плохо обусловлены
+    x_0 = 1.7e9
+    x, y = _signal(200, x_0)
+    order, window, forgetting = 4, 40, 0.95
+    estimator = IncrementalPolyRegression(order, window, forgetting)
+    for i in range(x.size):
+        value = estimator.update(x[i], y[i])
+    t = x - x[-window]
+    reference = _weighted_lstsq(t[:, None] ** np.arange(order), y, window, forgetting)
+    assert abs(value - np.polynomial.polynomial.polyval(t[-1], reference)) < 1e-6
+    assert np.allclose(estimator.predict(x[-5:]), np.polynomial.polynomial.polyval(t[-5:], reference), atol=1e-6)
+
+
+if __name__ == "__main__":
+    test_linear_window_forgetting()
+    test_poly_window_forgetting()
+    test_poly_timestamp_scale()
+    print("incremental_regression: ok")
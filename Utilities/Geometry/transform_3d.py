@@ -15,10 +15,11 @@ def deg_to_rad(deg: float) -> float:
 
 class Transform3d:
 
-    __slots__ = ("_raw_i_t_m", "_t_m", "_i_t_m", "_angles")
+    __slots__ = ("_raw_i_t_m", "_t_m", "_i_t_m", "_angles", "_version")
 
     def __init__(self):
         self._raw_i_t_m: bool = False
+        self._version: int = 0
         self._angles: Vector3 = Vector3(0.0, 0.0, 0.0)
         self._t_m = Matrix4(1.0, 0.0, 0.0, 0.0,
                             0.0, 1.0, 0.0, 0.0,
@@ -31,6 +32,7 @@ class Transform3d:
 
     def _build_i_t_m(self) -> None:
         self._raw_i_t_m = True
+        self._version += 1
 
     def __str__(self) -> str:
         return f"{{\n" \
@@ -62,6 +64,13 @@ class Transform3d:
     def unique_id(self) -> int:
         return id(self)
 
+    @property
+    def version(self) -> int:
+        """
+        Счётчик изменений transform_matrix, растёт при каждом изменении через свойства Transform3d.
+        """
+        return self._version
+
     @property
     def inv_transform_matrix(self) -> Matrix4:
         if self._raw_i_t_m:
@@ -41,6 +41,33 @@ class Vector3:
         self._y = float(args[1])
         self._z = float(args[2])
 
+    def assign(self, x: float, y: float, z: float) -> 'Vector3':
+        """
+        Записывает новые значения на месте, без создания нового вектора.
+        """
+        self._x = float(x)
+        self._y = float(y)
+        self._z = float(z)
+        return self
+
+    def copy_from(self, other: 'Vector3') -> 'Vector3':
+        """
+        Копирует значения другого вектора на месте.
+        """
+        self._x = other._x
+        self._y = other._y
+        self._z = other._z
+        return self
+
+    def iadd_scaled(self, other: 'Vector3', scale: float) -> 'Vector3':
+        """
+        self += other * scale на месте, без промежуточных векторов.
+        """
+        self._x += other._x * scale
+        self._y += other._y * scale
+        self._z += other._z * scale
+        return self
+
     def __iter__(self):
         yield self._x
         yield self._y
@@ -71,14 +98,14 @@ class Vector3:
 
     def __iadd__(self, other) -> 'Vector3':
         if isinstance(other, Vector3):
-            self.x += other.x
-            self.y += other.y
-            self.z += other.z
+            self._x += other._x
+            self._y += other._y
+            self._z += other._z
             return self
         if isinstance(other, int) or isinstance(other, float):
-            self.x += other
-            self.y += other
-            self.z += other
+            self._x += other
+            self._y += other
+            self._z += other
             return self
         raise RuntimeError(f"Vector3::IAdd::wrong argument type {type(other)}")
 
@@ -98,14 +125,14 @@ class Vector3:
 
     def __isub__(self, other) -> 'Vector3':
         if isinstance(other, Vector3):
-            self.x -= other.x
-            self.y -= other.y
-            self.z -= other.z
+            self._x -= other._x
+            self._y -= other._y
+            self._z -= other._z
             return self
         if isinstance(other, int) or isinstance(other, float):
-            self.x -= other
-            self.y -= other
-            self.z -= other
+            self._x -= other
+            self._y -= other
+            self._z -= other
             return self
         raise RuntimeError(f"Vector3::ISub::wrong argument type {type(other)}")
 
@@ -120,14 +147,14 @@ class Vector3:
 
     def __imul__(self, other) -> 'Vector3':
         if isinstance(other, Vector3):
-            self.x *= other.x
-            self.y *= other.y
-            self.z *= other.z
+            self._x *= other._x
+            self._y *= other._y
+            self._z *= other._z
             return self
         if isinstance(other, int) or isinstance(other, float):
-            self.x *= other
-            self.y *= other
-            self.z *= other
+            self._x *= other
+            self._y *= other
+            self._z *= other
             return self
         raise RuntimeError(f"Vector3::IMul::wrong argument type {type(other)}")
 
@@ -147,22 +174,24 @@ class Vector3:
 
     def __idiv__(self, other) -> 'Vector3':
         if isinstance(other, Vector3):
-            self.x /= other.x
-            self.y /= other.y
-            self.z /= other.z
+            self._x /= other._x
+            self._y /= other._y
+            self._z /= other._z
             return self
         if isinstance(other, int) or isinstance(other, float):
-            self.x /= other
-            self.y /= other
-            self.z /= other
+            self._x /= other
+            self._y /= other
+            self._z /= other
             return self
         raise RuntimeError(f"Vector3::IDiv::wrong argument type {type(other)}")
 
+    __itruediv__ = __idiv__
+
     __div__, __rdiv__ = __truediv__, __rtruediv__
 
     @property
     def magnitude_sqr(self) -> float:
-        return self.x * self.x + self.y * self.y + self.z * self.z
+        return self._x * self._x + self._y * self._y + self._z * self._z
 
     @property
     def magnitude(self) -> float:
@@ -173,7 +202,7 @@ class Vector3:
         try:
             return self / self.magnitude
         except ZeroDivisionError as _:
-            return Vector3()
+            return Vector3(0.0, 0.0, 0.0)
 
     def normalize(self) -> 'Vector3':
         try:
@@ -193,6 +222,52 @@ class Vector3:
         assert isinstance(b, Vector3)
         return cls(a.z * b.y - a.y * b.z, a.x * b.z - a.z * b.x, a.y * b.x - a.x * b.y)
 
+    @staticmethod
+    def cross_into(a: 'Vector3', b: 'Vector3', out: 'Vector3') -> 'Vector3':
+        """
+        Vector3.cross(a, b), записанный в out. out может совпадать с a или b.
+        """
+        return out.assign(a._z * b._y - a._y * b._z, a._x * b._z - a._z * b._x, a._y * b._x - a._x * b._y)
+
+    @staticmethod
+    def add_into(a: 'Vector3', b: 'Vector3', out: 'Vector3') -> 'Vector3':
+        out._x = a._x + b._x
+        out._y = a._y + b._y
+        out._z = a._z + b._z
+        return out
+
+    @staticmethod
+    def sub_into(a: 'Vector3', b: 'Vector3', out: 'Vector3') -> 'Vector3':
+        out._x = a._x - b._x
+        out._y = a._y - b._y
+        out._z = a._z - b._z
+        return out
+
+    @staticmethod
+    def mul_into(a: 'Vector3', b, out: 'Vector3') -> 'Vector3':
+        """
+        a * b, записанный в out. b - вектор (покомпонентно) или число.
+        """
+        if isinstance(b, Vector3):
+            out._x = a._x * b._x
+            out._y = a._y * b._y
+            out._z = a._z * b._z
+            return out
+        out._x = a._x * b
+        out._y = a._y * b
+        out._z = a._z * b
+        return out
+
+    @staticmethod
+    def distance(a: 'Vector3', b: 'Vector3') -> float:
+        """
+        (a - b).magnitude без промежуточного вектора.
+        """
+        dx = a._x - b._x
+        dy = a._y - b._y
+        dz = a._z - b._z
+        return math.sqrt(dx * dx + dy * dy + dz * dz)
+
     @classmethod
     def max(cls, a, b) -> 'Vector3':
         assert isinstance(a, Vector3)
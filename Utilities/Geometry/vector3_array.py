@@ -0,0 +1,235 @@
+from .common import NUMERICAL_FORMAT_4F as _4F
+from typing import Iterable, List, Union
+from .vector3 import Vector3
+import numpy as np
+
+
+def _as_xyz(value) -> Union[np.ndarray, float]:
+    """
+    Приводит аргумент операции к массиву (N, 3), строке (3,) или числу для broadcast.
+    """
+    if isinstance(value, Vector3Array):
+        return value._data
+    if isinstance(value, Vector3):
+        return np.array((value.x, value.y, value.z))
+    if isinstance(value, int) or isinstance(value, float):
+        return float(value)
+    if isinstance(value, np.ndarray) and value.ndim == 1:
+        # покомпонентный множитель для каждого вектора
+        return value[:, None]
+    return None
+
+
+class Vector3Array:
+    """
+    N векторов Vector3 в одном массиве numpy формы (N, 3) (структура массивов).
+    Операции выполняются над всеми векторами сразу, аргументом может быть Vector3Array той же длины,
+    одиночный Vector3 или число. Преобразования в массив numpy и обратно выполняются без копирования.
+    """
+    __slots__ = ('_data',)
+
+    def __init__(self, data: Union[np.ndarray, Iterable] = None):
+        if data is None:
+            data = np.zeros((0, 3))
+        data = np.asarray(data, dtype=np.float64)
+        if data.ndim != 2 or data.shape[1] != 3:
+            raise RuntimeError(f"Vector3Array :: expected array of shape (N, 3), got {data.shape}")
+        self._data: np.ndarray = data
+
+    @classmethod
+    def zeros(cls, n: int) -> 'Vector3Array':
+        return cls(np.zeros((n, 3)))
+
+    @classmethod
+    def from_vectors(cls, vectors: Iterable[Vector3]) -> 'Vector3Array':
+        return cls(np.array([(v.x, v.y, v.z) for v in vectors], dtype=np.float64).reshape((-1, 3)))
+
+    @classmethod
+    def from_np_array(cls, array: np.ndarray) -> 'Vector3Array':
+        """
+        Оборачивает массив (N, 3) без копирования, изменения видны в обоих объектах.
+        """
+        assert isinstance(array, np.ndarray)
+        return cls(array)
+
+    def to_np_array(self) -> np.ndarray:
+        """
+        Массив (N, 3) с данными, без копирования.
+        """
+        return self._data
+
+    def to_vectors(self) -> List[Vector3]:
+        return [Vector3(x, y, z) for x, y, z in self._data.tolist()]
+
+    def __len__(self) -> int:
+        return self._data.shape[0]
+
+    def __iter__(self):
+        for x, y, z in self._data.tolist():
+            yield Vector3(x, y, z)
+
+    def __getitem__(self, index) -> Union[Vector3, 'Vector3Array']:
+        if isinstance(index, int) or isinstance(index, np.integer):
+            return Vector3(*self._data[index])
+        return Vector3Array(self._data[index])
+
+    def __setitem__(self, index, value) -> None:
+        if isinstance(value, Vector3):
+            self._data[index] = (value.x, value.y, value.z)
+            return
+        if isinstance(value, Vector3Array):
+            self._data[index] = value._data
+            return
+        raise RuntimeError(f"Vector3Array::SetItem::wrong argument type {type(value)}")
+
+    def __eq__(self, other):
+        if not isinstance(other, Vector3Array):
+            return False
+        return self._data.shape == other._data.shape and bool(np.all(self._data == other._data))
+
+    def __str__(self) -> str:
+        return "[\n" + ",\n".join(f"\t{{\"x\": {x:{_4F}}, \"y\": {y:{_4F}}, \"z\": {z:{_4F}}}}"
+                                  for x, y, z in self._data.tolist()) + "\n]"
+
+    def __copy__(self) -> 'Vector3Array':
+        return Vector3Array(self._data.copy())
+
+    copy = __copy__
+
+    @property
+    def x(self) -> np.ndarray:
+        return self._data[:, 0]
+
+    @property
+    def y(self) -> np.ndarray:
+        return self._data[:, 1]
+
+    @property
+    def z(self) -> np.ndarray:
+        return self._data[:, 2]
+
+    def __neg__(self) -> 'Vector3Array':
+        return Vector3Array(-self._data)
+
+    def __abs__(self) -> 'Vector3Array':
+        return Vector3Array(np.abs(self._data))
+
+    def __add__(self, other) -> 'Vector3Array':
+        value = _as_xyz(other)
+        if value is None:
+            raise RuntimeError(f"Vector3Array::Add::wrong argument type {type(other)}")
+        return Vector3Array(self._data + value)
+
+    __radd__ = __add__
+
+    def __iadd__(self, other) -> 'Vector3Array':
+        value = _as_xyz(other)
+        if value is None:
+            raise RuntimeError(f"Vector3Array::IAdd::wrong argument type {type(other)}")
+        self._data += value
+        return self
+
+    def __sub__(self, other) -> 'Vector3Array':
+        value = _as_xyz(other)
+        if value is None:
+            raise RuntimeError(f"Vector3Array::Sub::wrong argument type {type(other)}")
+        return Vector3Array(self._data - value)
+
+    def __rsub__(self, other) -> 'Vector3Array':
+        value = _as_xyz(other)
+        if value is None:
+            raise RuntimeError(f"Vector3Array::RSub::wrong argument type {type(other)}")
+        return Vector3Array(value - self._data)
+
+    def __isub__(self, other) -> 'Vector3Array':
+        value = _as_xyz(other)
+        if value is None:
+            raise RuntimeError(f"Vector3Array::ISub::wrong argument type {type(other)}")
+        self._data -= value
+        return self
+
+    def __mul__(self, other) -> 'Vector3Array':
+        value = _as_xyz(other)
+        if value is None:
+            raise RuntimeError(f"Vector3Array::Mul::wrong argument type {type(other)}")
+        return Vector3Array(self._data * value)
+
+    __rmul__ = __mul__
+
+    def __imul__(self, other) -> 'Vector3Array':
+        value = _as_xyz(other)
+        if value is None:
+            raise RuntimeError(f"Vector3Array::IMul::wrong argument type {type(other)}")
+        self._data *= value
+        return self
+
+    def __truediv__(self, other) -> 'Vector3Array':
+        value = _as_xyz(other)
+        if value is None:
+            raise RuntimeError(f"Vector3Array::Div::wrong argument type {type(other)}")
+        return Vector3Array(self._data / value)
+
+    def __rtruediv__(self, other) -> 'Vector3Array':
+        value = _as_xyz(other)
+        if value is None:
+            raise RuntimeError(f"Vector3Array::RDiv::wrong argument type {type(other)}")
+        return Vector3Array(value / self._data)
+
+    def __itruediv__(self, other) -> 'Vector3Array':
+        value = _as_xyz(other)
+        if value is None:
+            raise RuntimeError(f"Vector3Array::IDiv::wrong argument type {type(other)}")
+        self._data /= value
+        return self
+
+    @property
+    def magnitude_sqr(self) -> np.ndarray:
+        return np.einsum('ij,ij->i', self._data, self._data)
+
+    @property
+    def magnitude(self) -> np.ndarray:
+        return np.sqrt(self.magnitude_sqr)
+
+    @property
+    def normalized(self) -> 'Vector3Array':
+        """
+        Нормированная копия, векторы нулевой длины остаются нулевыми (как у Vector3.normalized)
+        """
+        return Vector3Array(self._data.copy()).normalize()
+
+    def normalize(self) -> 'Vector3Array':
+        magnitude = self.magnitude
+        np.divide(self._data, magnitude[:, None], out=self._data, where=magnitude[:, None] > 0.0)
+        return self
+
+    @staticmethod
+    def dot(a, b) -> np.ndarray:
+        """
+        Скалярные произведения, (N,)
+        """
+        a, b = _as_xyz(a), _as_xyz(b)
+        return np.sum(a * b, axis=-1)
+
+    @staticmethod
+    def cross(a, b) -> 'Vector3Array':
+        """
+        Векторные произведения в соглашении Vector3.cross(a, b) (= b x a).
+        """
+        a, b = _as_xyz(a), _as_xyz(b)
+        return Vector3Array(np.atleast_2d(np.cross(b, a)))
+
+    @staticmethod
+    def distance(a, b) -> np.ndarray:
+        return np.linalg.norm(_as_xyz(a) - _as_xyz(b), axis=-1)
+
+    @classmethod
+    def max(cls, a, b) -> 'Vector3Array':
+        return cls(np.atleast_2d(np.maximum(_as_xyz(a), _as_xyz(b))))
+
+    @classmethod
+    def min(cls, a, b) -> 'Vector3Array':
+        return cls(np.atleast_2d(np.minimum(_as_xyz(a), _as_xyz(b))))
+
+    @property
+    def mean(self) -> Vector3:
+        return Vector3(*self._data.mean(axis=0))
@@ -1,14 +1,36 @@
-from .serial_utils import search_serial_ports
-from .real_time_filter import RealTimeFilter
-from .runnig_average import RunningAverage
-from .io_utils import get_file_type, create_dir, clear_folder
-from .io_utils import get_files_paths_from_dir_with_ext
-from .io_utils import clear_folder_files_with_ext
-from .io_utils import get_img_size, get_img_dpi
-from .io_utils import get_files_paths_from_dir
-from .io_utils import get_images_from_dir
-from .io_utils import print_list_new_row
-from .io_utils import str_list_new_row
-from .io_utils import is_file, is_dir
-from .io_utils import get_base_name
-from .io_utils import read_image
+import importlib as _importlib
+
+# имена, загружаемые при первом обращении (serial и cv2 импортируются, только когда нужны): модуль -> имена
+_LAZY_MODULES = {
+    ".serial_utils": ("search_serial_ports",),
+    ".real_time_filter": ("RealTimeFilter",),
+    ".filter_bank": ("FilterBank",),
+    ".runnig_average": ("RunningAverage",),
+    ".io_utils": ("get_file_type", "create_dir", "clear_folder", "get_files_paths_from_dir_with_ext",
+                  "clear_folder_files_with_ext", "get_img_size", "get_img_dpi", "get_files_paths_from_dir",
+                  "get_images_from_dir", "print_list_new_row", "str_list_new_row", "is_file", "is_dir",
+                  "get_base_name", "read_image"),
+    ".Common": ("Timer", "BitSet32"),
+    ".Device": ("DeviceMessage", "BEGIN_MODE_MESSAGE", "RUNNING_MODE_MESSAGE", "END_MODE_MESSAGE"),
+    ".Geometry": ("Vector2", "Vector3", "Quaternion"),
+}
+
+# подпакеты, доступные как атрибуты (Utilities.Device) без явного import Utilities.Device
+_LAZY_SUBPACKAGES = ("ActionsLoop", "CV", "Common", "DataAnalysis", "Device", "Geometry", "Matplotlib")
+
+_LAZY_ATTRIBUTES = {name: module for module, names in _LAZY_MODULES.items() for name in names}
+
+
+def __getattr__(name: str):
+    if name in _LAZY_SUBPACKAGES:
+        # import_module сам записывает подпакет в атрибуты Utilities
+        return _importlib.import_module(f".{name}", __name__)
+    if name not in _LAZY_ATTRIBUTES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(_importlib.import_module(_LAZY_ATTRIBUTES[name], __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_ATTRIBUTES) | set(_LAZY_SUBPACKAGES))
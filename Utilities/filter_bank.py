@@ -0,0 +1,254 @@
+from Utilities.Geometry.common import fast_math
+from typing import Sequence, Union
+import numpy as np
+
+RUNNING_AVERAGE_MODE = 0
+MEDIAN_MODE = 1
+KALMAN_MODE = 2
+_MODES = (RUNNING_AVERAGE_MODE, MEDIAN_MODE, KALMAN_MODE)
+
+
+def _channels_index(channels: np.ndarray) -> Union[slice, np.ndarray]:
+    # подряд идущие каналы адресуются срезом, без копирования при индексации
+    if channels.size and channels[-1] - channels[0] + 1 == channels.size:
+        return slice(int(channels[0]), int(channels[-1]) + 1)
+    return channels
+
+
+def _channels_array(value: Union[float, Sequence[float]], n_channels: int, min_: float, max_: float) -> np.ndarray:
+    return np.clip(np.broadcast_to(np.asarray(value, dtype=np.float64), (n_channels,)), min_, max_).copy()
+
+
+@fast_math("void(float64[:, ::1], float64[::1], float64[::1], float64[:, ::1])")
+def _run_avg_columns(columns: np.ndarray, k_arg: np.ndarray, curr_value: np.ndarray, out: np.ndarray) -> None:
+    for i in range(columns.shape[0]):
+        for j in range(columns.shape[1]):
+            curr_value[j] += (columns[i, j] - curr_value[j]) * k_arg[j]
+            out[i, j] = curr_value[j]
+
+
+@fast_math("void(float64[:, ::1], float64[::1], float64[::1], float64[::1], float64[::1], float64[:, ::1])")
+def _kalman_columns(columns: np.ndarray, k_arg: np.ndarray, err_measure: np.ndarray, err_estimate: np.ndarray,
+                    last_estimate: np.ndarray, out: np.ndarray) -> None:
+    for i in range(columns.shape[0]):
+        for j in range(columns.shape[1]):
+            gain = err_estimate[j] / (err_estimate[j] + err_measure[j])
+            estimate = last_estimate[j] + gain * (columns[i, j] - last_estimate[j])
+            err_estimate[j] = (1.0 - gain) * err_estimate[j] + abs(last_estimate[j] - estimate) * k_arg[j]
+            last_estimate[j] = estimate
+            out[i, j] = estimate
+
+
+class FilterBank:
+    """
+    Набор RealTimeFilter для N каналов с состоянием в массивах numpy. Все каналы фильтруются одним вызовом.
+    Режимы каналов как у RealTimeFilter: 0 - скользящее среднее, 1 - медиана, 2 - калман.
+    Окно медианы хранится отсортированным и обновляется вставкой и удалением одного значения,
+    без пересортировки.
+    """
+    def __init__(self, n_channels: int, modes: Union[int, Sequence[int]] = MEDIAN_MODE, window_size: int = 127,
+                 k_arg: Union[float, Sequence[float]] = 0.08, kalman_error: Union[float, Sequence[float]] = 0.9):
+        if n_channels <= 0:
+            raise RuntimeError(f"FilterBank :: channels count must be positive, got {n_channels}")
+        self._n_channels: int = int(n_channels)
+        self._modes: np.ndarray = np.zeros(self._n_channels, dtype=np.int64)
+        self._window_size: int = 1
+        self._k_arg: np.ndarray = _channels_array(k_arg, self._n_channels, 0.0, 1.0)
+        self._err_measure: np.ndarray = _channels_array(kalman_error, self._n_channels, 0.0, 1.0)
+        self._curr_value: np.ndarray = np.zeros(self._n_channels)
+        self._prev_value: np.ndarray = np.zeros(self._n_channels)
+        self._err_estimate: np.ndarray = np.full(self._n_channels, 0.333)
+        self._window_values: np.ndarray = np.zeros((0, 1))
+        self._window_sorted: np.ndarray = np.zeros((0, 1))
+        self._window_pos: int = 0
+        self._window_index: np.ndarray = np.zeros((1, 1), dtype=np.int64)
+        self._run_avg_channels: np.ndarray = np.zeros(0, dtype=np.int64)
+        self._median_channels: np.ndarray = np.zeros(0, dtype=np.int64)
+        self._kalman_channels: np.ndarray = np.zeros(0, dtype=np.int64)
+        self._run_avg_index: Union[slice, np.ndarray] = self._run_avg_channels
+        self._median_index: Union[slice, np.ndarray] = self._median_channels
+        self._kalman_index: Union[slice, np.ndarray] = self._kalman_channels
+        self.modes = modes
+        self.window_size = window_size
+
+    def __str__(self):
+        return f"\t{{\n" \
+               f"\t\t\"modes\":       [{', '.join(str(m) for m in self._modes)}],\n" \
+               f"\t\t\"window_size\": {self.window_size},\n" \
+               f"\t\t\"k_arg\":       [{', '.join(str(k) for k in self._k_arg)}],\n" \
+               f"\t\t\"kalman_error\":[{', '.join(str(e) for e in self._err_measure)}]\n" \
+               f"\t}}"
+
+    def clean_up(self) -> None:
+        self._err_estimate[:] = 0.333
+        self._prev_value[:] = 0.0
+        self._curr_value[:] = 0.0
+        self._window_values[:] = 0.0
+        self._window_sorted[:] = 0.0
+        self._window_pos = 0
+
+    def prime(self, values: Union[float, Sequence[float]]) -> None:
+        """
+        Сбрасывает состояние так, как если бы на вход долго подавались values.
+        """
+        values = np.broadcast_to(np.asarray(values, dtype=np.float64), (self._n_channels,))
+        self.clean_up()
+        self._curr_value[:] = values
+        self._prev_value[:] = values
+        self._window_values[:] = values[self._median_channels, None]
+        self._window_sorted[:] = values[self._median_channels, None]
+
+    @property
+    def n_channels(self) -> int:
+        return self._n_channels
+
+    @property
+    def modes(self) -> np.ndarray:
+        return self._modes.copy()
+
+    @modes.setter
+    def modes(self, val: Union[int, Sequence[int]]) -> None:
+        modes = np.broadcast_to(np.asarray(val, dtype=np.int64), (self._n_channels,))
+        if np.any(~np.isin(modes, _MODES)):
+            raise RuntimeError(f"FilterBank :: unknown filter mode in {val}")
+        self._modes = modes.copy()
+        self._run_avg_channels = np.flatnonzero(self._modes == RUNNING_AVERAGE_MODE)
+        self._median_channels = np.flatnonzero(self._modes == MEDIAN_MODE)
+        self._kalman_channels = np.flatnonzero(self._modes == KALMAN_MODE)
+        self._run_avg_index = _channels_index(self._run_avg_channels)
+        self._median_index = _channels_index(self._median_channels)
+        self._kalman_index = _channels_index(self._kalman_channels)
+        self.window_size = self._window_size
+
+    @property
+    def window_size(self) -> int:
+        return self._window_size
+
+    @window_size.setter
+    def window_size(self, val: int) -> None:
+        val = max(1, abs(int(val)))
+        self._window_size = val if val % 2 == 1 else val + 1
+        self._window_values = np.zeros((self._median_channels.size, self._window_size))
+        self._window_sorted = np.zeros((self._median_channels.size, self._window_size))
+        self._window_index = np.arange(self._window_size)[None, :]
+        self._window_pos = 0
+
+    @property
+    def k_arg(self) -> np.ndarray:
+        return self._k_arg.copy()
+
+    @k_arg.setter
+    def k_arg(self, val: Union[float, Sequence[float]]) -> None:
+        self._k_arg = _channels_array(val, self._n_channels, 0.0, 1.0)
+
+    @property
+    def kalman_error(self) -> np.ndarray:
+        return self._err_measure.copy()
+
+    @kalman_error.setter
+    def kalman_error(self, val: Union[float, Sequence[float]]) -> None:
+        self._err_measure = _channels_array(val, self._n_channels, 0.0, 1.0)
+
+    @property
+    def values(self) -> np.ndarray:
+        """
+        Последние отфильтрованные значения.
+        """
+        return self._curr_value.copy()
+
+    @property
+    def prev_values(self) -> np.ndarray:
+        return self._prev_value.copy()
+
+    def _median_filter(self, values: np.ndarray) -> np.ndarray:
+        window = self._window_size
+        old = self._window_values[:, self._window_pos].copy()
+        self._window_values[:, self._window_pos] = values
+        self._window_pos = (self._window_pos + 1) % window
+        window_sorted = self._window_sorted
+        if window == 1:
+            window_sorted[:, 0] = values
+            return values
+        # removed - позиция вытесняемого значения, inserted - позиция нового значения в окне без вытесняемого.
+        # Значения между ними сдвигаются на одну позицию, остальные остаются на месте.
+        old = old[:, None]
+        values = values[:, None]
+        removed = np.sum(window_sorted < old, axis=1, keepdims=True)
+        inserted = np.sum(window_sorted < values, axis=1, keepdims=True) - (old < values)
+        index = self._window_index
+        shifted = window_sorted.copy()
+        np.copyto(window_sorted[:, :-1], shifted[:, 1:], where=(index[:, :-1] >= removed) & (index[:, :-1] < inserted))
+        np.copyto(window_sorted[:, 1:], shifted[:, :-1], where=(index[:, 1:] > inserted) & (index[:, 1:] <= removed))
+        np.copyto(window_sorted, values, where=index == inserted)
+        return window_sorted[:, window // 2]
+
+    def filter(self, values: Union[Sequence[float], np.ndarray], out: np.ndarray = None) -> np.ndarray:
+        """
+        Фильтрует по одному новому значению для каждого канала.
+        :param values: (n_channels,) новые значения
+        :param out: массив для результата, по умолчанию новый
+        :return: (n_channels,) отфильтрованные значения
+        """
+        values = np.asarray(values, dtype=np.float64)
+        if values.shape != (self._n_channels,):
+            raise RuntimeError(f"FilterBank :: expected {self._n_channels} values, got shape {values.shape}")
+        curr_value = self._curr_value
+        self._prev_value[:] = curr_value
+        if self._run_avg_channels.size:
+            ch = self._run_avg_index
+            curr_value[ch] += (values[ch] - curr_value[ch]) * self._k_arg[ch]
+        if self._median_channels.size:
+            ch = self._median_index
+            curr_value[ch] = self._median_filter(values[ch])
+        if self._kalman_channels.size:
+            ch = self._kalman_index
+            last = curr_value[ch]
+            err_estimate = self._err_estimate[ch]
+            gain = err_estimate / (err_estimate + self._err_measure[ch])
+            estimate = last + gain * (values[ch] - last)
+            self._err_estimate[ch] = (1.0 - gain) * err_estimate + np.abs(last - estimate) * self._k_arg[ch]
+            curr_value[ch] = estimate
+        if out is None:
+            return curr_value.copy()
+        out[:] = curr_value
+        return out
+
+    def filter_columns(self, columns: np.ndarray, prime: bool = False) -> np.ndarray:
+        """
+        Фильтрует колонки лога (T, n_channels) целиком, начиная с чистого состояния. Состояние банка не меняется.
+        :param prime: начальное состояние по первой строке (см. prime), иначе нулевое, как у RealTimeFilter
+        """
+        columns = np.asarray(columns, dtype=np.float64)
+        if columns.ndim != 2 or columns.shape[1] != self._n_channels:
+            raise RuntimeError(f"FilterBank :: expected (T, {self._n_channels}) columns, got shape {columns.shape}")
+        out = np.empty_like(columns)
+        if columns.shape[0] == 0:
+            return out
+        start = columns[0] if prime else np.zeros(self._n_channels)
+        if self._run_avg_channels.size:
+            ch = self._run_avg_channels
+            column = np.ascontiguousarray(columns[:, ch])
+            result = np.empty_like(column)
+            _run_avg_columns(column, self._k_arg[ch], start[ch].copy(), result)
+            out[:, ch] = result
+        if self._median_channels.size:
+            ch = self._median_channels
+            padded = np.concatenate((np.broadcast_to(start[ch], (self._window_size - 1, ch.size)), columns[:, ch]))
+            windows = np.lib.stride_tricks.sliding_window_view(padded, self._window_size, axis=0)
+            out[:, ch] = np.median(windows, axis=-1)
+        if self._kalman_channels.size:
+            ch = self._kalman_channels
+            column = np.ascontiguousarray(columns[:, ch])
+            result = np.empty_like(column)
+            _kalman_columns(column, self._k_arg[ch], self._err_measure[ch], np.full(ch.size, 0.333),
+                            start[ch].copy(), result)
+            out[:, ch] = result
+        return out
+
+    def filtfilt(self, columns: np.ndarray) -> np.ndarray:
+        """
+        Двойной проход по колонкам лога (вперёд и назад), компенсирующий запаздывание фильтра, как filtfilt.
+        Каждый проход начинается с состояния по крайнему значению, чтобы не было переходного процесса от нуля.
+        """
+        forward = self.filter_columns(columns, prime=True)
+        return self.filter_columns(forward[::-1], prime=True)[::-1].copy()
@@ -0,0 +1,68 @@
+"""
+Время импорта пакета Utilities и проверка, что лёгкие импорты не загружают тяжёлые зависимости.
+Каждый импорт выполняется в отдельном процессе python. Код возврата 1, если хотя бы одна проверка не прошла.
+Запуск: python -m Utilities.import_benchmark
+"""
+from typing import List, Tuple
+import subprocess
+import json
+import sys
+import os
+
+_HEAVY_MODULES = ("cv2", "numba", "serial", "matplotlib", "scipy")
+
+# (импорт, модули, которые он не должен загружать, допустимое время импорта, с)
+_CASES: List[Tuple[str, Tuple[str, ...], float]] = [
+    ("import Utilities", _HEAVY_MODULES, 0.05),
+    ("from Utilities.Geometry import Vector3, Quaternion", _HEAVY_MODULES, 0.5),
+    ("from Utilities import RealTimeFilter", _HEAVY_MODULES, 0.5),
+    ("from Utilities import Vector3, Quaternion, RealTimeFilter", _HEAVY_MODULES, 0.5),
+    ("from Utilities import FilterBank", _HEAVY_MODULES, 0.5),
+    ("from Utilities.Geometry import Vector3Array, Matrix4Array, QuaternionArray", _HEAVY_MODULES, 0.5),
+    ("from Utilities.Geometry import bi_qubic_cut, fft_2d, BiCubicInterpolator", _HEAVY_MODULES, 0.5),
+]
+
+_PROBE = """
+import time, sys, json
+t = time.perf_counter()
+{statement}
+t = time.perf_counter() - t
+print(json.dumps({{"time": t, "modules": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def _measure(statement: str, heavy: Tuple[str, ...]) -> Tuple[float, List[str]]:
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ)
+    env["PYTHONPATH"] = root + os.pathsep + env.get("PYTHONPATH", "")
+    result = subprocess.run([sys.executable, "-c", _PROBE.format(statement=statement, heavy=heavy)],
+                            capture_output=True, text=True, cwd=root, env=env)
+    if result.returncode != 0:
+        raise RuntimeError(f"import_benchmark :: '{statement}' failed:\n{result.stderr}")
+    report = json.loads(result.stdout.strip().splitlines()[-1])
+    return report["time"], report["modules"]
+
+
+def import_benchmark(repeats: int = 5, time_scale: float = 1.0) -> bool:
+    """
+    :param repeats: число запусков каждого импорта, сравнивается медиана.
+    :param time_scale: множитель допустимого времени (например, 5.0 для Raspberry Pi).
+    :return: True, если все проверки прошли.
+    """
+    passed = True
+    print(f"|{'import':80}|{'median, ms':>11}|{'budget, ms':>11}|{'heavy modules':20}|")
+    for statement, heavy, budget in _CASES:
+        times, modules = [], []
+        for _ in range(repeats):
+            t, modules = _measure(statement, heavy)
+            times.append(t)
+        median = sorted(times)[len(times) // 2]
+        ok = len(modules) == 0 and median <= budget * time_scale
+        passed &= ok
+        print(f"|{statement:80}|{median * 1e3:11.1f}|{budget * time_scale * 1e3:11.1f}|"
+              f"{', '.join(modules):20}|{'' if ok else ' FAILED'}")
+    return passed
+
+
+if __name__ == "__main__":
+    sys.exit(0 if import_benchmark(time_scale=float(sys.argv[1]) if len(sys.argv) > 1 else 1.0) else 1)
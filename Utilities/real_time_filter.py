@@ -1,7 +1,11 @@
+from Utilities.Common.order_statistics import WindowOrderStatistics
 from Utilities.Common.circ_buffer import CircBuffer
-from typing import Callable
+from typing import Callable, Union
 import math
 
+# начиная с этой ширины окна медиана считается по skip-list, а не полной сортировкой окна
+WIDE_WINDOW_SIZE = 256
+
 
 def _clamp(val: float, min_: float, max_: float) -> float:
     """
@@ -17,6 +21,14 @@ def _clamp(val: float, min_: float, max_: float) -> float:
     return val
 
 
+def _make_window(window_size: int) -> Union[CircBuffer, WindowOrderStatistics]:
+    if window_size < WIDE_WINDOW_SIZE:
+        return CircBuffer(window_size)
+    window = WindowOrderStatistics(window_size)
+    window.fill(0.0)
+    return window
+
+
 class RealTimeFilter:
     def __init__(self):
         self._mode: int = 0
@@ -24,7 +36,7 @@ class RealTimeFilter:
         # 1 median
         # 2 kalman
         self._window_size:   int = 128
-        self._window_values: CircBuffer = CircBuffer(self.window_size)
+        self._window_values: Union[CircBuffer, WindowOrderStatistics] = _make_window(self.window_size)
         self._prev_value:    float = 0.0
         self._curr_value:    float = 0.0
         self._k_arg:         float = 0.08
@@ -47,7 +59,10 @@ class RealTimeFilter:
         self._last_estimate = 0.0
         self._prev_value = 0.0
         self._curr_value = 0.0
-        self._window_values.clear()
+        if isinstance(self._window_values, WindowOrderStatistics):
+            self._window_values.fill(0.0)
+        else:
+            self._window_values.clear()
 
     @property
     def window_size(self) -> int:
@@ -56,11 +71,11 @@ class RealTimeFilter:
     @window_size.setter
     def window_size(self, val: int) -> None:
         if val % 2 == 0:
-            self._window_size = 1 + math.fabs(val)
-            self._window_values = CircBuffer(self.window_size)
+            self._window_size = int(1 + math.fabs(val))
+            self._window_values = _make_window(self.window_size)
             return
         self._window_size = int(math.fabs(val))
-        self._window_values = CircBuffer(self.window_size)
+        self._window_values = _make_window(self.window_size)
 
     @property
     def mode(self) -> int:
@@ -103,8 +118,14 @@ class RealTimeFilter:
         return self._curr_value
 
     def _mid_filter(self, value: float) -> float:
-        self._window_values.append(value)
         self._prev_value = self._curr_value
+        if isinstance(self._window_values, WindowOrderStatistics):
+            # NaN не упорядочивается, такие выбросы просто пропускаем
+            if value == value:
+                self._window_values.append(value)
+            self._curr_value = self._window_values[self._window_values.capacity // 2]
+            return self._curr_value
+        self._window_values.append(value)
         self._curr_value = self._window_values.sorted[self._window_values.capacity // 2]
         return self._curr_value
 
@@ -1,5 +1,3 @@
-import time
-
 from matplotlib import pyplot as plt
 from os.path import isfile, join
 from typing import List, Tuple
@@ -11,8 +9,10 @@ import cv2 as cv
 # https://github.com/niconielsen32/ComputerVision/blob/master/LiveCameraTrajectory/liveCameraPoseEstimation.py
 # KITTI Camera
 from UIQt.GLUtilities.gl_tris_mesh import create_box, write_obj_mesh, TrisMeshGL
-from Utilities.Geometry import Matrix4, Vector3
+from Utilities.Geometry import Vector3
 from Utilities.Geometry.voxel import Voxel
+from Utilities.CV.frame_features import FrameFeatureStore, match_points
+from Utilities.CV.kitti import load_calib, load_poses, get_pose
 
 camera_k = np.array([[7.070912000000e+02, 0.000000000000e+00, 6.018873000000e+02],
                      [0.000000000000e+00, 7.070912000000e+02, 1.831104000000e+02],
@@ -29,63 +29,12 @@ camera_p = camera_k @ np.array(((1.0, 0.0, 0.0, 0.0), (0.0, 1.0, 0.0, 0.0), (0.0
 # camera_p = camera_k @ np.array(((1.0, 0.0, 0.0, 0.0), (0.0, 1.0, 0.0, 0.0), (0.0, 0.0, 1.0, 0.0)), dtype=np.float32)
 
 
-def build_transform(r: np.ndarray, t: np.ndarray) -> np.ndarray:
-    """
-    Build transform matrix
-    :param r: rotation 3x3 matrix
-    :param t: translation 3x1 vector
-    :return:
-    """
-    tr = np.eye(4, dtype=np.float32)
-    tr[:3, :3] = r
-    tr[:3, 3] = t
-    return tr
-
-
 def load_images(path: str):
     files = [f"{path}/{p}" for p in listdir(path) if isfile(join(path, p))]
     imgs = [cv.imread(f, cv.IMREAD_GRAYSCALE) for f in files]
     return [(f, i) for f, i in zip(files, imgs)]
 
 
-def load_calib(path: str):
-    """
-    Loads the calibration of the camera
-    Parameters
-    ----------
-    filepath (str): The file path to the camera file
-    Returns
-    -------
-    K (ndarray): Intrinsic parameters
-    P (ndarray): Projection matrix
-    """
-    with open(path, 'r') as f:
-        params = np.fromstring(f.readline(), dtype=np.float32, sep=' ')
-        P = np.reshape(params, (3, 4))
-        K = P[0:3, 0:3]
-    return K, P
-
-
-def load_poses(filepath):
-    """
-     Loads the GT poses
-     Parameters
-     ----------
-     filepath (str): The file path to the poses file
-     Returns
-     -------
-     poses (ndarray): The GT poses
-     """
-    poses = []
-    with open(filepath, 'r') as f:
-        for line in f.readlines():
-            t = np.fromstring(line, dtype=np.float32, sep=' ')
-            t = t.reshape(3, 4)
-            t = np.vstack((t, (0.0, 0.0, 0.0, 1.0)))
-            poses.append(t)
-    return poses
-
-
 def draw_transforms(t_list: List[np.ndarray], color='k', axis=None):
     x = [tr[0][3] for tr in t_list]
     y = [tr[1][3] for tr in t_list]
@@ -123,49 +72,6 @@ def draw_transforms_xz(t_list: List[np.ndarray], color='k', axis=None):
                   [z[i], z[i] + ez[i][2]], 'b')
 
 
-def decompose_essential_mat(essential_matrix: np.ndarray, q_1: np.ndarray, q_2: np.ndarray, camera_p) -> np.ndarray:
-    rot_1, rot_2, trans = cv.decomposeEssentialMat(essential_matrix)
-
-    trans = np.squeeze(trans)
-
-    transformations = (build_transform(rot_1, trans), build_transform(rot_2, trans),
-                       build_transform(rot_1, -trans), build_transform(rot_2, -trans))
-
-    # camera = np.concatenate((camera_k, np.zeros((3, 1))), axis=1) equal to camera_p
-    projections = (camera_p @ transformations[0], camera_p @ transformations[1],
-                   camera_p @ transformations[2], camera_p @ transformations[3])
-    z_sums = -1e32  # []
-    z_scale = -1.0  # []
-    z_sums_curr = 0
-    transformation = None
-    target_points = None
-    for T, P in zip(transformations, projections):
-        hom_q1 = cv.triangulatePoints(camera_p, P, q_1.T, q_2.T)  # Camera Tracking System
-        hom_q2 = np.matmul(T, hom_q1)
-        hom_q1[:3, :] /= hom_q1[3, :]  # Пространственные координаты особых точек, которые видит камера 1
-        hom_q2[:3, :] /= hom_q2[3, :]  # Пространственные координаты особых точек, которые видит камера 2
-
-        hom_q1[3, :] = 1.0
-        hom_q2[3, :] = 1.0
-
-        z_sums_curr = sum(hom_q2[2, :] > 0) + sum(hom_q1[2, :] > 0)
-        if z_sums_curr < z_sums:
-            continue
-        # Find the number of points there has positive z coordinate in both cameras
-        z_sums = z_sums_curr
-        z_scale = np.mean(np.linalg.norm(hom_q1.T[:-1] - hom_q1.T[1:], axis=-1) /
-                          np.linalg.norm(hom_q2.T[:-1] - hom_q2.T[1:], axis=-1))
-        transformation = T
-        transformation[:3, 3] *= z_scale
-
-    return transformation, hom_q2
-
-
-def get_pose(q_1: np.ndarray, q_2: np.ndarray, camera_k: np.ndarray, camera_p: np.ndarray):
-    e_m, e_m_mask = cv.findEssentialMat(q_1, q_2, camera_k)  # , threshold=2.)
-    return decompose_essential_mat(e_m, q_1, q_2, camera_p)
-
-
 class CameraTrack:
     def __init__(self, images_src, calib_info_src: str = None, gt_poses_src: str = None):
         self._images: List[Tuple[str, np.ndarray]] = load_images(images_src)
@@ -187,7 +93,9 @@ class CameraTrack:
         FLANN_INDEX_LSH = 6
         index_params = {"algorithm": FLANN_INDEX_LSH, "table_number": 6, "key_size": 12, "multi_probe_level": 2}
         search_params = {"checks": 10}
-        self._flann = cv.FlannBasedMatcher(indexParams=index_params, searchParams=search_params)
+        # изображение index + 1 детектируется один раз и используется в паре (index + 1, index + 2) из кэша
+        self._features = FrameFeatureStore(
+            self._orb, lambda: cv.FlannBasedMatcher(indexParams=index_params, searchParams=search_params), 2)
         self.display: bool = True
         self._voxel_size = 0.5
         self._voxels = set()
@@ -198,19 +106,19 @@ class CameraTrack:
             print(f"{{\n\t\"voxel_size\": {self._voxel_size},\n\t\"voxels\": [", file=output)
             for index in range(len(self._images) - 1):
 
-                kp1, des1 = self._orb.detectAndCompute(self._images[index][1], None)
-                kp2, des2 = self._orb.detectAndCompute(self._images[index + 1][1], None)
+                features_1 = self._features.features(self._images[index][1], index)
+                features_2 = self._features.features(self._images[index + 1][1], index + 1)
 
-                if des1 is None:
+                if not features_1.has_descriptors:
                     continue
-                if des2 is None:
+                if not features_2.has_descriptors:
                     continue
-                if len(kp1) < 10:
+                if len(features_1) < 10:
                     continue
-                if len(kp2) < 10:
+                if len(features_2) < 10:
                     continue
 
-                matches = self._flann.knnMatch(des1, des2, k=2)
+                matches = self._features.knn_match(features_1, features_2, k=2)
                 matches_mask = [(0, 0) for _ in range(len(matches))]
                 matches_good = []
 
@@ -225,13 +133,13 @@ class CameraTrack:
                 if self.display:
                     draw_params = dict(matchColor=(0, 255, 0), singlePointColor=(255, 0, 0),
                                        matchesMask=matches_mask, flags=2)
-                    img3 = cv.drawMatchesKnn(self._images[index][1], kp1, self._images[index + 1][1], kp2, matches,
+                    img3 = cv.drawMatchesKnn(self._images[index][1], features_1.key_points,
+                                             self._images[index + 1][1], features_2.key_points, matches,
                                              None, **draw_params)
                     cv.imshow('SIFT-odometry', img3)
                     cv.waitKey(10)
                 self._img_prev = self._img_curr
-                q1 = np.float32([kp1[m.queryIdx].pt for m in matches_good])
-                q2 = np.float32([kp2[m.trainIdx].pt for m in matches_good])
+                q1, q2 = match_points(features_1, features_2, matches_good)
                 # по результатам q1 и q2 получаем цвета из _img_prev и _img_curr соответсвенно
                 t, u_hom_pnts = get_pose(q1, q2, self._camera_k,
                                          self._camera_p)  # дополнительно рассчитывает пространственное полежние  q1, q2
@@ -274,52 +182,10 @@ class CameraTrack:
 
 
 def speed_test():
-    # np 4x4 matrix identity create time: 1.149396504915785  sec for 1000000 iterations
-    # my 4x4 matrix identity create time: 1.229776706022676  sec for 1000000 iterations
-    # np 4x4 matrix inversion time:       130.61569990747375 sec for 1000000 iterations
-    # my 4x4 matrix inversion time:       6.819007195997983  sec for 1000000 iterations
-    # np 4x4 matrix multiplication time:  1.2466165156802163 sec for 1000000 iterations
-    # my 4x4 matrix multiplication time:  5.52913630718831   sec for 1000000 iterations
-    t_start = 0.0
-    t_total = 0.0
-    n = 100000
-
-    for _ in range(n):
-        t_start = time.perf_counter()
-        a = np.eye(4, dtype=float)
-        t_total += time.perf_counter() - t_start
-    print(f"np 4x4 matrix identity create time: {t_total}")
-    t_total = 0.0
-    for _ in range(n):
-        t_start = time.perf_counter()
-        a = Matrix4.identity()
-        t_total += time.perf_counter() - t_start
-    print(f"my 4x4 matrix identity create time: {t_total}")
-    np_m = np.array([[1, 2, 0, 4], [5, 6, 7, 8], [9, 10, 11, 12], [13, 0, 15, 16]], dtype=float)
-    my_m = Matrix4(1, 2, 0, 4, 5, 6, 7, 8, 9, 10, 11, 12, 13, 0, 15, 16)
-    for _ in range(n):
-        t_start = time.perf_counter()
-        a = np.linalg.inv(np_m)
-        t_total += time.perf_counter() - t_start
-    print(f"np 4x4 matrix inversion time: {t_total}")
-    t_total = 0.0
-    for _ in range(n):
-        t_start = time.perf_counter()
-        a = my_m.invert()
-        t_total += time.perf_counter() - t_start
-    print(f"my 4x4 matrix inversion time: {t_total}")
-    t_total = 0.0
-    for _ in range(n):
-        t_start = time.perf_counter()
-        a = np_m @ np_m
-        t_total += time.perf_counter() - t_start
-    print(f"np 4x4 matrix multiplication time: {t_total}")
-    t_total = 0.0
-    for _ in range(n):
-        t_start = time.perf_counter()
-        a = my_m * my_m
-        t_total += time.perf_counter() - t_start
-    print(f"my 4x4 matrix multiplication time: {t_total}")
+    # замеры всех примитивов и сравнение с базовым запуском: python -m Utilities.Geometry.Benchmarks
+    from Utilities.Geometry.Benchmarks import run_benchmarks
+    for pattern in ("construction.", "inversion.", "arithmetic."):
+        run_benchmarks(pattern)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,284 @@
+"""
+Оценка визуальной одометрии (как в CameraTrack) по набору последовательностей KITTI с истинными положениями.
+Последовательность - каталог вида:
+    <sequence>/calib.txt      - матрица проекции 3x4 в первой строке (load_calib)
+    <sequence>/poses.txt      - истинные положения камеры, строка на кадр (load_poses)
+    <sequence>/image_l/*.png  - кадры, сортируются по имени
+Последовательности обрабатываются параллельно в пуле процессов, для каждой считаются
+ATE (absolute trajectory error) после совмещения траекторий, RPE (relative pose error) и время по кадрам.
+    python odometry_evaluation.py E:/KITTI/sequences -o orb_3000.json
+    python odometry_evaluation.py E:/KITTI/sequences --detector sift --baseline orb_3000.json
+"""
+from Utilities.CV.frame_features import FrameFeatureStore, match_points
+from Utilities.CV.kitti import load_calib, load_poses, get_pose
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Tuple, Union
+import numpy as np
+import cv2 as cv
+import argparse
+import datetime
+import platform
+import math
+import time
+import json
+import sys
+import os
+
+_IMAGE_EXTENSIONS = ('.png', '.jpg', '.bmp')
+
+DEFAULT_SETTINGS = {"detector": "orb", "features": 3000, "ratio": 0.5, "min_points": 10, "images": "image_l",
+                    "max_frames": 0, "rpe_delta": 1, "align": "sim3"}
+
+
+def _flann_orb():
+    index_params = {"algorithm": 6, "table_number": 6, "key_size": 12, "multi_probe_level": 2}  # FLANN_INDEX_LSH
+    return cv.FlannBasedMatcher(indexParams=index_params, searchParams={"checks": 10})
+
+
+def _flann_sift():
+    return cv.FlannBasedMatcher({"algorithm": 1, "trees": 5}, {"checks": 10})  # FLANN_INDEX_KDTREE
+
+
+def _feature_store(settings: dict) -> FrameFeatureStore:
+    if settings["detector"] == "orb":
+        return FrameFeatureStore(cv.ORB_create(settings["features"]), _flann_orb, 2)
+    if settings["detector"] == "sift":
+        return FrameFeatureStore(cv.SIFT_create(settings["features"]), _flann_sift, 2)
+    raise RuntimeError(f"odometry_evaluation :: unknown detector \"{settings['detector']}\"")
+
+
+def _images_paths(directory: str) -> List[str]:
+    return sorted(os.path.join(directory, name) for name in os.listdir(directory)
+                  if name.lower().endswith(_IMAGE_EXTENSIONS))
+
+
+def find_sequences(root: str, images: str = "image_l") -> List[str]:
+    """
+    root - каталог последовательности или каталог с последовательностями.
+    """
+    def is_sequence(path: str) -> bool:
+        return all(os.path.exists(os.path.join(path, name)) for name in ("calib.txt", "poses.txt", images))
+    if is_sequence(root):
+        return [root]
+    return sorted(os.path.join(root, name) for name in os.listdir(root) if is_sequence(os.path.join(root, name)))
+
+
+def umeyama_alignment(source: np.ndarray, target: np.ndarray, with_scale: bool = True) \
+        -> Tuple[float, np.ndarray, np.ndarray]:
+    """
+    Преобразование подобия (scale, rotation, translation), переводящее точки source (n, 3) в target (n, 3)
+    с минимальной суммой квадратов отклонений: target ~ scale * rotation @ source + translation.
+    """
+    mean_s, mean_t = source.mean(axis=0), target.mean(axis=0)
+    ds, dt = source - mean_s, target - mean_t
+    u, d, vt = np.linalg.svd(dt.T @ ds / source.shape[0])
+    s = np.eye(3)
+    if np.linalg.det(u) * np.linalg.det(vt) < 0.0:
+        s[2, 2] = -1.0
+    rotation = u @ s @ vt
+    variance = (ds * ds).sum() / source.shape[0]
+    scale = float(np.trace(np.diag(d) @ s) / variance) if with_scale and variance > 0.0 else 1.0
+    return scale, rotation, mean_t - scale * rotation @ mean_s
+
+
+def _error_stats(errors: np.ndarray) -> Dict[str, float]:
+    if errors.size == 0:
+        return {"rmse": float('nan'), "mean": float('nan'), "median": float('nan'), "max": float('nan')}
+    return {"rmse": float(np.sqrt(np.mean(errors * errors))), "mean": float(np.mean(errors)),
+            "median": float(np.median(errors)), "max": float(np.max(errors))}
+
+
+def absolute_trajectory_error(estimated: np.ndarray, ground_truth: np.ndarray, align: str = "sim3") \
+        -> Tuple[Dict[str, float], float]:
+    """
+    ATE по положениям камер после совмещения траекторий.
+    :param estimated: положения (n, 4, 4).
+    :param ground_truth: истинные положения (n, 4, 4).
+    :param align: "sim3" - с масштабом (монокулярная одометрия), "se3" - без масштаба, "none".
+    :return: статистика ошибок, масштаб совмещения.
+    """
+    p_est, p_gt = estimated[:, :3, 3], ground_truth[:, :3, 3]
+    scale = 1.0
+    if align != "none" and p_est.shape[0] > 2:
+        scale, rotation, translation = umeyama_alignment(p_est, p_gt, align == "sim3")
+        p_est = scale * p_est @ rotation.T + translation
+    return _error_stats(np.linalg.norm(p_est - p_gt, axis=-1)), scale
+
+
+def relative_pose_error(estimated: np.ndarray, ground_truth: np.ndarray, delta: int = 1, scale: float = 1.0) \
+        -> Tuple[Dict[str, float], Dict[str, float]]:
+    """
+    RPE между кадрами i и i + delta: ошибка (inv(gt_i) @ gt_i+d)^-1 @ (inv(est_i) @ est_i+d).
+    Не зависит от выбора мировой системы координат, scale - масштаб оценки (из absolute_trajectory_error).
+    :return: статистика ошибок перемещения, статистика ошибок поворота (градусы).
+    """
+    if estimated.shape[0] <= delta:
+        return _error_stats(np.zeros(0)), _error_stats(np.zeros(0))
+    estimated = estimated.copy()
+    estimated[:, :3, 3] *= scale
+    d_est = np.linalg.inv(estimated[:-delta]) @ estimated[delta:]
+    d_gt = np.linalg.inv(ground_truth[:-delta]) @ ground_truth[delta:]
+    error = np.linalg.inv(d_gt) @ d_est
+    cos_angle = np.clip((np.trace(error[:, :3, :3], axis1=1, axis2=2) - 1.0) * 0.5, -1.0, 1.0)
+    return _error_stats(np.linalg.norm(error[:, :3, 3], axis=-1)), _error_stats(np.degrees(np.arccos(cos_angle)))
+
+
+def _timing_stats(times: np.ndarray) -> Dict[str, float]:
+    return {"mean": float(np.mean(times)), "median": float(np.median(times)),
+            "p95": float(np.percentile(times, 95)), "max": float(np.max(times))}
+
+
+def evaluate_sequence(sequence: str, settings: dict = None) -> dict:
+    """
+    Одометрия CameraTrack по кадрам последовательности: ORB/SIFT, FLANN, тест отношения расстояний,
+    get_pose и накопление положения. Если положение кадра не найдено, повторяется предыдущее
+    (траектория остаётся сопоставимой с истинной покадрово).
+    """
+    settings = {**DEFAULT_SETTINGS, **(settings if settings else {})}
+    cv.setNumThreads(1)  # параллельность - по последовательностям
+    camera_k, camera_p = load_calib(os.path.join(sequence, "calib.txt"))
+    poses_gt = np.array(load_poses(os.path.join(sequence, "poses.txt")), dtype=float)
+    images = _images_paths(os.path.join(sequence, settings["images"]))
+    n_frames = min(len(images), poses_gt.shape[0])
+    if settings["max_frames"] > 0:
+        n_frames = min(n_frames, settings["max_frames"])
+    if n_frames < 2:
+        raise RuntimeError(f"odometry_evaluation :: sequence {sequence} has less than two frames")
+    store = _feature_store(settings)
+    poses = np.zeros((n_frames, 4, 4))
+    poses[0] = poses_gt[0]
+    # время по кадрам: чтение, особые точки, сопоставление, положение, всего
+    timings = np.zeros((n_frames - 1, 5))
+    failures, matches_count = 0, np.zeros(n_frames - 1, dtype=int)
+    store.features(cv.imread(images[0], cv.IMREAD_GRAYSCALE), 0)
+    for index in range(1, n_frames):
+        t_0 = time.perf_counter()
+        image = cv.imread(images[index], cv.IMREAD_GRAYSCALE)
+        t_1 = time.perf_counter()
+        features_1 = store.get(index - 1)
+        features_2 = store.features(image, index)
+        t_2 = time.perf_counter()
+        good = []
+        if features_1 is not None and min(len(features_1), len(features_2)) >= settings["min_points"]:
+            good = [pair[0] for pair in store.knn_match(features_1, features_2, k=2)
+                    if len(pair) == 2 and pair[0].distance < settings["ratio"] * pair[1].distance]
+        t_3 = time.perf_counter()
+        transform = None
+        if len(good) >= settings["min_points"]:
+            q_1, q_2 = match_points(features_1, features_2, good)
+            try:
+                transform, _ = get_pose(q_1, q_2, camera_k, camera_p)
+            except (cv.error, ValueError, np.linalg.LinAlgError):
+                transform = None
+        t_4 = time.perf_counter()
+        if transform is None or not np.all(np.isfinite(transform)):
+            failures += 1
+            poses[index] = poses[index - 1]
+        else:
+            poses[index] = poses[index - 1] @ np.linalg.inv(transform)
+        matches_count[index - 1] = len(good)
+        timings[index - 1] = (t_1 - t_0, t_2 - t_1, t_3 - t_2, t_4 - t_3, t_4 - t_0)
+
+    ate, scale = absolute_trajectory_error(poses, poses_gt[:n_frames], settings["align"])
+    rpe_translation, rpe_rotation = relative_pose_error(poses, poses_gt[:n_frames], settings["rpe_delta"], scale)
+    return {"sequence": os.path.basename(os.path.normpath(sequence)), "path": sequence, "frames": n_frames,
+            "failures": failures, "matches_mean": float(np.mean(matches_count)), "scale": scale,
+            "ate": ate, "rpe_translation": rpe_translation, "rpe_rotation_deg": rpe_rotation,
+            "fps": float((n_frames - 1) / timings[:, 4].sum()),
+            "timings": {name: _timing_stats(timings[:, i])
+                        for i, name in enumerate(("read", "features", "match", "pose", "total"))},
+            "frame_times": timings[:, 4].tolist(), "trajectory": poses[:, :3, 3].tolist()}
+
+
+def _evaluate_safe(sequence: str, settings: dict) -> dict:
+    try:
+        return evaluate_sequence(sequence, settings)
+    except Exception as ex:
+        return {"sequence": os.path.basename(os.path.normpath(sequence)), "path": sequence,
+                "error": f"{type(ex).__name__}: {ex}"}
+
+
+def evaluate_sequences(sequences: List[str], settings: dict = None, workers: int = None) -> dict:
+    """
+    Оценка последовательностей в пуле процессов (workers=1 - в текущем процессе).
+    :return: {"environment": {...}, "settings": {...}, "results": {имя последовательности: {...}}}.
+    """
+    settings = {**DEFAULT_SETTINGS, **(settings if settings else {})}
+    started = time.perf_counter()
+    if workers == 1 or len(sequences) == 1:
+        results = [_evaluate_safe(sequence, settings) for sequence in sequences]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(_evaluate_safe, sequences, [settings] * len(sequences)))
+    environment = {"time": datetime.datetime.now().isoformat(timespec="seconds"),
+                   "platform": platform.platform(), "python": sys.version.split()[0],
+                   "numpy": np.__version__, "opencv": cv.__version__,
+                   "wall_time_s": time.perf_counter() - started}
+    return {"environment": environment, "settings": settings, "results": {r["sequence"]: r for r in results}}
+
+
+def _ratio(value: float, reference: float) -> float:
+    """
+    value / reference, nan если опорное значение нулевое или не определено.
+    """
+    return value / reference if math.isfinite(reference) and reference != 0.0 else math.nan
+
+
+def print_summary(report: dict, baseline: Union[dict, None] = None) -> None:
+    """
+    Таблица по последовательностям, при заданном baseline - отношение ATE и fps к базовому отчёту.
+    """
+    reference = baseline["results"] if baseline else {}
+    header = f"|{'sequence':16}|{'frames':>7}|{'fails':>6}|{'ATE rmse':>9}|{'RPE t':>8}|{'RPE r, deg':>10}|" \
+             f"{'ms/frame':>9}|{'fps':>7}|"
+    print(header + (f"{'ATE/base':>9}|{'fps/base':>9}|" if baseline else ""))
+    for name, result in report["results"].items():
+        if "error" in result:
+            print(f"|{name:16}| failed: {result['error']}")
+            continue
+        row = f"|{name:16}|{result['frames']:7}|{result['failures']:6}|{result['ate']['rmse']:9.3f}|" \
+              f"{result['rpe_translation']['rmse']:8.3f}|{result['rpe_rotation_deg']['rmse']:10.3f}|" \
+              f"{result['timings']['total']['mean'] * 1e3:9.2f}|{result['fps']:7.2f}|"
+        base = reference.get(name)
+        if baseline and base is not None and "error" not in base:
+            row += f"{_ratio(result['ate']['rmse'], base['ate']['rmse']):9.2f}|" \
+                   f"{_ratio(result['fps'], base['fps']):9.2f}|"
+        print(row)
+    print(f"settings: {json.dumps(report['settings'])}, wall time {report['environment']['wall_time_s']:.1f} s")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(prog="python odometry_evaluation.py")
+    parser.add_argument("root", help="sequence directory or directory of sequences")
+    parser.add_argument("-o", "--output", default=None, help="write report to json file")
+    parser.add_argument("--baseline", default=None, help="report json to compare with")
+    parser.add_argument("--workers", type=int, default=None, help="process pool size, cpu count by default")
+    parser.add_argument("--detector", choices=("orb", "sift"), default=DEFAULT_SETTINGS["detector"])
+    parser.add_argument("--features", type=int, default=DEFAULT_SETTINGS["features"], help="detector features")
+    parser.add_argument("--ratio", type=float, default=DEFAULT_SETTINGS["ratio"], help="ratio test threshold")
+    parser.add_argument("--images", default=DEFAULT_SETTINGS["images"], help="images subdirectory of sequence")
+    parser.add_argument("--max-frames", type=int, default=DEFAULT_SETTINGS["max_frames"], help="0 - all frames")
+    parser.add_argument("--rpe-delta", type=int, default=DEFAULT_SETTINGS["rpe_delta"], help="RPE frames step")
+    parser.add_argument("--align", choices=("sim3", "se3", "none"), default=DEFAULT_SETTINGS["align"])
+    args = parser.parse_args()
+
+    sequences = find_sequences(args.root, args.images)
+    if not sequences:
+        print(f"no sequences with calib.txt, poses.txt and {args.images}/ found in {args.root}")
+        return 1
+    settings = {"detector": args.detector, "features": args.features, "ratio": args.ratio, "images": args.images,
+                "max_frames": args.max_frames, "rpe_delta": args.rpe_delta, "align": args.align}
+    report = evaluate_sequences(sequences, settings, args.workers)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, "rt") as file:
+            baseline = json.load(file)
+    print_summary(report, baseline)
+    if args.output:
+        with open(args.output, "wt") as output:
+            json.dump(report, output, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())